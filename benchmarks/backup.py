@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+End-to-end backup benchmark with synthetic dumps.
+
+Every case runs ``BackupManager.run_backup()`` in a fresh interpreter against
+the fake ``pg_dump``/``mysqldump`` of ``benchmarks/fakebin`` (see
+``benchmarks/synthetic.py``) and records:
+
+- wall time and throughput (uncompressed dump MB per second),
+- the per-phase durations and bytes reported by the backup metrics,
+- the compression ratio,
+- peak RSS of the backup process and of the dump tool,
+- bytes written to storage and through write() calls, and the peak and
+  final size of the backup directory.
+
+The cases are the product of the selected database types, dump shapes,
+compressions, modes (``file`` = dump then compress, ``stream`` =
+BACKUP_STREAMING), compression thread counts and encryption (``on`` =
+BACKUP_ENCRYPTION with a random key). Results are saved as JSON;
+``--compare`` checks them against an earlier result file and fails on
+regressions.
+
+Usage:
+    python benchmarks/backup.py --size 1G --shapes copy,inserts
+    python benchmarks/backup.py --compression gzip,zstd --modes stream --threads 1,4
+    python benchmarks/backup.py --compression zstd,lz4 --encryption off,on
+    python benchmarks/backup.py --compare benchmarks/results/baseline.json --max-regression 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+FAKEBIN = os.path.join(BENCHMARK_DIR, 'fakebin')
+
+sys.path.insert(0, BENCHMARK_DIR)
+
+from synthetic import SHAPES, parse_size  # noqa: E402
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    """Stable identifier of a case, used to match results between runs."""
+    key = f"{case['db_type']}/{case['shape']}/{case['compression']}/{case['mode']}/t{case['threads']}"
+    if case['db_type'] == 'postgresql' and case['pg_format'] != 'plain':
+        key = f"{case['db_type']}/{case['shape']}/{case['pg_format']}"
+    if case.get('encryption'):
+        key += '/enc'
+    return key
+
+
+def build_cases(args) -> List[Dict[str, Any]]:
+    """Expand the selected options into the list of cases, skipping invalid combinations."""
+    cases = {}
+    for db_type, shape, compression, mode, threads, pg_format, encryption in product(
+        args.db_types, args.shapes, args.compression, args.modes, args.threads, args.pg_formats, args.encryption
+    ):
+        if db_type != 'postgresql' and pg_format != 'plain':
+            continue
+        if db_type == 'postgresql' and pg_format != 'plain':
+            # pg_dump compresses archive formats itself
+            compression, mode, threads = 'none', 'file', 1
+        if mode == 'stream' and compression == 'none':
+            continue
+        if threads > 1 and compression not in ('gzip', 'zstd', 'lz4', 'xz'):
+            continue
+        if encryption == 'on' and compression == 'none' and pg_format == 'plain':
+            # Plain dumps are encrypted while they are compressed
+            continue
+        
+        case = {
+            'db_type': db_type,
+            'shape': shape,
+            'compression': compression,
+            'mode': mode,
+            'threads': threads,
+            'pg_format': pg_format if db_type == 'postgresql' else 'plain',
+            'encryption': encryption == 'on',
+            'size': args.size,
+        }
+        cases.setdefault(case_key(case), case)
+    
+    return list(cases.values())
+
+
+def read_proc_io() -> Dict[str, int]:
+    """Read the I/O counters of this process (Linux only)."""
+    counters = {}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                name, value = line.split(':')
+                counters[name.strip()] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def read_peak_rss() -> float:
+    """
+    Peak RSS of this process in MB.
+    
+    VmHWM is used where available because ru_maxrss survives exec() and
+    would report the peak of the parent process.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files below a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def run_case(case: Dict[str, Any], work_dir: str) -> Dict[str, Any]:
+    """
+    Run one case in this process and return its measurements.
+    
+    Must run in a fresh interpreter: the configuration is read from the
+    environment when the backup modules are imported.
+    """
+    backup_dir = os.path.join(work_dir, 'backups')
+    os.makedirs(backup_dir, exist_ok=True)
+    
+    os.environ.update({
+        'PATH': f"{FAKEBIN}{os.pathsep}{os.environ.get('PATH', '')}",
+        'DB_TYPE': case['db_type'],
+        'DB_HOST': 'benchmark',
+        'DB_PORT': '5432' if case['db_type'] == 'postgresql' else '3306',
+        'DB_USER': 'benchmark',
+        'DB_PASSWORD': 'benchmark',
+        'DB_DATABASE': 'benchmark',
+        'BACKUP_DIR': backup_dir,
+        'BACKUP_RETENTION_COUNT': '100',
+        'BACKUP_COMPRESSION': case['compression'],
+        'BACKUP_COMPRESSION_THREADS': str(case['threads']),
+        'BACKUP_STREAMING': 'true' if case['mode'] == 'stream' else 'false',
+        'PG_DUMP_FORMAT': case['pg_format'],
+        'BACKUP_ENCRYPTION': 'true' if case.get('encryption') else 'false',
+        'BACKUP_ENCRYPTION_KEY': os.urandom(32).hex(),
+        'TELEGRAM_ENABLED': 'false',
+        'EMAIL_ENABLED': 'false',
+        'METRICS_TEXTFILE': '',
+        'LOG_FILE': os.path.join(work_dir, 'backup.log'),
+        'BENCH_DUMP_SIZE': str(case['size']),
+        'BENCH_DUMP_SHAPE': case['shape'],
+    })
+    sys.path.insert(0, ROOT)
+    
+    from src.backup_manager import BackupManager
+    
+    manager = BackupManager()
+    
+    # Sample the backup directory to catch intermediate files
+    peak = {'bytes': 0}
+    done = threading.Event()
+    
+    def sample():
+        while not done.wait(0.05):
+            peak['bytes'] = max(peak['bytes'], directory_size(backup_dir))
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    
+    io_before = read_proc_io()
+    start = time.monotonic()
+    success = manager.run_backup()
+    wall = time.monotonic() - start
+    io_after = read_proc_io()
+    
+    done.set()
+    sampler.join()
+    final_size = directory_size(backup_dir)
+    
+    metrics = manager.metrics.get('benchmark')
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    
+    # Archive formats compressed by the dump tool do not report their
+    # uncompressed size, the requested size of the synthetic dump is used
+    dump_bytes = case['size']
+    phases = {}
+    sizes = {}
+    ratio = None
+    if metrics:
+        phases = {name: {'seconds': round(entry['duration'], 4), 'bytes': int(entry['bytes'])}
+                  for name, entry in metrics.phases.items()}
+        sizes = dict(metrics.sizes)
+        dump_bytes = sizes.get('dump') or dump_bytes
+        ratio = metrics.compression_ratio
+    
+    return {
+        'success': success,
+        'wall_seconds': round(wall, 4),
+        'dump_bytes': dump_bytes,
+        'archive_bytes': sizes.get('archive'),
+        'throughput_mb_s': round(dump_bytes / (1024 * 1024) / wall, 2) if wall > 0 else 0.0,
+        'compression_ratio': round(ratio, 3) if ratio else None,
+        'phases': phases,
+        'peak_rss_mb': round(read_peak_rss(), 1),
+        # Largest child (the dump tool or a compressor), ru_maxrss is in KiB on Linux
+        'peak_child_rss_mb': round(child_usage.ru_maxrss / 1024, 1),
+        # Bytes that reached the block layer (0 on tmpfs) and bytes passed to write() calls
+        'disk_write_bytes': (io_after.get('write_bytes', 0) - io_before.get('write_bytes', 0)
+                             + child_usage.ru_oublock * 512),
+        'write_call_bytes': io_after.get('wchar', 0) - io_before.get('wchar', 0),
+        'peak_backup_dir_bytes': max(peak['bytes'], final_size),
+        'backup_dir_bytes': final_size,
+    }
+
+
+def run_case_subprocess(case: Dict[str, Any], work_root: str, keep: bool) -> Dict[str, Any]:
+    """Run one case in a fresh interpreter and return its measurements."""
+    work_dir = tempfile.mkdtemp(prefix='case-', dir=work_root)
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(case), '--work-dir', work_dir],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return {'success': False, 'error': result.stderr.strip().splitlines()[-1:] or ['unknown error']}
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def summarize(case: Dict[str, Any], runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Keep the median run (by wall time) and the wall times of all runs."""
+    successful = [run for run in runs if run.get('success')]
+    if not successful:
+        return {'case': case_key(case), 'options': case, 'success': False, 'runs': runs}
+    
+    median = sorted(successful, key=lambda run: run['wall_seconds'])[len(successful) // 2]
+    return {
+        'case': case_key(case),
+        'options': case,
+        **median,
+        'wall_seconds_all': [run['wall_seconds'] for run in successful],
+        'wall_seconds_stdev': round(statistics.pstdev([run['wall_seconds'] for run in successful]), 4),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the benchmarked tree, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """
+    Print the change of throughput and peak RSS against a baseline result file.
+    
+    Returns:
+        bool: True if no case regressed by more than ``max_regression`` percent
+    """
+    with open(baseline_path) as f:
+        baseline = {result['case']: result for result in json.load(f)['results']}
+    
+    ok = True
+    print(f"\nComparison with {baseline_path} (max regression {max_regression:.0f}%):")
+    for result in results:
+        previous = baseline.get(result['case'])
+        if not previous or not previous.get('success') or not result.get('success'):
+            continue
+        
+        throughput_change = (result['throughput_mb_s'] / previous['throughput_mb_s'] - 1) * 100 \
+            if previous['throughput_mb_s'] else 0.0
+        rss_change = (result['peak_rss_mb'] / previous['peak_rss_mb'] - 1) * 100 \
+            if previous['peak_rss_mb'] else 0.0
+        regressed = throughput_change < -max_regression or rss_change > max_regression
+        ok = ok and not regressed
+        
+        print(f"  {'REGRESSION' if regressed else 'ok':<10} {result['case']:<45} "
+              f"{previous['throughput_mb_s']:>8.1f} -> {result['throughput_mb_s']:>8.1f} MB/s "
+              f"({throughput_change:+.1f}%), RSS {previous['peak_rss_mb']:.0f} -> "
+              f"{result['peak_rss_mb']:.0f} MB ({rss_change:+.1f}%)")
+    
+    return ok
+
+
+def print_encryption_overhead(results: List[Dict[str, Any]]) -> None:
+    """Print the throughput cost of encryption for the cases run with and without it."""
+    by_case = {result['case']: result for result in results if result.get('success')}
+    pairs = [(by_case[key[:-len('/enc')]], result) for key, result in by_case.items()
+             if key.endswith('/enc') and key[:-len('/enc')] in by_case]
+    if not pairs:
+        return
+    
+    print("\nEncryption overhead:")
+    for plain, encrypted in pairs:
+        change = (encrypted['throughput_mb_s'] / plain['throughput_mb_s'] - 1) * 100 \
+            if plain['throughput_mb_s'] else 0.0
+        print(f"  {plain['case']:<45} {plain['throughput_mb_s']:>8.1f} -> {encrypted['throughput_mb_s']:>8.1f} MB/s "
+              f"({change:+.1f}%), RSS {plain['peak_rss_mb']:.0f} -> {encrypted['peak_rss_mb']:.0f} MB")
+
+
+def parse_list(text: str) -> List[str]:
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end backup benchmark with synthetic dumps")
+    parser.add_argument('--size', default='256M', help="Dump size per case, e.g. 256M or 1G")
+    parser.add_argument('--shapes', type=parse_list, default=['copy', 'inserts'],
+                        help=f"Dump shapes ({', '.join(SHAPES)})")
+    parser.add_argument('--db-types', type=parse_list, default=['postgresql', 'mysql'])
+    parser.add_argument('--compression', type=parse_list, default=['none', 'gzip', 'zip', 'zstd', 'lz4'])
+    parser.add_argument('--modes', type=parse_list, default=['file', 'stream'],
+                        help="file (dump, then compress) and/or stream (BACKUP_STREAMING)")
+    parser.add_argument('--threads', type=lambda text: [int(item) for item in parse_list(text)], default=[1],
+                        help="Compression thread counts")
+    parser.add_argument('--pg-formats', type=parse_list, default=['plain'],
+                        help="PostgreSQL dump formats (plain, custom, directory)")
+    parser.add_argument('--encryption', type=parse_list, default=['off'],
+                        help="off and/or on (BACKUP_ENCRYPTION), to measure the encryption overhead")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case, the median is kept")
+    parser.add_argument('--work-dir', help="Directory for the backups (use a real disk for I/O numbers)")
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/backup-<timestamp>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with an earlier result file")
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help="Allowed throughput drop / RSS growth in percent for --compare")
+    parser.add_argument('--keep', action='store_true', help="Keep the backup files of every case")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case), args.work_dir)))
+        return
+    
+    args.size = parse_size(args.size)
+    cases = build_cases(args)
+    
+    # Generate the row pools up front so the first case does not pay for it; in a
+    # subprocess, so the pools do not inflate the peak RSS inherited by the cases
+    subprocess.run([sys.executable, os.path.join(BENCHMARK_DIR, 'synthetic.py'), '--prepare',
+                    '--shape', ','.join(args.shapes)], check=True, stdout=subprocess.DEVNULL)
+    
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+    work_root = tempfile.mkdtemp(prefix='db-backup-bench-', dir=args.work_dir)
+    results = []
+    try:
+        print(f"Running {len(cases)} cases of {args.size / (1024 * 1024):.0f} MB, {args.repeat} run(s) each")
+        for case in cases:
+            runs = [run_case_subprocess(case, work_root, args.keep) for _ in range(max(1, args.repeat))]
+            result = summarize(case, runs)
+            results.append(result)
+            
+            if result['success']:
+                print(f"  {result['case']:<45} {result['wall_seconds']:>7.2f}s {result['throughput_mb_s']:>8.1f} MB/s "
+                      f"ratio {result['compression_ratio'] or 0:>6.2f}  RSS {result['peak_rss_mb']:>6.1f} MB  "
+                      f"peak disk {result['peak_backup_dir_bytes'] / (1024 * 1024):>8.1f} MB")
+            else:
+                print(f"  {result['case']:<45} FAILED {result['runs'][-1].get('error')}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_root, ignore_errors=True)
+    
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results',
+                                         f"backup-{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'size': args.size,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+    print_encryption_overhead(results)
+    
+    failed = any(not result['success'] for result in results)
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        failed = True
+    
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time of main.py and the modules loaded at startup.
+
+Every sample is a fresh interpreter running ``python -X importtime -c "import main"``
+with notifications disabled, so the numbers are the cold start cost paid by
+every cron run. The benchmark fails (exit status 1) when a module that should
+only be loaded on use (requests, smtplib, the email MIME classes, the
+database layer, the catalog, storage targets, archivers, metrics or the dump
+pipeline) is imported at startup.
+
+With a budget (--budget-ms or STARTUP_BUDGET_MS) the benchmark also fails
+when the median import time exceeds it. The import time depends on the
+machine: run directly the time is only reported, ``make benchmark`` (and CI)
+uses a default budget of 150 ms with headroom for slower machines.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --budget-ms 40
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported by ``import main`` when no notifier is enabled
+LAZY_MODULES = [
+    'requests',
+    'smtplib',
+    'email.mime.multipart',
+    'src.notification.telegram',
+    'src.notification.email',
+    'src.database.postgresql',
+    'src.database.mysql',
+    'src.database.base',
+    'src.archive',
+    'src.catalog.catalog',
+    'sqlite3',
+    'src.storage.s3',
+    'src.storage.local',
+    'src.metrics',
+    'src.compression.selector',
+    'src.utils.encryption',
+    'src.utils.pipeline',
+    'src.utils.throttle',
+]
+
+BENCHMARK_ENV = {
+    'DB_HOST': 'benchmark',
+    'DB_USER': 'benchmark',
+    'DB_PASSWORD': 'benchmark',
+    'DB_DATABASE': 'benchmark',
+    'TELEGRAM_ENABLED': 'false',
+    'EMAIL_ENABLED': 'false',
+}
+
+
+def measure_import(env: dict) -> int:
+    """Import main.py in a new interpreter and return its cumulative import time in microseconds."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    
+    # Lines look like "import time:   self [us] | cumulative | module"
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == 'main':
+            return int(parts[1])
+    raise RuntimeError(f"No import time reported for main:\n{result.stderr}")
+
+
+def find_loaded_lazy_modules(env: dict) -> list:
+    """Return the lazy modules that ``import main`` loaded anyway."""
+    code = (
+        "import sys, json, main\n"
+        f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the startup import time of the backup system")
+    parser.add_argument('--runs', type=int, default=10, help="Number of fresh interpreters to sample")
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.getenv('STARTUP_BUDGET_MS')) if os.getenv('STARTUP_BUDGET_MS') else None,
+                        help="Maximum median import time of main.py in milliseconds (default: report only)")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+    
+    env = {**os.environ, **BENCHMARK_ENV}
+    
+    # The first run compiles the .pyc files and is not counted
+    measure_import(env)
+    samples = [measure_import(env) / 1000 for _ in range(max(1, args.runs))]
+    median = statistics.median(samples)
+    loaded = find_loaded_lazy_modules(env)
+    
+    results = {
+        'runs': len(samples),
+        'median_ms': round(median, 2),
+        'min_ms': round(min(samples), 2),
+        'max_ms': round(max(samples), 2),
+        'budget_ms': args.budget_ms,
+        'eagerly_loaded': loaded,
+    }
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        budget = f"budget {args.budget_ms:.0f} ms" if args.budget_ms is not None else "no budget"
+        print(f"import main: median {median:.1f} ms, min {min(samples):.1f} ms, max {max(samples):.1f} ms "
+              f"over {len(samples)} runs ({budget})")
+    
+    failed = False
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f} ms exceeds the budget of {args.budget_ms:.0f} ms",
+              file=sys.stderr)
+        failed = True
+    if loaded:
+        print(f"FAIL: modules imported at startup that should load on use: {', '.join(loaded)}",
+              file=sys.stderr)
+        failed = True
+    
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
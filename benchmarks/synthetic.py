@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Synthetic SQL dumps for the backup benchmarks.
+
+The fake ``pg_dump`` and ``mysqldump`` executables in ``benchmarks/fakebin``
+call :func:`run_fake_dump`, which writes a dump of a configurable size and
+shape as fast as the pipe or disk accepts it. The dump tool itself is never
+the bottleneck: rows are generated once into a pool (cached on disk) that is
+then written repeatedly. The pool is larger than the window of every codec,
+so the repetition does not inflate compression ratios.
+
+The fake tools are configured through environment variables:
+
+    BENCH_DUMP_SIZE    Approximate dump size, e.g. 512M or 1G (default 64M)
+    BENCH_DUMP_SHAPE   copy, inserts, extended, text or random (default copy)
+    BENCH_DUMP_TABLES  Number of tables the data is spread over (default 4)
+    BENCH_DUMP_SEED    Seed of the row generator (default 1)
+    BENCH_CACHE_DIR    Directory of the cached row pools
+
+Shapes:
+    copy      pg_dump COPY blocks with tab separated rows
+    inserts   One INSERT statement per row (pg_dump --inserts, mysqldump --skip-extended-insert)
+    extended  Multi-row INSERT statements of about 1 MB (mysqldump default)
+    text      Rows with long text columns
+    random    Rows of base64 encoded random bytes (barely compressible)
+
+mysqldump has no COPY, so it writes copy, text and random rows as extended
+INSERT statements.
+
+Usage:
+    python benchmarks/synthetic.py --prepare --shape copy
+    BENCH_DUMP_SIZE=1G benchmarks/fakebin/pg_dump > /dev/null
+"""
+import os
+import sys
+import gzip
+import base64
+import random
+import argparse
+import tempfile
+from typing import Iterator, List
+
+SHAPES = ['copy', 'inserts', 'extended', 'text', 'random']
+
+POOL_SIZE = 32 * 1024 * 1024
+WRITE_SIZE = 1024 * 1024
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar "
+    "papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu order invoice customer "
+    "payment shipping pending active archived warehouse product account balance transfer report"
+).split()
+STATUSES = ['active', 'pending', 'shipped', 'cancelled', 'archived']
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as 512M, 1G or 1048576."""
+    text = text.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _row_values(rng: random.Random, row_id: int, shape: str) -> List[str]:
+    """Values of one synthetic row."""
+    created = (f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+               f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}")
+    if shape == 'random':
+        body = base64.b64encode(rng.randbytes(rng.randint(48, 160))).decode()
+    elif shape == 'text':
+        body = ' '.join(rng.choices(WORDS, k=rng.randint(80, 300)))
+    else:
+        body = ' '.join(rng.choices(WORDS, k=rng.randint(2, 5)))
+    return [str(row_id), body, f"{rng.uniform(0, 100000):.2f}", created, rng.choice(STATUSES)]
+
+
+def get_statement_style(shape: str, dialect: str) -> str:
+    """How the rows of a shape are written: 'copy', 'inserts' or 'extended'."""
+    if shape in ('inserts', 'extended'):
+        return shape
+    return 'extended' if dialect == 'mysql' else 'copy'
+
+
+def generate_pool(shape: str, size: int = POOL_SIZE, seed: int = 1, dialect: str = 'postgresql') -> bytes:
+    """
+    Generate the rows of a shape until ``size`` bytes are reached.
+    
+    The pool only contains row data; statement headers are added by the writer.
+    Every line is complete, so any prefix ending at a newline is valid SQL.
+    """
+    rng = random.Random(f"{shape}:{seed}")
+    quote = '`' if dialect == 'mysql' else ''
+    statement = get_statement_style(shape, dialect)
+    lines = []
+    total = 0
+    row_id = 0
+    
+    while total < size:
+        if statement == 'extended':
+            # One statement of about 1 MB, like mysqldump with the default net_buffer_length
+            values = []
+            length = 0
+            while length < WRITE_SIZE:
+                row_id += 1
+                row = _row_values(rng, row_id, shape)
+                value = f"({row[0]},'{row[1]}',{row[2]},'{row[3]}','{row[4]}')"
+                values.append(value)
+                length += len(value) + 1
+            line = f"INSERT INTO {quote}__TABLE__{quote} VALUES {','.join(values)};\n"
+        elif statement == 'inserts':
+            row_id += 1
+            row = _row_values(rng, row_id, shape)
+            line = (f"INSERT INTO {quote}__TABLE__{quote} (id, name, amount, created_at, status) "
+                    f"VALUES ({row[0]}, '{row[1]}', {row[2]}, '{row[3]}', '{row[4]}');\n")
+        else:
+            row_id += 1
+            line = '\t'.join(_row_values(rng, row_id, shape)) + '\n'
+        
+        encoded = line.encode()
+        lines.append(encoded)
+        total += len(encoded)
+    
+    return b''.join(lines)
+
+
+def load_pool(shape: str, seed: int = 1, dialect: str = 'postgresql') -> bytes:
+    """Load a row pool from the cache, generating and caching it on first use."""
+    cache_dir = os.getenv('BENCH_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'db-backup-bench')
+    path = os.path.join(cache_dir, f"pool-{dialect}-{shape}-{seed}-{POOL_SIZE}.sql")
+    
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    
+    pool = generate_pool(shape, POOL_SIZE, seed, dialect)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(pool)
+    os.replace(temp_path, path)
+    return pool
+
+
+def iter_dump(size: int, shape: str, tables: int = 4, seed: int = 1, dialect: str = 'postgresql') -> Iterator[bytes]:
+    """
+    Yield the chunks of a synthetic dump of about ``size`` bytes.
+    
+    Args:
+        size: Approximate total size in bytes
+        shape: One of SHAPES
+        tables: Number of tables the rows are spread over
+        seed: Seed of the row generator
+        dialect: 'postgresql' or 'mysql'
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown dump shape: {shape}. Supported shapes: {', '.join(SHAPES)}")
+    
+    pool = load_pool(shape, seed, dialect)
+    tables = max(1, tables)
+    per_table = max(1, size // tables)
+    uses_copy = get_statement_style(shape, dialect) == 'copy'
+    mysql = dialect == 'mysql'
+    
+    if mysql:
+        yield b"-- MySQL dump (synthetic benchmark data)\n/*!40101 SET NAMES utf8mb4 */;\n"
+    else:
+        yield b"-- PostgreSQL database dump (synthetic benchmark data)\nSET client_encoding = 'UTF8';\n"
+    
+    for index in range(tables):
+        table = f"bench_{index}"
+        quoted = f"`{table}`" if mysql else f"public.{table}"
+        yield (f"\nCREATE TABLE {quoted} (id bigint PRIMARY KEY, name text, amount numeric(12,2), "
+               f"created_at timestamp, status varchar(16));\n").encode()
+        
+        if uses_copy:
+            yield f"COPY {quoted} (id, name, amount, created_at, status) FROM stdin;\n".encode()
+        
+        remaining = per_table
+        offset = 0
+        while remaining > 0:
+            if offset >= len(pool):
+                offset = 0
+            end = min(len(pool), offset + min(WRITE_SIZE, remaining))
+            # Cut at a line boundary, keeping at least one line
+            cut = pool.rfind(b'\n', offset, end) + 1
+            if cut <= offset:
+                cut = pool.index(b'\n', offset) + 1
+            chunk = pool[offset:cut]
+            if not uses_copy:
+                chunk = chunk.replace(b'__TABLE__', table.encode())
+            yield chunk
+            remaining -= len(chunk)
+            offset = cut
+        
+        if uses_copy:
+            yield b"\\.\n"
+    
+    yield b"\n-- Dump completed\n"
+
+
+def _write_dump(out, size: int, shape: str, tables: int, seed: int, dialect: str) -> None:
+    for chunk in iter_dump(size, shape, tables, seed, dialect):
+        out.write(chunk)
+
+
+def run_fake_dump(tool: str, argv: List[str]) -> None:
+    """
+    Behave like ``pg_dump`` or ``mysqldump`` for the benchmark.
+    
+    pg_dump honours ``-f``, ``-Fc``, ``-Fd``, ``-j`` and ``-Z`` (the archive
+    formats are gzip compressed like pg_dump's); everything else, including
+    the connection arguments, is ignored.
+    """
+    size = parse_size(os.getenv('BENCH_DUMP_SIZE', '64M'))
+    shape = os.getenv('BENCH_DUMP_SHAPE', 'copy')
+    tables = int(os.getenv('BENCH_DUMP_TABLES', 4))
+    seed = int(os.getenv('BENCH_DUMP_SEED', 1))
+    dialect = 'mysql' if tool == 'mysqldump' else 'postgresql'
+    
+    if dialect == 'mysql':
+        sys.stderr.write("-- Retrieving table structure for synthetic tables...\n")
+    else:
+        sys.stderr.write("pg_dump: dumping contents of synthetic tables\n")
+    
+    output = argv[argv.index('-f') + 1] if '-f' in argv else None
+    level = int(argv[argv.index('-Z') + 1]) if '-Z' in argv else 6
+    
+    if '-Fd' in argv:
+        # Directory format: one compressed file per table plus a table of contents
+        os.makedirs(output)
+        with open(os.path.join(output, 'toc.dat'), 'wb') as f:
+            f.write(b"PGDMP synthetic toc\n")
+        for index in range(tables):
+            path = os.path.join(output, f"{3000 + index}.dat.gz")
+            with gzip.open(path, 'wb', compresslevel=level) as f:
+                _write_dump(f, size // tables, shape, 1, seed, dialect)
+    elif '-Fc' in argv:
+        with open(output, 'wb') if output else os.fdopen(sys.stdout.fileno(), 'wb', closefd=False) as raw:
+            raw.write(b"PGDMP")
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level) as f:
+                _write_dump(f, size, shape, tables, seed, dialect)
+    elif output:
+        with open(output, 'wb') as f:
+            _write_dump(f, size, shape, tables, seed, dialect)
+    else:
+        _write_dump(sys.stdout.buffer, size, shape, tables, seed, dialect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic SQL dumps for the backup benchmarks")
+    parser.add_argument('--prepare', action='store_true', help="Generate and cache the row pools, then exit")
+    parser.add_argument('--shape', default=','.join(SHAPES), help="Comma separated shapes to prepare")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    for shape in args.shape.split(','):
+        for dialect in ('postgresql', 'mysql'):
+            load_pool(shape, args.seed, dialect)
+        print(f"Prepared {shape} row pools")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 
 class ConfigError(Exception):
@@ -31,6 +32,77 @@ class Config:
                 'backup_dir': os.getenv('BACKUP_DIR', '/backups'),
                 'retention_count': int(os.getenv('BACKUP_RETENTION_COUNT', 3)),
                 'compression': os.getenv('BACKUP_COMPRESSION', 'zip'),
+                # BACKUP_COMPRESSION=auto: candidates (codec[:level]) tried on a sample of the
+                # dump and the speed (MB/s) or total time (seconds) compression may take
+                'compression_candidates': os.getenv('BACKUP_COMPRESSION_CANDIDATES'),
+                'compression_min_speed': float(os.getenv('BACKUP_COMPRESSION_MIN_SPEED', 50)),
+                'compression_time_budget': float(os.getenv('BACKUP_COMPRESSION_TIME_BUDGET', 0)),
+                'compression_sample_size': self._get_size('BACKUP_COMPRESSION_SAMPLE_SIZE', '4M'),
+                # Codec specific level, the codec default is used when unset
+                'compression_level': self._get_optional_int('BACKUP_COMPRESSION_LEVEL'),
+                # Parallel compression threads (0 = one per CPU) and block size
+                'compression_threads': int(os.getenv('BACKUP_COMPRESSION_THREADS', 1)),
+                'compression_block_size': int(os.getenv('BACKUP_COMPRESSION_BLOCK_SIZE', 4 * 1024 * 1024)),
+                # Stream the dump straight into the archive (no intermediate .sql file)
+                'streaming': os.getenv('BACKUP_STREAMING', 'false').lower() == 'true',
+                'stream_chunk_size': int(os.getenv('BACKUP_STREAM_CHUNK_SIZE', 1024 * 1024)),
+                'stream_buffer_chunks': int(os.getenv('BACKUP_STREAM_BUFFER_CHUNKS', 8)),
+                # Highest load average automatic worker counts may reach (default: CPU count)
+                'load_ceiling': self._get_optional_float('BACKUP_LOAD_CEILING'),
+                # PostgreSQL dump format: plain, custom (-Fc), directory (-Fd -j N) or base
+                # (pg_basebackup of the whole cluster, for point-in-time recovery)
+                'pg_dump_format': os.getenv('PG_DUMP_FORMAT', 'plain').lower(),
+                'pg_dump_jobs': int(os.getenv('PG_DUMP_JOBS', 0)),  # 0 = automatic
+                'pg_dump_compress_level': self._get_optional_int('PG_DUMP_COMPRESS_LEVEL'),
+                # MySQL dump mode: single (mysqldump) or parallel (per-table workers)
+                'mysql_dump_mode': os.getenv('MYSQL_DUMP_MODE', 'single').lower(),
+                'mysql_dump_jobs': int(os.getenv('MYSQL_DUMP_JOBS', 0)),  # 0 = automatic
+                'mysql_parallel_lock': os.getenv('MYSQL_PARALLEL_LOCK', 'true').lower() == 'true',
+                # Skip the dump when the change fingerprint matches the latest backup in the
+                # catalog; a new backup is still taken once it is older than the max age (hours)
+                'skip_unchanged': os.getenv('BACKUP_SKIP_UNCHANGED', 'false').lower() == 'true',
+                'skip_unchanged_max_age': float(os.getenv('BACKUP_SKIP_UNCHANGED_MAX_AGE', 168)),
+                # MySQL fingerprint: checksum (CHECKSUM TABLE) or binlog (server-wide position)
+                'mysql_fingerprint': os.getenv('MYSQL_FINGERPRINT', 'checksum').lower(),
+                # Only dump the tables changed since the previous backup (PostgreSQL custom or
+                # directory format, MySQL parallel mode); every Nth backup is full (0 = never)
+                'incremental': os.getenv('BACKUP_INCREMENTAL', 'false').lower() == 'true',
+                'incremental_full_every': int(os.getenv('BACKUP_INCREMENTAL_FULL_EVERY', 7)),
+                # Continuous archiving of the transaction log for point-in-time recovery, run by the
+                # scheduler daemon (PostgreSQL: pg_receivewal, MySQL: mysqlbinlog; default dir:
+                # <backup_dir>/archive)
+                'continuous_archiving': os.getenv('CONTINUOUS_ARCHIVING', 'false').lower() == 'true',
+                'archive_dir': os.getenv('ARCHIVE_DIR'),
+                'archive_compression': os.getenv('ARCHIVE_COMPRESSION', 'gzip').lower(),
+                'archive_poll_interval': float(os.getenv('ARCHIVE_POLL_INTERVAL', 5)),
+                'archive_status_interval': int(os.getenv('ARCHIVE_STATUS_INTERVAL', 10)),
+                # Replication slot keeping the WAL the archiver has not received yet (empty = none)
+                'pg_replication_slot': os.getenv('PG_REPLICATION_SLOT', 'db_backup'),
+                # Multi-target backups: JSON job list and concurrency limits
+                'jobs_file': os.getenv('BACKUP_JOBS_FILE'),
+                'max_workers': int(os.getenv('BACKUP_MAX_WORKERS', 4)),
+                'max_per_host': int(os.getenv('BACKUP_MAX_PER_HOST', 1)),
+                # SQLite catalog of the backups (default: <backup_dir>/.backup_catalog.db)
+                'catalog': os.getenv('BACKUP_CATALOG', 'true').lower() == 'true',
+                'catalog_path': os.getenv('BACKUP_CATALOG_PATH'),
+                # Hash computed while the backup is written (sha256, blake2b, blake3, xxh3, ...)
+                'checksum_algorithm': os.getenv('BACKUP_CHECKSUM_ALGORITHM', 'sha256').lower(),
+                # Parallel restore workers (0 = one per CPU core, capped)
+                'restore_jobs': int(os.getenv('RESTORE_JOBS', 0)),
+                # Seconds between progress log lines of long transfers
+                'progress_interval': float(os.getenv('BACKUP_PROGRESS_INTERVAL', 5)),
+                # Seconds between progress notifications of a running dump (0 = disabled)
+                'progress_notify_interval': float(os.getenv('BACKUP_PROGRESS_NOTIFY_INTERVAL', 0)),
+                # Backups kept per job on the storage targets (0 = keep all)
+                'storage_retention_count': int(os.getenv('STORAGE_RETENTION_COUNT', 0)),
+                # Upload streamed archives while the dump runs instead of afterwards
+                'storage_streaming': os.getenv('STORAGE_STREAMING', 'true').lower() == 'true',
+                # Encrypt the archives while they are written (AES-256-GCM); the 32-byte key is
+                # given base64 or hex encoded, and is also used to restore encrypted archives
+                'encryption': os.getenv('BACKUP_ENCRYPTION', 'false').lower() == 'true',
+                'encryption_key': os.getenv('BACKUP_ENCRYPTION_KEY'),
+                'encryption_key_file': os.getenv('BACKUP_ENCRYPTION_KEY_FILE'),
+                'encryption_chunk_size': self._get_size('BACKUP_ENCRYPTION_CHUNK_SIZE', '256K'),
             },
             
 
@@ -38,6 +110,15 @@ class Config:
                 'bot_token': os.getenv('TELEGRAM_BOT_TOKEN'),
                 'chat_id': os.getenv('TELEGRAM_CHAT_ID'),
                 'enabled': os.getenv('TELEGRAM_ENABLED', 'false').lower() == 'true',
+                'timeout': float(os.getenv('TELEGRAM_TIMEOUT', 120)),  # Seconds per notification
+                # Seconds per upload request; a split backup is given one per round of parts
+                'request_timeout': float(os.getenv('TELEGRAM_REQUEST_TIMEOUT', 120)),
+                # Bot API server (a local telegram-bot-api server allows files up to 2000 MB)
+                'api_url': os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org'),
+                'max_file_size_mb': float(os.getenv('TELEGRAM_MAX_FILE_SIZE_MB', 50)),  # Larger files are split
+                'upload_workers': int(os.getenv('TELEGRAM_UPLOAD_WORKERS', 3)),
+                'max_retries': int(os.getenv('TELEGRAM_MAX_RETRIES', 5)),
+                'min_interval': float(os.getenv('TELEGRAM_MIN_INTERVAL', 1.0)),  # Seconds between requests
             },
             
             'email': {
@@ -48,11 +129,82 @@ class Config:
                 'from_email': os.getenv('EMAIL_FROM'),
                 'to_email': os.getenv('EMAIL_TO'),
                 'enabled': os.getenv('EMAIL_ENABLED', 'false').lower() == 'true',
+                'timeout': float(os.getenv('EMAIL_TIMEOUT', 60)),  # Seconds per notification
+                'max_attachment_mb': float(os.getenv('EMAIL_MAX_ATTACHMENT_MB', 10)),
+            },
+            
+            # I/O and CPU throttling, shared by all jobs of a run (rates in bytes/s, 0 = unlimited)
+            'throttle': {
+                # Output read from the dump tools and archives written to the backup directory
+                'dump_rate': self._get_size('BACKUP_DUMP_RATE_LIMIT'),
+                'write_rate': self._get_size('BACKUP_WRITE_RATE_LIMIT'),
+                # Priority of the dump tools (nice -n, ionice -c/-n), unchanged when unset
+                'nice': self._get_optional_int('BACKUP_NICE'),
+                'ionice_class': os.getenv('BACKUP_IONICE_CLASS', '').lower(),
+                'ionice_level': self._get_optional_int('BACKUP_IONICE_LEVEL'),
+                # Adaptive mode: a shell command printing a load value; the rates are
+                # lowered while it exceeds the threshold
+                'probe': os.getenv('BACKUP_THROTTLE_PROBE', ''),
+                'probe_threshold': float(os.getenv('BACKUP_THROTTLE_THRESHOLD', 0)),
+                'probe_interval': float(os.getenv('BACKUP_THROTTLE_INTERVAL', 15)),
+                'min_rate': self._get_size('BACKUP_THROTTLE_MIN_RATE', '1M'),
+            },
+            
+            # Remote copies of the backups (comma separated targets: s3, local)
+            'storage': {
+                'targets': [target.strip().lower() for target in os.getenv('STORAGE_TARGETS', '').split(',')
+                            if target.strip()],
+                's3': {
+                    # Amazon S3 by default; set the endpoint for MinIO and other compatible services
+                    'endpoint_url': os.getenv('S3_ENDPOINT_URL', ''),
+                    'region': os.getenv('S3_REGION', 'us-east-1'),
+                    'bucket': os.getenv('S3_BUCKET'),
+                    'prefix': os.getenv('S3_PREFIX', ''),
+                    'access_key_id': os.getenv('S3_ACCESS_KEY_ID'),
+                    'secret_access_key': os.getenv('S3_SECRET_ACCESS_KEY'),
+                    'session_token': os.getenv('S3_SESSION_TOKEN', ''),
+                    'storage_class': os.getenv('S3_STORAGE_CLASS', ''),
+                    # Bucket in the URL path instead of the host name (default: with a custom endpoint)
+                    'path_style': self._get_optional_bool('S3_FORCE_PATH_STYLE'),
+                    'verify_ssl': os.getenv('S3_VERIFY_SSL', 'true').lower() == 'true',
+                    # Multipart uploads: part size (min 5M) and parts uploaded in parallel
+                    'part_size': self._get_size('S3_PART_SIZE', '16M'),
+                    'concurrency': int(os.getenv('S3_UPLOAD_CONCURRENCY', 4)),
+                    'max_retries': int(os.getenv('S3_MAX_RETRIES', 3)),
+                    'timeout': float(os.getenv('S3_TIMEOUT', 60)),  # Seconds per request
+                    'progress_interval': float(os.getenv('BACKUP_PROGRESS_INTERVAL', 5)),
+                },
+                'local': {
+                    # Another directory, e.g. a mounted network share
+                    'path': os.getenv('STORAGE_LOCAL_PATH', ''),
+                    'progress_interval': float(os.getenv('BACKUP_PROGRESS_INTERVAL', 5)),
+                },
+            },
+            
+            # Per-phase metrics in the Prometheus text format
+            'metrics': {
+                # Written after every run, for the node_exporter textfile collector
+                'textfile': os.getenv('METRICS_TEXTFILE', ''),
+                # HTTP endpoint of the scheduler daemon (0 = disabled)
+                'port': int(os.getenv('METRICS_PORT', 0)),
+                'address': os.getenv('METRICS_ADDRESS', '0.0.0.0'),
+            },
+            
+            # Notifiers run concurrently; this bounds the time spent on all of them
+            'notification': {
+                'timeout': float(os.getenv('NOTIFICATION_TIMEOUT', 180)),
             },
             
 
             'cron': {
                 'schedule': os.getenv('CRON_SCHEDULE', '0 3 * * *'),  # Daily at 3 AM
+                # Random delay (seconds) added to each run of the scheduler daemon
+                'jitter': float(os.getenv('CRON_JITTER', 0)),
+                # Held while a backup runs so runs never overlap
+                'lock_file': os.getenv('BACKUP_LOCK_FILE', '/tmp/db-backup.lock'),
+                # Creating this file makes the daemon start a backup
+                'trigger_file': os.getenv('BACKUP_TRIGGER_FILE', '/tmp/db-backup.trigger'),
+                'run_on_start': os.getenv('BACKUP_RUN_ON_START', 'false').lower() == 'true',
             },
             
             # Project promotion configuration
@@ -69,24 +221,106 @@ class Config:
             }
         }
         
+        config['jobs'] = self._load_jobs(config)
+        
         self._validate_required_config(config)
         return config
     
+    def _load_jobs(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Load the list of backup targets.
+        
+        Without BACKUP_JOBS_FILE the single DB_* database is the only job.
+        The jobs file is JSON with an optional ``defaults`` object merged into
+        every entry of ``jobs``. A job may set ``password_env`` to read its
+        password from another environment variable, and may override any
+        backup setting (for example ``compression``).
+        """
+        jobs_file = config['backup']['jobs_file']
+        
+        if not jobs_file:
+            return [dict(config['database'])]
+        
+        try:
+            with open(jobs_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Failed to read jobs file {jobs_file}: {e}")
+        
+        if isinstance(data, list):
+            data = {'jobs': data}
+        
+        defaults = data.get('defaults', {})
+        jobs = []
+        
+        for index, entry in enumerate(data.get('jobs', [])):
+            job = {**defaults, **entry}
+            job['type'] = job.get('type', 'postgresql')
+            job['port'] = int(job.get('port') or (3306 if job['type'].lower() in ('mysql', 'mariadb') else 5432))
+            
+            if job.get('password_env'):
+                job['password'] = os.getenv(job['password_env'])
+            
+            job['name'] = job.get('name') or f"{job.get('host')}_{job.get('database')}"
+            jobs.append(job)
+        
+        if not jobs:
+            raise ConfigError(f"No jobs defined in {jobs_file}")
+        
+        names = [job['name'] for job in jobs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ConfigError(f"Duplicate job names in {jobs_file}: {', '.join(duplicates)}")
+        
+        return jobs
+    
+    @staticmethod
+    def _get_optional_int(name: str) -> Optional[int]:
+        """Read an integer environment variable, None if unset or empty."""
+        value = os.getenv(name)
+        return int(value) if value else None
+    
+    @staticmethod
+    def _get_optional_float(name: str) -> Optional[float]:
+        """Read a float environment variable, None if unset or empty."""
+        value = os.getenv(name)
+        return float(value) if value else None
+    
+    @staticmethod
+    def _get_optional_bool(name: str) -> Optional[bool]:
+        """Read a boolean environment variable, None if unset or empty."""
+        value = os.getenv(name)
+        return value.lower() == 'true' if value else None
+    
+    @staticmethod
+    def _get_size(name: str, default: str = '0') -> int:
+        """Read a byte size such as 512K, 20M or 1G (powers of 1024) from an environment variable."""
+        value = (os.getenv(name) or default).strip().upper().rstrip('B')
+        units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value or 0)
+    
     def _validate_required_config(self, config: Dict[str, Any]) -> None:
 
-        required_fields = [
-            ('database.host', config['database']['host']),
-            ('database.user', config['database']['user']),
-            ('database.password', config['database']['password']),
-            ('database.database', config['database']['database']),
-        ]
+        if config['backup']['jobs_file']:
+            required_fields = []
+            for job in config['jobs']:
+                for field in ('host', 'user', 'password', 'database'):
+                    required_fields.append((f"jobs.{job['name']}.{field}", job.get(field)))
+        else:
+            required_fields = [
+                ('database.host', config['database']['host']),
+                ('database.user', config['database']['user']),
+                ('database.password', config['database']['password']),
+                ('database.database', config['database']['database']),
+            ]
         
         missing_fields = []
         for field_name, field_value in required_fields:
             if not field_value:
                 missing_fields.append(field_name)
         
-
         if config['telegram']['enabled']:
             if not config['telegram']['bot_token']:
                 missing_fields.append('telegram.bot_token')
@@ -105,10 +339,34 @@ class Config:
                 if not field_value:
                     missing_fields.append(field_name)
         
+        backup = config['backup']
+        if backup['encryption'] and not (backup['encryption_key'] or backup['encryption_key_file']):
+            missing_fields.append('backup.encryption_key')
+        
+        storage = config['storage']
+        for target in storage['targets']:
+            if target == 's3':
+                for field in ('bucket', 'access_key_id', 'secret_access_key'):
+                    if not storage['s3'][field]:
+                        missing_fields.append(f"storage.s3.{field}")
+            elif target == 'local':
+                if not storage['local']['path']:
+                    missing_fields.append('storage.local.path')
+            else:
+                error_msg = f"Invalid STORAGE_TARGETS entry: {target}. Supported targets: s3, local"
+                self.logger.error(error_msg)
+                raise ConfigError(error_msg)
+        
         if missing_fields:
             error_msg = f"Missing required configuration values: {', '.join(missing_fields)}"
             self.logger.error(error_msg)
             raise ConfigError(error_msg)
+        
+        ionice_class = config['throttle']['ionice_class']
+        if ionice_class and ionice_class not in ('idle', 'best-effort', 'realtime', '1', '2', '3'):
+            error_msg = f"Invalid BACKUP_IONICE_CLASS: {ionice_class}. Supported classes: idle, best-effort, realtime"
+            self.logger.error(error_msg)
+            raise ConfigError(error_msg)
     
     def get(self, key: str, default: Any = None) -> Any:
 
@@ -130,6 +388,10 @@ class Config:
     def get_backup_config(self) -> Dict[str, Any]:
         return self._config['backup']
     
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        """Get the database configuration of every backup target."""
+        return self._config['jobs']
+    
     def get_notification_config(self, provider: str) -> Dict[str, Any]:
         return self._config.get(provider, {})
     
@@ -152,7 +414,3 @@ class Config:
 
 # Global configuration instance
 config = Config()
-
-
-
-config = Config()
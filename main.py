@@ -1,14 +1,57 @@
 #!/usr/bin/env python3
 import sys
 import logging
+import argparse
+from datetime import datetime
 from config.config import config, ConfigError
 from src.utils import setup_logging
 from src.backup_manager import BackupManager
+from src.scheduler import BackupScheduler, RunLock, SchedulerError
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description="Database backup system")
+    parser.add_argument('--list-backups', nargs='?', const='', metavar='NAME',
+                        help="List the backups in the catalog (optionally of one job) and exit")
+    parser.add_argument('--rebuild-catalog', action='store_true',
+                        help="Rebuild the backup catalog from the files on disk and exit")
+    parser.add_argument('--verify', nargs='?', const='', metavar='NAME',
+                        help="Verify the checksums of the backups (optionally of one job) and exit")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Stay resident and run backups on CRON_SCHEDULE")
+    parser.add_argument('--trigger', action='store_true',
+                        help="Ask the running daemon to start a backup now and exit")
+    return parser.parse_args()
+
+
+def list_backups(backup_manager, name):
+
+    entries = backup_manager.list_backups(name or None)
+    
+    print(f"{'NAME':<24} {'CREATED':<19} {'SIZE (MB)':>10} {'CODEC':<6} FILE")
+    for entry in entries:
+        created = datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        size_mb = (entry['size'] or 0) / (1024 * 1024)
+        print(f"{entry['name']:<24} {created:<19} {size_mb:>10.1f} {entry['codec'] or '-':<6} {entry['filename']}")
+
+
+def verify_backups(backup_manager, name):
+
+    results = backup_manager.verify_backups(name or None)
+    
+    for result in results:
+        print(f"{result['status'].upper():<9} {result['filename']}")
+    
+    failed = [result for result in results if result['status'] in ('mismatch', 'missing')]
+    print(f"{len(results) - len(failed)}/{len(results)} backups verified, {len(failed)} failed")
+    return not failed
 
 
 def main():
 
     try:
+        args = parse_args()
 
         log_config = config.get('logging', {})
         log_level = log_config.get('level', 'INFO')
@@ -17,11 +60,54 @@ def main():
         setup_logging(log_level, log_file)
         
         logger = logging.getLogger(__name__)
+        
+        if args.trigger:
+            # Picked up by the daemon on its next wake-up (every few seconds)
+            open(config.get('cron.trigger_file'), 'a').close()
+            logger.info("Backup requested from the scheduler daemon")
+            sys.exit(0)
+        
         logger.info("Starting database backup system")
         
-
         backup_manager = BackupManager()
-        success = backup_manager.run_backup()
+        
+        if args.list_backups is not None:
+            list_backups(backup_manager, args.list_backups)
+            sys.exit(0)
+        
+        if args.verify is not None:
+            sys.exit(0 if verify_backups(backup_manager, args.verify) else 1)
+        
+        if args.rebuild_catalog:
+            count = backup_manager.rebuild_catalogs()
+            logger.info(f"Backup catalog rebuilt with {count} backups")
+            sys.exit(0)
+        
+        if args.daemon:
+            if config.get('metrics.port', 0):
+                # Imported here so one-off runs never load the metrics server
+                from src.metrics import MetricsError, MetricsServer
+                try:
+                    MetricsServer(backup_manager.metrics, config.get('metrics.port'),
+                                  config.get('metrics.address', '0.0.0.0')).start()
+                except MetricsError as e:
+                    print(f"Configuration error: {e}", file=sys.stderr)
+                    sys.exit(1)
+            
+            # Continuous archiving runs alongside the scheduled backups
+            backup_manager.start_archivers()
+            
+            scheduler = BackupScheduler(lambda: backup_manager.run_backup(close_notifiers=False),
+                                        config.get('cron'), on_stop=backup_manager.close)
+            scheduler.install_signal_handlers()
+            scheduler.run_forever()
+            sys.exit(0)
+        
+        with RunLock(config.get('cron.lock_file')) as acquired:
+            if not acquired:
+                logger.error(f"Another backup is already running (lock {config.get('cron.lock_file')})")
+                sys.exit(1)
+            success = backup_manager.run_backup()
         
         if success:
             logger.info("Backup process completed successfully")
@@ -30,7 +116,7 @@ def main():
             logger.error("Backup process failed")
             sys.exit(1)
             
-    except ConfigError as e:
+    except (ConfigError, SchedulerError) as e:
         print(f"Configuration error: {e}", file=sys.stderr)
         sys.exit(1)
         
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import sys
+import logging
+import argparse
+from datetime import datetime
+from config.config import config, ConfigError
+from src.utils import setup_logging
+from src.restore_manager import RestoreManager
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description="Restore a database backup")
+    parser.add_argument('--job', metavar='NAME',
+                        help="Job to restore (required when several jobs are configured)")
+    parser.add_argument('--file', metavar='PATH',
+                        help="Backup file to restore (default: the newest backup of the job)")
+    parser.add_argument('--at', metavar='"YYYY-MM-DD HH:MM:SS"',
+                        help="Restore the newest backup taken at or before this time")
+    parser.add_argument('--target-database', metavar='NAME',
+                        help="Restore into this database instead of the job's database")
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help="Parallel restore workers (default: RESTORE_JOBS or automatic)")
+    parser.add_argument('--verify', action='store_true',
+                        help="Check the checksums of the backup and the backups it requires before restoring")
+    parser.add_argument('--data-dir', metavar='PATH',
+                        help="Restore a base backup into this empty PostgreSQL data directory and "
+                             "replay the archived WAL up to --at (point-in-time recovery)")
+    parser.add_argument('--replay-log', action='store_true',
+                        help="Replay the archived MySQL binlog after loading the backup, up to --at "
+                             "(point-in-time recovery)")
+    return parser.parse_args()
+
+
+def main():
+
+    try:
+        args = parse_args()
+
+        log_config = config.get('logging', {})
+        setup_logging(log_config.get('level', 'INFO'), log_config.get('file'))
+        
+        logger = logging.getLogger(__name__)
+        logger.info("Starting database restore")
+        
+        before = datetime.fromisoformat(args.at).timestamp() if args.at else None
+        
+        restore_manager = RestoreManager()
+        success = restore_manager.run_restore(
+            name=args.job,
+            backup_file=args.file,
+            before=before,
+            target_database=args.target_database,
+            jobs=args.jobs,
+            verify=args.verify,
+            data_dir=args.data_dir,
+            replay_log=args.replay_log,
+        )
+        
+        sys.exit(0 if success else 1)
+            
+    except ConfigError as e:
+        print(f"Configuration error: {e}", file=sys.stderr)
+        sys.exit(1)
+        
+    except ValueError as e:
+        print(f"Invalid argument: {e}", file=sys.stderr)
+        sys.exit(1)
+        
+    except KeyboardInterrupt:
+        print("Restore interrupted by user", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Continuous archiving of the transaction log for point-in-time recovery.
+"""
+from .base import ArchiveError, BaseArchiver
+from .factory import ArchiverFactory
+
+__all__ = [
+    'ArchiveError',
+    'BaseArchiver',
+    'WalArchiver',
+    'BinlogArchiver',
+    'ArchiverFactory',
+]
+
+
+def __getattr__(name):
+    # Implementations are only imported when accessed
+    if name == 'WalArchiver':
+        return ArchiverFactory.get_archiver_class('postgresql')
+    if name == 'BinlogArchiver':
+        return ArchiverFactory.get_archiver_class('mysql')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
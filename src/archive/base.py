@@ -0,0 +1,305 @@
+"""
+Base continuous archiving module.
+"""
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from src.compression import BaseCodec, CodecFactory, CompressionError
+from src.utils import Encryption, EncryptionError, StderrBuffer
+
+
+class ArchiveError(Exception):
+    """Custom exception for continuous archiving errors."""
+    pass
+
+
+class BaseArchiver(ABC):
+    """
+    Supervised receiver archiving the transaction log of one job.
+    
+    A client process (pg_receivewal, mysqlbinlog) streams the log of the
+    server into the ``incoming`` directory. Every completed log file is
+    compressed (and encrypted) into the archive directory of the job, and
+    the client is restarted with an exponential backoff whenever it exits.
+    Together with the base backups of the job, the archive allows restoring
+    to any point in time.
+    """
+    
+    # Database type name, as used in DB_TYPE
+    name = 'archive'
+    
+    # Completed files kept in the incoming directory after they were
+    # archived; the clients resume from the newest file they find there
+    keep_incoming = 1
+    
+    # Restart delays of the client in seconds (doubled after every quick failure)
+    RESTART_DELAY = 1.0
+    MAX_RESTART_DELAY = 60.0
+    
+    # Size of the reads when compressing a file
+    COPY_BUFFER_SIZE = 1024 * 1024
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.job = config.get('name') or config.get('database', 'backup')
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{self.job}]")
+        
+        root = config.get('archive_dir') or os.path.join(config.get('backup_dir', '/backups'), 'archive')
+        self.archive_dir = os.path.join(root, self.job)
+        self.incoming_dir = os.path.join(self.archive_dir, 'incoming')
+        self.poll_interval = max(0.1, float(config.get('archive_poll_interval', 5)))
+        
+        compression = (config.get('archive_compression') or 'none').lower()
+        try:
+            self.codec: Optional[BaseCodec] = (
+                CodecFactory.create_codec(compression) if compression != 'none' else None
+            )
+        except (ValueError, CompressionError) as e:
+            raise ArchiveError(str(e))
+        if self.codec is not None and not self.codec.is_available():
+            raise ArchiveError(f"ARCHIVE_COMPRESSION={compression} is not available, install its package")
+        
+        # Archived files are encrypted like the backups; the key also reads them back
+        try:
+            self.decryption: Optional[Encryption] = Encryption.from_config(config)
+        except EncryptionError as e:
+            raise ArchiveError(str(e))
+        self.encryption = self.decryption if config.get('encryption') else None
+        
+        # Environment of the client (None inherits os.environ)
+        self.env: Optional[Dict[str, str]] = None
+        
+        # State of the receiver, for metrics
+        self.running = False
+        self.last_archived: Optional[float] = None
+        
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr: Optional[StderrBuffer] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @abstractmethod
+    def get_command(self) -> List[str]:
+        """
+        Get the command of the client streaming the log into the incoming directory.
+        
+        Raises:
+            ArchiveError: If the position to resume from cannot be determined
+        """
+        pass
+    
+    @abstractmethod
+    def list_completed(self) -> List[str]:
+        """Get the names of the completed log files in the incoming directory, oldest first."""
+        pass
+    
+    @abstractmethod
+    def prune(self, recovery_starts: List[Dict[str, Any]]) -> List[str]:
+        """
+        Delete the archived files no kept backup needs.
+        
+        Args:
+            recovery_starts: ``recovery`` sections of the manifests of the kept backups
+        
+        Returns:
+            List[str]: Names of the deleted files
+        """
+        pass
+    
+    def prepare(self) -> None:
+        """
+        Prepare the server before the client starts (e.g. create a replication slot).
+        
+        Raises:
+            ArchiveError: If the server cannot be prepared
+        """
+        pass
+    
+    def start(self) -> None:
+        """Start receiving and archiving in the background."""
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._supervise, name=f"archiver-{self.job}", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Archiving the {self.name} log into {self.archive_dir}")
+    
+    def stop(self, timeout: float = 30) -> None:
+        """Stop the client and archive the files it completed."""
+        self._stopping.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _supervise(self) -> None:
+        """Run the client until stopped, restarting it when it exits."""
+        delay = self.RESTART_DELAY
+        
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            try:
+                self.prepare()
+                command = self.get_command()
+                self.logger.info(f"Running command: {' '.join(command)}")
+                self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                                 env=self.env)
+            except (ArchiveError, OSError) as e:
+                self.logger.error(f"Failed to start the {self.name} log receiver: {e}")
+            else:
+                # Keep the last lines of the error output, logging them at debug level
+                self._stderr = StderrBuffer(max_lines=20, on_line=self.logger.debug).start(self._process.stderr)
+                self.running = True
+                
+                while self._process.poll() is None and not self._stopping.wait(self.poll_interval):
+                    self.archive_completed()
+                
+                if self._process.poll() is None:
+                    self._process.terminate()
+                returncode = self._process.wait()
+                self._stderr.join()
+                self.running = False
+                self.archive_completed()
+                
+                if self._stopping.is_set():
+                    break
+                error = ' | '.join(line.strip() for line in self._stderr.lines) or 'no error output'
+                self.logger.error(f"{self.name} log receiver exited with code {returncode}: {error}")
+            
+            # A client that ran for a while failed for a new reason, start over with a short delay
+            if time.monotonic() - started > self.MAX_RESTART_DELAY:
+                delay = self.RESTART_DELAY
+            self.logger.info(f"Restarting the {self.name} log receiver in {delay:.0f}s")
+            self._stopping.wait(delay)
+            delay = min(delay * 2, self.MAX_RESTART_DELAY)
+        
+        self.logger.info(f"Stopped archiving the {self.name} log")
+    
+    def archive_completed(self) -> int:
+        """
+        Archive the completed files of the incoming directory.
+        
+        Returns:
+            int: Number of files archived
+        """
+        try:
+            completed = self.list_completed()
+        except OSError as e:
+            self.logger.error(f"Failed to list {self.incoming_dir}: {e}")
+            return 0
+        
+        archived = 0
+        for filename in completed:
+            if os.path.exists(self.get_archive_path(filename)):
+                continue
+            try:
+                self._archive_file(filename)
+            except (OSError, EncryptionError, CompressionError) as e:
+                # Retried on the next poll
+                self.logger.error(f"Failed to archive {filename}: {e}")
+                return archived
+            archived += 1
+        
+        # The newest files stay for the client to resume from
+        for filename in completed[:-self.keep_incoming] if self.keep_incoming else completed:
+            try:
+                os.remove(os.path.join(self.incoming_dir, filename))
+            except OSError as e:
+                self.logger.warning(f"Failed to remove {filename} from {self.incoming_dir}: {e}")
+        
+        return archived
+    
+    def get_archive_path(self, filename: str) -> str:
+        """Get the path of the archived copy of a log file."""
+        path = os.path.join(self.archive_dir, filename)
+        if self.codec is not None:
+            # Codec extensions name archives of SQL dumps ('sql.gz'), only the suffix applies
+            path = f"{path}.{self.codec.extension.rsplit('.', 1)[-1]}"
+        if self.encryption is not None:
+            path = self.encryption.get_encrypted_name(path)
+        return path
+    
+    def _archive_file(self, filename: str) -> None:
+        """Compress (and encrypt) a completed file into the archive, replacing it atomically."""
+        source_path = os.path.join(self.incoming_dir, filename)
+        archive_path = self.get_archive_path(filename)
+        temp_path = f"{archive_path}.part"
+        
+        try:
+            with open(source_path, 'rb') as source, open(temp_path, 'wb') as f:
+                encryptor = self.encryption.open_writer(f) if self.encryption is not None else None
+                writer = self.codec.open_writer(encryptor or f, filename) if self.codec is not None else None
+                shutil.copyfileobj(source, writer or encryptor or f, self.COPY_BUFFER_SIZE)
+                if writer is not None:
+                    writer.close()
+                if encryptor is not None:
+                    encryptor.close()
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, archive_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        self.last_archived = time.time()
+        self.logger.debug(f"Archived {filename}")
+    
+    def list_archived(self) -> Dict[str, str]:
+        """
+        Get the archived log files.
+        
+        Returns:
+            Dict[str, str]: Path of the archived copy by log file name
+        """
+        archived = {}
+        for filename in os.listdir(self.archive_dir) if os.path.isdir(self.archive_dir) else []:
+            path = os.path.join(self.archive_dir, filename)
+            if filename.endswith('.part') or not os.path.isfile(path):
+                continue
+            name = Encryption.strip_extension(filename)
+            codec = self._detect_codec(name)
+            if codec is not None:
+                name = name.rsplit('.', 1)[0]
+            archived[name] = path
+        return archived
+    
+    def restore_file(self, archive_path: str, output_path: str) -> None:
+        """
+        Decompress (and decrypt) an archived log file.
+        
+        Raises:
+            ArchiveError: If the file cannot be read
+        """
+        name = Encryption.strip_extension(os.path.basename(archive_path))
+        codec = self._detect_codec(name)
+        encrypted = Encryption.is_encrypted(archive_path)
+        if encrypted and self.decryption is None:
+            raise ArchiveError(f"{archive_path} is encrypted, configure its key with "
+                               f"BACKUP_ENCRYPTION_KEY or BACKUP_ENCRYPTION_KEY_FILE")
+        
+        try:
+            with open(archive_path, 'rb') as f, open(output_path, 'wb') as output:
+                source = self.decryption.open_reader(f) if encrypted else f
+                reader = codec.open_reader(source) if codec is not None else source
+                shutil.copyfileobj(reader, output, self.COPY_BUFFER_SIZE)
+        except (OSError, EncryptionError, CompressionError) as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise ArchiveError(f"Failed to restore {archive_path}: {e}")
+    
+    @staticmethod
+    def _detect_codec(filename: str) -> Optional[BaseCodec]:
+        """Detect the codec of an archived log file from its suffix."""
+        suffix = filename.rsplit('.', 1)[-1] if '.' in filename else ''
+        for codec_type in CodecFactory.get_supported_types():
+            codec = CodecFactory.create_codec(codec_type)
+            if codec.extension.rsplit('.', 1)[-1] == suffix:
+                return codec
+        return None
@@ -0,0 +1,167 @@
+"""
+MySQL/MariaDB binary log archiving with mysqlbinlog.
+"""
+import os
+import re
+import shutil
+import subprocess
+from typing import Any, Dict, List
+from .base import ArchiveError, BaseArchiver
+
+
+# Binlog file name: base name and a sequence number of at least six digits
+BINLOG_PATTERN = re.compile(r'^(?P<base>.+)\.(?P<index>\d{6,})$')
+
+
+def get_binlog_index(filename: str) -> int:
+    """Get the sequence number of a binlog file."""
+    return int(BINLOG_PATTERN.match(filename).group('index'))
+
+
+class BinlogArchiver(BaseArchiver):
+    """
+    Continuous archiving of the MySQL/MariaDB binary log.
+    
+    ``mysqlbinlog --read-from-remote-server --raw --stop-never`` copies the
+    binlog files of the server while they are written, like a replica does.
+    The newest file is still growing: it is archived once the server moves
+    on to the next file and is used from the incoming directory on restore.
+    The server has to keep its binlog files (``binlog_expire_logs_seconds``,
+    ``expire_logs_days``) for longer than the archiver may be down.
+    """
+    
+    name = 'mysql'
+    
+    # list_completed leaves out the file being written, which the client
+    # resumes from, so every completed file can leave the incoming directory
+    keep_incoming = 0
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        
+        # Pass the password through the environment, the command line of the
+        # client is logged on every (re)start
+        if config.get('password'):
+            self.env = {**os.environ, 'MYSQL_PWD': config['password']}
+    
+    def get_connection_args(self) -> List[str]:
+        """Get the connection arguments shared by mysqlbinlog and mysql."""
+        command = []
+        
+        if self.config.get('host'):
+            command.extend(['-h', self.config['host']])
+        
+        if self.config.get('port'):
+            command.extend(['-P', str(self.config['port'])])
+        
+        if self.config.get('user'):
+            command.extend(['-u', self.config['user']])
+        
+        return command
+    
+    def get_current_binlog(self) -> str:
+        """
+        Get the binlog file the server is writing.
+        
+        Raises:
+            ArchiveError: If it cannot be read or binary logging is disabled
+        """
+        error = ''
+        # SHOW MASTER STATUS is called SHOW BINARY LOG STATUS from MySQL 8.4 on
+        for statement in ("SHOW MASTER STATUS", "SHOW BINARY LOG STATUS"):
+            command = ['mysql', *self.get_connection_args(), '--batch', '--skip-column-names', '-e', statement]
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, env=self.env)
+            except OSError as e:
+                raise ArchiveError(f"Failed to run mysql: {e}")
+            if result.returncode != 0:
+                error = result.stderr.strip()
+                continue
+            if not result.stdout.strip():
+                raise ArchiveError("Binary logging is disabled on the server, CONTINUOUS_ARCHIVING needs it")
+            return result.stdout.split('\t', 1)[0].strip()
+        raise ArchiveError(f"Failed to read the binlog position: {error}")
+    
+    def get_command(self) -> List[str]:
+        # Resume from the file being written when stopped (it is fetched
+        # again from its start), then from the newest archived file; a new
+        # archive starts with the current file of the server
+        incoming = self._list_incoming()
+        archived = sorted(self.list_archived(), key=get_binlog_index)
+        if incoming:
+            start = incoming[-1]
+        elif archived:
+            start = archived[-1]
+        else:
+            start = self.get_current_binlog()
+        
+        # With --raw the result file is a prefix of the copied file names
+        return ['mysqlbinlog', *self.get_connection_args(), '--read-from-remote-server', '--raw',
+                '--stop-never', f"--result-file={self.incoming_dir}{os.sep}", start]
+    
+    def _list_incoming(self) -> List[str]:
+        """Get the binlog files of the incoming directory, oldest first."""
+        return sorted((filename for filename in os.listdir(self.incoming_dir) if BINLOG_PATTERN.match(filename)),
+                      key=get_binlog_index)
+    
+    def list_completed(self) -> List[str]:
+        # Every file but the newest was closed by a rotation of the server
+        return self._list_incoming()[:-1]
+    
+    def prune(self, recovery_starts: List[Dict[str, Any]]) -> List[str]:
+        """
+        Delete the archived binlog files older than the position of the oldest kept backup.
+        
+        Nothing is deleted while no kept backup records a binlog position.
+        """
+        starts = [get_binlog_index(start['file']) for start in recovery_starts
+                  if start.get('method') == 'binlog' and start.get('file')]
+        if not starts:
+            return []
+        oldest = min(starts)
+        
+        removed = []
+        for name, path in sorted(self.list_archived().items()):
+            if BINLOG_PATTERN.match(name) and get_binlog_index(name) < oldest:
+                os.remove(path)
+                removed.append(name)
+        return removed
+    
+    def stage(self, start_file: str, output_dir: str) -> List[str]:
+        """
+        Restore the binlog files from a position on into a directory, for mysqlbinlog.
+        
+        The file the client is still writing is copied from the incoming
+        directory, so a replay reaches the last event received.
+        
+        Args:
+            start_file: Binlog file of the backup position
+            output_dir: Directory receiving the files
+        
+        Returns:
+            List[str]: Paths of the restored files, oldest first
+        
+        Raises:
+            ArchiveError: If a file cannot be restored or the first one is missing
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        start = get_binlog_index(start_file)
+        
+        paths = {}
+        archived = self.list_archived()
+        for name, path in archived.items():
+            if BINLOG_PATTERN.match(name) and get_binlog_index(name) >= start:
+                paths[name] = os.path.join(output_dir, name)
+                self.restore_file(path, paths[name])
+        
+        if os.path.isdir(self.incoming_dir):
+            for name in self._list_incoming():
+                if name in archived or get_binlog_index(name) < start:
+                    continue
+                paths[name] = os.path.join(output_dir, name)
+                shutil.copyfile(os.path.join(self.incoming_dir, name), paths[name])
+        
+        if start_file not in paths:
+            raise ArchiveError(f"Binlog file {start_file} is not in the archive {self.archive_dir}")
+        
+        return [paths[name] for name in sorted(paths, key=get_binlog_index)]
@@ -0,0 +1,60 @@
+"""
+Archiver factory for creating continuous archiving instances.
+"""
+import importlib
+from typing import Dict, Any, Type
+from .base import BaseArchiver
+
+
+class ArchiverFactory:
+    """Factory class for creating continuous archiving instances."""
+    
+    # Archiver modules are imported on first use, like the database modules
+    _archiver_classes = {
+        'postgresql': ('src.archive.wal', 'WalArchiver'),
+        'postgres': ('src.archive.wal', 'WalArchiver'),  # Alias
+        'mysql': ('src.archive.binlog', 'BinlogArchiver'),
+        'mariadb': ('src.archive.binlog', 'BinlogArchiver'),  # Alias
+    }
+    
+    @classmethod
+    def get_archiver_class(cls, db_type: str) -> Type[BaseArchiver]:
+        """
+        Import and return the archiver class of a database type.
+        
+        Raises:
+            ValueError: If the database type has no continuous archiving
+        """
+        db_type_lower = db_type.lower()
+        
+        if db_type_lower not in cls._archiver_classes:
+            supported_types = ', '.join(cls._archiver_classes.keys())
+            raise ValueError(f"Continuous archiving is not supported for {db_type}. "
+                             f"Supported types: {supported_types}")
+        
+        module_name, class_name = cls._archiver_classes[db_type_lower]
+        return getattr(importlib.import_module(module_name), class_name)
+    
+    @classmethod
+    def create_archiver(cls, db_type: str, config: Dict[str, Any]) -> BaseArchiver:
+        """
+        Create the archiver of a backup job.
+        
+        Args:
+            db_type: Type of database (postgresql, mysql, ...)
+            config: Backup settings of the job
+        
+        Returns:
+            BaseArchiver: Archiver instance, not started
+        
+        Raises:
+            ValueError: If the database type has no continuous archiving
+            ArchiveError: If the configuration is invalid
+        """
+        archiver_class = cls.get_archiver_class(db_type)
+        return archiver_class(config)
+    
+    @classmethod
+    def get_supported_types(cls) -> list:
+        """Get list of database types with continuous archiving."""
+        return list(cls._archiver_classes.keys())
@@ -0,0 +1,149 @@
+"""
+PostgreSQL write-ahead log archiving with pg_receivewal.
+"""
+import os
+import re
+import shutil
+import subprocess
+from typing import Any, Dict, List
+from .base import ArchiveError, BaseArchiver
+
+
+# WAL segment (timeline, log and segment number in hex) and timeline history file names
+SEGMENT_PATTERN = re.compile(r'^[0-9A-F]{24}$')
+HISTORY_PATTERN = re.compile(r'^[0-9A-F]{8}\.history$')
+
+# Segment pg_receivewal is still writing
+PARTIAL_SUFFIX = '.partial'
+
+
+def get_segment_position(segment: str) -> int:
+    """Get the position of a WAL segment within the log, independent of its timeline."""
+    return int(segment[8:24], 16)
+
+
+class WalArchiver(BaseArchiver):
+    """
+    Continuous archiving of the PostgreSQL write-ahead log.
+    
+    ``pg_receivewal`` streams the WAL over a replication connection, so no
+    ``archive_command`` has to be set up on the server. With a replication
+    slot (PG_REPLICATION_SLOT) the server keeps the WAL the archiver has not
+    received yet, so a restart of the archiver or the container leaves no
+    gap; the segment being written (``.partial``) is used on restore as well.
+    """
+    
+    name = 'postgresql'
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.slot = config.get('pg_replication_slot') or None
+        self.status_interval = int(config.get('archive_status_interval', 10))
+        
+        # Pass the PostgreSQL password to pg_receivewal through its environment
+        if config.get('password'):
+            self.env = {**os.environ, 'PGPASSWORD': config['password']}
+    
+    def get_connection_args(self) -> List[str]:
+        """Get the replication connection arguments of pg_receivewal."""
+        command = []
+        
+        if self.config.get('host'):
+            command.extend(['-h', self.config['host']])
+        
+        if self.config.get('port'):
+            command.extend(['-p', str(self.config['port'])])
+        
+        if self.config.get('user'):
+            command.extend(['-U', self.config['user']])
+        
+        command.append('-w')  # Never prompt for password
+        return command
+    
+    def prepare(self) -> None:
+        """Create the replication slot unless it exists."""
+        if not self.slot:
+            return
+        
+        command = ['pg_receivewal', *self.get_connection_args(), '--slot', self.slot,
+                   '--create-slot', '--if-not-exists']
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, env=self.env)
+        except OSError as e:
+            raise ArchiveError(f"Failed to run pg_receivewal: {e}")
+        if result.returncode != 0:
+            raise ArchiveError(f"Failed to create replication slot {self.slot}: {result.stderr.strip()}")
+    
+    def get_command(self) -> List[str]:
+        # The loop is ours: pg_receivewal exits on errors and is restarted with a backoff
+        command = ['pg_receivewal', *self.get_connection_args(), '-D', self.incoming_dir,
+                   '--no-loop', '-s', str(self.status_interval)]
+        if self.slot:
+            command.extend(['--slot', self.slot])
+        return command
+    
+    def list_completed(self) -> List[str]:
+        # Segments and history files sort by timeline and position
+        return sorted(filename for filename in os.listdir(self.incoming_dir)
+                      if SEGMENT_PATTERN.match(filename) or HISTORY_PATTERN.match(filename))
+    
+    def prune(self, recovery_starts: List[Dict[str, Any]]) -> List[str]:
+        """
+        Delete the archived segments older than the start of the oldest kept base backup.
+        
+        Timeline history files are always kept; nothing is deleted while no
+        kept backup is a base backup.
+        """
+        starts = [get_segment_position(start['start_segment']) for start in recovery_starts
+                  if start.get('method') == 'wal' and start.get('start_segment')]
+        if not starts:
+            return []
+        oldest = min(starts)
+        
+        removed = []
+        for name, path in sorted(self.list_archived().items()):
+            if SEGMENT_PATTERN.match(name) and get_segment_position(name) < oldest:
+                os.remove(path)
+                removed.append(name)
+        return removed
+    
+    def stage(self, start_segment: str, output_dir: str) -> int:
+        """
+        Restore the segments a base backup needs into a directory, for ``restore_command``.
+        
+        Every archived segment from the start of the base backup on is
+        restored with the timeline history files. The segment
+        pg_receivewal is still writing is restored under its final name, so
+        the recovery reaches the last transaction received.
+        
+        Args:
+            start_segment: First segment of the base backup
+            output_dir: Directory receiving the segments
+        
+        Returns:
+            int: Number of segments restored
+        
+        Raises:
+            ArchiveError: If a segment cannot be restored
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        start = get_segment_position(start_segment)
+        
+        count = 0
+        archived = self.list_archived()
+        for name, path in sorted(archived.items()):
+            if HISTORY_PATTERN.match(name) or (SEGMENT_PATTERN.match(name) and get_segment_position(name) >= start):
+                self.restore_file(path, os.path.join(output_dir, name))
+                count += SEGMENT_PATTERN.match(name) is not None
+        
+        if os.path.isdir(self.incoming_dir):
+            for filename in sorted(os.listdir(self.incoming_dir)):
+                name = filename[:-len(PARTIAL_SUFFIX)] if filename.endswith(PARTIAL_SUFFIX) else filename
+                if (name in archived or not SEGMENT_PATTERN.match(name)
+                        or get_segment_position(name) < start
+                        or os.path.exists(os.path.join(output_dir, name))):
+                    continue
+                shutil.copyfile(os.path.join(self.incoming_dir, filename), os.path.join(output_dir, name))
+                count += 1
+        
+        return count
@@ -1,23 +1,86 @@
 """
 Main backup manager that orchestrates the backup process.
 """
+import os
 import time
 import logging
-from typing import List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 from config.config import config
-from src.database import DatabaseFactory, DatabaseBackupError
+from src.catalog import CatalogError
+from src.compression import CodecFactory
 from src.notification import NotificationFactory, BaseNotifier
-from src.utils import compress_file, format_duration, get_file_size_mb
+from src.storage import StorageError
+from src.utils import (
+    compress_file,
+    compute_checksum,
+    format_duration,
+    get_file_size_mb,
+    get_manifest_path,
+    get_required_files,
+    MANIFEST_SUFFIX,
+    read_manifest,
+    write_manifest,
+)
 from src.lang import t
 
+# The database layer, catalog, storage targets, archivers and metrics are
+# imported where they are used, so starting the daemon or a triggered run
+# does not load them all (see benchmarks/startup.py); only their exception
+# classes are imported here
+if TYPE_CHECKING:
+    from src.archive import BaseArchiver
+    from src.catalog import BackupCatalog
+    from src.database import BaseDatabase
+    from src.metrics import JobMetrics
+    from src.storage import BaseStorage
+
+
+class BackupResult:
+    """Outcome of a single backup job."""
+    
+    def __init__(self, name: str, success: bool, backup_file: Optional[str] = None,
+                 size_mb: float = 0.0, duration: float = 0.0, error: Optional[str] = None,
+                 unchanged: bool = False, degraded: bool = False):
+        self.name = name
+        self.success = success
+        self.backup_file = backup_file
+        self.size_mb = size_mb
+        self.duration = duration
+        self.error = error
+        # Set when the database was unchanged and the previous backup was kept
+        self.unchanged = unchanged
+        # Set when the local backup completed but a storage target did not receive it
+        self.degraded = degraded
+    
+    def __repr__(self) -> str:
+        return f"BackupResult(name={self.name!r}, success={self.success}, backup_file={self.backup_file!r})"
+
 
 class BackupManager:
     """Main backup manager class."""
     
     def __init__(self):
+        from src.metrics import MetricsRegistry
+        from src.utils import Throttle
+        
         self.logger = logging.getLogger(__name__)
         self.config = config
         self.notifiers: List[BaseNotifier] = []
+        # Storage targets receiving a copy of every backup
+        self.storages: List['BaseStorage'] = []
+        # Continuous archivers of the transaction log, run by the daemon
+        self.archivers: List['BaseArchiver'] = []
+        self.results: List[BackupResult] = []
+        # Per-phase metrics of the latest run of every job
+        self.metrics = MetricsRegistry()
+        # Rate limits and priority shared by all jobs
+        self.throttle = Throttle.from_config(self.config.get('throttle'))
+        
+        # Backup catalogs by path, shared by the jobs using the same directory
+        self._catalogs: Dict[str, 'BackupCatalog'] = {}
+        self._catalog_lock = threading.Lock()
         
         # Set up translator with configured language
         from src.lang.translator import get_translator
@@ -26,6 +89,7 @@ class BackupManager:
         
         # Initialize notifiers
         self._initialize_notifiers()
+        self._initialize_storages()
     
     def _initialize_notifiers(self) -> None:
         """Initialize notification providers."""
@@ -50,99 +114,849 @@ class BackupManager:
         except Exception as e:
             self.logger.error(t('notification_init_failed', error=str(e)))
     
-    def run_backup(self) -> bool:
+    def _initialize_storages(self) -> None:
+        """Initialize the storage targets listed in STORAGE_TARGETS."""
+        storage_config = self.config.get('storage', {})
+        targets = storage_config.get('targets') or []
+        if not targets:
+            return
+        
+        from src.storage import StorageFactory
+        self.storages = StorageFactory.create_all_storages(targets, storage_config)
+        if self.storages:
+            self.logger.info(t('storage_init_success',
+                               targets=', '.join(storage.name for storage in self.storages)))
+    
+    def start_archivers(self) -> None:
+        """
+        Start the continuous archiving of every job with CONTINUOUS_ARCHIVING.
+        
+        Used by the scheduler daemon; the archivers run until :meth:`close`.
+        A job whose archiver cannot be created is logged and skipped.
+        """
+        for job in self.config.get_jobs():
+            settings = {**self.config.get_backup_config(), **job}
+            if not settings.get('continuous_archiving'):
+                continue
+            
+            # Imported here so runs without continuous archiving never load the archivers
+            from src.archive import ArchiveError, ArchiverFactory
+            try:
+                archiver = ArchiverFactory.create_archiver(job['type'], settings)
+            except (ValueError, ArchiveError) as e:
+                self.logger.error(t('archive_init_failed', name=job.get('name') or job.get('database'),
+                                    error=str(e)))
+                continue
+            
+            archiver.start()
+            self.archivers.append(archiver)
+            self.metrics.add_archiver(archiver)
+    
+    def run_backup(self, close_notifiers: bool = True) -> bool:
         """
-        Run the complete backup process.
+        Run the complete backup process for every configured target.
+        
+        A single target runs in the calling thread. Several targets (from
+        BACKUP_JOBS_FILE) run on a bounded worker pool with a per-host
+        concurrency limit; the result of every job is kept in ``self.results``.
+        
+        Args:
+            close_notifiers: Close the notifier connections after the run;
+                the scheduler daemon keeps them open for the next run
         
         Returns:
-            bool: True if backup completed successfully
+            bool: True if all backups completed successfully
+        """
+        jobs = self.config.get_jobs()
+        waited = self.throttle.waited
+        
+        self.throttle.start()
+        try:
+            if len(jobs) == 1:
+                self.results = [self.run_job(jobs[0])]
+            else:
+                self.results = self._run_jobs_concurrently(jobs)
+        finally:
+            self.throttle.stop()
+            if self.throttle.waited > waited:
+                self.logger.info(t('backup_throttled', duration=format_duration(self.throttle.waited - waited)))
+            # Notifiers keep connections open between the messages of one run
+            if close_notifiers:
+                self.close()
+            self._write_metrics()
+        
+        return all(result.success for result in self.results)
+    
+    def _write_metrics(self) -> None:
+        """Write the metrics file for the node_exporter textfile collector, if configured."""
+        path = self.config.get('metrics.textfile', '')
+        if not path:
+            return
+        
+        from src.metrics import MetricsError
+        try:
+            self.metrics.write_textfile(path)
+        except MetricsError as e:
+            self.logger.warning(str(e))
+    
+    def close(self) -> None:
+        """Close the connections held by the notifiers and storage targets, and stop the archivers."""
+        for archiver in self.archivers:
+            archiver.stop()
+        self.archivers = []
+        for notifier in self.notifiers:
+            notifier.close()
+        for storage in self.storages:
+            storage.close()
+    
+    def run_job(self, db_config: Dict[str, Any]) -> BackupResult:
         """
+        Run the complete backup process for one database.
+        
+        Every outcome leaves through one exit: failures (a degraded upload
+        included) are notified there and the job metrics are stored once.
+        
+        Args:
+            db_config: Database configuration of the target
+            
+        Returns:
+            BackupResult: Outcome of the backup
+        """
+        from src.database import DatabaseBackupError
+        from src.metrics import JobMetrics
+        
         start_time = time.time()
-        backup_file = None
+        name = db_config.get('name') or db_config.get('database')
+        metrics = JobMetrics(name)
+        # Prefix messages with the job name when running several targets
+        label = f"[{db_config['name']}] " if db_config.get('name') else ''
+        error_msg = ''
         
         try:
-            self.logger.info(t('backup_starting'))
+            self.logger.info(label + t('backup_starting'))
+            result = self._run_backup(db_config, self._get_job_settings(db_config, name), metrics, start_time, label)
+            if result.degraded:
+                error_msg = label + t('backup_degraded', file=result.backup_file, error=result.error)
+                self.logger.error(error_msg)
             
-            # Get database configuration
-            db_config = self.config.get_database_config()
-            db_type = db_config['type']
+        except (DatabaseBackupError, StorageError) as e:
+            error_msg = label + t('backup_failed') + f": {e}"
+            self.logger.error(error_msg)
+            result = BackupResult(name, False, duration=time.time() - start_time, error=str(e))
             
-            self.logger.info(f"Database type: {db_type}")
+        except Exception as e:
+            error_msg = label + t('unexpected_error', error=str(e))
+            self.logger.error(error_msg, exc_info=True)
+            result = BackupResult(name, False, duration=time.time() - start_time, error=str(e))
+        
+        if not result.success:
+            self._send_notifications('failure', None, error_msg, metrics)
+        self._finish_metrics(metrics, result.success, label)
+        if result.success and not result.unchanged:
+            self.logger.info(label + t('backup_process_completed', duration=format_duration(result.duration)))
+        return result
+    
+    def _get_job_settings(self, db_config: Dict[str, Any], name: str) -> Dict[str, Any]:
+        """Merge the backup settings with the overrides of a job."""
+        from src.compression import AUTO
+        
+        # Jobs may override any backup setting
+        settings = {**self.config.get_backup_config(), **db_config}
+        if (settings.get('compression') or '').lower() == AUTO and settings.get('compression_time_budget'):
+            # Streamed dumps are sized after the fact, the time budget uses the previous dump
+            settings['expected_dump_size'] = self._get_previous_dump_size(settings, name)
+        return settings
+    
+    def _run_backup(self, db_config: Dict[str, Any], settings: Dict[str, Any], metrics: 'JobMetrics',
+                    start_time: float, label: str = '') -> BackupResult:
+        """
+        Run the phases of a backup: dump, compress, record, upload, clean up and notify.
+        
+        Args:
+            db_config: Database configuration of the target
+            settings: Backup settings of the job
+            metrics: Metrics of the job, receiving the timings of every phase
+            start_time: Start time of the run
+            label: Job name prefix of the log messages
             
-            # Create database backup instance
-            database = DatabaseFactory.create_database(db_type, db_config)
+        Returns:
+            BackupResult: Outcome of the backup, degraded when an upload failed
             
-            # Perform backup
+        Raises:
+            DatabaseBackupError: If the backup fails
+        """
+        name = db_config.get('name') or db_config.get('database')
+        database = self._create_database(db_config, settings, name, label)
+        
+        if settings.get('skip_unchanged'):
+            with metrics.phase('fingerprint'):
+                database.fingerprint = database.get_fingerprint()
+            result = self._reuse_unchanged_backup(database, settings, start_time, label)
+            if result:
+                metrics.unchanged = True
+                return result
+        
+        backup_file, backup_file_mb = self._dump(database, metrics, label)
+        compressed_file = self._compress_and_encrypt(database, settings, backup_file, metrics, label)
+        if database.encryption is not None and not database.output_compressed:
+            # Only the encrypted archive is kept
+            backup_file = None
+        final_backup_file = compressed_file or backup_file
+        final_size_mb = get_file_size_mb(compressed_file) if compressed_file else backup_file_mb
+        
+        duration = time.time() - start_time
+        artifacts = [artifact for artifact in (backup_file, compressed_file) if artifact]
+        catalog = self._record_backup(database, db_config, settings, artifacts, start_time, duration, metrics, label)
+        
+        # Copy the backup to the storage targets
+        remote_files = []
+        upload_error = None
+        if self.storages:
+            with metrics.phase('upload') as phase:
+                try:
+                    remote_files, phase['bytes'] = self._upload_backup(database, final_backup_file, label)
+                except StorageError as e:
+                    # The local backup is complete, its retention and pruning still run
+                    upload_error = str(e)
+        
+        with metrics.phase('cleanup'):
+            self._cleanup(database, settings, catalog, final_backup_file, label)
+        
+        if upload_error:
+            return BackupResult(name, False, final_backup_file, final_size_mb, duration,
+                                error=upload_error, degraded=True)
+        
+        # Send success notifications
+        success_message = self._create_success_message(
+            db_config, final_backup_file, final_size_mb, duration,
+            f"{database.checksum_algorithm}:{database.checksums[final_backup_file]}",
+            remote_files,
+        )
+        if self.notifiers:
+            with metrics.phase('notify') as phase:
+                self._send_notifications('success', final_backup_file, success_message, metrics)
+                # The backup file is uploaded by the providers that attach it
+                phase['bytes'] = os.path.getsize(final_backup_file)
+        
+        return BackupResult(name, True, final_backup_file, final_size_mb, duration)
+    
+    def _create_database(self, db_config: Dict[str, Any], settings: Dict[str, Any], name: str,
+                         label: str = '') -> 'BaseDatabase':
+        """Create the database instance of a job, wired to the throttle, storages and notifiers."""
+        from src.database import DatabaseFactory
+        
+        db_type = db_config['type']
+        self.logger.info(f"{label}Database type: {db_type}")
+        
+        # Backup settings such as backup_dir and streaming are needed by the database layer too
+        database = DatabaseFactory.create_database(db_type, settings)
+        database.throttle = self.throttle
+        if settings.get('storage_streaming', True):
+            # Streamed archives are uploaded while they are written
+            database.storages = self.storages
+        if self.notifiers and settings.get('progress_notify_interval'):
+            # Long dumps report their progress to the notifiers
+            database.progress_listener = self._create_progress_listener(
+                settings['progress_notify_interval'], label
+            )
+        
+        if settings.get('incremental'):
+            # Incremental backups build on the latest backup of the job
+            database.previous_backup = self._get_latest_backup(settings, name)
+        return database
+    
+    def _dump(self, database: 'BaseDatabase', metrics: 'JobMetrics', label: str = '') -> Tuple[str, float]:
+        """Dump the database, recording the dump and archive sizes; returns the file and its size in MB."""
+        with metrics.phase('dump') as phase:
             backup_file = database.backup()
-            backup_size_mb = get_file_size_mb(backup_file)
-            
-            self.logger.info(t('backup_created', file=backup_file, size=backup_size_mb))
+            backup_size = os.path.getsize(backup_file)
+            # Streamed dumps report the uncompressed bytes read from the dump tool
+            phase['bytes'] = database.content_size or backup_size
+        
+        if database.output_compressed:
+            metrics.sizes['archive'] = backup_size
+            if database.content_size:
+                metrics.sizes['dump'] = database.content_size
+        else:
+            metrics.sizes['dump'] = backup_size
+        
+        backup_size_mb = get_file_size_mb(backup_file)
+        self.logger.info(label + t('backup_created', file=backup_file, size=backup_size_mb))
+        return backup_file, backup_size_mb
+    
+    def _compress_and_encrypt(self, database: 'BaseDatabase', settings: Dict[str, Any], backup_file: str,
+                              metrics: 'JobMetrics', label: str = '') -> Optional[str]:
+        """
+        Compress (and encrypt) a dump that was not streamed into an archive.
+        
+        With encryption the unencrypted dump is removed once the encrypted
+        archive exists, and kept when it could not be written.
+        
+        Returns:
+            Optional[str]: Path to the archive, None if the dump is kept as it is
+        
+        Raises:
+            DatabaseBackupError: If the dump had to be encrypted and was not
+        """
+        from src.database import DatabaseBackupError
+        
+        compressed_file = None
+        compression = (settings.get('compression') or 'none').lower()
+        if not database.output_compressed and compression != 'none':
+            with metrics.phase('compress') as phase:
+                phase['bytes'] = os.path.getsize(backup_file)
+                compressed_file = self._compress_backup(backup_file, settings, database)
+        
+        if database.encryption is not None and not database.output_compressed:
+            if not compressed_file or not os.path.exists(compressed_file):
+                # The dump is the only copy of the backup, it is kept until an archive exists
+                raise DatabaseBackupError(
+                    f"Encrypting the backup failed, the unencrypted dump was kept: {backup_file}"
+                )
+            self._remove_plain_dump(database, backup_file)
+        
+        if compressed_file:
+            metrics.sizes['archive'] = os.path.getsize(compressed_file)
+            self.logger.info(label + t('backup_compressed', file=compressed_file,
+                                       size=get_file_size_mb(compressed_file)))
+        return compressed_file
+    
+    def _record_backup(self, database: 'BaseDatabase', db_config: Dict[str, Any], settings: Dict[str, Any],
+                       artifacts: List[str], start_time: float, duration: float, metrics: 'JobMetrics',
+                       label: str = '') -> Optional['BackupCatalog']:
+        """
+        Write the sidecar manifests of the backup files and record them in the catalog.
+        
+        Returns:
+            Optional[BackupCatalog]: The catalog of the job, None if disabled or unavailable
+        """
+        with metrics.phase('checksum') as phase:
+            # Only files without an inline checksum are read again
+            phase['bytes'] = sum(os.path.getsize(artifact) for artifact in artifacts
+                                 if not database.checksums.get(artifact))
+            self._write_manifests(database, db_config, artifacts, start_time, duration)
+        
+        catalog = self.get_catalog(settings)
+        if not catalog:
+            return None
+        
+        try:
+            with metrics.phase('catalog'):
+                for artifact in artifacts:
+                    catalog.add(artifact, database.name, database=db_config.get('database'),
+                                db_type=db_config['type'], host=db_config.get('host'),
+                                checksum=database.checksums[artifact],
+                                checksum_algorithm=database.checksum_algorithm,
+                                created_at=start_time, duration=duration,
+                                fingerprint=database.fingerprint)
+        except CatalogError as e:
+            self.logger.warning(label + t('catalog_unavailable', path=catalog.path, error=str(e)))
+            return None
+        return catalog
+    
+    def _cleanup(self, database: 'BaseDatabase', settings: Dict[str, Any], catalog: Optional['BackupCatalog'],
+                 backup_file: str, label: str = '') -> None:
+        """Apply the local and remote retention, and prune the continuous archive."""
+        database.cleanup_old_backups(settings.get('retention_count', 3), catalog)
+        self._prune_storages(database.name, settings.get('storage_retention_count', 0), label,
+                             self._get_required_backups(catalog, database, backup_file))
+        if settings.get('continuous_archiving'):
+            self._prune_archive(catalog, database, settings, label)
+    
+    def _reuse_unchanged_backup(self, database: 'BaseDatabase', settings: Dict[str, Any],
+                                start_time: float, label: str = '') -> Optional[BackupResult]:
+        """
+        Keep the latest backup of a job instead of dumping again if the database is unchanged.
+        
+        The latest backup in the catalog is reused when it was taken with the
+        same change fingerprint, still exists and is younger than
+        BACKUP_SKIP_UNCHANGED_MAX_AGE. The run is recorded on its catalog
+        entry; nothing is uploaded, pruned or notified.
+        
+        Args:
+            database: Database instance with the fingerprint read before the dump
+            settings: Backup settings of the job
+            start_time: Start time of the run
+            label: Job name prefix of the log messages
+        
+        Returns:
+            Optional[BackupResult]: Result pointing at the reused backup, None to run a full backup
+        """
+        catalog = self.get_catalog(settings)
+        if not database.fingerprint or not catalog:
+            return None
+        
+        try:
+            entry = catalog.find_backup(database.name)
+        except CatalogError:
+            return None
+        if not entry or entry.get('fingerprint') != database.fingerprint:
+            return None
+        
+        max_age = float(settings.get('skip_unchanged_max_age') or 0)
+        if max_age > 0 and start_time - entry['created_at'] > max_age * 3600:
+            self.logger.info(label + t('backup_unchanged_expired', file=entry['filename'], hours=max_age))
+            return None
+        
+        backup_file = catalog.get_path(entry)
+        if not os.path.exists(backup_file):
+            return None
+        
+        try:
+            catalog.mark_unchanged(backup_file, start_time)
+        except CatalogError as e:
+            self.logger.warning(label + t('catalog_unavailable', path=catalog.path, error=str(e)))
+        
+        duration = time.time() - start_time
+        self.logger.info(label + t('backup_unchanged', file=backup_file))
+        return BackupResult(database.name, True, backup_file, get_file_size_mb(backup_file), duration,
+                            unchanged=True)
+    
+    def _finish_metrics(self, metrics: 'JobMetrics', success: bool, label: str = '') -> None:
+        """Log the phase timings of a job and store its metrics."""
+        metrics.finish(success)
+        if metrics.phases:
+            self.logger.info(label + t('backup_phases', phases=metrics.describe()))
+        self.metrics.add(metrics)
+    
+    def _run_jobs_concurrently(self, jobs: List[Dict[str, Any]]) -> List[BackupResult]:
+        """
+        Run several backup jobs on a bounded worker pool.
+        
+        Args:
+            jobs: Database configurations of the targets
             
-            # Compress backup if configured
-            compressed_file = self._compress_backup(backup_file)
-            if compressed_file:
-                final_backup_file = compressed_file
-                final_size_mb = get_file_size_mb(compressed_file)
-                self.logger.info(t('backup_compressed', file=compressed_file, size=final_size_mb))
+        Returns:
+            List[BackupResult]: Result of every job, in job order
+        """
+        start_time = time.time()
+        backup_config = self.config.get_backup_config()
+        max_workers = max(1, backup_config.get('max_workers', 4))
+        max_per_host = max(1, backup_config.get('max_per_host', 1))
+        
+        host_limits = {job.get('host'): threading.BoundedSemaphore(max_per_host) for job in jobs}
+        
+        def run_limited(job: Dict[str, Any]) -> BackupResult:
+            with host_limits[job.get('host')]:
+                return self.run_job(job)
+        
+        self.logger.info(t('backup_jobs_starting', count=len(jobs), workers=max_workers, per_host=max_per_host))
+        
+        # Interleave hosts so the pool is not filled with jobs waiting for one host
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backup') as executor:
+            futures = {job['name']: executor.submit(run_limited, job) for job in self._interleave_by_host(jobs)}
+            results = [futures[job['name']].result() for job in jobs]
+        
+        for result in results:
+            if result.success:
+                status = t('backup_job_ok')
             else:
-                final_backup_file = backup_file
-                final_size_mb = backup_size_mb
+                status = t('backup_job_degraded') if result.degraded else t('backup_job_failed')
+            detail = f" ({result.error})" if result.error else ''
+            self.logger.info(t('backup_job_result', name=result.name, status=status,
+                               duration=format_duration(result.duration)) + detail)
+        
+        succeeded = sum(1 for result in results if result.success)
+        self.logger.info(t('backup_jobs_summary', succeeded=succeeded, total=len(results),
+                           duration=format_duration(time.time() - start_time)))
+        return results
+    
+    def _get_backup_dirs(self) -> List[Tuple[str, Optional['BackupCatalog']]]:
+        """Get the backup directories of all jobs with their catalogs (None if disabled)."""
+        backup_dirs = []
+        for job in self.config.get_jobs():
+            settings = {**self.config.get_backup_config(), **job}
+            backup_dir = settings.get('backup_dir', '/backups')
+            if backup_dir not in [directory for directory, _ in backup_dirs]:
+                backup_dirs.append((backup_dir, self.get_catalog(settings)))
+        return backup_dirs
+    
+    def _get_catalogs(self) -> List['BackupCatalog']:
+        """Get the catalogs of the backup directories of all jobs."""
+        catalogs = []
+        for _, catalog in self._get_backup_dirs():
+            if catalog and catalog not in catalogs:
+                catalogs.append(catalog)
+        return catalogs
+    
+    def list_backups(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List the backups recorded in the catalogs, newest first.
+        
+        Args:
+            name: Only list backups of this job
             
-            # Clean up old backups
-            backup_config = self.config.get_backup_config()
-            retention_count = backup_config.get('retention_count', 3)
-            database.cleanup_old_backups(retention_count)
+        Returns:
+            List[Dict[str, Any]]: Catalog entries
+        """
+        entries = []
+        for catalog in self._get_catalogs():
+            entries.extend(catalog.list_backups(name))
+        return sorted(entries, key=lambda entry: entry['created_at'], reverse=True)
+    
+    def verify_backups(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Verify the backup files against their recorded checksums.
+        
+        Archives are re-hashed as they are stored, with large sequential
+        reads, so no decompression is needed. The checksum of the sidecar
+        manifest is used, or the catalog checksum for files without one.
+        
+        Args:
+            name: Only verify backups of this job
             
-            # Calculate duration
-            duration = time.time() - start_time
+        Returns:
+            List[Dict[str, Any]]: One result per file with ``filename``,
+            ``name``, ``path`` and ``status`` (ok, mismatch, missing or
+            unknown when no checksum was recorded)
+        """
+        results = []
+        
+        for backup_dir, catalog in self._get_backup_dirs():
+            if catalog:
+                candidates = catalog.list_backups(name)
+            else:
+                candidates = []
+                for filename in sorted(os.listdir(backup_dir)):
+                    if filename.endswith(MANIFEST_SUFFIX):
+                        manifest = read_manifest(os.path.join(backup_dir, filename[:-len(MANIFEST_SUFFIX)]))
+                        if manifest and (name is None or manifest.get('name') == name):
+                            candidates.append({'filename': manifest['file'], 'name': manifest.get('name')})
             
-            # Send success notifications
-            success_message = self._create_success_message(
-                final_backup_file, final_size_mb, duration
-            )
-            self._send_notifications('success', final_backup_file, success_message)
+            for candidate in candidates:
+                path = os.path.join(backup_dir, candidate['filename'])
+                manifest = read_manifest(path) or {}
+                expected = manifest.get('checksum') or candidate.get('checksum')
+                algorithm = manifest.get('algorithm') or candidate.get('checksum_algorithm') or 'sha256'
+                
+                if not os.path.exists(path):
+                    status = 'missing'
+                elif not expected:
+                    status = 'unknown'
+                elif compute_checksum(path, algorithm) == expected:
+                    status = 'ok'
+                else:
+                    status = 'mismatch'
+                
+                if status in ('missing', 'mismatch'):
+                    self.logger.error(t('backup_verify_failed', file=path, status=status))
+                results.append({'filename': candidate['filename'], 'name': candidate.get('name'),
+                                'path': path, 'status': status})
+        
+        return results
+    
+    def rebuild_catalogs(self) -> int:
+        """
+        Rebuild every catalog from the backup files on disk.
+        
+        Returns:
+            int: Number of backups in the rebuilt catalogs
+        """
+        from src.database import DatabaseFactory
+        
+        extensions = DatabaseFactory.get_backup_extensions()
+        algorithm = self.config.get_backup_config().get('checksum_algorithm') or 'sha256'
+        return sum(catalog.rebuild(extensions, checksum_algorithm=algorithm) for catalog in self._get_catalogs())
+    
+    def get_catalog(self, settings: Dict[str, Any]) -> Optional['BackupCatalog']:
+        """
+        Get the backup catalog of a backup directory.
+        
+        A new catalog is filled with the backups already on disk. If the
+        catalog is disabled or cannot be opened, None is returned and
+        retention falls back to scanning the directory.
+        
+        Args:
+            settings: Backup settings of the job
             
-            self.logger.info(t('backup_process_completed', duration=format_duration(duration)))
-            return True
+        Returns:
+            Optional[BackupCatalog]: The catalog, or None
+        """
+        if not settings.get('catalog', True):
+            return None
+        
+        # Imported here so runs with the catalog disabled never load SQLite
+        from src.catalog import BackupCatalog
+        from src.database import DatabaseFactory
+        
+        backup_dir = settings.get('backup_dir', '/backups')
+        path = settings.get('catalog_path') or os.path.join(backup_dir, BackupCatalog.DEFAULT_FILENAME)
+        
+        with self._catalog_lock:
+            if path in self._catalogs:
+                return self._catalogs[path]
             
-        except DatabaseBackupError as e:
-            error_msg = t('backup_failed') + f": {e}"
-            self.logger.error(error_msg)
-            self._send_notifications('failure', None, error_msg)
-            return False
+            try:
+                catalog = BackupCatalog(backup_dir, path)
+                if catalog.is_new:
+                    self.logger.info(t('catalog_indexing', path=path))
+                    catalog.rebuild(DatabaseFactory.get_backup_extensions(), with_checksums=False)
+            except Exception as e:
+                self.logger.warning(t('catalog_unavailable', path=path, error=str(e)))
+                catalog = None
             
-        except Exception as e:
-            error_msg = t('unexpected_error', error=str(e))
-            self.logger.error(error_msg, exc_info=True)
-            self._send_notifications('failure', None, error_msg)
-            return False
+            self._catalogs[path] = catalog
+            return catalog
+    
+    @staticmethod
+    def _interleave_by_host(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order jobs round-robin across hosts, keeping the order per host."""
+        by_host: Dict[Any, List[Dict[str, Any]]] = {}
+        for job in jobs:
+            by_host.setdefault(job.get('host'), []).append(job)
+        
+        ordered = []
+        queues = list(by_host.values())
+        while any(queues):
+            for queue in queues:
+                if queue:
+                    ordered.append(queue.pop(0))
+        return ordered
     
-    def _compress_backup(self, backup_file: str) -> Optional[str]:
+    def _compress_backup(self, backup_file: str, backup_config: Dict[str, Any],
+                         database: Optional['BaseDatabase'] = None) -> Optional[str]:
         """
         Compress the backup file if compression is enabled.
         
+        With BACKUP_COMPRESSION=auto the codec and level are picked from a
+        sample at the start of the dump and the choice is kept on the
+        database for the manifest.
+        
         Args:
             backup_file: Path to the backup file
+            backup_config: Backup settings of the job
+            database: Optional database instance receiving the checksums of both files
             
         Returns:
             Optional[str]: Path to compressed file, or None if compression disabled/failed
         """
-        backup_config = self.config.get_backup_config()
         compression_type = backup_config.get('compression')
+        level = backup_config.get('compression_level')
         
         if not compression_type or compression_type.lower() == 'none':
             return None
         
-        return compress_file(backup_file, compression_type)
+        from src.compression import AUTO, CodecSelector
+        if compression_type.lower() == AUTO:
+            selector = CodecSelector.from_config(backup_config)
+            with open(backup_file, 'rb') as f:
+                sample = f.read(selector.sample_size)
+            choice = selector.select(sample, os.path.getsize(backup_file))
+            compression_type, level = choice.codec, choice.level
+            if database:
+                database.codec_selection = choice.to_dict()
+        
+        return compress_file(
+            backup_file,
+            compression_type,
+            level=level,
+            threads=backup_config.get('compression_threads', 1),
+            block_size=backup_config.get('compression_block_size', 4 * 1024 * 1024),
+            checksums=database.checksums if database else None,
+            checksum_algorithm=backup_config.get('checksum_algorithm') or 'sha256',
+            throttle=self.throttle,
+            encryption=database.encryption if database else None,
+        )
     
-    def _create_success_message(self, backup_file: str, size_mb: float, duration: float) -> str:
+    def _remove_plain_dump(self, database: 'BaseDatabase', backup_file: str) -> None:
+        """
+        Remove the unencrypted dump once it was compressed into an encrypted archive.
+        
+        The checksum and size of the dump are kept for the manifest of the archive.
+        
+        Args:
+            database: Database instance that produced the backup
+            backup_file: Path to the unencrypted dump
+        """
+        database.content_size = os.path.getsize(backup_file)
+        database.content_checksum = database.checksums.pop(backup_file, None)
+        os.remove(backup_file)
+    
+    def _get_latest_backup(self, settings: Dict[str, Any], name: str) -> Optional[str]:
+        """Get the path of the latest backup of a job, None if unknown."""
+        catalog = self.get_catalog(settings)
+        if not catalog:
+            return None
+        
+        try:
+            entry = catalog.find_backup(name)
+        except CatalogError:
+            return None
+        return catalog.get_path(entry) if entry else None
+    
+    def _get_required_backups(self, catalog: Optional['BackupCatalog'], database: 'BaseDatabase',
+                              backup_file: str) -> List[str]:
+        """Get the file names of the earlier backups the local backups of a job take tables from."""
+        required = set(get_required_files(backup_file))
+        if catalog:
+            try:
+                for entry in catalog.list_backups(database.name):
+                    required.update(get_required_files(catalog.get_path(entry)))
+            except CatalogError:
+                pass
+        return sorted(required)
+    
+    def _get_previous_dump_size(self, settings: Dict[str, Any], name: str) -> Optional[int]:
+        """Get the uncompressed size of the latest backup of a job, None if unknown."""
+        catalog = self.get_catalog(settings)
+        if not catalog:
+            return None
+        
+        try:
+            entry = catalog.find_backup(name)
+        except CatalogError:
+            return None
+        if not entry:
+            return None
+        
+        manifest = read_manifest(catalog.get_path(entry)) or {}
+        return manifest.get('content_size') or entry.get('size')
+    
+    def _upload_backup(self, database: 'BaseDatabase', backup_file: str, label: str = '') -> Tuple[List[str], int]:
+        """
+        Upload a backup and its manifest to every storage target.
+        
+        Archives already streamed to a target during the dump are not
+        uploaded again. All targets are tried before an error is raised.
+        
+        Args:
+            database: Database instance that produced the backup
+            backup_file: Path to the final backup file
+            label: Job name prefix of the log messages
+            
+        Returns:
+            Tuple[List[str], int]: URIs of the stored backups and the number of bytes uploaded
+            
+        Raises:
+            StorageError: If the backup could not be stored on a target
+        """
+        
+        manifest_path = get_manifest_path(backup_file)
+        remote_files = []
+        uploaded = 0
+        errors = []
+        
+        for storage in self.storages:
+            try:
+                uri = database.uploads.get(storage.name)
+                if not uri:
+                    uri = storage.upload_file(backup_file)
+                    uploaded += os.path.getsize(backup_file)
+                # The manifest is written after the archive, so it is always uploaded here
+                if os.path.exists(manifest_path):
+                    storage.upload_file(manifest_path)
+                self.logger.info(label + t('backup_uploaded', uri=uri))
+                remote_files.append(uri)
+            except StorageError as e:
+                self.logger.error(label + t('backup_upload_failed', storage=storage.name, error=str(e)))
+                errors.append(f"{storage.name}: {e}")
+        
+        if errors:
+            raise StorageError('; '.join(errors))
+        return remote_files, uploaded
+    
+    def _prune_storages(self, name: str, retention_count: int, label: str = '',
+                        keep: Optional[List[str]] = None) -> None:
+        """Remove the oldest backups of a job from the storage targets (0 keeps all), except those in ``keep``."""
+        if retention_count <= 0:
+            return
+        
+        for storage in self.storages:
+            try:
+                for uri in storage.prune(name, retention_count, keep or ()):
+                    self.logger.info(label + t('backup_remote_removed', uri=uri))
+            except StorageError as e:
+                self.logger.warning(label + t('storage_prune_failed', storage=storage.name, error=str(e)))
+    
+    def _prune_archive(self, catalog: Optional['BackupCatalog'], database: 'BaseDatabase',
+                       settings: Dict[str, Any], label: str = '') -> None:
+        """Remove the archived transaction log no kept backup of a job needs."""
+        if not catalog:
+            return
+        
+        from src.archive import ArchiveError, ArchiverFactory
+        try:
+            recovery_starts = []
+            for entry in catalog.list_backups(database.name):
+                recovery = (read_manifest(catalog.get_path(entry)) or {}).get('recovery')
+                if recovery:
+                    recovery_starts.append(recovery)
+            archiver = ArchiverFactory.create_archiver(settings['type'], settings)
+            removed = archiver.prune(recovery_starts)
+        except (CatalogError, ArchiveError, ValueError, OSError) as e:
+            self.logger.warning(label + t('archive_prune_failed', error=str(e)))
+            return
+        
+        if removed:
+            self.logger.info(label + t('archive_pruned', count=len(removed), first=removed[0], last=removed[-1]))
+    
+    def _write_manifests(self, database: 'BaseDatabase', db_config: Dict[str, Any], artifacts: List[str],
+                         start_time: float, duration: float) -> None:
+        """
+        Write the sidecar manifest of every backup file.
+        
+        Checksums computed while the files were written are reused; files
+        written directly by the dump tool are hashed once here.
+        
+        Args:
+            database: Database instance that produced the backup
+            db_config: Database configuration of the target
+            artifacts: Paths of the backup files, the uncompressed dump first
+            start_time: Start time of the backup
+            duration: Backup duration in seconds
+        """
+        from datetime import datetime
+        from src.utils import Encryption
+        
+        algorithm = database.checksum_algorithm
+        for artifact in artifacts:
+            if not database.checksums.get(artifact):
+                database.checksums[artifact] = compute_checksum(artifact, algorithm)
+        
+        # Checksum of the uncompressed dump, known when it was streamed or compressed here
+        content_checksum = database.content_checksum
+        content_size = database.content_size
+        if len(artifacts) > 1:
+            content_checksum = database.checksums[artifacts[0]]
+            content_size = os.path.getsize(artifacts[0])
+        
+        for artifact in artifacts:
+            codec = CodecFactory.detect_codec(Encryption.strip_extension(artifact))
+            is_archive = artifact == artifacts[-1]
+            encrypted = database.encryption is not None and Encryption.is_encrypted(artifact)
+            write_manifest(
+                artifact,
+                database.checksums[artifact],
+                algorithm,
+                name=database.name,
+                database=db_config.get('database'),
+                db_type=db_config.get('type'),
+                host=db_config.get('host'),
+                codec=codec.name if codec else None,
+                content_checksum=content_checksum if is_archive else None,
+                content_size=content_size if is_archive else None,
+                codec_selection=database.codec_selection if is_archive else None,
+                encryption=database.encryption.describe() if encrypted else None,
+                fingerprint=database.fingerprint,
+                incremental=database.incremental if is_archive else None,
+                recovery=database.recovery_start if is_archive else None,
+                created_at=datetime.fromtimestamp(start_time).isoformat(timespec='seconds'),
+                duration=round(duration, 3),
+            )
+    
+    def _create_success_message(self, db_config: Dict[str, Any], backup_file: str,
+                                size_mb: float, duration: float, checksum: Optional[str] = None,
+                                remote_files: Optional[List[str]] = None) -> str:
         """
         Create a success message for notifications.
         
         Args:
+            db_config: Database configuration of the target
             backup_file: Path to the backup file
             size_mb: File size in MB
             duration: Backup duration in seconds
+            checksum: Optional checksum of the backup file (``algorithm:hex``)
+            remote_files: Optional URIs of the copies on the storage targets
             
         Returns:
             str: Success message
@@ -150,8 +964,6 @@ class BackupManager:
         import os
         from datetime import datetime
         
-        db_config = self.config.get_database_config()
-        
         message = f"""{t('success_indicator')} {t('backup_completed')}
 
 {t('database_details')}:
@@ -165,32 +977,121 @@ class BackupManager:
 - {t('backup_duration')}: {format_duration(duration)}
 - {t('backup_timestamp')}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
         
+        if checksum:
+            message += f"\n- {t('backup_checksum')}: {checksum}"
+        
+        for uri in remote_files or []:
+            message += f"\n- {t('backup_remote')}: {uri}"
+        
         # Add promotion message if enabled
         if self.config.is_promotion_enabled():
             message += f"\n\n{t('star_message')}"
         
         return message
     
-    def _send_notifications(self, notification_type: str, backup_file: Optional[str], message: str) -> None:
+    def _send_notifications(self, notification_type: str, backup_file: Optional[str], message: str,
+                            metrics: Optional['JobMetrics'] = None) -> None:
         """
         Send notifications to all configured providers.
         
+        Every provider runs in its own daemon thread. The call returns once
+        all providers finished, each provider's own timeout expired, or the
+        global NOTIFICATION_TIMEOUT budget is spent, whichever comes first.
+        A provider needing more than the budget for the size of the backup
+        (a Telegram upload in parts) is logged so the budget can be raised.
+        A provider that is still running is abandoned and never keeps the
+        process alive.
+        
         Args:
             notification_type: 'success' or 'failure'
             backup_file: Path to backup file (for success notifications)
             message: Message to send
+            metrics: Job metrics receiving the duration and outcome of every provider
         """
         if not self.notifiers:
             return
         
+        start = time.monotonic()
+        budget = self.config.get('notification.timeout', 180)
+        
+        outcomes: Dict[int, Tuple[float, bool]] = {}
+        threads = []
         for notifier in self.notifiers:
-            try:
-                if notification_type == 'success' and backup_file:
-                    notifier.send_backup_success(backup_file, message)
-                elif notification_type == 'failure':
-                    notifier.send_backup_failure(message)
-                    
-            except Exception as e:
-                self.logger.error(t('notification_send_failed', 
-                                  provider=notifier.__class__.__name__, 
-                                  error=str(e)))
+            timeout = notifier.get_timeout(backup_file)
+            if timeout > budget:
+                self.logger.warning(t('notification_budget_exceeded',
+                                      provider=notifier.__class__.__name__,
+                                      timeout=format_duration(timeout),
+                                      budget=format_duration(budget)))
+            notifier_deadline = start + min(timeout, budget)
+            thread = threading.Thread(
+                target=self._notify,
+                args=(notifier, notification_type, backup_file, message, outcomes),
+                name=f"notify-{notifier.__class__.__name__}",
+                daemon=True,
+            )
+            thread.start()
+            threads.append((notifier, thread, notifier_deadline))
+        
+        for notifier, thread, notifier_deadline in threads:
+            thread.join(max(0.0, notifier_deadline - time.monotonic()))
+            if thread.is_alive():
+                self.logger.warning(t('notification_timeout',
+                                      provider=notifier.__class__.__name__,
+                                      duration=format_duration(time.monotonic() - start)))
+            if metrics:
+                # Providers still running count as failed after their deadline
+                duration, success = outcomes.get(id(notifier), (time.monotonic() - start, False))
+                metrics.record_notification(notifier.__class__.__name__, duration, success)
+    
+    def _create_progress_listener(self, interval: float, label: str = '') -> Callable[[str], None]:
+        """
+        Create a listener sending the progress lines of a dump to the notifiers.
+        
+        At most one progress notification is sent per interval, from a
+        daemon thread so the dump never waits for a provider; a line is
+        dropped while the previous notification is still being sent.
+        
+        Args:
+            interval: Seconds between progress notifications
+            label: Job label prefixed to the messages
+        """
+        lock = threading.Lock()
+        state: Dict[str, Any] = {'last': time.monotonic(), 'thread': None}
+        
+        def send(message: str) -> None:
+            for notifier in self.notifiers:
+                self._notify(notifier, 'progress', None, message)
+        
+        def listener(line: str) -> None:
+            with lock:
+                now = time.monotonic()
+                if now - state['last'] < interval or (state['thread'] and state['thread'].is_alive()):
+                    return
+                state['last'] = now
+                state['thread'] = threading.Thread(target=send, args=(label + line,), name='notify-progress',
+                                                   daemon=True)
+                state['thread'].start()
+        
+        return listener
+    
+    def _notify(self, notifier: BaseNotifier, notification_type: str,
+                backup_file: Optional[str], message: str,
+                outcomes: Optional[Dict[int, Tuple[float, bool]]] = None) -> None:
+        """Send one notification, logging instead of raising on errors."""
+        start = time.monotonic()
+        success = False
+        try:
+            if notification_type == 'success' and backup_file:
+                success = notifier.send_backup_success(backup_file, message)
+            elif notification_type == 'failure':
+                success = notifier.send_backup_failure(message)
+            elif notification_type == 'progress':
+                success = notifier.send_progress(message)
+                
+        except Exception as e:
+            self.logger.error(t('notification_send_failed', provider=notifier.__class__.__name__, error=str(e)))
+        
+        finally:
+            if outcomes is not None:
+                outcomes[id(notifier)] = (time.monotonic() - start, bool(success))
@@ -0,0 +1,17 @@
+"""
+Backup catalog modules.
+"""
+from .errors import CatalogError
+
+__all__ = [
+    'BackupCatalog',
+    'CatalogError',
+]
+
+
+def __getattr__(name):
+    # The catalog pulls in sqlite3, so it is only imported when accessed
+    if name == 'BackupCatalog':
+        from .catalog import BackupCatalog
+        return BackupCatalog
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,367 @@
+"""
+Backup catalog stored in a SQLite database next to the backups.
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from src.compression import CodecFactory
+from src.utils import Encryption, compute_checksum, get_required_files, read_manifest, remove_backup_file
+from .errors import CatalogError
+
+
+# backup_<name>_<YYYYmmdd>_<HHMMSS>.<extension>
+BACKUP_FILENAME_PATTERN = re.compile(r'^backup_(?P<name>.+)_(?P<timestamp>\d{8}_\d{6})\.(?P<extension>.+)$')
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    filename TEXT NOT NULL UNIQUE,
+    database TEXT,
+    db_type TEXT,
+    host TEXT,
+    extension TEXT,
+    codec TEXT,
+    size INTEGER,
+    checksum TEXT,
+    checksum_algorithm TEXT,
+    created_at REAL NOT NULL,
+    completed_at REAL,
+    duration REAL,
+    fingerprint TEXT,
+    unchanged_at REAL,
+    unchanged_runs INTEGER
+);
+CREATE INDEX IF NOT EXISTS backups_name_created ON backups (name, created_at);
+"""
+
+COLUMNS = ('name', 'filename', 'database', 'db_type', 'host', 'extension', 'codec',
+           'size', 'checksum', 'checksum_algorithm', 'created_at', 'completed_at', 'duration',
+           'fingerprint', 'unchanged_at', 'unchanged_runs')
+
+
+class BackupCatalog:
+    """
+    Index of the backup artifacts in one backup directory.
+    
+    Every artifact is recorded with its job name, database, codec, size,
+    checksum and timestamps, so retention, listing and restore lookups never
+    need to scan the directory. Each operation uses its own short-lived
+    connection, which makes one catalog safe to share between concurrent
+    jobs and processes.
+    """
+    
+    DEFAULT_FILENAME = '.backup_catalog.db'
+    
+    def __init__(self, backup_dir: str, path: Optional[str] = None):
+        """
+        Args:
+            backup_dir: Directory holding the backup files
+            path: Catalog database path, ``<backup_dir>/.backup_catalog.db`` if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.backup_dir = backup_dir
+        self.path = path or os.path.join(backup_dir, self.DEFAULT_FILENAME)
+        
+        # Set when the catalog file did not exist yet, so existing backups
+        # can be indexed with rebuild()
+        self.is_new = not os.path.exists(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        with self._connect() as connection:
+            connection.executescript(CATALOG_SCHEMA)
+            # Catalogs created before a column existed get it added
+            existing = {row['name'] for row in connection.execute("PRAGMA table_info(backups)")}
+            for column in COLUMNS:
+                if column not in existing:
+                    connection.execute(f"ALTER TABLE backups ADD COLUMN {column}")
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, committing on success and rolling back on errors."""
+        try:
+            connection = sqlite3.connect(self.path, timeout=30)
+        except sqlite3.Error as e:
+            raise CatalogError(f"Failed to open backup catalog {self.path}: {e}")
+        
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        except sqlite3.Error as e:
+            raise CatalogError(f"Backup catalog {self.path} error: {e}")
+        finally:
+            connection.close()
+    
+    def add(self, backup_file: str, name: str, database: Optional[str] = None,
+            db_type: Optional[str] = None, host: Optional[str] = None,
+            checksum: Optional[str] = None, checksum_algorithm: str = 'sha256',
+            created_at: Optional[float] = None, duration: Optional[float] = None,
+            fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record a backup artifact, replacing an existing entry of the same file.
+        
+        Args:
+            backup_file: Path to the backup file
+            name: Job name of the backup
+            database: Name of the backed up database
+            db_type: Database type
+            host: Database host
+            checksum: Checksum of the file, computed if None
+            checksum_algorithm: Hash algorithm of the checksum
+            created_at: Start time of the backup (epoch seconds)
+            duration: Backup duration in seconds
+            fingerprint: Change fingerprint of the database when the backup started
+        
+        Returns:
+            Dict[str, Any]: The recorded entry
+        """
+        filename = os.path.basename(backup_file)
+        now = time.time()
+        
+        entry = {
+            'name': name,
+            'filename': filename,
+            'database': database,
+            'db_type': db_type,
+            'host': host,
+            'extension': self._get_extension(filename),
+            'codec': self._get_codec_name(filename),
+            'size': os.path.getsize(backup_file),
+            'checksum': checksum or compute_checksum(backup_file, checksum_algorithm),
+            'checksum_algorithm': checksum_algorithm,
+            'created_at': created_at or now,
+            'completed_at': now,
+            'duration': duration,
+            'fingerprint': fingerprint,
+            'unchanged_at': None,
+            'unchanged_runs': 0,
+        }
+        
+        self._insert([entry])
+        return entry
+    
+    def _insert(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace catalog entries."""
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in COLUMNS if column != 'filename')
+        
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO backups ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (filename) DO UPDATE SET {updates}",
+                [tuple(entry[column] for column in COLUMNS) for entry in entries],
+            )
+    
+    def list_backups(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List catalog entries, newest first.
+        
+        Args:
+            name: Only list backups of this job
+        
+        Returns:
+            List[Dict[str, Any]]: Catalog entries
+        """
+        query = "SELECT * FROM backups"
+        params: tuple = ()
+        if name is not None:
+            query += " WHERE name = ?"
+            params = (name,)
+        query += " ORDER BY created_at DESC, id DESC"
+        
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(query, params)]
+    
+    def find_backup(self, name: str, before: Optional[float] = None,
+                    extensions: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find the newest backup of a job, optionally taken at or before a point in time.
+        
+        Args:
+            name: Job name
+            before: Latest acceptable start time (epoch seconds)
+            extensions: Only consider backups with these extensions (encrypted or not)
+        
+        Returns:
+            Optional[Dict[str, Any]]: Catalog entry, or None if there is none
+        """
+        query = "SELECT * FROM backups WHERE name = ?"
+        params: tuple = (name,)
+        if before is not None:
+            query += " AND created_at <= ?"
+            params += (before,)
+        if extensions is not None:
+            extensions = [*extensions]
+            extensions += [Encryption.get_encrypted_name(extension) for extension in extensions]
+            query += f" AND extension IN ({', '.join('?' * len(extensions))})"
+            params += tuple(extensions)
+        # A compressed archive wins over the plain dump of the same run
+        query += " ORDER BY created_at DESC, codec IS NULL, id DESC LIMIT 1"
+        
+        with self._connect() as connection:
+            row = connection.execute(query, params).fetchone()
+        return dict(row) if row else None
+    
+    def mark_unchanged(self, filename: str, checked_at: Optional[float] = None) -> None:
+        """
+        Record a run that found the database unchanged and kept an existing backup.
+        
+        Args:
+            filename: File name of the reused backup
+            checked_at: Start time of the run (epoch seconds)
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE backups SET unchanged_at = ?, unchanged_runs = COALESCE(unchanged_runs, 0) + 1 "
+                "WHERE filename = ?",
+                (checked_at or time.time(), os.path.basename(filename)),
+            )
+    
+    def get_path(self, entry: Dict[str, Any]) -> str:
+        """Get the path of the file of a catalog entry."""
+        return os.path.join(self.backup_dir, entry['filename'])
+    
+    def prune(self, name: str, retention_count: int) -> List[str]:
+        """
+        Delete the backups of a job beyond the newest ``retention_count``.
+        
+        Older backups still needed by a kept incremental backup are kept
+        until the chain is no longer used.
+        
+        Args:
+            name: Job name
+            retention_count: Number of backups to keep
+        
+        Returns:
+            List[str]: Paths of the removed backup files
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, filename FROM backups WHERE name = ? ORDER BY created_at DESC, id DESC",
+                (name,),
+            ).fetchall()
+        
+        retention_count = max(0, retention_count)
+        required = set()
+        for row in rows[:retention_count]:
+            required.update(get_required_files(os.path.join(self.backup_dir, row['filename'])))
+        
+        removed = []
+        for row in rows[retention_count:]:
+            if row['filename'] in required:
+                self.logger.debug(f"Keeping {row['filename']}, an incremental backup needs it")
+                continue
+            
+            filepath = os.path.join(self.backup_dir, row['filename'])
+            try:
+                remove_backup_file(filepath)
+            except FileNotFoundError:
+                self.logger.warning(f"Backup file already missing: {filepath}")
+            
+            with self._connect() as connection:
+                connection.execute("DELETE FROM backups WHERE id = ?", (row['id'],))
+            removed.append(filepath)
+        
+        return removed
+    
+    def remove(self, filename: str) -> None:
+        """Remove the entry of a backup file (the file itself is kept)."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM backups WHERE filename = ?", (os.path.basename(filename),))
+    
+    def rebuild(self, extensions: Iterable[str], with_checksums: bool = True,
+                checksum_algorithm: str = 'sha256') -> int:
+        """
+        Rebuild the catalog from the backup files on disk.
+        
+        Entries of missing files are dropped. Files already in the catalog
+        keep their recorded metadata unless their size changed or their
+        checksum is missing. Other files matching
+        ``backup_<name>_<timestamp>.<extension>`` are added with the metadata
+        of their sidecar manifest, or with the name and timestamp taken from
+        the file name when there is no manifest.
+        
+        Args:
+            extensions: Backup file extensions to index (without leading dot)
+            with_checksums: Compute checksums of files without a manifest
+            checksum_algorithm: Hash algorithm of computed checksums
+        
+        Returns:
+            int: Number of entries in the rebuilt catalog
+        """
+        extensions = tuple(f".{extension}" for extension in extensions)
+        known = {entry['filename']: entry for entry in self.list_backups()}
+        
+        entries = []
+        with os.scandir(self.backup_dir) as scanner:
+            for item in scanner:
+                match = BACKUP_FILENAME_PATTERN.match(item.name)
+                if not match or not item.name.endswith(extensions) or not item.is_file():
+                    continue
+                
+                stat = item.stat()
+                entry = known.pop(item.name, None)
+                if entry and entry['size'] == stat.st_size and (entry['checksum'] or not with_checksums):
+                    continue
+                
+                # Recorded metadata: the sidecar manifest, else the previous entry
+                details = dict(entry or {})
+                if entry and entry['size'] != stat.st_size:
+                    details['checksum'] = None
+                manifest = read_manifest(item.path)
+                if manifest and manifest.get('size') == stat.st_size:
+                    details = manifest
+                
+                checksum = details.get('checksum')
+                algorithm = details.get('algorithm') or details.get('checksum_algorithm') or checksum_algorithm
+                if not checksum and with_checksums:
+                    checksum = compute_checksum(item.path, algorithm)
+                
+                entries.append({
+                    'name': details.get('name') or match.group('name'),
+                    'filename': item.name,
+                    'database': details.get('database'),
+                    'db_type': details.get('db_type'),
+                    'host': details.get('host'),
+                    'extension': self._get_extension(item.name),
+                    'codec': self._get_codec_name(item.name),
+                    'size': stat.st_size,
+                    'checksum': checksum,
+                    'checksum_algorithm': algorithm if checksum else None,
+                    'created_at': datetime.strptime(match.group('timestamp'), '%Y%m%d_%H%M%S').timestamp(),
+                    'completed_at': stat.st_mtime,
+                    'duration': details.get('duration'),
+                    'fingerprint': details.get('fingerprint'),
+                    'unchanged_at': details.get('unchanged_at'),
+                    'unchanged_runs': details.get('unchanged_runs') or 0,
+                })
+        
+        if entries:
+            self._insert(entries)
+        
+        # Whatever is left in ``known`` no longer exists on disk
+        for filename in known:
+            self.remove(filename)
+        
+        count = len(self.list_backups())
+        self.logger.info(f"Backup catalog rebuilt: {count} backups ({len(entries)} added or updated, "
+                         f"{len(known)} missing removed)")
+        return count
+    
+    @staticmethod
+    def _get_extension(filename: str) -> Optional[str]:
+        """Get the extension of a backup file name (everything after the timestamp)."""
+        match = BACKUP_FILENAME_PATTERN.match(filename)
+        return match.group('extension') if match else None
+    
+    @staticmethod
+    def _get_codec_name(filename: str) -> Optional[str]:
+        """Get the name of the codec that compressed a backup file (encrypted or not)."""
+        codec = CodecFactory.detect_codec(Encryption.strip_extension(filename))
+        return codec.name if codec else None
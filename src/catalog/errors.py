@@ -0,0 +1,8 @@
+"""
+Backup catalog errors, importable without loading sqlite3.
+"""
+
+
+class CatalogError(Exception):
+    """Custom exception for backup catalog errors."""
+    pass
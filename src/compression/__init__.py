@@ -0,0 +1,34 @@
+"""
+Compression codec modules.
+"""
+import importlib
+from .base import BaseCodec, CompressionError
+from .zip_codec import ZipCodec
+from .gzip_codec import GzipCodec
+from .xz_codec import XzCodec
+from .zstd_codec import ZstdCodec
+from .lz4_codec import Lz4Codec
+from .parallel import ParallelBlockWriter
+from .factory import CodecFactory
+
+__all__ = [
+    'BaseCodec',
+    'CompressionError',
+    'ZipCodec',
+    'GzipCodec',
+    'XzCodec',
+    'ZstdCodec',
+    'Lz4Codec',
+    'ParallelBlockWriter',
+    'CodecFactory',
+    'AUTO',
+    'CodecChoice',
+    'CodecSelector',
+]
+
+
+def __getattr__(name):
+    # The automatic codec selection is only imported when accessed
+    if name in ('AUTO', 'CodecChoice', 'CodecSelector'):
+        return getattr(importlib.import_module('.selector', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,130 @@
+"""
+Base compression codec module.
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import IO, Optional
+
+
+class CompressionError(Exception):
+    """Custom exception for compression errors."""
+    pass
+
+
+class BaseCodec(ABC):
+    """Abstract base class for compression codecs."""
+    
+    # Codec name as used in BACKUP_COMPRESSION
+    name = ''
+    # Extension of the archive, replacing the '.sql' of the dump file
+    extension = ''
+    mime_type = 'application/octet-stream'
+    default_level = 6
+    min_level = 0
+    max_level = 9
+    # Whether independently compressed blocks can be concatenated
+    supports_blocks = False
+    
+    @property
+    def supports_threads(self) -> bool:
+        """Whether the codec compresses with several threads (in blocks or natively)."""
+        return self.supports_blocks
+    
+    def __init__(self, level: Optional[int] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.level = self.default_level if level is None else int(level)
+        
+        if not self.min_level <= self.level <= self.max_level:
+            raise CompressionError(
+                f"Invalid {self.name} compression level {self.level}: "
+                f"expected {self.min_level}-{self.max_level}"
+            )
+    
+    @abstractmethod
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        """
+        Wrap a binary file object in a compressing writer.
+        
+        Closing the returned writer flushes the compressed stream but must
+        leave ``fileobj`` open.
+        
+        Args:
+            fileobj: Binary file object receiving the compressed data
+            entry_name: Name of the uncompressed file (used by container formats)
+        
+        Returns:
+            IO[bytes]: Writable stream accepting uncompressed data
+        """
+        pass
+    
+    @abstractmethod
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        """
+        Wrap a binary file object in a decompressing reader.
+        
+        Args:
+            fileobj: Binary file object providing the compressed data
+        
+        Returns:
+            IO[bytes]: Readable stream of uncompressed data
+        """
+        pass
+    
+    def compress_block(self, data: bytes) -> bytes:
+        """
+        Compress a block into a complete, independently decodable member.
+        
+        Args:
+            data: Uncompressed block
+        
+        Returns:
+            bytes: Compressed member
+        """
+        raise CompressionError(f"{self.name} does not support block-parallel compression")
+    
+    def open_parallel_writer(self, fileobj: IO[bytes], entry_name: str, threads: int,
+                             block_size: int = 4 * 1024 * 1024) -> IO[bytes]:
+        """
+        Wrap a binary file object in a multi-threaded compressing writer.
+        
+        Codecs without block support fall back to the single-threaded writer.
+        
+        Args:
+            fileobj: Binary file object receiving the compressed data
+            entry_name: Name of the uncompressed file (used by container formats)
+            threads: Number of compression threads
+            block_size: Size of the uncompressed blocks compressed in parallel
+        
+        Returns:
+            IO[bytes]: Writable stream accepting uncompressed data
+        """
+        if threads <= 1:
+            return self.open_writer(fileobj, entry_name)
+        
+        if not self.supports_blocks:
+            self.logger.warning(f"{self.name} does not support parallel compression, using a single thread")
+            return self.open_writer(fileobj, entry_name)
+        
+        from .parallel import ParallelBlockWriter
+        return ParallelBlockWriter(fileobj, self.compress_block, threads, block_size)
+    
+    def is_available(self) -> bool:
+        """Check if the libraries needed by this codec are installed."""
+        return True
+    
+    def get_archive_name(self, dump_file: str) -> str:
+        """
+        Get the archive file name for a dump file.
+        
+        Args:
+            dump_file: Path or name of the uncompressed dump ('*.sql')
+        
+        Returns:
+            str: Archive path or name with this codec's extension
+        """
+        if dump_file.endswith('.sql'):
+            dump_file = dump_file[:-len('.sql')]
+        return f"{dump_file}.{self.extension}"
+    
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(level={self.level})"
@@ -0,0 +1,75 @@
+"""
+Codec factory for creating compression codec instances.
+"""
+from typing import Dict, List, Optional, Type
+from .base import BaseCodec
+from .zip_codec import ZipCodec
+from .gzip_codec import GzipCodec
+from .xz_codec import XzCodec
+from .zstd_codec import ZstdCodec
+from .lz4_codec import Lz4Codec
+
+
+class CodecFactory:
+    """Factory class for creating compression codec instances."""
+    
+    _codec_classes: Dict[str, Type[BaseCodec]] = {
+        'zip': ZipCodec,
+        'gzip': GzipCodec,
+        'gz': GzipCodec,  # Alias
+        'xz': XzCodec,
+        'zstd': ZstdCodec,
+        'zst': ZstdCodec,  # Alias
+        'lz4': Lz4Codec,
+    }
+    
+    @classmethod
+    def create_codec(cls, codec_type: str, level: Optional[int] = None) -> BaseCodec:
+        """
+        Create a codec instance based on the codec type.
+        
+        Args:
+            codec_type: Type of compression (zip, gzip, zstd, xz, lz4)
+            level: Optional compression level, codec default if None
+        
+        Returns:
+            BaseCodec: Codec instance
+        
+        Raises:
+            ValueError: If codec type is not supported
+        """
+        codec_type_lower = codec_type.lower()
+        
+        if codec_type_lower not in cls._codec_classes:
+            supported_types = ', '.join(cls._codec_classes.keys())
+            raise ValueError(f"Unsupported compression type: {codec_type}. Supported types: {supported_types}")
+        
+        return cls._codec_classes[codec_type_lower](level)
+    
+    @classmethod
+    def detect_codec(cls, file_path: str) -> Optional[BaseCodec]:
+        """
+        Detect the codec of an archive from its file extension.
+        
+        Args:
+            file_path: Path to the archive
+        
+        Returns:
+            Optional[BaseCodec]: Codec instance, or None for uncompressed files
+        """
+        # Longest extension first so 'sql.gz' wins over a bare 'gz'
+        for codec_class in sorted(set(cls._codec_classes.values()),
+                                  key=lambda c: len(c.extension), reverse=True):
+            if file_path.endswith(f".{codec_class.extension}"):
+                return codec_class()
+        return None
+    
+    @classmethod
+    def get_extensions(cls) -> List[str]:
+        """Get archive extensions of all codecs (without leading dot)."""
+        return sorted({codec_class.extension for codec_class in cls._codec_classes.values()})
+    
+    @classmethod
+    def get_supported_types(cls) -> list:
+        """Get list of supported compression types."""
+        return list(cls._codec_classes.keys())
@@ -0,0 +1,29 @@
+"""
+Gzip compression codec.
+"""
+import gzip
+from typing import IO
+from .base import BaseCodec
+
+
+class GzipCodec(BaseCodec):
+    """Gzip (deflate) compression codec."""
+    
+    name = 'gzip'
+    extension = 'sql.gz'
+    mime_type = 'application/gzip'
+    default_level = 6
+    min_level = 0
+    max_level = 9
+    supports_blocks = True
+    
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        return gzip.GzipFile(filename=entry_name, mode='wb', compresslevel=self.level,
+                             fileobj=fileobj, mtime=0)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        return gzip.GzipFile(mode='rb', fileobj=fileobj)
+    
+    def compress_block(self, data: bytes) -> bytes:
+        # Multi-member gzip, as written by pigz --independent
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
@@ -0,0 +1,45 @@
+"""
+LZ4 compression codec.
+"""
+from typing import IO
+from .base import BaseCodec, CompressionError
+
+
+class Lz4Codec(BaseCodec):
+    """LZ4 frame compression codec (requires the 'lz4' package)."""
+    
+    name = 'lz4'
+    extension = 'sql.lz4'
+    mime_type = 'application/x-lz4'
+    default_level = 0
+    min_level = 0
+    max_level = 16
+    supports_blocks = True
+    
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        lz4_frame = self._import()
+        return lz4_frame.LZ4FrameFile(fileobj, 'wb', compression_level=self.level)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        lz4_frame = self._import()
+        return lz4_frame.LZ4FrameFile(fileobj, 'rb')
+    
+    def compress_block(self, data: bytes) -> bytes:
+        # Concatenated LZ4 frames
+        lz4_frame = self._import()
+        return lz4_frame.compress(data, compression_level=self.level)
+    
+    def is_available(self) -> bool:
+        try:
+            self._import()
+            return True
+        except CompressionError:
+            return False
+    
+    @staticmethod
+    def _import():
+        try:
+            import lz4.frame
+        except ImportError:
+            raise CompressionError("lz4 compression requires the 'lz4' package")
+        return lz4.frame
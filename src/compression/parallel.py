@@ -0,0 +1,67 @@
+"""
+Block-parallel compression writer.
+"""
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable
+
+
+class ParallelBlockWriter(io.RawIOBase):
+    """
+    Compress fixed-size blocks on a thread pool and write them in order.
+    
+    Each block is compressed into a complete, independent member (gzip
+    member, xz stream, lz4 frame). Concatenated members are a valid stream
+    for the standard command line tools, so the output stays compatible
+    with gunzip, xz -d and lz4 -d. The compression libraries release the
+    GIL, so threads scale with the number of cores.
+    """
+    
+    def __init__(self, fileobj: IO[bytes], compress_block: Callable[[bytes], bytes],
+                 threads: int, block_size: int = 4 * 1024 * 1024):
+        super().__init__()
+        self._fileobj = fileobj
+        self._compress_block = compress_block
+        self._block_size = max(64 * 1024, block_size)
+        self._max_pending = max(1, threads) * 2
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads),
+                                            thread_name_prefix='compress')
+        self._pending: deque = deque()
+        self._buffer = bytearray()
+        self._blocks_written = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            block = bytes(self._buffer[:self._block_size])
+            del self._buffer[:self._block_size]
+            self._submit(block)
+        return len(data)
+    
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            # An empty input still needs one member to be a valid stream
+            if self._buffer or self._blocks_written == 0 and not self._pending:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_next()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            super().close()
+    
+    def _submit(self, block: bytes) -> None:
+        # Bound memory: wait for the oldest block before queueing more
+        while len(self._pending) >= self._max_pending:
+            self._write_next()
+        self._pending.append(self._executor.submit(self._compress_block, block))
+    
+    def _write_next(self) -> None:
+        self._fileobj.write(self._pending.popleft().result())
+        self._blocks_written += 1
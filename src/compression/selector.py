@@ -0,0 +1,194 @@
+"""
+Automatic codec and level selection.
+"""
+import io
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from .base import CompressionError
+from .factory import CodecFactory
+
+
+# BACKUP_COMPRESSION value selecting the codec per backup
+AUTO = 'auto'
+
+# Candidates tried by default, as codec[:level]; the first one is used when
+# there is nothing to sample
+DEFAULT_CANDIDATES = 'zstd:3,zstd:1,zstd:9,lz4,gzip:6,xz:1'
+
+
+class CodecChoice:
+    """Codec and level picked for a backup, with the measurements behind the choice."""
+    
+    def __init__(self, codec: str, level: Optional[int], ratio: float = 0.0, speed: float = 0.0,
+                 sample_size: int = 0, required_speed: float = 0.0, reason: str = '',
+                 candidates: Optional[List[Dict[str, Any]]] = None):
+        self.codec = codec
+        self.level = level
+        self.ratio = ratio
+        # Estimated throughput in MB/s with all compression threads
+        self.speed = speed
+        self.sample_size = sample_size
+        self.required_speed = required_speed
+        self.reason = reason
+        self.candidates = candidates or []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the choice for the backup manifest."""
+        return {
+            'mode': AUTO,
+            'codec': self.codec,
+            'level': self.level,
+            'reason': self.reason,
+            'sample_bytes': self.sample_size,
+            'sample_ratio': round(self.ratio, 3),
+            'estimated_mb_per_second': round(self.speed, 1),
+            'required_mb_per_second': round(self.required_speed, 1),
+            'candidates': self.candidates,
+        }
+    
+    def __repr__(self) -> str:
+        return f"CodecChoice(codec={self.codec!r}, level={self.level}, ratio={self.ratio:.2f})"
+
+
+class CodecSelector:
+    """
+    Pick a codec and level by compressing a sample of the dump with each candidate.
+    
+    The sample (the first few MB of the dump) is compressed with every
+    available candidate while the CPU time of the thread is measured. The
+    candidate with the smallest output that is fast enough wins; candidates
+    within 2% of the smallest output are considered equal and the fastest
+    of them is used. Fast enough means at least ``min_speed`` MB/s with all
+    compression threads and, with a time budget and a known dump size, fast
+    enough to compress the whole dump within the budget. If no candidate is
+    fast enough, or the data hardly compresses (best ratio below
+    ``min_ratio``, e.g. already compressed blobs), the fastest candidate is
+    used.
+    """
+    
+    def __init__(self, candidates: Optional[str] = None, min_speed: float = 0.0, time_budget: float = 0.0,
+                 sample_size: int = 4 * 1024 * 1024, threads: int = 1, min_ratio: float = 1.1):
+        self.candidates = self.parse_candidates(candidates or DEFAULT_CANDIDATES)
+        self.min_speed = min_speed
+        self.time_budget = time_budget
+        self.sample_size = max(64 * 1024, sample_size)
+        self.threads = max(1, threads)
+        self.min_ratio = min_ratio
+        self.logger = logging.getLogger(self.__class__.__name__)
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> 'CodecSelector':
+        """Create a selector from the backup settings."""
+        threads = int(settings.get('compression_threads', 1))
+        return cls(
+            candidates=settings.get('compression_candidates'),
+            min_speed=float(settings.get('compression_min_speed') or 0),
+            time_budget=float(settings.get('compression_time_budget') or 0),
+            sample_size=int(settings.get('compression_sample_size') or 4 * 1024 * 1024),
+            threads=threads if threads > 0 else (os.cpu_count() or 1),
+        )
+    
+    @staticmethod
+    def parse_candidates(text: str) -> List[Tuple[str, Optional[int]]]:
+        """
+        Parse a candidate list such as 'lz4,zstd:3,gzip:6'.
+        
+        Raises:
+            ValueError: If a codec is unknown or a level is not a number
+        """
+        candidates = []
+        for item in text.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, level = item.partition(':')
+            if name.lower() not in CodecFactory.get_supported_types() or name.lower() == 'zip':
+                raise ValueError(f"Unsupported compression candidate: {item}")
+            candidates.append((name.lower(), int(level) if level else None))
+        if not candidates:
+            raise ValueError("No compression candidates configured")
+        return candidates
+    
+    def get_default(self) -> Tuple[str, Optional[int]]:
+        """Codec used when there is nothing to sample: the first available candidate."""
+        for name, level in self.candidates:
+            if CodecFactory.create_codec(name, level).is_available():
+                return name, level
+        return 'gzip', None
+    
+    def select(self, sample: bytes, total_size: Optional[int] = None) -> CodecChoice:
+        """
+        Pick the codec for a dump.
+        
+        Args:
+            sample: The first bytes of the dump
+            total_size: Size of the whole dump if known (for the time budget)
+        
+        Returns:
+            CodecChoice: The selected codec and level
+        """
+        required = self.min_speed
+        if self.time_budget > 0 and total_size:
+            required = max(required, total_size / (1024 * 1024) / self.time_budget)
+        
+        if not sample:
+            name, level = self.get_default()
+            return CodecChoice(name, level, required_speed=required, reason='empty sample')
+        
+        results = []
+        for name, level in self.candidates:
+            try:
+                results.append(self._measure(name, level, sample))
+            except CompressionError as e:
+                self.logger.debug(f"Skipping compression candidate {name}: {e}")
+        
+        if not results:
+            return CodecChoice('gzip', None, required_speed=required, reason='no candidate available')
+        
+        fitting = [result for result in results if result['mb_per_second'] >= required]
+        fastest = max(results, key=lambda result: result['mb_per_second'])
+        
+        if not fitting:
+            choice, reason = fastest, 'no candidate fits the budget, using the fastest'
+        else:
+            smallest = min(result['bytes'] for result in fitting)
+            close = [result for result in fitting if result['bytes'] <= smallest * 1.02]
+            choice, reason = max(close, key=lambda result: result['mb_per_second']), 'best ratio within the budget'
+            if choice['ratio'] < self.min_ratio:
+                choice, reason = fastest, 'data hardly compresses, using the fastest'
+        
+        selected = CodecChoice(
+            choice['codec'], choice['level'], ratio=choice['ratio'], speed=choice['mb_per_second'],
+            sample_size=len(sample), required_speed=required, reason=reason, candidates=results,
+        )
+        self.logger.info(
+            f"Selected {selected.codec} level {selected.level} for the backup: ratio {selected.ratio:.2f}, "
+            f"about {selected.speed:.0f} MB/s on a {len(sample) / (1024 * 1024):.1f} MB sample ({reason})"
+        )
+        return selected
+    
+    def _measure(self, name: str, level: Optional[int], sample: bytes) -> Dict[str, Any]:
+        """Compress the sample with one candidate and measure size and speed."""
+        codec = CodecFactory.create_codec(name, level)
+        if not codec.is_available():
+            raise CompressionError(f"{name} is not installed")
+        
+        output = io.BytesIO()
+        # CPU time of this thread, so other load on the host does not skew the result
+        start = time.thread_time()
+        writer = codec.open_writer(output, 'sample.sql')
+        writer.write(sample)
+        writer.close()
+        cpu_seconds = max(time.thread_time() - start, 1e-6)
+        
+        threads = self.threads if codec.supports_threads else 1
+        size = max(1, len(output.getvalue()))
+        return {
+            'codec': codec.name,
+            'level': codec.level,
+            'bytes': size,
+            'ratio': round(len(sample) / size, 3),
+            'mb_per_second': round(len(sample) / (1024 * 1024) / cpu_seconds * threads, 1),
+        }
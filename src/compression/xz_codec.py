@@ -0,0 +1,28 @@
+"""
+XZ (LZMA2) compression codec.
+"""
+import lzma
+from typing import IO
+from .base import BaseCodec
+
+
+class XzCodec(BaseCodec):
+    """XZ (LZMA2) compression codec."""
+    
+    name = 'xz'
+    extension = 'sql.xz'
+    mime_type = 'application/x-xz'
+    default_level = 6
+    min_level = 0
+    max_level = 9
+    supports_blocks = True
+    
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        return lzma.LZMAFile(fileobj, 'wb', format=lzma.FORMAT_XZ, preset=self.level)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        return lzma.LZMAFile(fileobj, 'rb')
+    
+    def compress_block(self, data: bytes) -> bytes:
+        # Concatenated .xz streams, as written by xz --threads
+        return lzma.compress(data, format=lzma.FORMAT_XZ, preset=self.level)
@@ -0,0 +1,53 @@
+"""
+ZIP compression codec.
+"""
+import io
+import zipfile
+from typing import IO
+from .base import BaseCodec, CompressionError
+
+
+class _ZipEntryWriter(io.RawIOBase):
+    """Writable stream for a single ZIP entry that also finalizes the archive."""
+    
+    def __init__(self, archive: zipfile.ZipFile, entry_name: str):
+        super().__init__()
+        self._archive = archive
+        # force_zip64 because the final size is unknown while streaming
+        self._entry = archive.open(entry_name, 'w', force_zip64=True)
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        return self._entry.write(data)
+    
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._entry.close()
+            finally:
+                self._archive.close()
+        super().close()
+
+
+class ZipCodec(BaseCodec):
+    """ZIP (deflate) compression codec."""
+    
+    name = 'zip'
+    extension = 'zip'
+    mime_type = 'application/zip'
+    default_level = 6
+    min_level = 0
+    max_level = 9
+    
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        archive = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.level)
+        return _ZipEntryWriter(archive, entry_name)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        archive = zipfile.ZipFile(fileobj, 'r')
+        names = archive.namelist()
+        if len(names) != 1:
+            raise CompressionError(f"Expected exactly one entry in ZIP archive, found {len(names)}")
+        return archive.open(names[0], 'r')
@@ -0,0 +1,51 @@
+"""
+Zstandard compression codec.
+"""
+from typing import IO
+from .base import BaseCodec, CompressionError
+
+
+class ZstdCodec(BaseCodec):
+    """Zstandard compression codec (requires the 'zstandard' package)."""
+    
+    name = 'zstd'
+    extension = 'sql.zst'
+    mime_type = 'application/zstd'
+    default_level = 3
+    min_level = 1
+    max_level = 22
+    # libzstd compresses with several threads natively
+    supports_threads = True
+    
+    def open_writer(self, fileobj: IO[bytes], entry_name: str) -> IO[bytes]:
+        zstandard = self._import()
+        compressor = zstandard.ZstdCompressor(level=self.level, write_checksum=True)
+        return compressor.stream_writer(fileobj, closefd=False)
+    
+    def open_parallel_writer(self, fileobj: IO[bytes], entry_name: str, threads: int,
+                             block_size: int = 4 * 1024 * 1024) -> IO[bytes]:
+        # libzstd has native multi-threading that produces a single frame
+        if threads <= 1:
+            return self.open_writer(fileobj, entry_name)
+        zstandard = self._import()
+        compressor = zstandard.ZstdCompressor(level=self.level, write_checksum=True, threads=threads)
+        return compressor.stream_writer(fileobj, closefd=False)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        zstandard = self._import()
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True, closefd=False)
+    
+    def is_available(self) -> bool:
+        try:
+            self._import()
+            return True
+        except CompressionError:
+            return False
+    
+    @staticmethod
+    def _import():
+        try:
+            import zstandard
+        except ImportError:
+            raise CompressionError("zstd compression requires the 'zstandard' package")
+        return zstandard
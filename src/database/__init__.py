@@ -2,8 +2,6 @@
 Database backup modules.
 """
 from .base import BaseDatabase, DatabaseBackupError
-from .postgresql import PostgreSQLDatabase
-from .mysql import MySQLDatabase
 from .factory import DatabaseFactory
 
 __all__ = [
@@ -13,3 +11,12 @@ __all__ = [
     'MySQLDatabase',
     'DatabaseFactory',
 ]
+
+
+def __getattr__(name):
+    # Implementations are only imported when accessed
+    if name == 'PostgreSQLDatabase':
+        return DatabaseFactory.get_database_class('postgresql')
+    if name == 'MySQLDatabase':
+        return DatabaseFactory.get_database_class('mysql')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,11 +2,34 @@
 Base database backup module.
 """
 import os
-import subprocess
+import re
+import json
+import shutil
+import hashlib
 import logging
+import subprocess
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
+from src.compression import AUTO, CodecFactory, CodecSelector
+from src.utils import (
+    ENCRYPTED_EXTENSION,
+    DumpPipeline,
+    Encryption,
+    EncryptionError,
+    RestorePipeline,
+    PipelineError,
+    ProgressReporter,
+    StderrBuffer,
+    Throttle,
+    get_auto_worker_count,
+    get_required_files,
+    new_hasher,
+    open_archive_reader,
+    package_directory,
+    read_manifest,
+    remove_backup_file,
+)
 
 
 class DatabaseBackupError(Exception):
@@ -17,10 +40,93 @@ class DatabaseBackupError(Exception):
 class BaseDatabase(ABC):
     """Abstract base class for database backup implementations."""
     
+    # Extensions of uncompressed backup files managed by retention
+    backup_extensions = ('sql',)
+    
+    # Extensions of physical base backups, restored into a data directory and
+    # rolled forward with the archived transaction log (point-in-time recovery)
+    base_backup_extensions: tuple = ()
+    
+    # Extensions of logical backups that record a transaction log position,
+    # replayed from the log archive after they are loaded (point-in-time recovery)
+    log_replay_extensions: tuple = ()
+    
+    # Settings shaping the backup file, part of the change fingerprint so a
+    # changed setting always produces a new backup
+    fingerprint_settings = ('type', 'database', 'compression', 'compression_level',
+                            'pg_dump_format', 'pg_dump_compress_level', 'mysql_dump_mode')
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.logger = logging.getLogger(self.__class__.__name__)
+        # Name used in backup file names, defaults to the database name
+        self.name = config.get('name') or config.get('database', 'backup')
+        self.logger = logging.getLogger(
+            f"{self.__class__.__name__}[{config['name']}]" if config.get('name') else self.__class__.__name__
+        )
         self.backup_dir = config.get('backup_dir', '/backups')
+        self.compression = config.get('compression') or 'none'
+        self.compression_level = config.get('compression_level')
+        self.streaming = bool(config.get('streaming', False)) and self.compression.lower() != 'none'
+        
+        # Set when backup() already produced a compressed archive
+        self.output_compressed = False
+        
+        # Checksums computed while the backup files were written, by path,
+        # and the checksum and size of the uncompressed dump when known
+        self.checksum_algorithm = config.get('checksum_algorithm') or 'sha256'
+        self.checksums: Dict[str, str] = {}
+        self.content_checksum: Optional[str] = None
+        self.content_size: Optional[int] = None
+        # How the codec was picked with BACKUP_COMPRESSION=auto (for the manifest)
+        self.codec_selection: Optional[Dict[str, Any]] = None
+        
+        # Environment for child processes (None inherits os.environ); set per
+        # instance so concurrent backups never share credentials
+        self.env: Optional[Dict[str, str]] = None
+        
+        # Rate limits and priority of the backup; the backup manager shares
+        # one throttle between all jobs of a run (none by default)
+        self.throttle = Throttle()
+        
+        # Storage targets streamed archives are uploaded to while they are
+        # written (set by the backup manager), and the URIs of the completed
+        # uploads by storage type
+        self.storages: List[Any] = []
+        self.uploads: Dict[str, str] = {}
+        
+        # Key of encrypted archives (used to restore them) and the encryption
+        # of new backups, which is only set with BACKUP_ENCRYPTION=true
+        try:
+            self.decryption: Optional[Encryption] = Encryption.from_config(config)
+        except EncryptionError as e:
+            raise DatabaseBackupError(str(e))
+        if config.get('encryption') and self.decryption is None:
+            raise DatabaseBackupError("BACKUP_ENCRYPTION requires BACKUP_ENCRYPTION_KEY or BACKUP_ENCRYPTION_KEY_FILE")
+        self.encryption = self.decryption if config.get('encryption') else None
+        
+        # Change fingerprint read before the dump (BACKUP_SKIP_UNCHANGED), kept
+        # with the backup so the next run can tell whether anything changed
+        self.fingerprint: Optional[str] = None
+        
+        # Incremental backups (BACKUP_INCREMENTAL) only dump the tables that
+        # changed since the previous backup of the job, set by the backup
+        # manager; ``incremental`` describes the chain for the manifest
+        self.incremental_enabled = bool(config.get('incremental', False))
+        self.full_every = int(config.get('incremental_full_every') or 0)
+        self.previous_backup: Optional[str] = None
+        self.incremental: Optional[Dict[str, Any]] = None
+        
+        # Where replaying the archived transaction log starts for a backup
+        # (CONTINUOUS_ARCHIVING), for the manifest and the log retention
+        self.recovery_start: Optional[Dict[str, Any]] = None
+        
+        # Progress of the running dump (see _start_dump_progress), fed with the
+        # bytes read from the dump tool or with the progress lines of its error
+        # output (see _parse_progress_line); the backup manager sets a listener
+        # receiving the progress lines to notify about long backups
+        self.dump_progress: Optional[ProgressReporter] = None
+        self.progress_listener: Optional[Callable[[str], None]] = None
+        self._progress_from_output = True
         
         # Ensure backup directory exists
         os.makedirs(self.backup_dir, exist_ok=True)
@@ -48,19 +154,307 @@ class BaseDatabase(ABC):
         """
         pass
     
+    @abstractmethod
+    def get_restore_command(self) -> list:
+        """
+        Get the command that applies a plain SQL dump read from stdin.
+        
+        Returns:
+            list: Command arguments for subprocess
+        """
+        pass
+    
+    def get_restore_jobs(self) -> int:
+        """
+        Get the number of parallel restore workers.
+        
+        Uses RESTORE_JOBS when set, otherwise picks a count from the CPU
+        count and the configured load ceiling.
+        """
+        jobs = int(self.config.get('restore_jobs') or 0)
+        if jobs > 0:
+            return jobs
+        return get_auto_worker_count(self.config.get('load_ceiling'))
+    
+    def restore(self, backup_file: str, jobs: Optional[int] = None) -> None:
+        """
+        Restore a backup file into the configured database.
+        
+        Plain and compressed SQL dumps are streamed into the restore command.
+        Subclasses handle their own archive formats.
+        
+        Args:
+            backup_file: Path to the backup file
+            jobs: Number of parallel restore workers, automatic if None
+            
+        Raises:
+            DatabaseBackupError: If restore fails
+        """
+        self._stream_restore(backup_file)
+    
+    def _stream_restore(self, backup_file: str) -> None:
+        """
+        Stream a (compressed) SQL dump straight into the restore command.
+        
+        Args:
+            backup_file: Path to the backup file
+            
+        Raises:
+            DatabaseBackupError: If restore fails
+        """
+        command = self.get_restore_command()
+        progress = self._create_progress(f"Restoring {os.path.basename(backup_file)}",
+                                         os.path.getsize(backup_file))
+        
+        self.logger.info(f"Running command: {' '.join(command)}")
+        
+        pipeline = RestorePipeline(
+            command,
+            backup_file,
+            chunk_size=self.config.get('stream_chunk_size', 1024 * 1024),
+            buffer_chunks=self.config.get('stream_buffer_chunks', 8),
+            env=self.env,
+            progress=progress,
+            encryption=self.decryption,
+        )
+        
+        try:
+            pipeline.run()
+        except PipelineError as e:
+            raise DatabaseBackupError(str(e))
+        
+        progress.finish()
+    
+    def get_fingerprint(self) -> Optional[str]:
+        """
+        Get a cheap fingerprint of the database contents.
+        
+        The change counters read from the server are combined with the
+        settings that shape the backup file and the encryption key, so a
+        backup is only reused while both are unchanged. Errors are logged and
+        turn into a full backup.
+        
+        Returns:
+            Optional[str]: Hex digest, or None if the database type has no
+            fingerprint or it could not be read
+        """
+        try:
+            source = self._read_fingerprint()
+        except DatabaseBackupError as e:
+            self.logger.warning(f"Failed to read the change fingerprint, running a full backup: {e}")
+            return None
+        if not source:
+            return None
+        
+        settings = [self.config.get(key) for key in self.fingerprint_settings]
+        settings.append(self._get_key_id())
+        return hashlib.sha256(json.dumps([source, settings], default=str).encode()).hexdigest()
+    
+    def _read_fingerprint(self) -> Optional[str]:
+        """
+        Read the change counters of the database from the server.
+        
+        Returns:
+            Optional[str]: Raw counters, None if the database type has no fingerprint
+        
+        Raises:
+            DatabaseBackupError: If the counters cannot be read
+        """
+        return None
+    
+    def _query(self, command: list) -> str:
+        """
+        Run a client command printing a query result and return its output.
+        
+        Args:
+            command: Client command to run as list of arguments
+        
+        Returns:
+            str: Standard output of the command
+        
+        Raises:
+            DatabaseBackupError: If the command fails
+        """
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, env=self.env)
+        except OSError as e:
+            raise DatabaseBackupError(f"Failed to run {command[0]}: {e}")
+        
+        if result.returncode != 0:
+            raise DatabaseBackupError(f"{command[0]} failed with exit code {result.returncode}: "
+                                      f"{result.stderr.strip()}")
+        return result.stdout
+    
+    def _load_parent_backup(self, chain_format: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the chain details of the previous backup if a new incremental backup can build on it.
+        
+        A full backup is taken instead when the previous backup is not part
+        of a chain of the same format, the chain reached
+        BACKUP_INCREMENTAL_FULL_EVERY backups, the encryption key changed or
+        a backup of the chain is missing.
+        
+        Args:
+            chain_format: Format of the chain (e.g. 'postgresql-custom')
+        
+        Returns:
+            Optional[Dict[str, Any]]: The ``incremental`` section of the previous
+            manifest, None for a full backup
+        """
+        if not self.previous_backup:
+            return None
+        
+        parent = (read_manifest(self.previous_backup) or {}).get('incremental')
+        backup_dir = os.path.dirname(self.previous_backup)
+        missing = [filename for filename in get_required_files(self.previous_backup)
+                   if not os.path.exists(os.path.join(backup_dir, filename))]
+        
+        if not parent or parent.get('format') != chain_format:
+            reason = "the previous backup is not part of an incremental chain"
+        elif self.full_every > 0 and parent.get('chain', 0) + 1 >= self.full_every:
+            reason = f"the chain reached {self.full_every} backups"
+        elif parent.get('key_id') != self._get_key_id():
+            reason = "the encryption key changed"
+        elif not os.path.exists(self.previous_backup) or missing:
+            reason = f"{', '.join(missing) or os.path.basename(self.previous_backup)} is missing"
+        else:
+            return parent
+        
+        self.logger.info(f"Taking a full backup: {reason}")
+        return None
+    
+    def _describe_chain(self, backup_filepath: str, chain_format: str, parent: Optional[Dict[str, Any]],
+                        requires: List[str], **details: Any) -> Dict[str, Any]:
+        """
+        Describe the place of a new backup in its incremental chain, for the manifest.
+        
+        Args:
+            backup_filepath: Path to the new backup
+            chain_format: Format of the chain
+            parent: Chain details of the previous backup, None for a full backup
+            requires: File names of the earlier backups holding unchanged tables
+            **details: Format specific fields (table signatures, ...)
+        """
+        filename = os.path.basename(backup_filepath)
+        return {
+            'type': 'incremental' if parent else 'full',
+            'format': chain_format,
+            'base': parent['base'] if parent else filename,
+            'parent': os.path.basename(self.previous_backup) if parent else None,
+            'chain': parent.get('chain', 0) + 1 if parent else 0,
+            'key_id': self._get_key_id(),
+            'requires': requires,
+            **details,
+        }
+    
+    def _get_key_id(self) -> Optional[str]:
+        """Key id of the backup encryption, None without encryption."""
+        return self.encryption.key_id.hex() if self.encryption is not None else None
+    
+    def _decrypt_archive(self, backup_file: str) -> str:
+        """
+        Decrypt an encrypted archive next to it, for restore tools that need random access.
+        
+        Args:
+            backup_file: Path to the encrypted archive ('*.enc')
+        
+        Returns:
+            str: Path to the decrypted copy, removed by the caller
+        
+        Raises:
+            DatabaseBackupError: If the archive cannot be decrypted
+        """
+        output_file = f"{Encryption.strip_extension(backup_file)}.restore.part"
+        progress = self._create_progress(f"Decrypting {os.path.basename(backup_file)}",
+                                         os.path.getsize(backup_file))
+        try:
+            with open_archive_reader(backup_file, on_read=progress.update, encryption=self.decryption) as reader:
+                with open(output_file, 'wb') as f:
+                    shutil.copyfileobj(reader, f, self.config.get('stream_chunk_size', 1024 * 1024))
+        except (EncryptionError, OSError) as e:
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            raise DatabaseBackupError(f"Failed to decrypt {backup_file}: {e}")
+        
+        progress.finish()
+        return output_file
+    
+    def _check_plain_encryption(self) -> None:
+        """Refuse to write an unencrypted plain dump when encryption is enabled."""
+        if self.encryption is not None and self.compression.lower() == 'none':
+            raise DatabaseBackupError("Plain SQL dumps are encrypted while they are compressed, "
+                                      "BACKUP_ENCRYPTION requires BACKUP_COMPRESSION (e.g. lz4)")
+    
+    def _create_progress(self, label: str, total: Optional[int] = None, **options: Any) -> ProgressReporter:
+        """Create a progress reporter logging to this database's logger."""
+        return ProgressReporter(label, total, interval=self.config.get('progress_interval', 5), logger=self.logger,
+                                **options)
+    
+    def _start_dump_progress(self, total: Optional[int] = None, items_total: Optional[int] = None,
+                             from_output: bool = True) -> ProgressReporter:
+        """
+        Start following the progress of the dump.
+        
+        Args:
+            total: Expected size of the dump in bytes, if known
+            items_total: Number of tables, if known
+            from_output: Count the bytes read from the dump tool; otherwise
+                _parse_progress_line updates the progress
+        
+        Returns:
+            ProgressReporter: The progress of the dump, also kept in ``dump_progress``
+        """
+        self._progress_from_output = from_output
+        self.dump_progress = self._create_progress(f"Dumping {self.name}", total, items_total=items_total,
+                                                   item_label='table', listener=self.progress_listener)
+        return self.dump_progress
+    
+    def _finish_dump_progress(self) -> None:
+        """Log the final throughput of the dump and stop following its progress."""
+        if self.dump_progress is not None:
+            self.dump_progress.finish()
+            self.dump_progress = None
+    
+    def _parse_progress_line(self, line: str) -> None:
+        """
+        Follow the progress of the dump in a line of the dump tool's error output.
+        
+        Called for every line while ``dump_progress`` is set; databases
+        whose dump tool reports its progress update ``dump_progress``.
+        """
+        pass
+    
+    def _read_stderr(self, stream) -> StderrBuffer:
+        """Start consuming the error output of a command, following the progress of a running dump."""
+        on_line = self._parse_progress_line if self.dump_progress is not None else None
+        return StderrBuffer(on_line=on_line).start(stream)
+    
     def _generate_backup_filename(self, extension: str = 'sql') -> str:
         """Generate backup filename with timestamp."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        db_name = self.config.get('database', 'backup')
-        return f"backup_{db_name}_{timestamp}.{extension}"
+        return f"backup_{self.name}_{timestamp}.{extension}"
+    
+    def _package_directory(self, directory: str, archive_path: str, arcname: str) -> str:
+        """Package a dump directory into a tar archive, hashing (and encrypting) it on the way."""
+        hasher = new_hasher(self.checksum_algorithm)
+        package_directory(directory, archive_path, arcname=arcname, hasher=hasher, throttle=self.throttle,
+                          encryption=self.encryption)
+        self.checksums[archive_path] = hasher.hexdigest()
+        return archive_path
     
-    def _run_command(self, command: list, output_file: Optional[str] = None) -> bool:
+    def _run_command(self, command: list, output_file: Optional[str] = None, encrypt: bool = False) -> bool:
         """
         Run a command and return success status.
         
+        When the dump output is rate limited, encrypted or counted for the
+        dump progress, the output is copied to the file through the
+        throttle and the encryption instead of being written by the
+        command. Only the last lines of the error output are kept.
+        
         Args:
             command: Command to run as list of arguments
             output_file: Optional output file for command output
+            encrypt: Encrypt the output file with the backup encryption
             
         Returns:
             bool: True if command succeeded, False otherwise
@@ -68,22 +462,17 @@ class BaseDatabase(ABC):
         try:
             self.logger.info(f"Running command: {' '.join(command)}")
             
-            if output_file:
-                with open(output_file, 'w') as f:
-                    result = subprocess.run(
-                        command,
-                        stdout=f,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        check=True
-                    )
+            counted = self.dump_progress is not None and self._progress_from_output
+            if output_file and (self.throttle.dump.limited or encrypt or counted):
+                self._copy_output(command, output_file, self.encryption if encrypt else None)
             else:
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+                with open(output_file or os.devnull, 'wb') as f:
+                    process = subprocess.Popen(command, stdout=f, stderr=subprocess.PIPE, env=self.env)
+                    stderr = self._read_stderr(process.stderr)
+                    returncode = process.wait()
+                    stderr.join()
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, command, stderr=stderr.text())
             
             self.logger.info("Command executed successfully")
             return True
@@ -96,28 +485,159 @@ class BaseDatabase(ABC):
             self.logger.error(f"Unexpected error running command: {e}")
             return False
     
-    def cleanup_old_backups(self, retention_count: int = 3) -> None:
+    def _copy_output(self, command: list, output_file: str, encryption: Optional[Encryption] = None) -> None:
+        """
+        Copy the output of a command to a file, paced by the dump limit.
+        
+        The bytes copied are counted for the progress of a running dump.
+        
+        Args:
+            command: Command to run as list of arguments
+            output_file: File receiving the output
+            encryption: Optional Encryption the file is encrypted with
+        
+        Raises:
+            subprocess.CalledProcessError: If the command fails
+        """
+        chunk_size = self.config.get('stream_chunk_size', 1024 * 1024)
+        progress = self.dump_progress if self._progress_from_output else None
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.env)
+        
+        # Drain stderr so a verbose dump tool never blocks on a full pipe
+        stderr = self._read_stderr(process.stderr)
+        
+        try:
+            with open(output_file, 'wb') as f:
+                target = encryption.open_writer(f) if encryption is not None else f
+                for chunk in iter(lambda: process.stdout.read(chunk_size), b''):
+                    self.throttle.dump.consume(len(chunk))
+                    target.write(chunk)
+                    if progress is not None:
+                        progress.update(len(chunk))
+                if encryption is not None:
+                    target.close()
+        except Exception:
+            process.kill()
+            raise
+        finally:
+            returncode = process.wait()
+            stderr.join()
+        
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command, stderr=stderr.text())
+    
+    def _stream_backup(self, command: list) -> str:
+        """
+        Stream the backup command straight into a compressed archive.
+        
+        Args:
+            command: Backup command to run as list of arguments
+            
+        Returns:
+            str: Path to the compressed archive
+            
+        Raises:
+            DatabaseBackupError: If the streaming backup fails
+        """
+        dump_filename = self._generate_backup_filename('sql')
+        selector = None
+        if self.compression.lower() == AUTO:
+            # The pipeline picks the codec from the start of the dump and adds its extension
+            selector = CodecSelector.from_config(self.config)
+            archive_filepath = os.path.join(self.backup_dir, dump_filename)
+        else:
+            codec = CodecFactory.create_codec(self.compression, self.compression_level)
+            archive_filepath = os.path.join(self.backup_dir, codec.get_archive_name(dump_filename))
+            if self.encryption is not None:
+                archive_filepath = self.encryption.get_encrypted_name(archive_filepath)
+            self.logger.info(f"Streaming backup to {archive_filepath}")
+        
+        self.logger.info(f"Running command: {' '.join(command)}")
+        
+        pipeline = DumpPipeline(
+            command,
+            archive_filepath,
+            entry_name=dump_filename,
+            compression_type=self.compression,
+            level=self.compression_level,
+            chunk_size=self.config.get('stream_chunk_size', 1024 * 1024),
+            buffer_chunks=self.config.get('stream_buffer_chunks', 8),
+            threads=self.config.get('compression_threads', 1),
+            env=self.env,
+            block_size=self.config.get('compression_block_size', 4 * 1024 * 1024),
+            checksum_algorithm=self.checksum_algorithm,
+            throttle=self.throttle,
+            selector=selector,
+            expected_size=self.config.get('expected_dump_size'),
+            storages=self.storages,
+            encryption=self.encryption,
+            progress=self.dump_progress if self._progress_from_output else None,
+            on_stderr_line=self._parse_progress_line if self.dump_progress is not None else None,
+        )
+        
+        try:
+            bytes_in = pipeline.run()
+        except PipelineError as e:
+            raise DatabaseBackupError(str(e))
+        
+        archive_filepath = pipeline.archive_path
+        if pipeline.selection:
+            self.codec_selection = pipeline.selection.to_dict()
+        self.uploads.update(pipeline.uploads)
+        
+        if bytes_in == 0:
+            os.remove(archive_filepath)
+            raise DatabaseBackupError("Backup output is empty")
+        
+        self.output_compressed = True
+        self.checksums[archive_filepath] = pipeline.checksum
+        self.content_checksum = pipeline.content_checksum
+        self.content_size = bytes_in
+        self.logger.info(f"Streamed {bytes_in / (1024 * 1024):.1f} MB of dump output into {archive_filepath}")
+        return archive_filepath
+    
+    def cleanup_old_backups(self, retention_count: int = 3, catalog: Optional[Any] = None) -> None:
         """
         Clean up old backup files, keeping only the most recent ones.
         
+        With a backup catalog the files to remove are looked up in the
+        catalog. Otherwise only files of this backup target
+        (``backup_<name>_<timestamp>.*``) are considered, so several targets
+        can share one backup directory.
+        
         Args:
             retention_count: Number of backup files to keep
+            catalog: Optional BackupCatalog of the backup directory
         """
         try:
-            # Get all backup files in the backup directory
+            if catalog is not None:
+                for filepath in catalog.prune(self.name, retention_count):
+                    self.logger.info(f"Removed old backup file: {filepath}")
+                return
+            
+            # Get all backup files (plain dumps, archives of every codec, encrypted archives)
+            extensions = tuple(f".{ext}" for ext in list(self.backup_extensions) + CodecFactory.get_extensions()
+                               + [ENCRYPTED_EXTENSION])
+            name_pattern = re.compile(rf"^backup_{re.escape(self.name)}_\d{{8}}_\d{{6}}\.")
             backup_files = []
             for filename in os.listdir(self.backup_dir):
-                if filename.startswith('backup_') and (filename.endswith('.sql') or filename.endswith('.zip')):
+                if name_pattern.match(filename) and filename.endswith(extensions):
                     filepath = os.path.join(self.backup_dir, filename)
                     backup_files.append((filepath, os.path.getmtime(filepath)))
             
             # Sort by modification time (newest first)
             backup_files.sort(key=lambda x: x[1], reverse=True)
             
+            # Backups the kept incremental backups take tables from are kept too
+            required = set()
+            for filepath, _ in backup_files[:retention_count]:
+                required.update(get_required_files(filepath))
+            
             # Remove old files
-            files_to_remove = backup_files[retention_count:]
+            files_to_remove = [(filepath, mtime) for filepath, mtime in backup_files[retention_count:]
+                               if os.path.basename(filepath) not in required]
             for filepath, _ in files_to_remove:
-                os.remove(filepath)
+                remove_backup_file(filepath)
                 self.logger.info(f"Removed old backup file: {filepath}")
                 
         except Exception as e:
@@ -1,22 +1,42 @@
 """
 Database factory for creating database backup instances.
 """
-from typing import Dict, Any
+import importlib
+from typing import Dict, Any, List, Type
+from src.compression import CodecFactory
+from src.utils import ENCRYPTED_EXTENSION
 from .base import BaseDatabase
-from .postgresql import PostgreSQLDatabase
-from .mysql import MySQLDatabase
 
 
 class DatabaseFactory:
     """Factory class for creating database backup instances."""
     
+    # Database modules are imported on first use, so a run only loads the
+    # implementation it needs
     _database_classes = {
-        'postgresql': PostgreSQLDatabase,
-        'postgres': PostgreSQLDatabase,  # Alias
-        'mysql': MySQLDatabase,
-        'mariadb': MySQLDatabase,  # Alias
+        'postgresql': ('src.database.postgresql', 'PostgreSQLDatabase'),
+        'postgres': ('src.database.postgresql', 'PostgreSQLDatabase'),  # Alias
+        'mysql': ('src.database.mysql', 'MySQLDatabase'),
+        'mariadb': ('src.database.mysql', 'MySQLDatabase'),  # Alias
     }
     
+    @classmethod
+    def get_database_class(cls, db_type: str) -> Type[BaseDatabase]:
+        """
+        Import and return the class of a database type.
+        
+        Raises:
+            ValueError: If database type is not supported
+        """
+        db_type_lower = db_type.lower()
+        
+        if db_type_lower not in cls._database_classes:
+            supported_types = ', '.join(cls._database_classes.keys())
+            raise ValueError(f"Unsupported database type: {db_type}. Supported types: {supported_types}")
+        
+        module_name, class_name = cls._database_classes[db_type_lower]
+        return getattr(importlib.import_module(module_name), class_name)
+    
     @classmethod
     def create_database(cls, db_type: str, config: Dict[str, Any]) -> BaseDatabase:
         """
@@ -32,16 +52,18 @@ class DatabaseFactory:
         Raises:
             ValueError: If database type is not supported
         """
-        db_type_lower = db_type.lower()
-        
-        if db_type_lower not in cls._database_classes:
-            supported_types = ', '.join(cls._database_classes.keys())
-            raise ValueError(f"Unsupported database type: {db_type}. Supported types: {supported_types}")
-        
-        database_class = cls._database_classes[db_type_lower]
+        database_class = cls.get_database_class(db_type)
         return database_class(config)
     
     @classmethod
     def get_supported_types(cls) -> list:
         """Get list of supported database types."""
         return list(cls._database_classes.keys())
+    
+    @classmethod
+    def get_backup_extensions(cls) -> List[str]:
+        """Get the extensions of every kind of backup file (dumps, archives and encrypted archives)."""
+        extensions = set(CodecFactory.get_extensions()) | {ENCRYPTED_EXTENSION}
+        for db_type in cls._database_classes:
+            extensions.update(cls.get_database_class(db_type).backup_extensions)
+        return sorted(extensions)
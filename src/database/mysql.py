@@ -2,19 +2,67 @@
 MySQL database backup implementation.
 """
 import os
-from typing import Dict, Any, List
+import shutil
+import tarfile
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from src.compression import AUTO, BaseCodec, CodecFactory, CodecSelector
+from src.utils import Encryption, EncryptionError, StderrBuffer, get_auto_worker_count, read_manifest
 from .base import BaseDatabase, DatabaseBackupError
 
 
 class MySQLDatabase(BaseDatabase):
     """MySQL database backup implementation."""
     
+    backup_extensions = ('sql', 'mysql.tar')
+    
+    # Parallel dumps record the binlog position of their snapshot
+    log_replay_extensions = ('mysql.tar',)
+    
+    # Definitions of the tables, indexes, routines, triggers and views, part
+    # of the checksum fingerprint since CHECKSUM TABLE only covers the rows
+    SCHEMA_FINGERPRINT_QUERY = (
+        "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA "
+        "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION; "
+        "SELECT TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, NON_UNIQUE "
+        "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() ORDER BY 1, 2, 3; "
+        "SELECT ROUTINE_TYPE, ROUTINE_NAME, LAST_ALTERED "
+        "FROM information_schema.ROUTINES WHERE ROUTINE_SCHEMA = DATABASE() ORDER BY 1, 2; "
+        "SELECT TRIGGER_NAME, CREATED, MD5(ACTION_STATEMENT) "
+        "FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE() ORDER BY 1; "
+        "SELECT TABLE_NAME, MD5(VIEW_DEFINITION) "
+        "FROM information_schema.VIEWS WHERE TABLE_SCHEMA = DATABASE() ORDER BY 1"
+    )
+    
+    # Size of the rows of the tables (an estimate for InnoDB), the expected total of the dump progress
+    DATA_SIZE_QUERY = (
+        "SELECT COALESCE(SUM(DATA_LENGTH), 0) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'"
+    )
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
+        
+        # 'single' runs one mysqldump, 'parallel' dumps tables concurrently
+        self.dump_mode = (config.get('mysql_dump_mode') or 'single').lower()
+        if self.dump_mode not in ('single', 'parallel'):
+            raise DatabaseBackupError(f"Unsupported MySQL dump mode: {self.dump_mode}. Supported modes: single, parallel")
+        
+        # 'checksum' runs CHECKSUM TABLE on every table, 'binlog' uses the server-wide binlog position
+        self.fingerprint_mode = (config.get('mysql_fingerprint') or 'checksum').lower()
+        if self.fingerprint_mode not in ('checksum', 'binlog'):
+            raise DatabaseBackupError(f"Unsupported MySQL fingerprint: {self.fingerprint_mode}. "
+                                      f"Supported fingerprints: checksum, binlog")
+        
+        # Pass the password to the MySQL tools through their environment,
+        # their command lines are logged
+        if config.get('password'):
+            self.env = {**os.environ, 'MYSQL_PWD': config['password']}
     
-    def get_backup_command(self) -> List[str]:
-        """Get the mysqldump command."""
-        command = ['mysqldump']
+    def get_connection_args(self) -> List[str]:
+        """Get the connection arguments shared by mysqldump and mysql."""
+        command = []
         
         # Add connection parameters
         if self.config.get('host'):
@@ -26,8 +74,32 @@ class MySQLDatabase(BaseDatabase):
         if self.config.get('user'):
             command.extend(['-u', self.config['user']])
         
-        if self.config.get('password'):
-            command.append(f"-p{self.config['password']}")
+        return command
+    
+    def get_dump_jobs(self) -> int:
+        """
+        Get the number of parallel dump workers.
+        
+        Uses MYSQL_DUMP_JOBS when set, otherwise picks a count from the CPU
+        count and the configured load ceiling.
+        """
+        jobs = int(self.config.get('mysql_dump_jobs') or 0)
+        if jobs > 0:
+            return jobs
+        return get_auto_worker_count(self.config.get('load_ceiling'))
+    
+    def get_client_command(self) -> List[str]:
+        """Get the mysql client command connected to the configured database."""
+        command = ['mysql', *self.get_connection_args()]
+        
+        if self.config.get('database'):
+            command.append(self.config['database'])
+        
+        return command
+    
+    def get_backup_command(self) -> List[str]:
+        """Get the mysqldump command."""
+        command = ['mysqldump', *self.get_connection_args()]
         
         # Add additional options
         command.extend(['--single-transaction', '--routines', '--triggers'])
@@ -38,6 +110,75 @@ class MySQLDatabase(BaseDatabase):
         
         return command
     
+    def get_restore_command(self) -> List[str]:
+        """Get the mysql client command that applies a plain SQL dump from stdin."""
+        return self.get_client_command()
+    
+    def _run_query(self, statement: str) -> str:
+        """Run statements with the mysql client and return the tab separated rows."""
+        command = ['mysql', *self.get_connection_args(), '--batch', '--skip-column-names', '-e', statement]
+        if self.config.get('database'):
+            command.append(self.config['database'])
+        return self._query(command)
+    
+    def _read_fingerprint(self) -> Optional[str]:
+        """
+        Read the table checksums and schema definitions, or the binlog position.
+        
+        CHECKSUM TABLE reads every row on the server but transfers and writes
+        nothing. The binlog position is cheaper but moves with writes to any
+        database of the server, and needs binary logging.
+        """
+        if self.fingerprint_mode == 'binlog':
+            for statement in ("SHOW MASTER STATUS", "SHOW BINARY LOG STATUS"):
+                try:
+                    position = self._run_query(statement).strip()
+                except DatabaseBackupError as e:
+                    error = e
+                    continue
+                if not position:
+                    raise DatabaseBackupError("Binary logging is disabled, MYSQL_FINGERPRINT=binlog needs it")
+                return position
+            raise error
+        
+        tables = self._run_query(
+            "SELECT TABLE_NAME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY 1"
+        ).splitlines()
+        checksums = ''
+        if tables:
+            quoted = ', '.join('`' + table.replace('`', '``') + '`' for table in tables)
+            checksums = self._run_query(f"CHECKSUM TABLE {quoted}")
+        return checksums + self._run_query(self.SCHEMA_FINGERPRINT_QUERY)
+    
+    def restore(self, backup_file: str, jobs: Optional[int] = None) -> None:
+        """
+        Restore a backup file into the configured database.
+        
+        Parallel backups ('.mysql.tar') are loaded with concurrent mysql
+        clients, SQL dumps are streamed into a single client. With the
+        ``replay_log`` setting (``restore.py --replay-log``) the archived
+        binlog is replayed after a parallel backup, up to the recovery target.
+        
+        Args:
+            backup_file: Path to the backup file
+            jobs: Number of concurrent loaders for parallel backups, automatic if None
+            
+        Raises:
+            DatabaseBackupError: If restore fails
+        """
+        parallel = Encryption.strip_extension(backup_file).endswith('.mysql.tar')
+        if self.config.get('replay_log') and not parallel:
+            raise DatabaseBackupError("Only parallel backups (.mysql.tar) record the binlog position "
+                                      "the archived binlog is replayed from")
+        
+        if parallel:
+            manifest = self.restore_parallel(backup_file, jobs)
+            if self.config.get('replay_log'):
+                self._replay_binlog(backup_file, manifest)
+        else:
+            self._stream_restore(backup_file)
+    
     def backup(self) -> str:
         """
         Perform MySQL database backup.
@@ -48,19 +189,46 @@ class MySQLDatabase(BaseDatabase):
         Raises:
             DatabaseBackupError: If backup fails
         """
+        if self.dump_mode == 'parallel':
+            return self._backup_parallel()
+        
+        if self.incremental_enabled:
+            raise DatabaseBackupError("BACKUP_INCREMENTAL needs MYSQL_DUMP_MODE=parallel")
+        
+        if self.config.get('continuous_archiving'):
+            raise DatabaseBackupError("CONTINUOUS_ARCHIVING needs MYSQL_DUMP_MODE=parallel, which records "
+                                      "the binlog position of the dump")
+        
+        self._check_plain_encryption()
+        
+        # Get backup command
+        command = self.throttle.wrap_command(self.get_backup_command())
+        
+        try:
+            data_size = int(self._run_query(self.DATA_SIZE_QUERY).strip() or 0)
+        except (DatabaseBackupError, ValueError) as e:
+            self.logger.warning(f"Failed to read the data size, the dump progress has no total: {e}")
+            data_size = 0
+        self._start_dump_progress(data_size or None)
+        
+        if self.streaming:
+            self.logger.info("Starting MySQL streaming backup")
+            backup_filepath = self._stream_backup(command)
+            self._finish_dump_progress()
+            self.logger.info(f"MySQL backup completed successfully: {backup_filepath}")
+            return backup_filepath
+        
         backup_filename = self._generate_backup_filename('sql')
         backup_filepath = os.path.join(self.backup_dir, backup_filename)
         
         self.logger.info(f"Starting MySQL backup to {backup_filepath}")
         
-        # Get backup command
-        command = self.get_backup_command()
-        
         # Run backup command
         success = self._run_command(command, backup_filepath)
         
         if not success:
             raise DatabaseBackupError("MySQL backup failed")
+        self._finish_dump_progress()
         
         # Verify backup file was created and has content
         if not os.path.exists(backup_filepath):
@@ -71,3 +239,236 @@ class MySQLDatabase(BaseDatabase):
         
         self.logger.info(f"MySQL backup completed successfully: {backup_filepath}")
         return backup_filepath
+    
+    def restore_parallel(self, archive_path: str, jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Load a parallel backup archive with concurrent mysql clients.
+        
+        Args:
+            archive_path: Path to a '.mysql.tar' archive (or an encrypted '.mysql.tar.enc')
+            jobs: Number of concurrent loaders, automatic if None
+            
+        Returns:
+            Dict[str, Any]: The manifest of the archive
+            
+        Raises:
+            DatabaseBackupError: If loading fails
+        """
+        from .mysql_parallel import ParallelMySQLLoader
+        
+        progress = self._create_progress(f"Loading {os.path.basename(archive_path)}")
+        loader = ParallelMySQLLoader(archive_path, self.get_client_command(),
+                                     jobs or self.get_restore_jobs(), env=self.env, progress=progress,
+                                     encryption=self.decryption)
+        try:
+            manifest = loader.run()
+        except EncryptionError as e:
+            raise DatabaseBackupError(f"Failed to decrypt {archive_path}: {e}")
+        progress.finish()
+        return manifest
+    
+    def get_binlog_replay_command(self, start: Dict[str, Any], source_database: Optional[str],
+                                  paths: List[str]) -> List[str]:
+        """
+        Get the mysqlbinlog command printing the events of the archived binlog from a backup position.
+        
+        Args:
+            start: Binlog position of the backup (``recovery`` section of its manifest)
+            source_database: Database the backup was taken from
+            paths: Binlog files, oldest first
+        """
+        command = ['mysqlbinlog', f"--start-position={start['position']}"]
+        
+        if start.get('gtid'):
+            # The server already executed the GTIDs of the events, which would skip them
+            command.append('--skip-gtids')
+        
+        if self.config.get('recovery_target') is not None:
+            # mysqlbinlog reads the stop time in the local time zone
+            stop = datetime.fromtimestamp(self.config['recovery_target']).strftime('%Y-%m-%d %H:%M:%S')
+            command.append(f"--stop-datetime={stop}")
+        
+        # The binlog holds every database of the server, only the backed up one is replayed
+        database = self.config.get('database')
+        if source_database and database and source_database != database:
+            command.append(f"--rewrite-db={source_database}->{database}")
+        if database:
+            command.append(f"--database={database}")
+        
+        command.extend(paths)
+        return command
+    
+    def _replay_binlog(self, backup_file: str, manifest: Dict[str, Any]) -> None:
+        """
+        Replay the archived binlog from the position of a loaded backup, up to the recovery target.
+        
+        Args:
+            backup_file: Path to the '.mysql.tar' backup that was loaded
+            manifest: Manifest inside the archive
+            
+        Raises:
+            DatabaseBackupError: If the binlog cannot be restored or replayed
+        """
+        start = (read_manifest(backup_file) or {}).get('recovery')
+        if not start and (manifest.get('binlog') or {}).get('file'):
+            start = {'method': 'binlog', **manifest['binlog']}
+        if not start:
+            raise DatabaseBackupError(f"{os.path.basename(backup_file)} records no binlog position, "
+                                      f"binary logging was disabled when it was taken")
+        
+        # Imported here so dumps and restores without replay never load the archivers
+        from src.archive import ArchiveError, ArchiverFactory
+        
+        staging_dir = f"{Encryption.strip_extension(backup_file)[:-len('.mysql.tar')]}.binlog.part"
+        try:
+            # The archive belongs to the job, not to the target database of the restore
+            archiver = ArchiverFactory.create_archiver(
+                'mysql', {**self.config, 'name': self.config.get('name') or manifest.get('database')}
+            )
+            paths = archiver.stage(start['file'], staging_dir)
+            command = self.get_binlog_replay_command(start, manifest.get('database'), paths)
+            self.logger.info(f"Replaying {len(paths)} binlog files from {start['file']}:{start['position']}")
+            self._pipe_commands(command, self.get_client_command())
+        except ArchiveError as e:
+            raise DatabaseBackupError(f"Failed to restore the archived binlog: {e}")
+        finally:
+            if os.path.isdir(staging_dir):
+                shutil.rmtree(staging_dir)
+        
+        if self.config.get('recovery_target') is not None:
+            target = datetime.fromtimestamp(self.config['recovery_target']).isoformat(sep=' ', timespec='seconds')
+            self.logger.info(f"Replayed the archived binlog up to {target}")
+        else:
+            self.logger.info("Replayed the archived binlog up to the last event archived")
+    
+    def _pipe_commands(self, source: List[str], target: List[str]) -> None:
+        """
+        Run a command with its output piped into another one.
+        
+        Raises:
+            DatabaseBackupError: If either command fails
+        """
+        self.logger.info(f"Running command: {' '.join(source)} | {' '.join(target)}")
+        try:
+            producer = subprocess.Popen(source, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.env)
+        except OSError as e:
+            raise DatabaseBackupError(f"Failed to run {source[0]}: {e}")
+        
+        producer_errors = StderrBuffer().start(producer.stderr)
+        
+        try:
+            consumer = subprocess.Popen(target, stdin=producer.stdout, stderr=subprocess.PIPE, env=self.env)
+        except OSError as e:
+            producer.kill()
+            raise DatabaseBackupError(f"Failed to run {target[0]}: {e}")
+        finally:
+            # The consumer holds the only read end, so the producer sees a closed pipe if it exits
+            producer.stdout.close()
+        
+        consumer_errors = StderrBuffer().start(consumer.stderr)
+        consumer.wait()
+        producer.wait()
+        producer_errors.join()
+        consumer_errors.join()
+        
+        for command, returncode, errors in ((source, producer.returncode, producer_errors),
+                                            (target, consumer.returncode, consumer_errors)):
+            if returncode != 0:
+                raise DatabaseBackupError(f"{command[0]} failed with exit code {returncode}: {errors.text()}")
+    
+    def _get_table_codec(self) -> Optional[BaseCodec]:
+        """
+        Codec for the per-table files; zip is a container so gzip is used instead.
+        
+        With BACKUP_COMPRESSION=auto no single stream can be sampled, so the
+        first available candidate is used for every table.
+        """
+        if self.compression.lower() == 'none':
+            return None
+        if self.compression.lower() == AUTO:
+            return CodecFactory.create_codec(*CodecSelector.from_config(self.config).get_default())
+        if self.compression.lower() == 'zip':
+            return CodecFactory.create_codec('gzip', self.compression_level)
+        return CodecFactory.create_codec(self.compression, self.compression_level)
+    
+    def _backup_parallel(self) -> str:
+        """
+        Dump all tables concurrently from one consistent snapshot.
+        
+        The per-table files, schema and manifest are packaged into a single
+        '.mysql.tar' artifact. Incremental backups only dump the tables whose
+        checksum changed since the previous backup.
+        
+        Returns:
+            str: Path to the backup archive
+            
+        Raises:
+            DatabaseBackupError: If backup fails
+        """
+        from .mysql_parallel import MANIFEST_FORMAT, ParallelMySQLDumper, ParallelMySQLLoader
+        
+        base_name = os.path.splitext(self._generate_backup_filename('sql'))[0]
+        backup_filepath = os.path.join(self.backup_dir, f"{base_name}.mysql.tar")
+        if self.encryption is not None:
+            backup_filepath = self.encryption.get_encrypted_name(backup_filepath)
+        output_dir = os.path.join(self.backup_dir, f"{base_name}.mysql.part")
+        
+        if self.config.get('continuous_archiving') and not self.config.get('mysql_parallel_lock', True):
+            raise DatabaseBackupError("CONTINUOUS_ARCHIVING needs MYSQL_PARALLEL_LOCK=true, the binlog position "
+                                      "only matches the snapshot while the tables are locked")
+        
+        jobs = self.get_dump_jobs()
+        self.logger.info(f"Starting parallel MySQL backup to {backup_filepath} with {jobs} workers")
+        
+        parent = self._load_parent_backup(MANIFEST_FORMAT) if self.incremental_enabled else None
+        previous = None
+        if parent:
+            try:
+                previous = ParallelMySQLLoader(self.previous_backup, [], 1, encryption=self.decryption).read_manifest()
+            except (DatabaseBackupError, EncryptionError, OSError, tarfile.TarError) as e:
+                self.logger.warning(f"Failed to read the previous backup, taking a full backup: {e}")
+                parent = None
+        
+        dumper = ParallelMySQLDumper(
+            self.config,
+            output_dir,
+            self._get_table_codec(),
+            jobs,
+            self.get_connection_args(),
+            env=self.env,
+            lock=self.config.get('mysql_parallel_lock', True),
+            throttle=self.throttle,
+            incremental=self.incremental_enabled,
+            previous=previous,
+            previous_archive=os.path.basename(self.previous_backup) if previous else None,
+            progress=self._start_dump_progress(),
+        )
+        
+        try:
+            manifest = dumper.run()
+        except Exception as e:
+            if os.path.isdir(output_dir):
+                shutil.rmtree(output_dir)
+            if isinstance(e, DatabaseBackupError):
+                raise
+            raise DatabaseBackupError(f"Parallel MySQL backup failed: {e}")
+        self._finish_dump_progress()
+        
+        self._package_directory(output_dir, backup_filepath, base_name)
+        self.output_compressed = True
+        
+        if self.incremental_enabled:
+            requires = sorted({table['archive'] for table in manifest['tables'] if table.get('archive')})
+            self.incremental = self._describe_chain(backup_filepath, MANIFEST_FORMAT, parent, requires)
+        
+        if self.config.get('continuous_archiving'):
+            if (manifest.get('binlog') or {}).get('file'):
+                # The archived binlog is replayed from the snapshot position on restore
+                self.recovery_start = {'method': 'binlog', **manifest['binlog']}
+            else:
+                self.logger.warning("Binary logging is disabled, the backup cannot be rolled forward "
+                                    "with the archived binlog")
+        
+        self.logger.info(f"MySQL backup completed successfully: {backup_filepath} "
+                         f"({len(manifest['tables'])} tables)")
+        return backup_filepath
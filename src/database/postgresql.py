@@ -2,23 +2,128 @@
 PostgreSQL database backup implementation.
 """
 import os
-from typing import Dict, Any, List
+import re
+import shutil
+import tarfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.utils import Encryption, EncryptionError, get_auto_worker_count, open_archive_reader, read_manifest
 from .base import BaseDatabase, DatabaseBackupError
 
 
 class PostgreSQLDatabase(BaseDatabase):
     """PostgreSQL database backup implementation."""
     
+    # pg_dump output format -> backup file extension
+    DUMP_FORMATS = {
+        'plain': 'sql',
+        'custom': 'dump',
+        'directory': 'dir.tar',
+        'base': 'base.tar.gz',
+    }
+    
+    backup_extensions = ('sql', 'dump', 'dir.tar', 'base.tar.gz')
+    base_backup_extensions = ('base.tar.gz',)
+    
+    # Directory of a restored data directory holding the archived WAL
+    # segments until the recovery has replayed them
+    WAL_STAGING_DIR = 'pg_wal_restore'
+    
+    # Row changes of the database (catalog changes from DDL and TRUNCATE
+    # included) and the last statistics reset; the transaction counters are
+    # left out since read-only transactions raise them too
+    FINGERPRINT_QUERY = (
+        "SELECT concat_ws(',', tup_inserted, tup_updated, tup_deleted, stats_reset) "
+        "FROM pg_stat_database WHERE datname = current_database()"
+    )
+    
+    # Change signature of every table for incremental backups: row changes,
+    # the last (auto)vacuum and (auto)analyze, the size and file of the
+    # relation (the file is rewritten by TRUNCATE, VACUUM FULL and CLUSTER)
+    # and the column definitions. The size is read from the files, so it also
+    # covers row changes whose counters were not flushed yet. The OID of the
+    # table finds its rows in the TOC of the backup that dumped them.
+    TABLE_STATS_QUERY = (
+        "SELECT s.schemaname, s.relname, s.relid, concat_ws(',', s.n_tup_ins, s.n_tup_upd, s.n_tup_del, "
+        "coalesce(pg_stat_get_last_vacuum_time(s.relid)::text, '-'), "
+        "coalesce(pg_stat_get_last_autovacuum_time(s.relid)::text, '-'), "
+        "coalesce(pg_stat_get_last_analyze_time(s.relid)::text, '-'), "
+        "coalesce(pg_stat_get_last_autoanalyze_time(s.relid)::text, '-'), "
+        "pg_table_size(s.relid), pg_relation_filenode(s.relid), (SELECT md5(string_agg(a.attname || ' ' || "
+        "format_type(a.atttypid, a.atttypmod), ',' ORDER BY a.attnum)) FROM pg_attribute a "
+        "WHERE a.attrelid = s.relid AND a.attnum > 0 AND NOT a.attisdropped)) "
+        "FROM pg_stat_user_tables s JOIN pg_class c ON c.oid = s.relid WHERE c.relkind = 'r'"
+    )
+    
+    # The table counters only compare within one statistics lifetime: a
+    # restart (crash, failover) or a reset of the statistics, of the database
+    # or of a single table, starts a new chain. Returns the server start, the
+    # last reset and the current time (seconds since the epoch)
+    SERVER_STATS_QUERY = (
+        "SELECT pg_postmaster_start_time(), coalesce(extract(epoch FROM stats_reset), 0), "
+        "extract(epoch FROM now()) FROM pg_stat_database WHERE datname = current_database()"
+    )
+    
+    # Size of the rows of every table (TOAST included), the expected total of the dump progress
+    TABLE_SIZES_QUERY = (
+        "SELECT s.schemaname, s.relname, pg_table_size(s.relid) "
+        "FROM pg_stat_user_tables s JOIN pg_class c ON c.oid = s.relid WHERE c.relkind = 'r'"
+    )
+    
+    # Progress lines of pg_dump --verbose: the rows of a table are dumped (the
+    # next table starts once they are done), and a parallel job finished the
+    # rows of a table (named without its schema)
+    DUMP_TABLE_PATTERN = re.compile(r'dumping contents of table "(.+)"$')
+    FINISHED_TABLE_PATTERN = re.compile(r'finished item \d+ TABLE DATA (.+)$')
+    
+    # Progress lines of pg_basebackup --progress: kB copied and expected
+    BASE_PROGRESS_PATTERN = re.compile(r'^(\d+)/(\d+) kB \(')
+    
+    # Rows of a table in the TOC list of pg_restore -l:
+    # <dump id>; 0 <table oid> TABLE DATA <schema> <name> <owner>
+    TOC_TABLE_DATA_PATTERN = re.compile(r'^\d+; \d+ (?P<oid>\d+) TABLE DATA (?P<item>.*)$')
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         
-        # Set PostgreSQL password environment variable
+        self.dump_format = (config.get('pg_dump_format') or 'plain').lower()
+        if self.dump_format not in self.DUMP_FORMATS:
+            supported_formats = ', '.join(self.DUMP_FORMATS.keys())
+            raise DatabaseBackupError(
+                f"Unsupported pg_dump format: {self.dump_format}. Supported formats: {supported_formats}"
+            )
+        
+        # Pass the PostgreSQL password to pg_dump through its environment
         if config.get('password'):
-            os.environ['PGPASSWORD'] = config['password']
+            self.env = {**os.environ, 'PGPASSWORD': config['password']}
+        
+        # Sizes of the tables whose rows are dumped ('schema.name' -> bytes)
+        # and the tables being dumped, for the dump progress
+        self._table_sizes: Dict[str, int] = {}
+        self._dumping: List[str] = []
+        self._parallel_dump = False
+    
+    def get_dump_jobs(self) -> int:
+        """
+        Get the number of parallel pg_dump jobs.
+        
+        Uses PG_DUMP_JOBS when set, otherwise picks a count from the CPU
+        count and the configured load ceiling.
+        """
+        jobs = int(self.config.get('pg_dump_jobs') or 0)
+        if jobs > 0:
+            return jobs
+        return get_auto_worker_count(self.config.get('load_ceiling'))
     
-    def get_backup_command(self) -> List[str]:
-        """Get the pg_dump command."""
-        command = ['pg_dump']
+    def get_connection_args(self, with_database: bool = True) -> List[str]:
+        """
+        Get the connection arguments shared by pg_dump, psql and pg_restore.
+        
+        Args:
+            with_database: Include the database name (pg_basebackup reads -d as a connection string)
+        """
+        command = []
         
         # Add connection parameters
         if self.config.get('host'):
@@ -30,15 +135,361 @@ class PostgreSQLDatabase(BaseDatabase):
         if self.config.get('user'):
             command.extend(['-U', self.config['user']])
         
-        if self.config.get('database'):
+        if with_database and self.config.get('database'):
             command.extend(['-d', self.config['database']])
         
-        # Add additional options
         command.append('-w')  # Never prompt for password
+        return command
+    
+    def get_backup_command(self, output_path: Optional[str] = None,
+                           exclude_table_data: Optional[List[Tuple[str, str]]] = None) -> List[str]:
+        """
+        Get the pg_dump command.
+        
+        Args:
+            output_path: Optional output file or directory (stdout if None)
+            exclude_table_data: Tables (schema, name) dumped without their rows
+        """
+        if self.dump_format == 'base':
+            return self.get_base_backup_command()
+        
+        command = ['pg_dump', *self.get_connection_args()]
+        
+        # Add additional options
         command.append('--verbose')  # Verbose output
         
+        # Archive formats compress internally and can be restored with pg_restore -j
+        if self.dump_format == 'custom':
+            command.append('-Fc')
+        elif self.dump_format == 'directory':
+            command.extend(['-Fd', '-j', str(self.get_dump_jobs())])
+        
+        if self.dump_format != 'plain' and self.config.get('pg_dump_compress_level') is not None:
+            command.extend(['-Z', str(self.config['pg_dump_compress_level'])])
+        
+        # Quoted patterns match the names literally
+        for schema, table in exclude_table_data or []:
+            command.append(f"--exclude-table-data={self._quote_pattern(schema)}.{self._quote_pattern(table)}")
+        
+        if output_path:
+            command.extend(['-f', output_path])
+        
+        return command
+    
+    def get_base_backup_command(self) -> List[str]:
+        """
+        Get the pg_basebackup command writing a gzipped tar of the cluster to stdout.
+        
+        The WAL needed to make the copy consistent is fetched into the tar
+        (-X fetch), so a base backup can be restored without the archive too.
+        With --progress the server sizes the cluster before the copy starts.
+        """
+        command = ['pg_basebackup', *self.get_connection_args(with_database=False),
+                   '-D', '-', '-Ft', '-X', 'fetch', '-z', '--verbose', '--progress']
+        
+        if self.config.get('pg_dump_compress_level') is not None:
+            command.extend(['-Z', str(self.config['pg_dump_compress_level'])])
+        
         return command
     
+    @staticmethod
+    def _quote_pattern(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+    
+    def get_restore_command(self) -> List[str]:
+        """Get the psql command that applies a plain SQL dump from stdin."""
+        # -X ignores ~/.psqlrc, ON_ERROR_STOP aborts on the first failing statement
+        return ['psql', *self.get_connection_args(), '-X', '-q', '-v', 'ON_ERROR_STOP=1']
+    
+    def get_pg_restore_command(self, archive_path: str, jobs: int, options: Optional[List[str]] = None) -> List[str]:
+        """
+        Get the pg_restore command for a custom or directory format archive.
+        
+        Args:
+            archive_path: Path to the .dump file or dump directory
+            jobs: Number of parallel pg_restore jobs
+            options: Additional pg_restore options (sections, TOC list)
+        """
+        return ['pg_restore', *self.get_connection_args(), '--exit-on-error', '-j', str(jobs),
+                *(options or []), archive_path]
+    
+    def _read_fingerprint(self) -> Optional[str]:
+        """Read the tuple counters of the database from pg_stat_database."""
+        if self.dump_format == 'base':
+            # A base backup copies every database of the cluster, the counters cover one
+            return None
+        command = ['psql', *self.get_connection_args(), '-X', '-A', '-t', '-c', self.FINGERPRINT_QUERY]
+        return self._query(command).strip() or None
+    
+    def restore(self, backup_file: str, jobs: Optional[int] = None) -> None:
+        """
+        Restore a backup file into the configured database.
+        
+        Custom format dumps are applied with ``pg_restore -j N``. Directory
+        format archives are unpacked next to the archive (pg_restore needs a
+        directory) and removed afterwards. SQL dumps are streamed into psql.
+        Encrypted custom format dumps are decrypted next to the archive first,
+        since pg_restore -j needs a seekable file. Incremental backups are
+        rebuilt from the backups of their chain. Base backups are unpacked
+        into a data directory set up for point-in-time recovery.
+        
+        Args:
+            backup_file: Path to the backup file
+            jobs: Number of parallel pg_restore jobs, automatic if None
+            
+        Raises:
+            DatabaseBackupError: If restore fails
+        """
+        jobs = jobs or self.get_restore_jobs()
+        
+        archive_name = Encryption.strip_extension(backup_file)
+        
+        if archive_name.endswith(f".{self.DUMP_FORMATS['base']}"):
+            self._restore_base_backup(backup_file)
+            return
+        
+        if not archive_name.endswith((f".{self.DUMP_FORMATS['custom']}", f".{self.DUMP_FORMATS['directory']}")):
+            self._stream_restore(backup_file)
+            return
+        
+        chain = (read_manifest(backup_file) or {}).get('incremental')
+        if chain and chain.get('type') == 'incremental':
+            self._restore_incremental(backup_file, chain, jobs)
+            return
+        
+        with self._open_pg_archive(backup_file) as archive_path:
+            self._pg_restore(archive_path, jobs)
+    
+    def _pg_restore(self, archive_path: str, jobs: int, options: Optional[List[str]] = None) -> None:
+        """Run pg_restore with parallel jobs."""
+        self.logger.info(f"Restoring {archive_path} with {jobs} pg_restore jobs")
+        
+        if not self._run_command(self.get_pg_restore_command(archive_path, jobs, options)):
+            raise DatabaseBackupError("PostgreSQL restore failed")
+    
+    @contextmanager
+    def _open_pg_archive(self, backup_file: str) -> Iterator[str]:
+        """
+        Get a path pg_restore can read for a custom or directory format backup.
+        
+        Directory archives are unpacked and encrypted custom dumps decrypted
+        next to the backup; the copy is removed afterwards.
+        
+        Args:
+            backup_file: Path to a '.dump' or '.dir.tar' backup (optionally encrypted)
+        
+        Yields:
+            str: Path to the dump file or dump directory
+        """
+        archive_name = Encryption.strip_extension(backup_file)
+        
+        if archive_name.endswith(f".{self.DUMP_FORMATS['directory']}"):
+            output_dir = f"{archive_name[:-len('.tar')]}.restore.part"
+            try:
+                yield self._unpack_directory_archive(backup_file, output_dir)
+            finally:
+                if os.path.isdir(output_dir):
+                    shutil.rmtree(output_dir)
+        elif archive_name != backup_file:
+            decrypted_file = self._decrypt_archive(backup_file)
+            try:
+                yield decrypted_file
+            finally:
+                os.remove(decrypted_file)
+        else:
+            yield backup_file
+    
+    def _unpack_directory_archive(self, backup_file: str, output_dir: str) -> str:
+        """Unpack a '.dir.tar' archive (decrypting it on the way) and return the dump directory."""
+        try:
+            with open_archive_reader(backup_file, encryption=self.decryption) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(output_dir, filter='data')
+                    else:
+                        tar.extractall(output_dir)
+        except EncryptionError as e:
+            raise DatabaseBackupError(f"Failed to decrypt {backup_file}: {e}")
+        
+        # The archive holds a single top-level dump directory
+        entries = os.listdir(output_dir)
+        return os.path.join(output_dir, entries[0]) if len(entries) == 1 else output_dir
+    
+    def _restore_incremental(self, backup_file: str, chain: Dict[str, Any], jobs: int) -> None:
+        """
+        Rebuild a full image from an incremental backup and the backups it builds on.
+        
+        The schema, the changed tables, the sequences and finally the
+        indexes and constraints come from the incremental backup; the rows
+        of every unchanged table come from the backup that last dumped it.
+        
+        Args:
+            backup_file: Path to the incremental backup
+            chain: The ``incremental`` section of its manifest
+            jobs: Number of parallel pg_restore jobs
+        
+        Raises:
+            DatabaseBackupError: If a backup of the chain is missing or restore fails
+        """
+        backup_dir = os.path.dirname(backup_file)
+        filename = os.path.basename(backup_file)
+        
+        tables_by_backup: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for table, entry in chain.get('tables', {}).items():
+            if entry['archive'] != filename:
+                tables_by_backup.setdefault(entry['archive'], {})[table] = entry
+        
+        missing = [name for name in tables_by_backup if not os.path.exists(os.path.join(backup_dir, name))]
+        if missing:
+            raise DatabaseBackupError(f"Incremental backup {filename} needs {', '.join(sorted(missing))}, "
+                                      f"which is missing")
+        
+        self.logger.info(f"Restoring incremental backup {filename} with unchanged tables from "
+                         f"{len(tables_by_backup)} earlier backups")
+        
+        with self._open_pg_archive(backup_file) as archive_path:
+            self._pg_restore(archive_path, jobs, ['--section=pre-data'])
+            self._pg_restore(archive_path, jobs, ['--section=data'])
+            for name, tables in sorted(tables_by_backup.items()):
+                with self._open_pg_archive(os.path.join(backup_dir, name)) as path:
+                    self._restore_table_data(path, tables, jobs)
+            self._pg_restore(archive_path, jobs, ['--section=post-data'])
+    
+    def _restore_table_data(self, archive_path: str, tables: Dict[str, Dict[str, Any]], jobs: int) -> None:
+        """
+        Restore the rows of some tables from an archive, selected through a pg_restore TOC list.
+        
+        The TOC entries are matched by the OID of the table recorded in the
+        chain, since the names in the list are not quoted and may hold spaces.
+        Chains written before the OID was recorded are matched by name.
+        
+        Args:
+            archive_path: Path to the dump file or dump directory
+            tables: Chain entries of the tables by 'schema.name'
+            jobs: Number of parallel pg_restore jobs
+        """
+        by_oid = {str(entry['oid']): table for table, entry in tables.items() if entry.get('oid')}
+        by_name = {table for table, entry in tables.items() if not entry.get('oid')}
+        
+        entries = []
+        found = set()
+        for line in self._query(['pg_restore', '-l', archive_path]).splitlines():
+            match = self.TOC_TABLE_DATA_PATTERN.match(line)
+            if not match:
+                continue
+            table = by_oid.get(match.group('oid'))
+            if table is None:
+                # <schema> <name> <owner>
+                table = '.'.join(match.group('item').rsplit(' ', 1)[0].split(' ', 1))
+                if table not in by_name:
+                    continue
+            if table not in found:
+                entries.append(line)
+                found.add(table)
+        
+        missing = set(tables) - found
+        if missing:
+            raise DatabaseBackupError(f"{archive_path} holds no rows of {', '.join(sorted(missing))}")
+        
+        list_file = f"{archive_path.rstrip(os.sep)}.list"
+        with open(list_file, 'w') as f:
+            f.write('\n'.join(entries) + '\n')
+        try:
+            self._pg_restore(archive_path, jobs, ['--section=data', '-L', list_file])
+        finally:
+            os.remove(list_file)
+    
+    def _restore_base_backup(self, backup_file: str) -> None:
+        """
+        Unpack a base backup into a data directory set up for point-in-time recovery.
+        
+        The archived WAL from the start of the backup on is restored into the
+        data directory, and the recovery settings make PostgreSQL replay it
+        up to the recovery target (``--at``), or to the last transaction
+        archived, when it is started on the directory. The files take the
+        owner of the data directory.
+        
+        Args:
+            backup_file: Path to the '.base.tar.gz' backup (optionally encrypted)
+        
+        Raises:
+            DatabaseBackupError: If the data directory is not empty or restore fails
+        """
+        data_dir = self.config.get('restore_data_dir')
+        if not data_dir:
+            raise DatabaseBackupError("Base backups are restored into the data directory of a stopped "
+                                      "server, choose it with --data-dir")
+        if os.path.isdir(data_dir) and os.listdir(data_dir):
+            raise DatabaseBackupError(f"Data directory {data_dir} is not empty")
+        os.makedirs(data_dir, exist_ok=True)
+        os.chmod(data_dir, 0o700)
+        
+        recovery = (read_manifest(backup_file) or {}).get('recovery') or self._read_backup_label(backup_file)
+        
+        progress = self._create_progress(f"Unpacking {os.path.basename(backup_file)}", os.path.getsize(backup_file))
+        try:
+            with open_archive_reader(backup_file, on_read=progress.update, encryption=self.decryption) as reader:
+                with tarfile.open(fileobj=reader, mode='r|gz') as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(data_dir, filter='data')
+                    else:
+                        tar.extractall(data_dir)
+        except (tarfile.TarError, EncryptionError, OSError) as e:
+            raise DatabaseBackupError(f"Failed to unpack {backup_file}: {e}")
+        progress.finish()
+        
+        # Imported here so dumps and restores of other formats never load the archivers
+        from src.archive import ArchiveError, ArchiverFactory
+        
+        try:
+            archiver = ArchiverFactory.create_archiver('postgresql', self.config)
+            segments = archiver.stage(recovery['start_segment'], os.path.join(data_dir, self.WAL_STAGING_DIR))
+        except (ArchiveError, OSError) as e:
+            raise DatabaseBackupError(f"Failed to restore the archived WAL: {e}")
+        
+        target = self._write_recovery_config(data_dir)
+        self._match_owner(data_dir)
+        
+        self.logger.info(f"Restored base backup into {data_dir} with {segments} archived WAL segments "
+                         f"from {recovery['start_segment']}; start PostgreSQL on it to recover to {target}")
+    
+    def _write_recovery_config(self, data_dir: str) -> str:
+        """
+        Configure a restored data directory for targeted recovery.
+        
+        Returns:
+            str: Description of the recovery target, for the log
+        """
+        settings = [
+            f"restore_command = 'cp {self.WAL_STAGING_DIR}/%f \"%p\"'",
+            f"recovery_end_command = 'rm -rf {self.WAL_STAGING_DIR}'",
+            "recovery_target_action = 'promote'",
+        ]
+        
+        target = 'the last archived transaction'
+        if self.config.get('recovery_target') is not None:
+            moment = datetime.fromtimestamp(self.config['recovery_target']).astimezone()
+            target = moment.isoformat(sep=' ', timespec='seconds')
+            settings.append(f"recovery_target_time = '{target}'")
+        
+        # postgresql.auto.conf is read last, so these settings win over postgresql.conf
+        with open(os.path.join(data_dir, 'postgresql.auto.conf'), 'a') as f:
+            f.write("\n# Point-in-time recovery set up by db-backup restore.py\n")
+            f.write('\n'.join(settings) + '\n')
+        open(os.path.join(data_dir, 'recovery.signal'), 'w').close()
+        
+        return target
+    
+    def _match_owner(self, data_dir: str) -> None:
+        """Give the restored files to the owner of the data directory (PostgreSQL refuses others)."""
+        stat = os.stat(data_dir)
+        if os.geteuid() != 0 or stat.st_uid == 0:
+            return
+        
+        for root, directories, files in os.walk(data_dir):
+            for name in [*directories, *files]:
+                os.lchown(os.path.join(root, name), stat.st_uid, stat.st_gid)
+    
     def backup(self) -> str:
         """
         Perform PostgreSQL database backup.
@@ -49,19 +500,40 @@ class PostgreSQLDatabase(BaseDatabase):
         Raises:
             DatabaseBackupError: If backup fails
         """
+        if self.dump_format == 'base':
+            return self._backup_base()
+        
+        if self.dump_format != 'plain':
+            return self._backup_archive_format()
+        
+        if self.incremental_enabled:
+            raise DatabaseBackupError("BACKUP_INCREMENTAL needs PG_DUMP_FORMAT=custom or directory")
+        
+        self._check_plain_encryption()
+        
+        # Get backup command
+        command = self.throttle.wrap_command(self.get_backup_command())
+        
+        if self.streaming:
+            self.logger.info("Starting PostgreSQL streaming backup")
+            self._start_table_progress(from_output=True)
+            backup_filepath = self._stream_backup(command)
+            self._finish_dump_progress()
+            self.logger.info(f"PostgreSQL backup completed successfully: {backup_filepath}")
+            return backup_filepath
+        
         backup_filename = self._generate_backup_filename('sql')
         backup_filepath = os.path.join(self.backup_dir, backup_filename)
         
         self.logger.info(f"Starting PostgreSQL backup to {backup_filepath}")
         
-        # Get backup command
-        command = self.get_backup_command()
-        
         # Run backup command
+        self._start_table_progress(from_output=True)
         success = self._run_command(command, backup_filepath)
         
         if not success:
             raise DatabaseBackupError("PostgreSQL backup failed")
+        self._finish_dump_progress()
         
         # Verify backup file was created and has content
         if not os.path.exists(backup_filepath):
@@ -72,3 +544,295 @@ class PostgreSQLDatabase(BaseDatabase):
         
         self.logger.info(f"PostgreSQL backup completed successfully: {backup_filepath}")
         return backup_filepath
+    
+    def _backup_archive_format(self) -> str:
+        """
+        Perform a custom (-Fc) or parallel directory (-Fd -j N) format backup.
+        
+        Directory dumps are packaged into a single tar archive so they are
+        tracked as one backup artifact. With encryption, custom dumps are
+        written to stdout and encrypted on the way, directory dumps while
+        they are packaged. Incremental backups leave out the rows of the
+        tables that did not change since the previous backup.
+        
+        Returns:
+            str: Path to the backup file
+            
+        Raises:
+            DatabaseBackupError: If backup fails
+        """
+        base_name = os.path.splitext(self._generate_backup_filename('sql'))[0]
+        extension = self.DUMP_FORMATS[self.dump_format]
+        backup_filepath = os.path.join(self.backup_dir, f"{base_name}.{extension}")
+        if self.encryption is not None:
+            backup_filepath = self.encryption.get_encrypted_name(backup_filepath)
+        
+        if self.dump_format == 'directory':
+            output_path = os.path.join(self.backup_dir, f"{base_name}.dir.part")
+        else:
+            output_path = f"{backup_filepath}.part"
+        
+        self.logger.info(f"Starting PostgreSQL {self.dump_format} format backup to {backup_filepath}")
+        
+        unchanged = self._plan_incremental(backup_filepath) if self.incremental_enabled else []
+        
+        # The output is compressed, the progress follows the tables pg_dump reports done
+        self._start_table_progress(from_output=False, exclude=unchanged)
+        
+        if self.dump_format == 'custom' and (self.throttle.dump.limited or self.encryption is not None):
+            # Custom dumps are written to stdout so the output can be rate limited and encrypted
+            command = self.throttle.wrap_command(self.get_backup_command(exclude_table_data=unchanged))
+            success = self._run_command(command, output_path, encrypt=self.encryption is not None)
+        else:
+            command = self.throttle.wrap_command(self.get_backup_command(output_path, unchanged))
+            success = self._run_command(command)
+        
+        if not success:
+            if os.path.isdir(output_path):
+                shutil.rmtree(output_path)
+            elif os.path.exists(output_path):
+                os.remove(output_path)
+            raise DatabaseBackupError("PostgreSQL backup failed")
+        self._finish_dump_progress()
+        
+        if not os.path.exists(output_path):
+            raise DatabaseBackupError("Backup file was not created")
+        
+        if self.dump_format == 'directory':
+            self._package_directory(output_path, backup_filepath, base_name)
+        else:
+            os.replace(output_path, backup_filepath)
+        
+        # pg_dump already compressed the data
+        self.output_compressed = True
+        
+        self.logger.info(f"PostgreSQL backup completed successfully: {backup_filepath}")
+        return backup_filepath
+    
+    def _backup_base(self) -> str:
+        """
+        Perform a base backup of the whole cluster with pg_basebackup.
+        
+        The gzipped tar is written to stdout, so it can be rate limited and
+        encrypted on the way. The start of the WAL the backup needs is read
+        from its backup label for the manifest.
+        
+        Returns:
+            str: Path to the backup file
+            
+        Raises:
+            DatabaseBackupError: If backup fails
+        """
+        if self.incremental_enabled:
+            raise DatabaseBackupError("BACKUP_INCREMENTAL needs PG_DUMP_FORMAT=custom or directory")
+        
+        backup_filepath = os.path.join(self.backup_dir, self._generate_backup_filename(self.DUMP_FORMATS['base']))
+        if self.encryption is not None:
+            backup_filepath = self.encryption.get_encrypted_name(backup_filepath)
+        output_path = f"{backup_filepath}.part"
+        
+        self.logger.info(f"Starting PostgreSQL base backup to {backup_filepath}")
+        
+        command = self.throttle.wrap_command(self.get_backup_command())
+        # pg_basebackup reports the kB copied, the output is compressed
+        self._start_dump_progress(from_output=False)
+        if not self._run_command(command, output_path, encrypt=self.encryption is not None):
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise DatabaseBackupError("PostgreSQL base backup failed")
+        self._finish_dump_progress()
+        
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            raise DatabaseBackupError("Backup file is empty")
+        
+        os.replace(output_path, backup_filepath)
+        
+        # pg_basebackup already compressed the data
+        self.output_compressed = True
+        self.recovery_start = self._read_backup_label(backup_filepath)
+        
+        self.logger.info(f"PostgreSQL base backup completed successfully: {backup_filepath} "
+                         f"(WAL from {self.recovery_start['start_segment']})")
+        return backup_filepath
+    
+    def _read_backup_label(self, backup_file: str) -> Dict[str, Any]:
+        """
+        Read where the WAL replay of a base backup starts from its backup label.
+        
+        The label is the first file of the tar, so only the start of the
+        archive is read.
+        
+        Returns:
+            Dict[str, Any]: Start LSN, segment and timeline for the manifest
+        
+        Raises:
+            DatabaseBackupError: If the archive has no readable backup label
+        """
+        label = None
+        try:
+            with open_archive_reader(backup_file, encryption=self.decryption) as reader:
+                with tarfile.open(fileobj=reader, mode='r|gz') as tar:
+                    for member in tar:
+                        if os.path.normpath(member.name) == 'backup_label':
+                            label = tar.extractfile(member).read().decode('utf-8', errors='replace')
+                            break
+        except (tarfile.TarError, EncryptionError, OSError) as e:
+            raise DatabaseBackupError(f"Failed to read the backup label of {backup_file}: {e}")
+        
+        # START WAL LOCATION: 0/2000028 (file 000000010000000000000002)
+        location = re.search(r'^START WAL LOCATION: (\S+) \(file ([0-9A-F]{24})\)', label or '', re.MULTILINE)
+        if not location:
+            raise DatabaseBackupError(f"{backup_file} has no backup label")
+        timeline = re.search(r'^START TIMELINE: (\d+)', label, re.MULTILINE)
+        
+        return {
+            'method': 'wal',
+            'start_lsn': location.group(1),
+            'start_segment': location.group(2),
+            'timeline': int(timeline.group(1)) if timeline else int(location.group(2)[:8], 16),
+        }
+    
+    def _start_table_progress(self, from_output: bool, exclude: Optional[List[Tuple[str, str]]] = None) -> None:
+        """
+        Start the dump progress, expecting the size of the tables whose rows are dumped.
+        
+        Args:
+            from_output: Count the bytes of the plain dump; otherwise a table
+                counts with its size once pg_dump is done with it
+            exclude: Tables (schema, name) dumped without their rows
+        """
+        psql = ['psql', *self.get_connection_args(), '-X', '-A', '-t', '-F', '\t', '-c', self.TABLE_SIZES_QUERY]
+        try:
+            output = self._query(psql)
+        except DatabaseBackupError as e:
+            self.logger.warning(f"Failed to read the table sizes, the dump progress has no total: {e}")
+            output = ''
+        
+        excluded = {f"{schema}.{name}" for schema, name in exclude or []}
+        self._table_sizes = {}
+        for line in output.splitlines():
+            fields = line.split('\t')
+            if len(fields) == 3 and f"{fields[0]}.{fields[1]}" not in excluded:
+                self._table_sizes[f"{fields[0]}.{fields[1]}"] = int(fields[2])
+        
+        self._dumping = []
+        self._parallel_dump = self.dump_format == 'directory' and self.get_dump_jobs() > 1
+        self._start_dump_progress(sum(self._table_sizes.values()) or None, len(self._table_sizes) or None,
+                                  from_output=from_output)
+    
+    def _parse_progress_line(self, line: str) -> None:
+        if self.dump_format == 'base':
+            match = self.BASE_PROGRESS_PATTERN.match(line)
+            if match:
+                self.dump_progress.update_to(int(match.group(1)) * 1024, int(match.group(2)) * 1024)
+            return
+        
+        match = self.DUMP_TABLE_PATTERN.search(line)
+        if match:
+            if not self._parallel_dump and self._dumping:
+                self._finish_table(self._dumping.pop())
+            self._dumping.append(match.group(1))
+            self.dump_progress.step(match.group(1))
+            return
+        
+        match = self.FINISHED_TABLE_PATTERN.search(line)
+        if match:
+            for table in self._dumping:
+                if table.endswith(f".{match.group(1)}"):
+                    self._dumping.remove(table)
+                    self._finish_table(table)
+                    break
+    
+    def _finish_table(self, table: str) -> None:
+        """Count a table whose rows were dumped, unless the dump output is counted."""
+        if not self._progress_from_output:
+            self.dump_progress.update(self._table_sizes.get(table, 0))
+    
+    def _finish_dump_progress(self) -> None:
+        # The tables still listed are done once pg_dump exited
+        while self._dumping:
+            self._finish_table(self._dumping.pop())
+        super()._finish_dump_progress()
+    
+    def _read_table_stats(self) -> Tuple[Dict[str, Any], Dict[str, Tuple[str, str, str]]]:
+        """
+        Read the statistics lifetime of the server and the change signature of every table.
+        
+        Returns:
+            Tuple: Server start, last statistics reset and time of the reading
+            ('server', 'stats_reset', 'stats_read_at'), and (schema, name,
+            OID, signature) by 'schema.name'
+        
+        Raises:
+            DatabaseBackupError: If the statistics cannot be read
+        """
+        psql = ['psql', *self.get_connection_args(), '-X', '-A', '-t', '-F', '\t', '-c']
+        fields = self._query([*psql, self.SERVER_STATS_QUERY]).strip().split('\t')
+        if len(fields) != 3:
+            raise DatabaseBackupError(f"Unexpected statistics of the database: {fields}")
+        server = {'server': fields[0], 'stats_reset': float(fields[1]), 'stats_read_at': float(fields[2])}
+        
+        tables = {}
+        for line in self._query([*psql, self.TABLE_STATS_QUERY]).splitlines():
+            fields = line.split('\t')
+            if len(fields) == 4:
+                tables[f"{fields[0]}.{fields[1]}"] = (fields[0], fields[1], int(fields[2]), fields[3])
+        return server, tables
+    
+    def _plan_incremental(self, backup_filepath: str) -> List[Tuple[str, str]]:
+        """
+        Compare the table statistics with the previous backup and pick the tables to leave out.
+        
+        Tables whose signature did not change keep pointing at the backup
+        that holds their rows; the chain is kept in ``self.incremental`` for
+        the manifest. A full backup is taken when the server restarted or
+        the statistics were reset after the previous backup read them.
+        
+        The row counters are cumulative statistics that PostgreSQL flushes
+        asynchronously (about every second by active sessions, up to 10
+        seconds by idle ones on PostgreSQL 15 and later, through the lossy
+        statistics collector before). A table written in that window before
+        the run, without changing its size, is taken from the earlier backup;
+        its counters change once they are flushed, so the next backup dumps it.
+        
+        Args:
+            backup_filepath: Path of the new backup
+        
+        Returns:
+            List[Tuple[str, str]]: Unchanged tables (schema, name), dumped without rows
+        """
+        chain_format = f"postgresql-{self.dump_format}"
+        try:
+            server, stats = self._read_table_stats()
+        except DatabaseBackupError as e:
+            self.logger.warning(f"Failed to read the table statistics, taking a full backup: {e}")
+            return []
+        
+        parent = self._load_parent_backup(chain_format)
+        if parent and parent.get('server') != server['server']:
+            self.logger.info("Taking a full backup: the server restarted since the previous backup")
+            parent = None
+        elif parent and server['stats_reset'] >= float(parent.get('stats_read_at') or 0):
+            self.logger.info("Taking a full backup: the statistics were reset since the previous backup")
+            parent = None
+        
+        filename = os.path.basename(backup_filepath)
+        previous = parent.get('tables', {}) if parent else {}
+        tables = {}
+        unchanged = []
+        for table, (schema, name, oid, signature) in stats.items():
+            entry = previous.get(table)
+            # A table recreated under the same name is a new table
+            if entry and entry['signature'] == signature and entry.get('oid', oid) == oid:
+                tables[table] = entry
+                unchanged.append((schema, name))
+            else:
+                tables[table] = {'signature': signature, 'archive': filename, 'oid': oid}
+        
+        requires = sorted({entry['archive'] for entry in tables.values()} - {filename})
+        self.incremental = self._describe_chain(backup_filepath, chain_format, parent, requires,
+                                                **server, tables=tables)
+        if parent:
+            self.logger.info(f"Incremental backup: {len(stats) - len(unchanged)} of {len(stats)} tables "
+                             f"changed since {self.incremental['parent']}")
+        return unchanged
@@ -29,6 +29,12 @@ class Translator:
                 'backup_compressed': 'Backup compressed: {file} ({size:.1f} MB)',
                 'backup_process_completed': 'Backup process completed successfully in {duration}',
                 'unexpected_error': 'Unexpected error during backup: {error}',
+                'backup_jobs_starting': 'Running {count} backup jobs with {workers} workers ({per_host} per host)',
+                'backup_job_result': 'Job {name}: {status} in {duration}',
+                'backup_job_ok': 'OK',
+                'backup_job_failed': 'FAILED',
+                'backup_job_degraded': 'DEGRADED',
+                'backup_jobs_summary': 'Backup summary: {succeeded}/{total} jobs succeeded in {duration}',
                 
                 # Database details
                 'database_details': 'Database Details',
@@ -42,12 +48,37 @@ class Translator:
                 'backup_size': 'Size',
                 'backup_duration': 'Duration',
                 'backup_timestamp': 'Timestamp',
+                'backup_checksum': 'Checksum',
+                'backup_remote': 'Stored at',
                 
                 # Notification messages
                 'notification_init_success': 'Initialized {count} notification providers',
                 'notification_init_none': 'No notification providers enabled',
                 'notification_init_failed': 'Failed to initialize notifiers: {error}',
                 'notification_send_failed': 'Failed to send notification via {provider}: {error}',
+                'notification_timeout': 'Notification via {provider} did not finish within {duration}, continuing without it',
+                'notification_budget_exceeded': 'Notification via {provider} may need {timeout} but NOTIFICATION_TIMEOUT allows {budget}, raise it for large backups',
+                'backup_verify_failed': 'Verification failed for {file}: {status}',
+                'restore_starting': 'Restoring {file} ({size:.1f} MB) into database {database}',
+                'restore_starting_data_dir': 'Restoring {file} ({size:.1f} MB) into data directory {path}',
+                'restore_completed': 'Restore completed in {duration}',
+                'restore_failed': 'Restore failed: {error}',
+                'restore_no_backup': 'No backup found for {name}',
+                'backup_phases': 'Backup phases: {phases}',
+                'backup_throttled': 'Rate limits delayed the backups by {duration}',
+                'storage_init_success': 'Storage targets: {targets}',
+                'backup_uploaded': 'Backup stored at {uri}',
+                'backup_upload_failed': 'Failed to upload the backup to {storage}: {error}',
+                'backup_degraded': 'Backup kept locally at {file}, but storing it on the storage targets failed: {error}',
+                'backup_remote_removed': 'Removed old remote backup: {uri}',
+                'storage_prune_failed': 'Failed to remove old backups from {storage}: {error}',
+                'catalog_indexing': 'Creating backup catalog {path} from the existing backups',
+                'catalog_unavailable': 'Backup catalog {path} unavailable, scanning the backup directory instead: {error}',
+                'backup_unchanged': 'Database unchanged since the last backup, keeping {file}',
+                'backup_unchanged_expired': 'Database unchanged but {file} is older than {hours:g} hours, taking a new backup',
+                'archive_init_failed': 'Failed to start continuous archiving of {name}: {error}',
+                'archive_pruned': 'Removed {count} archived log files ({first} to {last}) older than the oldest kept backup',
+                'archive_prune_failed': 'Failed to remove old files from the log archive: {error}',
                 
                 # Validation messages
                 'config_missing_fields': 'Missing required configuration values: {fields}',
@@ -83,6 +114,12 @@ class Translator:
                 'backup_compressed': 'پشتیبان فشرده شد: {file} ({size:.1f} مگابایت)',
                 'backup_process_completed': 'فرآیند پشتیبان‌گیری با موفقیت در {duration} تکمیل شد',
                 'unexpected_error': 'خطای غیرمنتظره در حین پشتیبان‌گیری: {error}',
+                'backup_jobs_starting': 'اجرای {count} کار پشتیبان‌گیری با {workers} کارگر ({per_host} برای هر میزبان)',
+                'backup_job_result': 'کار {name}: {status} در {duration}',
+                'backup_job_ok': 'موفق',
+                'backup_job_failed': 'ناموفق',
+                'backup_job_degraded': 'ناقص',
+                'backup_jobs_summary': 'خلاصه پشتیبان‌گیری: {succeeded} از {total} کار در {duration} موفق بود',
                 
                 # Database details
                 'database_details': 'جزئیات پایگاه داده',
@@ -96,12 +133,37 @@ class Translator:
                 'backup_size': 'اندازه',
                 'backup_duration': 'مدت زمان',
                 'backup_timestamp': 'زمان',
+                'backup_checksum': 'چک‌سام',
+                'backup_remote': 'محل ذخیره',
                 
                 # Notification messages
                 'notification_init_success': '{count} ارائه‌دهنده اطلاع‌رسانی راه‌اندازی شد',
                 'notification_init_none': 'هیچ ارائه‌دهنده اطلاع‌رسانی فعال نیست',
                 'notification_init_failed': 'راه‌اندازی اطلاع‌رسان‌ها ناموفق بود: {error}',
                 'notification_send_failed': 'ارسال اطلاع‌رسانی از طریق {provider} ناموفق بود: {error}',
+                'notification_timeout': 'اطلاع‌رسانی از طریق {provider} در {duration} تمام نشد، ادامه بدون آن',
+                'notification_budget_exceeded': 'اطلاع‌رسانی از طریق {provider} ممکن است {timeout} طول بکشد اما NOTIFICATION_TIMEOUT فقط {budget} است، برای پشتیبان‌های بزرگ آن را افزایش دهید',
+                'backup_verify_failed': 'بررسی صحت {file} ناموفق بود: {status}',
+                'restore_starting': 'بازیابی {file} ({size:.1f} مگابایت) در پایگاه داده {database}',
+                'restore_starting_data_dir': 'بازیابی {file} ({size:.1f} مگابایت) در پوشه داده {path}',
+                'restore_completed': 'بازیابی در {duration} تکمیل شد',
+                'restore_failed': 'بازیابی ناموفق بود: {error}',
+                'restore_no_backup': 'هیچ پشتیبانی برای {name} یافت نشد',
+                'backup_phases': 'مراحل پشتیبان‌گیری: {phases}',
+                'backup_throttled': 'محدودیت سرعت، پشتیبان‌گیری را {duration} به تأخیر انداخت',
+                'storage_init_success': 'مقصدهای ذخیره‌سازی: {targets}',
+                'backup_uploaded': 'پشتیبان در {uri} ذخیره شد',
+                'backup_upload_failed': 'بارگذاری پشتیبان در {storage} ناموفق بود: {error}',
+                'backup_degraded': 'پشتیبان به صورت محلی در {file} نگه داشته شد، اما ذخیره آن در مقصدهای ذخیره‌سازی ناموفق بود: {error}',
+                'backup_remote_removed': 'پشتیبان قدیمی راه دور حذف شد: {uri}',
+                'storage_prune_failed': 'حذف پشتیبان‌های قدیمی از {storage} ناموفق بود: {error}',
+                'catalog_indexing': 'ایجاد فهرست پشتیبان {path} از پشتیبان‌های موجود',
+                'catalog_unavailable': 'فهرست پشتیبان {path} در دسترس نیست، به جای آن پوشه پشتیبان بررسی می‌شود: {error}',
+                'backup_unchanged': 'پایگاه داده از آخرین پشتیبان تغییری نکرده است، {file} نگه داشته می‌شود',
+                'backup_unchanged_expired': 'پایگاه داده تغییری نکرده اما {file} قدیمی‌تر از {hours:g} ساعت است، پشتیبان جدید گرفته می‌شود',
+                'archive_init_failed': 'شروع بایگانی پیوسته {name} ناموفق بود: {error}',
+                'archive_pruned': '{count} فایل لاگ بایگانی‌شده ({first} تا {last}) قدیمی‌تر از قدیمی‌ترین پشتیبان نگه‌داشته‌شده حذف شد',
+                'archive_prune_failed': 'حذف فایل‌های قدیمی از بایگانی لاگ ناموفق بود: {error}',
                 
                 # Validation messages
                 'config_missing_fields': 'مقادیر تنظیمات مورد نیاز موجود نیست: {fields}',
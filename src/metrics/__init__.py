@@ -0,0 +1,11 @@
+"""
+Backup metrics modules.
+"""
+from .metrics import JobMetrics, MetricsError, MetricsRegistry, MetricsServer
+
+__all__ = [
+    'JobMetrics',
+    'MetricsError',
+    'MetricsRegistry',
+    'MetricsServer',
+]
@@ -0,0 +1,351 @@
+"""
+Per-phase backup metrics in the Prometheus text exposition format.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.utils import format_duration
+
+
+class MetricsError(Exception):
+    """Custom exception for metrics errors."""
+    pass
+
+
+PREFIX = 'db_backup'
+
+# name: (type, help)
+METRICS = {
+    'last_run_timestamp_seconds': ('gauge', 'Start time of the last backup run of the job'),
+    'last_success_timestamp_seconds': ('gauge', 'Start time of the last successful backup of the job'),
+    'last_success': ('gauge', 'Whether the last backup of the job succeeded (1) or failed (0)'),
+    'last_unchanged': ('gauge', 'Whether the last run kept the previous backup of the unchanged database (1) or not (0)'),
+    'duration_seconds': ('gauge', 'Total duration of the last backup of the job'),
+    'phase_duration_seconds': ('gauge', 'Duration of each phase of the last backup'),
+    'phase_bytes': ('gauge', 'Bytes processed by each phase of the last backup'),
+    'phase_throughput_megabytes_per_second': ('gauge', 'Throughput of each phase of the last backup in MB/s'),
+    'size_bytes': ('gauge', 'Size of the artifacts of the last backup (dump and archive)'),
+    'compression_ratio': ('gauge', 'Uncompressed dump size divided by archive size of the last backup'),
+    'notification_duration_seconds': ('gauge', 'Time spent by each notifier on the last backup'),
+    'notification_success': ('gauge', 'Whether each notifier delivered the last backup (1) or not (0)'),
+    'runs_total': ('counter', 'Backup runs since the process started, by status'),
+    'archive_up': ('gauge', 'Whether the continuous archiver of the job is receiving the log (1) or not (0)'),
+    'archive_last_archived_timestamp_seconds': ('gauge', 'Time the continuous archiver of the job last archived a log file'),
+}
+
+
+class JobMetrics:
+    """
+    Timings and byte counts of one backup job.
+    
+    Phases are timed with :meth:`phase` and may be given the number of bytes
+    they processed, from which the throughput is derived.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.duration = 0.0
+        self.success = False
+        # Set when the database was unchanged and no new backup was taken
+        self.unchanged = False
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.sizes: Dict[str, int] = {}
+        self.notifications: Dict[str, Dict[str, Any]] = {}
+    
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[Dict[str, float]]:
+        """
+        Time a phase.
+        
+        The yielded dict accepts a ``bytes`` entry with the amount of data the
+        phase processed.
+        """
+        entry: Dict[str, float] = {'bytes': 0}
+        start = time.monotonic()
+        try:
+            yield entry
+        finally:
+            self.record(phase, time.monotonic() - start, entry['bytes'])
+    
+    def record(self, phase: str, duration: float, size: float = 0) -> None:
+        """Record the duration and bytes of a phase."""
+        self.phases[phase] = {'duration': duration, 'bytes': size}
+    
+    def record_notification(self, provider: str, duration: float, success: bool) -> None:
+        """Record the outcome of one notifier."""
+        self.notifications[provider] = {'duration': duration, 'success': success}
+    
+    def finish(self, success: bool) -> None:
+        """Mark the job as finished."""
+        self.success = success
+        self.duration = time.time() - self.started
+    
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """Uncompressed dump size divided by archive size, None if unknown."""
+        dump, archive = self.sizes.get('dump'), self.sizes.get('archive')
+        if not dump or not archive:
+            return None
+        return dump / archive
+    
+    @staticmethod
+    def throughput(entry: Dict[str, float]) -> float:
+        """Throughput of a phase in MB/s."""
+        if not entry['bytes'] or entry['duration'] <= 0:
+            return 0.0
+        return entry['bytes'] / (1024 * 1024) / entry['duration']
+    
+    def describe(self) -> str:
+        """Summarize the phases in one line."""
+        parts = []
+        for phase, entry in self.phases.items():
+            part = f"{phase} {format_duration(entry['duration'])}"
+            if entry['bytes']:
+                part += f" ({self.throughput(entry):.1f} MB/s)"
+            parts.append(part)
+        for provider, entry in self.notifications.items():
+            status = '' if entry['success'] else ', failed'
+            parts.append(f"{provider} {format_duration(entry['duration'])}{status}")
+        if self.compression_ratio:
+            parts.append(f"ratio {self.compression_ratio:.2f}")
+        return ', '.join(parts)
+
+
+class MetricsRegistry:
+    """
+    Latest metrics of every job, rendered in the Prometheus text format.
+    
+    The output suits the node_exporter textfile collector (:meth:`write_textfile`)
+    and the HTTP endpoint of the scheduler daemon (:class:`MetricsServer`).
+    """
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._jobs: Dict[str, JobMetrics] = {}
+        self._last_success: Dict[str, float] = {}
+        self._runs: Dict[Tuple[str, str], int] = {}
+        # Continuous archivers, read on every render
+        self._archivers: List[Any] = []
+        self._lock = threading.Lock()
+    
+    def add(self, job: JobMetrics) -> None:
+        """Store the metrics of a finished job."""
+        status = 'success' if job.success else 'failure'
+        with self._lock:
+            self._jobs[job.name] = job
+            self._runs[(job.name, status)] = self._runs.get((job.name, status), 0) + 1
+            if job.success:
+                self._last_success[job.name] = job.started
+    
+    def add_archiver(self, archiver: Any) -> None:
+        """Report the state of a running continuous archiver."""
+        with self._lock:
+            self._archivers.append(archiver)
+    
+    def get(self, name: str) -> Optional[JobMetrics]:
+        """Get the metrics of the latest run of a job."""
+        with self._lock:
+            return self._jobs.get(name)
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            last_success = dict(self._last_success)
+            runs = dict(self._runs)
+            archivers = list(self._archivers)
+        
+        samples: Dict[str, List[Tuple[Dict[str, str], float]]] = {name: [] for name in METRICS}
+        
+        for job in jobs:
+            labels = {'job': job.name}
+            samples['last_run_timestamp_seconds'].append((labels, job.started))
+            samples['last_success'].append((labels, 1 if job.success else 0))
+            samples['last_unchanged'].append((labels, 1 if job.unchanged else 0))
+            samples['duration_seconds'].append((labels, job.duration))
+            if job.name in last_success:
+                samples['last_success_timestamp_seconds'].append((labels, last_success[job.name]))
+            
+            for phase, entry in job.phases.items():
+                phase_labels = {**labels, 'phase': phase}
+                samples['phase_duration_seconds'].append((phase_labels, entry['duration']))
+                samples['phase_bytes'].append((phase_labels, entry['bytes']))
+                samples['phase_throughput_megabytes_per_second'].append(
+                    (phase_labels, JobMetrics.throughput(entry))
+                )
+            
+            for artifact, size in job.sizes.items():
+                samples['size_bytes'].append(({**labels, 'artifact': artifact}, size))
+            if job.compression_ratio:
+                samples['compression_ratio'].append((labels, job.compression_ratio))
+            
+            for provider, entry in job.notifications.items():
+                provider_labels = {**labels, 'provider': provider}
+                samples['notification_duration_seconds'].append((provider_labels, entry['duration']))
+                samples['notification_success'].append((provider_labels, 1 if entry['success'] else 0))
+        
+        for (name, status), count in sorted(runs.items()):
+            samples['runs_total'].append(({'job': name, 'status': status}, count))
+        
+        for archiver in archivers:
+            labels = {'job': archiver.job}
+            samples['archive_up'].append((labels, 1 if archiver.running else 0))
+            if archiver.last_archived is not None:
+                samples['archive_last_archived_timestamp_seconds'].append((labels, archiver.last_archived))
+        
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            if not samples[name]:
+                continue
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for labels, value in samples[name]:
+                lines.append(f"{metric}{{{self._format_labels(labels)}}} {self._format_value(value)}")
+        
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _format_value(value: float) -> str:
+        """Format a sample value (integers without a fraction, floats at full precision)."""
+        if float(value).is_integer():
+            return str(int(value))
+        return repr(float(value))
+    
+    @staticmethod
+    def _format_labels(labels: Dict[str, str]) -> str:
+        """Format a label set, escaping backslashes, quotes and newlines."""
+        escaped = (
+            (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, value in labels.items()
+        )
+        return ','.join(f'{key}="{value}"' for key, value in escaped)
+    
+    def load_last_success(self, path: str) -> int:
+        """
+        Seed the last success times from an earlier metrics textfile.
+        
+        One-shot runs start with an empty registry; without this a failed
+        run would drop ``last_success_timestamp_seconds`` from the file and
+        alerts on the age of the last success would lose their input. Jobs
+        that succeeded in this process keep their own, newer time.
+        
+        Args:
+            path: Path to the textfile written by an earlier run
+        
+        Returns:
+            int: Number of jobs seeded
+        """
+        pattern = re.compile(rf'^{PREFIX}_last_success_timestamp_seconds\{{job="((?:[^"\\]|\\.)*)"\}} (\S+)$')
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            self.logger.warning(f"Failed to read the last success times from {path}: {e}")
+            return 0
+        
+        seeded = 0
+        for line in lines:
+            match = pattern.match(line)
+            if not match:
+                continue
+            name = re.sub(r'\\(.)', lambda escape: '\n' if escape.group(1) == 'n' else escape.group(1),
+                          match.group(1))
+            try:
+                value = float(match.group(2))
+            except ValueError:
+                continue
+            with self._lock:
+                if name not in self._last_success:
+                    self._last_success[name] = value
+                    seeded += 1
+        return seeded
+    
+    def write_textfile(self, path: str) -> None:
+        """
+        Write the metrics to a file for the node_exporter textfile collector.
+        
+        The file is written under a temporary name and renamed, so the
+        collector never reads a partial file. The last success times of the
+        file being replaced are kept for the jobs without a success yet.
+        
+        Raises:
+            MetricsError: If the file cannot be written
+        """
+        self.load_last_success(path)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+        except OSError as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise MetricsError(f"Failed to write metrics to {path}: {e}")
+
+
+class MetricsServer:
+    """Serve the metrics of a registry over HTTP on ``/metrics`` from a daemon thread."""
+    
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    
+    def __init__(self, registry: MetricsRegistry, port: int, address: str = '0.0.0.0'):
+        self.registry = registry
+        self.port = port
+        self.address = address
+        self.logger = logging.getLogger(__name__)
+        self._server = None
+    
+    def start(self) -> None:
+        """
+        Start serving in the background.
+        
+        Raises:
+            MetricsError: If the port cannot be bound
+        """
+        # http.server pulls in http.client and the email parser, so it is
+        # only imported by the daemon when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        registry = self.registry
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', MetricsServer.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                # Scrapes would flood the backup log
+                pass
+        
+        try:
+            self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        except OSError as e:
+            raise MetricsError(f"Failed to listen on {self.address}:{self.port}: {e}")
+        
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        thread.start()
+        self.logger.info(f"Serving metrics on http://{self.address}:{self.port}/metrics")
+    
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -2,8 +2,6 @@
 Notification modules.
 """
 from .base import BaseNotifier, NotificationError
-from .telegram import TelegramNotifier
-from .email import EmailNotifier
 from .factory import NotificationFactory
 
 __all__ = [
@@ -13,3 +11,13 @@ __all__ = [
     'EmailNotifier',
     'NotificationFactory',
 ]
+
+
+def __getattr__(name):
+    # The notifier implementations pull in requests and the email modules,
+    # so they are only imported when accessed
+    if name == 'TelegramNotifier':
+        return NotificationFactory.get_notifier_class('telegram')
+    if name == 'EmailNotifier':
+        return NotificationFactory.get_notifier_class('email')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
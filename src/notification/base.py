@@ -18,6 +18,8 @@ class BaseNotifier(ABC):
         self.config = config
         self.logger = logging.getLogger(self.__class__.__name__)
         self.enabled = config.get('enabled', False)
+        # Deadline in seconds for one notification (network timeouts use it too)
+        self.timeout = float(config.get('timeout', 60))
     
     @abstractmethod
     def send_backup_success(self, backup_file: str, message: Optional[str] = None) -> bool:
@@ -46,6 +48,38 @@ class BaseNotifier(ABC):
         """
         pass
     
+    def send_progress(self, message: str) -> bool:
+        """
+        Send the progress of a running backup (BACKUP_PROGRESS_NOTIFY_INTERVAL).
+        
+        Providers that do not support progress messages ignore it.
+        
+        Args:
+            message: Progress line of the backup
+            
+        Returns:
+            bool: True if notification sent successfully
+        """
+        return False
+    
+    def get_timeout(self, backup_file: Optional[str] = None) -> float:
+        """
+        Get the deadline in seconds for one notification.
+        
+        Providers whose upload time depends on the backup size extend it.
+        
+        Args:
+            backup_file: Optional path to the backup file sent with the notification
+            
+        Returns:
+            float: Seconds before the notification is abandoned
+        """
+        return self.timeout
+    
+    def close(self) -> None:
+        """Release connections kept open between notifications."""
+        pass
+    
     def is_enabled(self) -> bool:
         """Check if this notifier is enabled."""
         return self.enabled
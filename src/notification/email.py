@@ -2,18 +2,26 @@
 Email notification implementation.
 """
 import os
+import re
+import uuid
+import base64
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
+from src.compression import CodecFactory
 from .base import BaseNotifier, NotificationError
 
 
 class EmailNotifier(BaseNotifier):
     """Email notification implementation."""
     
+    # Bytes of the attachment encoded at a time (a multiple of 57 bytes, one
+    # 76 character base64 line)
+    ATTACHMENT_CHUNK_SIZE = 57 * 1024
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         
@@ -25,6 +33,14 @@ class EmailNotifier(BaseNotifier):
             self.password = config['password']
             self.from_email = config['from_email']
             self.to_email = config['to_email']
+            # Comma separated recipients all receive the same message
+            self.recipients = [address.strip() for address in self.to_email.split(',') if address.strip()]
+            self.max_attachment_size = int(float(config.get('max_attachment_mb', 10)) * 1024 * 1024)
+            
+            # SMTP connection reused between messages, guarded by a lock
+            # because notifications of concurrent jobs share this notifier
+            self._server: Optional[smtplib.SMTP] = None
+            self._lock = threading.Lock()
     
     def send_backup_success(self, backup_file: str, message: Optional[str] = None) -> bool:
         """
@@ -66,14 +82,15 @@ The backup file is attached to this email (if under size limit).
             body = message or default_body
             msg.attach(MIMEText(body, 'plain'))
             
-            # Attach backup file if it exists and is not too large (10MB limit for email)
-            if os.path.exists(backup_file) and os.path.getsize(backup_file) < 10 * 1024 * 1024:
-                self._attach_file(msg, backup_file)
+            # Attach backup file if it exists and is not too large (EMAIL_MAX_ATTACHMENT_MB)
+            attachment = None
+            if os.path.exists(backup_file) and os.path.getsize(backup_file) < self.max_attachment_size:
+                attachment = backup_file
             else:
                 msg.attach(MIMEText("\nNote: Backup file is too large to attach via email.", 'plain'))
             
             # Send email
-            self._send_email(msg)
+            self._send_email(msg, attachment)
             
             self.logger.info("Email notification sent successfully")
             return True
@@ -127,48 +144,168 @@ Please check the backup system and resolve the issue.
             self.logger.error(f"Failed to send email failure notification: {e}")
             return False
     
-    def _send_email(self, msg: MIMEMultipart) -> None:
+    def _send_email(self, msg: MIMEMultipart, attachment: Optional[str] = None) -> None:
         """
         Send email via SMTP.
         
+        The attachment is base64 encoded while the message is written to the
+        SMTP connection, so it is never held in memory as a whole.
+        
         Args:
             msg: Email message to send
+            attachment: Optional path of a file to attach
             
         Raises:
             NotificationError: If email sending fails
         """
+        with self._lock:
+            try:
+                server = self._get_connection()
+                self._send_data(server, self._iter_message(msg, attachment))
+                
+            except Exception as e:
+                self._close_connection()
+                raise NotificationError(f"Failed to send email: {e}")
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """Return the open SMTP connection, connecting and logging in if needed."""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_connection()
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        server.starttls()
+        server.login(self.username, self.password)
+        
+        self._server = server
+        return server
+    
+    def _close_connection(self) -> None:
+        """Quit the SMTP connection, ignoring errors of a dead connection."""
+        if self._server is None:
+            return
+        
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.username, self.password)
-            
-            text = msg.as_string()
-            server.sendmail(self.from_email, self.to_email, text)
-            server.quit()
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+    
+    def _send_data(self, server: smtplib.SMTP, chunks: Iterator[bytes]) -> None:
+        """
+        Send one message to all recipients using the SMTP MAIL, RCPT and DATA commands.
+        
+        Args:
+            server: Connected SMTP server
+            chunks: Message content with CRLF line endings and dot-stuffing applied
             
-        except Exception as e:
-            raise NotificationError(f"Failed to send email: {e}")
+        Raises:
+            smtplib.SMTPException: If the server rejects the message
+        """
+        server.ehlo_or_helo_if_needed()
+        
+        code, response = server.mail(self.from_email)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, self.from_email)
+        
+        refused = {}
+        for recipient in self.recipients:
+            code, response = server.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        
+        if len(refused) == len(self.recipients):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        
+        if refused:
+            self.logger.warning(f"Recipients refused by the SMTP server: {', '.join(refused)}")
+        
+        code, response = server.docmd('DATA')
+        if code != 354:
+            raise smtplib.SMTPDataError(code, response)
+        
+        for chunk in chunks:
+            server.sock.sendall(chunk)
+        server.sock.sendall(b'.\r\n')
+        
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+    
+    def _iter_message(self, msg: MIMEMultipart, attachment: Optional[str]) -> Iterator[bytes]:
+        """
+        Render the message in chunks ready for the SMTP DATA command.
+        
+        The attachment part is rendered with a placeholder that is replaced by
+        the file content, base64 encoded chunk by chunk.
+        
+        Args:
+            msg: Email message without the attachment
+            attachment: Optional path of a file to attach
+        """
+        marker = None
+        if attachment:
+            marker = f"ATTACHMENT-{uuid.uuid4().hex}"
+            msg.attach(self._create_attachment_part(attachment, marker))
+        
+        rendered = re.sub(rb'\r?\n', b'\r\n', msg.as_bytes())
+        # Lines starting with a dot are doubled so they cannot end DATA early
+        rendered = re.sub(rb'(?m)^\.', b'..', rendered)
+        if not rendered.endswith(b'\r\n'):
+            rendered += b'\r\n'
+        
+        if not marker:
+            yield rendered
+            return
+        
+        head, tail = rendered.split(marker.encode(), 1)
+        yield head
+        
+        with open(attachment, 'rb') as file:
+            while True:
+                data = file.read(self.ATTACHMENT_CHUNK_SIZE)
+                if not data:
+                    break
+                # Base64 lines never start with a dot
+                yield base64.encodebytes(data).replace(b'\n', b'\r\n')
+        
+        yield tail.lstrip(b'\r\n')
     
-    def _attach_file(self, msg: MIMEMultipart, file_path: str) -> None:
+    def _create_attachment_part(self, file_path: str, payload: str) -> MIMEBase:
         """
-        Attach a file to the email message.
+        Create the attachment part of a file.
         
         Args:
-            msg: Email message
             file_path: Path to the file to attach
+            payload: Placeholder replaced by the encoded file when sending
         """
-        with open(file_path, "rb") as attachment:
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(attachment.read())
+        codec = CodecFactory.detect_codec(file_path)
+        maintype, subtype = (codec.mime_type if codec else 'application/octet-stream').split('/', 1)
         
-        encoders.encode_base64(part)
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(payload)
+        part['Content-Transfer-Encoding'] = 'base64'
         
         part.add_header(
             'Content-Disposition',
             f'attachment; filename= {os.path.basename(file_path)}',
         )
         
-        msg.attach(part)
+        return part
+    
+    def close(self) -> None:
+        """Close the SMTP connection unless a message is still being sent."""
+        if self._lock.acquire(blocking=False):
+            try:
+                self._close_connection()
+            finally:
+                self._lock.release()
     
     def _format_file_size(self, file_path: str) -> str:
         """Format file size in human-readable format."""
@@ -1,20 +1,38 @@
 """
 Notification factory for creating notification instances.
 """
-from typing import Dict, Any, List
+import importlib
+from typing import Dict, Any, List, Type
 from .base import BaseNotifier
-from .telegram import TelegramNotifier
-from .email import EmailNotifier
 
 
 class NotificationFactory:
     """Factory class for creating notification instances."""
     
+    # Notifier modules are imported on first use, so disabled providers never
+    # load their dependencies (requests, smtplib, email.mime)
     _notifier_classes = {
-        'telegram': TelegramNotifier,
-        'email': EmailNotifier,
+        'telegram': ('src.notification.telegram', 'TelegramNotifier'),
+        'email': ('src.notification.email', 'EmailNotifier'),
     }
     
+    @classmethod
+    def get_notifier_class(cls, notifier_type: str) -> Type[BaseNotifier]:
+        """
+        Import and return the class of a notifier type.
+        
+        Raises:
+            ValueError: If notifier type is not supported
+        """
+        notifier_type_lower = notifier_type.lower()
+        
+        if notifier_type_lower not in cls._notifier_classes:
+            supported_types = ', '.join(cls._notifier_classes.keys())
+            raise ValueError(f"Unsupported notifier type: {notifier_type}. Supported types: {supported_types}")
+        
+        module_name, class_name = cls._notifier_classes[notifier_type_lower]
+        return getattr(importlib.import_module(module_name), class_name)
+    
     @classmethod
     def create_notifier(cls, notifier_type: str, config: Dict[str, Any]) -> BaseNotifier:
         """
@@ -30,13 +48,7 @@ class NotificationFactory:
         Raises:
             ValueError: If notifier type is not supported
         """
-        notifier_type_lower = notifier_type.lower()
-        
-        if notifier_type_lower not in cls._notifier_classes:
-            supported_types = ', '.join(cls._notifier_classes.keys())
-            raise ValueError(f"Unsupported notifier type: {notifier_type}. Supported types: {supported_types}")
-        
-        notifier_class = cls._notifier_classes[notifier_type_lower]
+        notifier_class = cls.get_notifier_class(notifier_type)
         return notifier_class(config)
     
     @classmethod
@@ -2,14 +2,104 @@
 Telegram notification implementation.
 """
 import os
+import html
+import time
+import uuid
+import threading
 import requests
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from src.compression import CodecFactory
 from .base import BaseNotifier, NotificationError
 
 
+class MultipartUpload:
+    """
+    multipart/form-data body of a document upload, streamed from a slice of a file.
+    
+    requests reads ``files`` into memory, so the body is passed as ``data``
+    instead: the HTTP client reads it in blocks, an upload part costs no
+    memory however large it is, and ``seek(0)`` rewinds it for a retry.
+    """
+    
+    BLOCK_SIZE = 64 * 1024
+    
+    def __init__(self, fields: Dict[str, Any], field_name: str, file_path: str, file_name: str,
+                 mime_type: str, offset: int = 0, length: Optional[int] = None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        
+        head = ''.join(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                       for name, value in fields.items())
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{field_name}"; '
+                 f'filename="{file_name}"\r\nContent-Type: {mime_type}\r\n\r\n')
+        self._head = head.encode('utf-8')
+        self._tail = f"\r\n--{boundary}--\r\n".encode('utf-8')
+        
+        self._file = open(file_path, 'rb')
+        self._offset = offset
+        self._length = length if length is not None else os.path.getsize(file_path) - offset
+        self._position = 0
+    
+    def __len__(self) -> int:
+        return len(self._head) + self._length + len(self._tail)
+    
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(self.BLOCK_SIZE), b'')
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, position: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            position += self._position
+        elif whence == os.SEEK_END:
+            position += len(self)
+        self._position = max(0, min(position, len(self)))
+        return self._position
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read the next bytes of the body."""
+        end = len(self) if size is None or size < 0 else min(len(self), self._position + size)
+        chunks = []
+        head_end = len(self._head)
+        file_end = head_end + self._length
+        
+        while self._position < end:
+            if self._position < head_end:
+                chunk = self._head[self._position:min(end, head_end)]
+            elif self._position < file_end:
+                self._file.seek(self._offset + self._position - head_end)
+                chunk = self._file.read(min(end, file_end) - self._position)
+                if not chunk:
+                    raise NotificationError("The backup file shrank while it was uploaded")
+            else:
+                chunk = self._tail[self._position - file_end:end - file_end]
+            chunks.append(chunk)
+            self._position += len(chunk)
+        
+        return b''.join(chunks)
+    
+    def close(self) -> None:
+        self._file.close()
+    
+    def __enter__(self) -> 'MultipartUpload':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
 class TelegramNotifier(BaseNotifier):
     """Telegram notification implementation."""
     
+    # Upload limit of the public Bot API; a local Bot API server allows 2000 MB
+    DEFAULT_MAX_FILE_SIZE_MB = 50
+    
+    # HTTP status codes worth retrying besides 429 (Too Many Requests)
+    RETRY_STATUS_CODES = (500, 502, 503, 504)
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         
@@ -17,7 +107,26 @@ class TelegramNotifier(BaseNotifier):
             self._validate_config(['bot_token', 'chat_id'])
             self.bot_token = config['bot_token']
             self.chat_id = config['chat_id']
-            self.api_base_url = f"https://api.telegram.org/bot{self.bot_token}"
+            api_url = (config.get('api_url') or 'https://api.telegram.org').rstrip('/')
+            self.api_base_url = f"{api_url}/bot{self.bot_token}"
+            
+            max_file_size_mb = config.get('max_file_size_mb') or self.DEFAULT_MAX_FILE_SIZE_MB
+            self.max_file_size = int(max_file_size_mb * 1024 * 1024)
+            self.upload_workers = max(1, int(config.get('upload_workers', 3)))
+            # Timeout of one upload request, separate from the deadline of the notification
+            self.request_timeout = float(config.get('request_timeout') or self.timeout)
+            self.max_retries = max(0, int(config.get('max_retries', 5)))
+            self.min_interval = max(0.0, float(config.get('min_interval', 1.0)))
+            
+            # One pooled session keeps TLS connections open between requests
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.upload_workers + 1)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            
+            # Spacing of requests to the chat (Telegram allows about one per second)
+            self._rate_lock = threading.Lock()
+            self._next_request_at = 0.0
     
     def send_backup_success(self, backup_file: str, message: Optional[str] = None) -> bool:
         """
@@ -41,11 +150,11 @@ class TelegramNotifier(BaseNotifier):
             
             self._send_message(text_message)
             
-            # Then send the backup file if it exists and is not too large
-            if os.path.exists(backup_file) and os.path.getsize(backup_file) < 50 * 1024 * 1024:  # 50MB limit
-                self._send_document(backup_file)
+            # Then send the backup file, split into numbered parts if it is too large
+            if os.path.exists(backup_file):
+                self._upload_backup(backup_file)
             else:
-                self.logger.warning(f"Backup file {backup_file} is too large or doesn't exist, skipping file upload")
+                self.logger.warning(f"Backup file {backup_file} doesn't exist, skipping file upload")
             
             self.logger.info("Telegram notification sent successfully")
             return True
@@ -79,6 +188,55 @@ class TelegramNotifier(BaseNotifier):
             self.logger.error(f"Failed to send Telegram failure notification: {e}")
             return False
     
+    def send_progress(self, message: str) -> bool:
+        """
+        Send the progress of a running backup via Telegram.
+        
+        Args:
+            message: Progress line of the backup
+            
+        Returns:
+            bool: True if notification sent successfully
+        """
+        if not self.enabled:
+            return True
+        
+        try:
+            self._send_message(f"⏳ Database backup in progress\n\n{html.escape(message)}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to send Telegram progress notification: {e}")
+            return False
+    
+    def get_timeout(self, backup_file: Optional[str] = None) -> float:
+        """
+        Get the deadline in seconds for one notification.
+        
+        A backup split into parts is given one request timeout per round of
+        ``upload_workers`` parts on top of the notification timeout, so large
+        uploads are not abandoned halfway.
+        
+        Args:
+            backup_file: Optional path to the backup file sent with the notification
+            
+        Returns:
+            float: Seconds before the notification is abandoned
+        """
+        if not self.enabled or not backup_file or not os.path.exists(backup_file):
+            return self.timeout
+        
+        parts = len(self._get_parts(os.path.getsize(backup_file)))
+        if parts == 1:
+            return self.timeout
+        rounds = -(-parts // self.upload_workers)
+        return self.timeout + rounds * self.request_timeout
+    
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        if self.enabled:
+            self.session.close()
+    
     def _send_message(self, text: str) -> None:
         """
         Send a text message via Telegram API.
@@ -89,44 +247,165 @@ class TelegramNotifier(BaseNotifier):
         Raises:
             NotificationError: If message sending fails
         """
-        url = f"{self.api_base_url}/sendMessage"
-        
         data = {
             'chat_id': self.chat_id,
             'text': text,
             'parse_mode': 'HTML'
         }
         
-        response = requests.post(url, data=data, timeout=30)
-        response.raise_for_status()
+        self._request('sendMessage', data, timeout=min(30, self.timeout))
+    
+    def _upload_backup(self, file_path: str) -> None:
+        """
+        Upload a backup file, splitting it into parts above the size limit.
+        
+        Parts are named ``<file>.part001``, ``<file>.part002``, ... and are
+        uploaded concurrently; ``cat <file>.part* > <file>`` restores the
+        original file.
+        
+        Args:
+            file_path: Path to the file to send
+            
+        Raises:
+            NotificationError: If any part fails to upload
+        """
+        parts = self._get_parts(os.path.getsize(file_path))
+        
+        if len(parts) == 1:
+            self._send_document(file_path)
+            return
+        
+        self.logger.info(f"Uploading {os.path.basename(file_path)} in {len(parts)} parts "
+                         f"with {self.upload_workers} workers")
         
-        result = response.json()
-        if not result.get('ok'):
-            raise NotificationError(f"Telegram API error: {result.get('description', 'Unknown error')}")
+        with ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix='telegram') as executor:
+            futures = [
+                executor.submit(self._send_document, file_path, number, len(parts), offset, length)
+                for number, (offset, length) in enumerate(parts, start=1)
+            ]
+            errors = []
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(str(e))
+        
+        if errors:
+            raise NotificationError(f"{len(errors)} of {len(parts)} parts failed to upload: {errors[0]}")
+    
+    def _get_parts(self, file_size: int) -> List[Tuple[int, int]]:
+        """Split a file size into (offset, length) parts within the upload limit."""
+        if file_size <= self.max_file_size:
+            return [(0, file_size)]
+        return [(offset, min(self.max_file_size, file_size - offset))
+                for offset in range(0, file_size, self.max_file_size)]
     
-    def _send_document(self, file_path: str) -> None:
+    def _send_document(self, file_path: str, part: int = 1, total_parts: int = 1,
+                       offset: int = 0, length: Optional[int] = None) -> None:
         """
-        Send a document via Telegram API.
+        Send a document (or one part of it) via Telegram API.
         
         Args:
             file_path: Path to the file to send
+            part: Number of the part, starting at 1
+            total_parts: Number of parts the file is split into
+            offset: Offset of the part in the file
+            length: Length of the part (None for the whole file)
             
         Raises:
             NotificationError: If document sending fails
         """
-        url = f"{self.api_base_url}/sendDocument"
+        file_name = os.path.basename(file_path)
+        caption = f"Backup file: {file_name}"
+        
+        if total_parts > 1:
+            file_name = f"{file_name}.part{part:03d}"
+            caption += f" (part {part}/{total_parts})"
+            mime_type = 'application/octet-stream'
+        else:
+            codec = CodecFactory.detect_codec(file_path)
+            mime_type = codec.mime_type if codec else 'application/octet-stream'
         
         data = {
             'chat_id': self.chat_id,
-            'caption': f"Backup file: {os.path.basename(file_path)}"
+            'caption': caption
         }
         
-        with open(file_path, 'rb') as file:
-            files = {'document': file}
-            response = requests.post(url, data=data, files=files, timeout=120)
+        # The part is streamed from the file, never held in memory
+        with MultipartUpload(data, 'document', file_path, file_name, mime_type, offset, length) as body:
+            self._request('sendDocument', body, timeout=self.request_timeout)
+    
+    def _request(self, method: str, data: Any, files: Optional[Dict[str, Any]] = None,
+                 timeout: float = 30) -> Dict[str, Any]:
+        """
+        Call a Bot API method, honouring rate limits.
+        
+        429 responses are retried after the ``retry_after`` delay sent by
+        Telegram; server errors and connection failures are retried with
+        exponential backoff.
+        
+        Args:
+            method: Bot API method name
+            data: Form fields, or a MultipartUpload (rewound for every attempt)
+            files: Optional multipart files
+            timeout: Timeout of one HTTP request in seconds
+            
+        Returns:
+            Dict[str, Any]: The ``result`` of the API response
+            
+        Raises:
+            NotificationError: If the request fails after all retries
+        """
+        url = f"{self.api_base_url}/{method}"
+        attempt = 0
         
-        response.raise_for_status()
+        while True:
+            self._wait_for_rate_limit()
+            
+            headers = None
+            if isinstance(data, MultipartUpload):
+                data.seek(0)
+                headers = {'Content-Type': data.content_type}
+            
+            try:
+                response = self.session.post(url, data=data, files=files, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise NotificationError(f"Telegram request failed: {e}")
+                delay = 2 ** attempt
+            else:
+                if response.status_code == 429:
+                    if attempt >= self.max_retries:
+                        raise NotificationError("Telegram API rate limit exceeded")
+                    delay = self._get_retry_after(response, default=2 ** attempt)
+                    self.logger.warning(f"Telegram rate limit hit, retrying {method} in {delay}s")
+                elif response.status_code in self.RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = 2 ** attempt
+                else:
+                    response.raise_for_status()
+                    
+                    result = response.json()
+                    if not result.get('ok'):
+                        raise NotificationError(f"Telegram API error: {result.get('description', 'Unknown error')}")
+                    return result.get('result', {})
+            
+            attempt += 1
+            time.sleep(delay)
+    
+    def _wait_for_rate_limit(self) -> None:
+        """Space requests at least ``min_interval`` seconds apart."""
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + self.min_interval
         
-        result = response.json()
-        if not result.get('ok'):
-            raise NotificationError(f"Telegram API error: {result.get('description', 'Unknown error')}")
+        if wait > 0:
+            time.sleep(wait)
+    
+    @staticmethod
+    def _get_retry_after(response: requests.Response, default: float) -> float:
+        """Read the retry delay of a 429 response."""
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            return float(response.headers.get('Retry-After', default))
@@ -0,0 +1,221 @@
+"""
+Restore manager that finds a backup and applies it to a database.
+"""
+import os
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+from config.config import config
+from src.catalog import BackupCatalog, CatalogError
+from src.catalog.catalog import BACKUP_FILENAME_PATTERN
+from src.database import DatabaseFactory, DatabaseBackupError
+from src.utils import (
+    Encryption,
+    compute_checksum,
+    format_duration,
+    get_file_size_mb,
+    get_required_files,
+    read_manifest,
+)
+from src.lang import t
+
+
+class RestoreManager:
+    """Restore backups created by the backup manager."""
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        
+        # Set up translator with configured language
+        from src.lang.translator import get_translator
+        self.translator = get_translator()
+        self.translator.set_language(self.config.get_language())
+    
+    def get_job(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the configuration of a backup job.
+        
+        Args:
+            name: Job name; may be omitted when only one job is configured
+        
+        Returns:
+            Dict[str, Any]: Database configuration of the job
+        
+        Raises:
+            DatabaseBackupError: If the job does not exist or is ambiguous
+        """
+        jobs = self.config.get_jobs()
+        
+        if name is None:
+            if len(jobs) != 1:
+                raise DatabaseBackupError("Several jobs are configured, choose one with --job")
+            return jobs[0]
+        
+        for job in jobs:
+            if name in (job.get('name'), job.get('database')):
+                return job
+        
+        raise DatabaseBackupError(f"Unknown job: {name}")
+    
+    def find_backup(self, settings: Dict[str, Any], name: str, before: Optional[float] = None,
+                    extensions: Optional[Iterable[str]] = None) -> str:
+        """
+        Find the newest backup of a job, optionally taken at or before a point in time.
+        
+        The catalog is used when enabled, otherwise the backup directory is
+        scanned for ``backup_<name>_<timestamp>.*`` files.
+        
+        Args:
+            settings: Backup settings of the job
+            name: Name used in the backup file names
+            before: Latest acceptable backup time (epoch seconds)
+            extensions: Only consider backups with these extensions (default: all)
+        
+        Returns:
+            str: Path to the backup file
+        
+        Raises:
+            DatabaseBackupError: If no backup is found
+        """
+        backup_dir = settings.get('backup_dir', '/backups')
+        
+        if settings.get('catalog', True):
+            try:
+                catalog = BackupCatalog(backup_dir, settings.get('catalog_path'))
+                if catalog.is_new:
+                    catalog.rebuild(DatabaseFactory.get_backup_extensions(), with_checksums=False)
+                entry = catalog.find_backup(name, before, extensions)
+                if entry:
+                    return catalog.get_path(entry)
+            except CatalogError as e:
+                self.logger.warning(t('catalog_unavailable', path=settings.get('catalog_path') or backup_dir,
+                                      error=str(e)))
+        
+        suffixes = tuple(f".{extension}" for extension in extensions or DatabaseFactory.get_backup_extensions())
+        if extensions is not None:
+            suffixes += tuple(Encryption.get_encrypted_name(suffix) for suffix in suffixes)
+        candidates = []
+        for filename in os.listdir(backup_dir):
+            match = BACKUP_FILENAME_PATTERN.match(filename)
+            if not match or match.group('name') != name or not filename.endswith(suffixes):
+                continue
+            created_at = datetime.strptime(match.group('timestamp'), '%Y%m%d_%H%M%S').timestamp()
+            if before is None or created_at <= before:
+                candidates.append((created_at, filename))
+        
+        if not candidates:
+            raise DatabaseBackupError(t('restore_no_backup', name=name))
+        
+        return os.path.join(backup_dir, max(candidates)[1])
+    
+    def verify_backup(self, backup_file: str) -> None:
+        """
+        Check a backup file against the checksum of its manifest.
+        
+        An incremental backup is checked together with the earlier backups
+        it takes unchanged tables from, since the restore reads them too.
+        
+        Raises:
+            DatabaseBackupError: If a checksum does not match or a required backup is missing
+        """
+        backup_dir = os.path.dirname(backup_file)
+        for path in [backup_file] + [os.path.join(backup_dir, filename)
+                                     for filename in get_required_files(backup_file)]:
+            if not os.path.exists(path):
+                raise DatabaseBackupError(f"Backup file not found: {path}")
+            self._verify_file(path)
+    
+    def _verify_file(self, backup_file: str) -> None:
+        """Check one backup file against the checksum of its manifest."""
+        manifest = read_manifest(backup_file)
+        if not manifest:
+            self.logger.warning(f"No manifest for {backup_file}, skipping checksum verification")
+            return
+        
+        if compute_checksum(backup_file, manifest.get('algorithm', 'sha256')) != manifest['checksum']:
+            raise DatabaseBackupError(f"Checksum mismatch for {backup_file}")
+        
+        self.logger.info(f"Checksum verified: {os.path.basename(backup_file)} "
+                         f"{manifest.get('algorithm', 'sha256')}:{manifest['checksum']}")
+    
+    def run_restore(self, name: Optional[str] = None, backup_file: Optional[str] = None,
+                    before: Optional[float] = None, target_database: Optional[str] = None,
+                    jobs: Optional[int] = None, verify: bool = False,
+                    data_dir: Optional[str] = None, replay_log: bool = False) -> bool:
+        """
+        Restore a backup into the database of a job.
+        
+        Args:
+            name: Job name; may be omitted when only one job is configured
+            backup_file: Backup file to restore, the newest backup of the job if None
+            before: Restore the newest backup taken at or before this time (epoch seconds)
+            target_database: Restore into this database instead of the job's database
+            jobs: Number of parallel restore workers, automatic if None
+            verify: Check the checksums of the backup and the backups it requires before restoring
+            data_dir: Restore a base backup into this empty data directory, replaying
+                the archived log up to ``before`` (point-in-time recovery)
+            replay_log: Replay the archived log after loading the backup, up to ``before``
+        
+        Returns:
+            bool: True if the restore completed successfully
+        """
+        start_time = time.time()
+        
+        try:
+            job = self.get_job(name)
+            settings = {**self.config.get_backup_config(), **job}
+            if target_database:
+                settings['database'] = target_database
+            if data_dir:
+                settings['restore_data_dir'] = data_dir
+            if replay_log:
+                settings['replay_log'] = True
+            if data_dir or replay_log:
+                settings['recovery_target'] = before
+            
+            database = DatabaseFactory.create_database(job['type'], settings)
+            
+            extensions = None
+            if data_dir:
+                # Point-in-time recovery starts from a base backup
+                extensions = database.base_backup_extensions
+                if not extensions:
+                    raise DatabaseBackupError(f"--data-dir is not supported for {job['type']} backups")
+            elif replay_log:
+                # or from a dump that records its log position
+                extensions = database.log_replay_extensions
+                if not extensions:
+                    raise DatabaseBackupError(f"--replay-log is not supported for {job['type']} backups")
+            
+            # Backups are named after the job, not the target database
+            if not backup_file:
+                backup_name = job.get('name') or job.get('database')
+                backup_file = self.find_backup(settings, backup_name, before, extensions)
+            
+            if not os.path.exists(backup_file):
+                raise DatabaseBackupError(f"Backup file not found: {backup_file}")
+            
+            if data_dir:
+                self.logger.info(t('restore_starting_data_dir', file=backup_file,
+                                   size=get_file_size_mb(backup_file), path=data_dir))
+            else:
+                self.logger.info(t('restore_starting', file=backup_file, size=get_file_size_mb(backup_file),
+                                   database=settings['database']))
+            
+            if verify:
+                self.verify_backup(backup_file)
+            
+            database.restore(backup_file, jobs)
+            
+            self.logger.info(t('restore_completed', duration=format_duration(time.time() - start_time)))
+            return True
+        
+        except DatabaseBackupError as e:
+            self.logger.error(t('restore_failed', error=str(e)))
+            return False
+        
+        except Exception as e:
+            self.logger.error(t('restore_failed', error=str(e)), exc_info=True)
+            return False
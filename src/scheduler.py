@@ -0,0 +1,318 @@
+"""
+Resident scheduler that runs backups from a cron expression.
+"""
+import os
+import time
+import fcntl
+import random
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.utils import format_duration
+
+
+class SchedulerError(Exception):
+    """Custom exception for scheduler errors."""
+    pass
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week).
+    
+    Supports ``*``, lists, ranges, steps, month and weekday names, ``7`` for
+    Sunday and the ``@hourly``, ``@daily``, ``@weekly``, ``@monthly`` and
+    ``@yearly`` shortcuts. As in cron, when both the day of month and the day
+    of week are restricted a day matching either of them is used.
+    """
+    
+    MACROS = {
+        '@yearly': '0 0 1 1 *',
+        '@annually': '0 0 1 1 *',
+        '@monthly': '0 0 1 * *',
+        '@weekly': '0 0 * * 0',
+        '@daily': '0 0 * * *',
+        '@midnight': '0 0 * * *',
+        '@hourly': '0 * * * *',
+    }
+    
+    MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+    DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+    
+    def __init__(self, expression: str):
+        """
+        Args:
+            expression: Cron expression, e.g. ``0 3 * * *``
+        
+        Raises:
+            SchedulerError: If the expression is invalid
+        """
+        self.expression = expression.strip()
+        fields = self.MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise SchedulerError(f"Invalid cron expression '{expression}': expected 5 fields")
+        
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = self._parse_field(fields[2], 1, 31)
+        self.months = self._parse_field(fields[3], 1, 12, self.MONTH_NAMES, 1)
+        # 0 and 7 are both Sunday
+        self.weekdays = {day % 7 for day in self._parse_field(fields[4], 0, 7, self.DAY_NAMES, 0)}
+        
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+    
+    def _parse_field(self, field: str, low: int, high: int,
+                     names: Optional[List[str]] = None, offset: int = 0) -> Set[int]:
+        """Parse one field into the set of values it matches."""
+        values: Set[int] = set()
+        
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = self._parse_value(step_text, 1, high, None, 0)
+            
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_text, end_text = part.split('-', 1)
+                start = self._parse_value(start_text, low, high, names, offset)
+                end = self._parse_value(end_text, low, high, names, offset)
+            else:
+                start = self._parse_value(part, low, high, names, offset)
+                # ``5/15`` means from 5 to the end of the range
+                end = high if step > 1 else start
+            
+            if start > end:
+                raise SchedulerError(f"Invalid cron range '{part}' in '{self.expression}'")
+            values.update(range(start, end + 1, step))
+        
+        return values
+    
+    def _parse_value(self, text: str, low: int, high: int, names: Optional[List[str]], offset: int) -> int:
+        """Parse a number or a month/weekday name."""
+        text = text.strip().lower()
+        if names and text in names:
+            return names.index(text) + offset
+        
+        try:
+            value = int(text)
+        except ValueError:
+            raise SchedulerError(f"Invalid cron value '{text}' in '{self.expression}'")
+        
+        if not low <= value <= high:
+            raise SchedulerError(f"Cron value {value} out of range {low}-{high} in '{self.expression}'")
+        return value
+    
+    def _matches_day(self, moment: datetime) -> bool:
+        """Check the day of month and day of week fields."""
+        day_match = moment.day in self.days
+        # datetime.weekday() is 0 for Monday, cron uses 0 for Sunday
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        
+        if self._any_day:
+            return weekday_match
+        if self._any_weekday:
+            return day_match
+        return day_match or weekday_match
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Get the first matching time strictly after ``moment``.
+        
+        Whole months, days and hours that cannot match are skipped at once,
+        so even yearly schedules take only a few dozen steps.
+        
+        Raises:
+            SchedulerError: If the expression never matches (e.g. February 30)
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._matches_day(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        
+        raise SchedulerError(f"Cron expression '{self.expression}' never matches")
+
+
+class RunLock:
+    """
+    Exclusive lock file held while a backup runs.
+    
+    The lock is an ``flock`` on the file, so it is released by the kernel when
+    the holding process dies and a cron run, a manual ``main.py`` run and the
+    daemon never overlap.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+    
+    def acquire(self) -> bool:
+        """
+        Try to take the lock without waiting.
+        
+        Returns:
+            bool: True if the lock was taken, False if another run holds it
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+    
+    def release(self) -> None:
+        """Release the lock if it is held."""
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+    
+    def __enter__(self) -> bool:
+        return self.acquire()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+
+class BackupScheduler:
+    """
+    Long-running process that triggers backups on a cron schedule.
+    
+    The backup manager, its notifiers and their connections stay alive between
+    runs, so a run does not pay the interpreter start-up, imports and
+    configuration parsing again. A random delay of up to ``jitter`` seconds is
+    added to every scheduled run. A run can be started by hand with SIGUSR1 or
+    by creating the trigger file; requests arriving during a run are merged
+    into one run after it. Scheduled runs whose time passed while a backup
+    ran, whether scheduled or requested, are skipped, not queued.
+    """
+    
+    def __init__(self, run: Callable[[], bool], settings: Dict[str, Any], on_stop: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            run: Function performing one backup run, returning its success
+            settings: The ``cron`` configuration
+            on_stop: Called once when the scheduler stops
+        """
+        self.logger = logging.getLogger(__name__)
+        self.run = run
+        self.on_stop = on_stop
+        self.schedule = CronSchedule(settings.get('schedule', '0 3 * * *'))
+        self.jitter = max(0.0, float(settings.get('jitter', 0)))
+        self.lock = RunLock(settings.get('lock_file') or '/tmp/db-backup.lock')
+        self.trigger_file = settings.get('trigger_file')
+        self.poll_interval = max(0.1, float(settings.get('poll_interval', 5)))
+        self.run_on_start = settings.get('run_on_start', False)
+        
+        self._wakeup = threading.Event()
+        self._triggered = False
+        self._stopping = False
+    
+    def trigger(self) -> None:
+        """Request an immediate run."""
+        self._triggered = True
+        self._wakeup.set()
+    
+    def stop(self) -> None:
+        """Stop after the current run."""
+        self._stopping = True
+        self._wakeup.set()
+    
+    def install_signal_handlers(self) -> None:
+        """SIGUSR1 starts a run, SIGTERM and SIGINT stop the scheduler."""
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+    
+    def next_run_time(self, now: Optional[datetime] = None) -> datetime:
+        """Get the next scheduled run, including the jitter."""
+        next_run = self.schedule.next_after(now or datetime.now())
+        if self.jitter:
+            next_run += timedelta(seconds=random.uniform(0, self.jitter))
+        return next_run
+    
+    def _consume_trigger_file(self) -> bool:
+        """Remove the trigger file, returning True if it existed."""
+        if not self.trigger_file:
+            return False
+        try:
+            os.remove(self.trigger_file)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def run_forever(self) -> None:
+        """Run backups on schedule until stopped."""
+        self.logger.info(f"Scheduler started with schedule '{self.schedule.expression}'"
+                         + (f" and up to {self.jitter:.0f}s jitter" if self.jitter else ""))
+        
+        # A trigger file left over from before the start is not a request
+        self._consume_trigger_file()
+        if self.run_on_start:
+            self._triggered = True
+        
+        next_run = self.next_run_time()
+        self.logger.info(f"Next backup at {next_run:%Y-%m-%d %H:%M:%S}")
+        
+        try:
+            while not self._stopping:
+                if self._consume_trigger_file():
+                    self.logger.info("Backup requested by trigger file")
+                    self._triggered = True
+                
+                if self._triggered or datetime.now() >= next_run:
+                    self._triggered = False
+                    self._run_once()
+                    # Slots that passed during any run, scheduled or requested, are skipped
+                    if datetime.now() >= next_run:
+                        next_run = self.next_run_time()
+                        self.logger.info(f"Next backup at {next_run:%Y-%m-%d %H:%M:%S}")
+                else:
+                    # Sleep until the next run, waking up for signals and trigger files
+                    delay = (next_run - datetime.now()).total_seconds()
+                    self._wakeup.wait(max(0.0, min(delay, self.poll_interval)))
+                    self._wakeup.clear()
+        finally:
+            self.logger.info("Scheduler stopped")
+            if self.on_stop:
+                self.on_stop()
+    
+    def _run_once(self) -> None:
+        """Run one backup unless another run holds the lock."""
+        with self.lock as acquired:
+            if not acquired:
+                self.logger.warning(f"Another backup is running (lock {self.lock.path}), skipping this run")
+                return
+            
+            start_time = time.time()
+            try:
+                success = self.run()
+            except Exception as e:
+                self.logger.error(f"Backup run failed: {e}", exc_info=True)
+                success = False
+            
+            duration = format_duration(time.time() - start_time)
+            self.logger.info(f"Backup run {'completed' if success else 'failed'} in {duration}")
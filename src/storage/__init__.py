@@ -0,0 +1,24 @@
+"""
+Storage targets receiving copies of the backups.
+"""
+from .base import BaseStorage, StorageError, StorageUpload
+from .factory import StorageFactory
+
+__all__ = [
+    'BaseStorage',
+    'StorageError',
+    'StorageUpload',
+    'S3Storage',
+    'LocalStorage',
+    'StorageFactory',
+]
+
+
+def __getattr__(name):
+    # The S3 implementation pulls in requests, so the targets are only
+    # imported when accessed
+    if name == 'S3Storage':
+        return StorageFactory.get_storage_class('s3')
+    if name == 'LocalStorage':
+        return StorageFactory.get_storage_class('local')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
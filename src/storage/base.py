@@ -0,0 +1,241 @@
+"""
+Base storage module.
+"""
+import io
+import os
+import re
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+from src.utils import MANIFEST_SUFFIX, ProgressReporter
+
+
+class StorageError(Exception):
+    """Custom exception for storage errors."""
+    pass
+
+
+class StorageUpload(io.RawIOBase):
+    """
+    Writable stream storing an object while it is written.
+    
+    The object only becomes visible once :meth:`complete` is called. A
+    failing write does not raise: the upload is aborted, further writes are
+    discarded and :meth:`complete` raises instead, so a broken connection
+    never interrupts the local backup that feeds the stream.
+    """
+    
+    def __init__(self, uri: str):
+        super().__init__()
+        self.uri = uri
+        self.error: Optional[Exception] = None
+        self.bytes_written = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        if self.error is None:
+            try:
+                self._write(data)
+            except Exception as e:
+                self.logger.warning(f"Upload to {self.uri} failed, discarding the rest of the stream: {e}")
+                self.error = e
+                self._abort_quietly()
+        self.bytes_written += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def complete(self) -> str:
+        """
+        Finish the upload and make the object visible.
+        
+        Returns:
+            str: URI of the stored object
+        
+        Raises:
+            StorageError: If a write or the completion failed
+        """
+        if isinstance(self.error, StorageError):
+            raise self.error
+        if self.error is not None:
+            raise StorageError(f"Upload to {self.uri} failed: {self.error}")
+        try:
+            self._complete()
+        except StorageError:
+            self._abort_quietly()
+            raise
+        except Exception as e:
+            self._abort_quietly()
+            raise StorageError(f"Upload to {self.uri} failed: {e}")
+        return self.uri
+    
+    def abort(self) -> None:
+        """Discard the upload."""
+        if self.error is None:
+            self.error = StorageError("Upload aborted")
+            self._abort_quietly()
+    
+    def _abort_quietly(self) -> None:
+        try:
+            self._abort()
+        except Exception as e:
+            self.logger.debug(f"Failed to abort the upload to {self.uri}: {e}")
+    
+    @abstractmethod
+    def _write(self, data) -> None:
+        pass
+    
+    @abstractmethod
+    def _complete(self) -> None:
+        pass
+    
+    @abstractmethod
+    def _abort(self) -> None:
+        pass
+
+
+class BaseStorage(ABC):
+    """
+    Abstract base class for storage targets receiving copies of the backups.
+    
+    Files are stored flat under the target's location with their local file
+    name, so the ``backup_<name>_<timestamp>`` naming used by the local
+    retention applies to the remote copies as well.
+    """
+    
+    # Type name of the target, as used in STORAGE_TARGETS
+    name = 'storage'
+    
+    # Size of the reads when uploading a file
+    COPY_BUFFER_SIZE = 1024 * 1024
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # Seconds between progress log lines of uploads
+        self.progress_interval = float(config.get('progress_interval', 5))
+    
+    @abstractmethod
+    def get_uri(self, filename: str) -> str:
+        """Get the URI of a stored file, for logs and notifications."""
+        pass
+    
+    @abstractmethod
+    def open_upload(self, filename: str, size: Optional[int] = None) -> StorageUpload:
+        """
+        Open a stream storing a file while it is written.
+        
+        Args:
+            filename: Name of the stored file
+            size: Total size if known in advance
+        
+        Returns:
+            StorageUpload: Writable stream, finished with ``complete()``
+        """
+        pass
+    
+    @abstractmethod
+    def list_files(self, prefix: str = '') -> List[str]:
+        """
+        List the names of the stored files starting with a prefix.
+        
+        Raises:
+            StorageError: If the files cannot be listed
+        """
+        pass
+    
+    @abstractmethod
+    def delete_file(self, filename: str) -> None:
+        """
+        Delete a stored file.
+        
+        Raises:
+            StorageError: If the file cannot be deleted
+        """
+        pass
+    
+    def upload_file(self, path: str, filename: Optional[str] = None) -> str:
+        """
+        Store a local file.
+        
+        Args:
+            path: Path of the local file
+            filename: Name of the stored file (default: the local file name)
+        
+        Returns:
+            str: URI of the stored file
+        
+        Raises:
+            StorageError: If the upload fails
+        """
+        filename = filename or os.path.basename(path)
+        size = os.path.getsize(path)
+        progress = ProgressReporter(f"Uploading {filename} to {self.name}", size,
+                                    interval=self.progress_interval, logger=self.logger)
+        
+        upload = self.open_upload(filename, size)
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.COPY_BUFFER_SIZE)
+                    # Stop reading once the upload failed, complete() raises the error
+                    if not chunk or upload.error is not None:
+                        break
+                    upload.write(chunk)
+                    progress.update(len(chunk))
+        except OSError as e:
+            upload.abort()
+            raise StorageError(f"Failed to read {path}: {e}")
+        
+        uri = upload.complete()
+        if size >= self.COPY_BUFFER_SIZE:
+            progress.finish()
+        return uri
+    
+    def prune(self, name: str, retention_count: int, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Delete the oldest stored backups of a job, keeping the newest ones.
+        
+        Backups are ordered by the timestamp in their file name; the
+        manifest of a deleted backup is deleted with it.
+        
+        Args:
+            name: Name of the backup job
+            retention_count: Number of backups to keep (0 keeps all)
+            keep: File names never deleted, such as backups incremental backups are built on
+        
+        Returns:
+            List[str]: URIs of the deleted backups
+        
+        Raises:
+            StorageError: If the backups cannot be listed or deleted
+        """
+        if retention_count <= 0:
+            return []
+        
+        name_pattern = re.compile(rf"^backup_{re.escape(name)}_\d{{8}}_\d{{6}}\.")
+        filenames = set(self.list_files(f"backup_{name}_"))
+        backups = sorted(
+            (filename for filename in filenames
+             if name_pattern.match(filename) and not filename.endswith(MANIFEST_SUFFIX)),
+            reverse=True,
+        )
+        
+        keep = set(keep)
+        removed = []
+        for filename in backups[retention_count:]:
+            if filename in keep:
+                continue
+            self.delete_file(filename)
+            if filename + MANIFEST_SUFFIX in filenames:
+                self.delete_file(filename + MANIFEST_SUFFIX)
+            removed.append(self.get_uri(filename))
+        return removed
+    
+    def close(self) -> None:
+        """Release connections kept open between uploads."""
+        pass
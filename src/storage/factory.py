@@ -0,0 +1,83 @@
+"""
+Storage factory for creating storage target instances.
+"""
+import importlib
+import logging
+from typing import Dict, Any, List, Type
+from .base import BaseStorage
+
+
+class StorageFactory:
+    """Factory class for creating storage target instances."""
+    
+    # Storage modules are imported on first use, so unused targets never
+    # load their dependencies (requests, xml.etree)
+    _storage_classes = {
+        's3': ('src.storage.s3', 'S3Storage'),
+        'local': ('src.storage.local', 'LocalStorage'),
+    }
+    
+    @classmethod
+    def get_storage_class(cls, storage_type: str) -> Type[BaseStorage]:
+        """
+        Import and return the class of a storage type.
+        
+        Raises:
+            ValueError: If storage type is not supported
+        """
+        storage_type_lower = storage_type.lower()
+        
+        if storage_type_lower not in cls._storage_classes:
+            supported_types = ', '.join(cls._storage_classes.keys())
+            raise ValueError(f"Unsupported storage type: {storage_type}. Supported types: {supported_types}")
+        
+        module_name, class_name = cls._storage_classes[storage_type_lower]
+        return getattr(importlib.import_module(module_name), class_name)
+    
+    @classmethod
+    def create_storage(cls, storage_type: str, config: Dict[str, Any]) -> BaseStorage:
+        """
+        Create a storage instance based on the storage type.
+        
+        Args:
+            storage_type: Type of storage (s3, local)
+            config: Storage configuration
+        
+        Returns:
+            BaseStorage: Storage instance
+        
+        Raises:
+            ValueError: If storage type is not supported
+            StorageError: If the configuration is incomplete
+        """
+        storage_class = cls.get_storage_class(storage_type)
+        return storage_class(config)
+    
+    @classmethod
+    def create_all_storages(cls, targets: List[str], configs: Dict[str, Dict[str, Any]]) -> List[BaseStorage]:
+        """
+        Create the storage instances of the configured targets.
+        
+        Args:
+            targets: Storage types to create, in upload order
+            configs: Configuration of every storage type
+        
+        Returns:
+            List[BaseStorage]: List of storage instances
+        """
+        storages = []
+        
+        for storage_type in targets:
+            try:
+                storages.append(cls.create_storage(storage_type, configs.get(storage_type, {})))
+            except Exception as e:
+                # Log error but continue with other targets
+                logger = logging.getLogger(__name__)
+                logger.error(f"Failed to create {storage_type} storage: {e}")
+        
+        return storages
+    
+    @classmethod
+    def get_supported_types(cls) -> List[str]:
+        """Get list of supported storage types."""
+        return list(cls._storage_classes.keys())
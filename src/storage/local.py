@@ -0,0 +1,89 @@
+"""
+Local directory storage implementation.
+"""
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+from .base import BaseStorage, StorageError, StorageUpload
+
+
+class LocalUpload(StorageUpload):
+    """Upload into a file that is moved into place once complete."""
+    
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.path = path
+        self._temp_path = f"{path}.part"
+        self._file = open(self._temp_path, 'wb')
+    
+    def _write(self, data) -> None:
+        self._file.write(data)
+    
+    def _complete(self) -> None:
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+    
+    def _abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+class LocalStorage(BaseStorage):
+    """
+    Copies of the backups in another directory.
+    
+    Meant for a mounted network share (NFS, SMB) or a second disk, so the
+    backups survive the loss of the backup volume.
+    """
+    
+    name = 'local'
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        
+        if not config.get('path'):
+            raise StorageError("Local storage requires a path (STORAGE_LOCAL_PATH)")
+        self.path = config['path']
+        
+        try:
+            os.makedirs(self.path, exist_ok=True)
+        except OSError as e:
+            raise StorageError(f"Failed to create storage directory {self.path}: {e}")
+    
+    def get_uri(self, filename: str) -> str:
+        return os.path.join(self.path, filename)
+    
+    def open_upload(self, filename: str, size: Optional[int] = None) -> StorageUpload:
+        try:
+            return LocalUpload(self.get_uri(filename))
+        except OSError as e:
+            raise StorageError(f"Failed to create {self.get_uri(filename)}: {e}")
+    
+    def upload_file(self, path: str, filename: Optional[str] = None) -> str:
+        # shutil uses sendfile, so the data never passes through Python
+        target = self.get_uri(filename or os.path.basename(path))
+        temp_path = f"{target}.part"
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, target)
+        except OSError as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise StorageError(f"Failed to copy {path} to {target}: {e}")
+        return target
+    
+    def list_files(self, prefix: str = '') -> List[str]:
+        try:
+            return [filename for filename in os.listdir(self.path)
+                    if filename.startswith(prefix) and not filename.endswith('.part')]
+        except OSError as e:
+            raise StorageError(f"Failed to list {self.path}: {e}")
+    
+    def delete_file(self, filename: str) -> None:
+        try:
+            os.remove(self.get_uri(filename))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise StorageError(f"Failed to delete {self.get_uri(filename)}: {e}")
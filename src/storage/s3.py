@@ -0,0 +1,357 @@
+"""
+S3-compatible object storage implementation.
+"""
+import hmac
+import time
+import hashlib
+import threading
+import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+from requests.adapters import HTTPAdapter
+from .base import BaseStorage, StorageError, StorageUpload
+
+
+class S3Upload(StorageUpload):
+    """
+    Multipart upload fed by a stream.
+    
+    Written data is cut into parts that are uploaded by a thread pool while
+    the next part fills. At most ``concurrency`` parts are in flight; a
+    write blocks while all of them are busy, which paces the producer to the
+    upload bandwidth and caps memory at about ``part_size * (concurrency + 1)``.
+    An object smaller than one part is stored with a single request.
+    """
+    
+    def __init__(self, storage: 'S3Storage', filename: str, size: Optional[int] = None):
+        super().__init__(storage.get_uri(filename))
+        self.storage = storage
+        self.key = storage.get_key(filename)
+        self.part_size = storage.get_part_size(size)
+        # Without a known size the parts grow, so the part limit allows any size
+        self.fixed_size = size is not None
+        self.upload_id: Optional[str] = None
+        self._buffer = bytearray()
+        self._parts: List[Future] = []
+        self._slots = threading.BoundedSemaphore(storage.concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _next_part_size(self) -> int:
+        if self.fixed_size:
+            return self.part_size
+        return self.part_size * 2 ** (len(self._parts) // self.storage.PARTS_PER_SIZE)
+    
+    def _write(self, data) -> None:
+        self._buffer += data
+        while len(self._buffer) >= self._next_part_size():
+            size = self._next_part_size()
+            part = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            self._submit(part)
+    
+    def _submit(self, data: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.storage.create_multipart_upload(self.key)
+            self._executor = ThreadPoolExecutor(max_workers=self.storage.concurrency,
+                                                thread_name_prefix='s3-upload')
+        
+        self._slots.acquire()
+        # A failed part fails the upload before more data is sent
+        for future in self._parts:
+            if future.done() and future.exception():
+                self._slots.release()
+                raise future.exception()
+        
+        number = len(self._parts) + 1
+        future = self._executor.submit(self.storage.upload_part, self.key, self.upload_id, number, data)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._parts.append(future)
+    
+    def _complete(self) -> None:
+        if self.upload_id is None:
+            self.storage.put_object(self.key, bytes(self._buffer))
+            self._buffer.clear()
+            return
+        
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        
+        try:
+            etags = [future.result() for future in self._parts]
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self.storage.complete_multipart_upload(self.key, self.upload_id, etags)
+    
+    def _abort(self) -> None:
+        self._buffer.clear()
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.upload_id:
+            self.storage.abort_multipart_upload(self.key, self.upload_id)
+
+
+class S3Storage(BaseStorage):
+    """
+    Copies of the backups in an S3-compatible bucket.
+    
+    Requests are signed with AWS Signature Version 4, so besides Amazon S3
+    any compatible service works (MinIO, Ceph RGW, Wasabi, Backblaze B2,
+    Cloudflare R2, ...). Archives larger than one part are sent as a
+    multipart upload with several parts in flight over pooled connections.
+    """
+    
+    name = 's3'
+    
+    # Limits of the S3 multipart API
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    MAX_PARTS = 10000
+    
+    # Streams of unknown size double their part size every this many parts
+    PARTS_PER_SIZE = 1000
+    
+    # HTTP status codes worth retrying
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    
+    EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        
+        missing = [field for field in ('bucket', 'access_key_id', 'secret_access_key') if not config.get(field)]
+        if missing:
+            raise StorageError(f"Missing S3 configuration values: {', '.join(missing)}")
+        
+        self.bucket = config['bucket']
+        self.region = config.get('region') or 'us-east-1'
+        self.access_key_id = config['access_key_id']
+        self.secret_access_key = config['secret_access_key']
+        self.session_token = config.get('session_token') or None
+        self.storage_class = config.get('storage_class') or None
+        self.prefix = (config.get('prefix') or '').lstrip('/')
+        if self.prefix and not self.prefix.endswith('/'):
+            self.prefix += '/'
+        
+        endpoint = (config.get('endpoint_url') or f"https://s3.{self.region}.amazonaws.com").rstrip('/')
+        parts = urlsplit(endpoint)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.netloc or parts.path
+        # Custom endpoints (MinIO and most self-hosted services) expect the bucket in the path
+        path_style = config.get('path_style')
+        self.path_style = bool(config.get('endpoint_url')) if path_style is None else path_style
+        
+        self.part_size = max(self.MIN_PART_SIZE, int(config.get('part_size') or 16 * 1024 * 1024))
+        self.concurrency = max(1, int(config.get('concurrency', 4)))
+        self.max_retries = max(0, int(config.get('max_retries', 3)))
+        self.timeout = float(config.get('timeout', 60))
+        self.verify_ssl = config.get('verify_ssl', True)
+        
+        # One pooled session keeps a connection open per upload thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency + 1)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def get_key(self, filename: str) -> str:
+        """Get the object key of a stored file."""
+        return f"{self.prefix}{filename}"
+    
+    def get_uri(self, filename: str) -> str:
+        return f"s3://{self.bucket}/{self.get_key(filename)}"
+    
+    def get_part_size(self, size: Optional[int] = None) -> int:
+        """Get the part size for an object, grown if needed to stay within the part limit."""
+        if not size:
+            return self.part_size
+        return max(self.part_size, -(-size // self.MAX_PARTS))
+    
+    def open_upload(self, filename: str, size: Optional[int] = None) -> StorageUpload:
+        return S3Upload(self, filename, size)
+    
+    def list_files(self, prefix: str = '') -> List[str]:
+        filenames = []
+        params = {'list-type': '2', 'prefix': self.get_key(prefix)}
+        
+        while True:
+            response = self._request('GET', '', params)
+            root = self._parse_xml(response.content)
+            for contents in self._find_all(root, 'Contents'):
+                key = self._find_text(contents, 'Key')
+                if key and key.startswith(self.prefix):
+                    filenames.append(key[len(self.prefix):])
+            
+            token = self._find_text(root, 'NextContinuationToken')
+            if self._find_text(root, 'IsTruncated') != 'true' or not token:
+                return filenames
+            params['continuation-token'] = token
+    
+    def delete_file(self, filename: str) -> None:
+        self._request('DELETE', self.get_key(filename))
+    
+    def put_object(self, key: str, data: bytes) -> None:
+        """Store an object with a single request."""
+        headers = {'x-amz-storage-class': self.storage_class} if self.storage_class else {}
+        self._request('PUT', key, data=data, headers=headers)
+    
+    def create_multipart_upload(self, key: str) -> str:
+        """Start a multipart upload and return its upload ID."""
+        headers = {'x-amz-storage-class': self.storage_class} if self.storage_class else {}
+        response = self._request('POST', key, {'uploads': ''}, headers=headers)
+        upload_id = self._find_text(self._parse_xml(response.content), 'UploadId')
+        if not upload_id:
+            raise StorageError(f"No upload ID returned for {key}")
+        return upload_id
+    
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        """Upload one part of a multipart upload and return its ETag."""
+        response = self._request('PUT', key, {'partNumber': str(number), 'uploadId': upload_id}, data=data)
+        etag = response.headers.get('ETag')
+        if not etag:
+            raise StorageError(f"No ETag returned for part {number} of {key}")
+        return etag
+    
+    def complete_multipart_upload(self, key: str, upload_id: str, etags: List[str]) -> None:
+        """Assemble the uploaded parts into the object."""
+        parts = ''.join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                        for number, etag in enumerate(etags, 1))
+        body = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode()
+        response = self._request('POST', key, {'uploadId': upload_id}, data=body)
+        # Errors during the assembly are reported with status 200
+        if b'<Error>' in response.content:
+            root = self._parse_xml(response.content)
+            raise StorageError(f"Failed to complete the upload of {key}: "
+                               f"{self._find_text(root, 'Code')}: {self._find_text(root, 'Message')}")
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Discard a multipart upload and its uploaded parts."""
+        self._request('DELETE', key, {'uploadId': upload_id})
+    
+    def close(self) -> None:
+        self.session.close()
+    
+    def _get_location(self, key: str) -> Tuple[str, str]:
+        """Get the host and the URI-encoded path of an object (or of the bucket for an empty key)."""
+        if self.path_style:
+            path = f"/{self.bucket}/{key}" if key else f"/{self.bucket}"
+            return self.host, quote(path, safe='/')
+        return f"{self.bucket}.{self.host}", quote(f"/{key}", safe='/')
+    
+    def _request(self, method: str, key: str, params: Optional[Dict[str, str]] = None,
+                 data: bytes = b'', headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Send a signed request, retrying throttling, server errors and connection failures.
+        
+        Raises:
+            StorageError: If the request fails
+        """
+        host, path = self._get_location(key)
+        query = self._canonical_query(params or {})
+        url = f"{self.scheme}://{host}{path}" + (f"?{query}" if query else '')
+        payload_hash = hashlib.sha256(data).hexdigest() if data else self.EMPTY_SHA256
+        
+        for attempt in range(self.max_retries + 1):
+            signed_headers = self.sign(method, host, path, query, dict(headers or {}), payload_hash)
+            try:
+                response = self.session.request(method, url, data=data or None, headers=signed_headers,
+                                                timeout=self.timeout, verify=self.verify_ssl)
+            except requests.RequestException as e:
+                if attempt >= self.max_retries:
+                    raise StorageError(f"S3 {method} {key or self.bucket} failed: {e}")
+                self.logger.warning(f"S3 {method} {key or self.bucket} failed, retrying: {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            
+            if response.status_code < 300:
+                return response
+            
+            if response.status_code in self.RETRY_STATUS_CODES and attempt < self.max_retries:
+                self.logger.warning(f"S3 {method} {key or self.bucket} returned {response.status_code}, retrying")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            
+            root = self._parse_xml(response.content, strict=False)
+            detail = ''
+            if root is not None:
+                detail = ': '.join(text for text in (self._find_text(root, 'Code'), self._find_text(root, 'Message')) if text)
+            raise StorageError(f"S3 {method} {key or self.bucket} failed with status {response.status_code} {detail}".rstrip())
+    
+    def sign(self, method: str, host: str, path: str, query: str, headers: Dict[str, str],
+             payload_hash: str, now: Optional[datetime] = None) -> Dict[str, str]:
+        """
+        Add the AWS Signature Version 4 headers to a request.
+        
+        Args:
+            method: HTTP method
+            host: Host header of the request
+            path: URI-encoded path
+            query: Canonical query string
+            headers: Headers to sign and send
+            payload_hash: Hex SHA-256 of the request body
+            now: Time of the request (default: now)
+        
+        Returns:
+            Dict[str, str]: The headers including Authorization
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date = amz_date[:8]
+        
+        headers.update({'Host': host, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+        if self.session_token:
+            headers['x-amz-security-token'] = self.session_token
+        
+        canonical_headers = sorted((name.lower(), ' '.join(str(value).split())) for name, value in headers.items())
+        signed_names = ';'.join(name for name, _ in canonical_headers)
+        canonical_request = '\n'.join([
+            method,
+            path,
+            query,
+            ''.join(f"{name}:{value}\n" for name, value in canonical_headers),
+            signed_names,
+            payload_hash,
+        ])
+        
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256',
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        
+        key = f"AWS4{self.secret_access_key}".encode()
+        for part in (date, self.region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        
+        headers['Authorization'] = (f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+                                    f"SignedHeaders={signed_names}, Signature={signature}")
+        return headers
+    
+    @staticmethod
+    def _canonical_query(params: Dict[str, str]) -> str:
+        """Encode query parameters sorted by name, as SigV4 requires."""
+        return '&'.join(f"{quote(name, safe='')}={quote(str(value), safe='')}"
+                        for name, value in sorted(params.items()))
+    
+    @staticmethod
+    def _parse_xml(content: bytes, strict: bool = True) -> Optional[ElementTree.Element]:
+        try:
+            return ElementTree.fromstring(content)
+        except ElementTree.ParseError as e:
+            if not strict:
+                return None
+            raise StorageError(f"Invalid S3 response: {e}")
+    
+    @staticmethod
+    def _find_all(root: ElementTree.Element, tag: str) -> List[ElementTree.Element]:
+        # Responses use the S3 namespace, which some compatible services omit
+        return [element for element in root.iter() if element.tag.rsplit('}', 1)[-1] == tag]
+    
+    @classmethod
+    def _find_text(cls, root: ElementTree.Element, tag: str) -> Optional[str]:
+        elements = cls._find_all(root, tag)
+        return elements[0].text if elements else None
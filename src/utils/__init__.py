@@ -1,11 +1,85 @@
 """
 Utility modules.
 """
-from .helpers import compress_file, setup_logging, format_duration, get_file_size_mb
+import importlib
+from .helpers import (
+    compress_file,
+    setup_logging,
+    format_duration,
+    get_file_size_mb,
+    get_archive_extension,
+    open_archive_writer,
+    open_archive_reader,
+    package_directory,
+    get_auto_worker_count,
+)
+from .checksum import (
+    MANIFEST_SUFFIX,
+    HashingWriter,
+    new_hasher,
+    compute_checksum,
+    get_manifest_path,
+    write_manifest,
+    read_manifest,
+    get_required_files,
+    remove_backup_file,
+)
 
 __all__ = [
     'compress_file',
     'setup_logging',
     'format_duration',
     'get_file_size_mb',
+    'get_archive_extension',
+    'open_archive_writer',
+    'open_archive_reader',
+    'package_directory',
+    'get_auto_worker_count',
+    'MANIFEST_SUFFIX',
+    'HashingWriter',
+    'new_hasher',
+    'compute_checksum',
+    'get_manifest_path',
+    'write_manifest',
+    'read_manifest',
+    'get_required_files',
+    'remove_backup_file',
+    'ENCRYPTED_EXTENSION',
+    'Encryption',
+    'EncryptionError',
+    'DumpPipeline',
+    'RestorePipeline',
+    'PipelineError',
+    'ProgressReporter',
+    'format_bytes',
+    'StderrBuffer',
+    'RateLimiter',
+    'ThrottledWriter',
+    'Throttle',
+    'get_priority_prefix',
 ]
+
+# The dump pipeline, encryption and throttling are only needed while a
+# backup or restore runs, so their modules are imported when accessed
+_LAZY_ATTRIBUTES = {
+    'ENCRYPTED_EXTENSION': 'encryption',
+    'Encryption': 'encryption',
+    'EncryptionError': 'encryption',
+    'DumpPipeline': 'pipeline',
+    'RestorePipeline': 'pipeline',
+    'PipelineError': 'pipeline',
+    'ProgressReporter': 'progress',
+    'format_bytes': 'progress',
+    'StderrBuffer': 'stderr',
+    'RateLimiter': 'throttle',
+    'ThrottledWriter': 'throttle',
+    'Throttle': 'throttle',
+    'get_priority_prefix': 'throttle',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,202 @@
+"""
+Inline checksums and backup manifests.
+"""
+import io
+import os
+import json
+import hashlib
+from typing import Any, Dict, IO, List, Optional
+
+
+# Sidecar manifest written next to every backup file
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_FORMAT = 'db-backup-manifest'
+
+
+def new_hasher(algorithm: str = 'sha256'):
+    """
+    Create a hash object.
+    
+    Every hashlib algorithm is supported (sha256, sha512, blake2b, ...).
+    ``blake3`` and ``xxh3_128`` are faster alternatives that need the
+    optional 'blake3' or 'xxhash' package.
+    
+    Args:
+        algorithm: Name of the hash algorithm
+    
+    Returns:
+        Hash object with ``update()`` and ``hexdigest()``
+    
+    Raises:
+        ValueError: If the algorithm is not available
+    """
+    algorithm = algorithm.lower()
+    
+    if algorithm == 'blake3':
+        try:
+            import blake3
+        except ImportError:
+            raise ValueError("blake3 checksums require the 'blake3' package")
+        return blake3.blake3()
+    
+    if algorithm in ('xxh3', 'xxh3_128'):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError("xxh3 checksums require the 'xxhash' package")
+        return xxhash.xxh3_128()
+    
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+
+
+class HashingWriter(io.RawIOBase):
+    """
+    Write-through stream that hashes every byte written to a file.
+    
+    The stream is not seekable, so writers such as zipfile never rewrite
+    data that was already hashed.
+    """
+    
+    def __init__(self, fileobj: IO[bytes], hasher):
+        super().__init__()
+        self._fileobj = fileobj
+        self.hasher = hasher
+        self.bytes_written = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        self._fileobj.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def flush(self) -> None:
+        self._fileobj.flush()
+    
+    def hexdigest(self) -> str:
+        """Checksum of the bytes written so far."""
+        return self.hasher.hexdigest()
+
+
+def compute_checksum(file_path: str, algorithm: str = 'sha256', chunk_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Compute the checksum of a file with large sequential reads.
+    
+    The kernel is told the file is read sequentially (larger read-ahead) and
+    that the pages are not needed afterwards, so hashing a large archive does
+    not evict the page cache of the database host.
+    
+    Args:
+        file_path: Path to the file
+        algorithm: Name of the hash algorithm
+        chunk_size: Bytes read at a time
+    
+    Returns:
+        str: Hex digest
+    """
+    hasher = new_hasher(algorithm)
+    
+    with open(file_path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+        
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    
+    return hasher.hexdigest()
+
+
+def get_manifest_path(backup_file: str) -> str:
+    """Get the path of the sidecar manifest of a backup file."""
+    return f"{backup_file}{MANIFEST_SUFFIX}"
+
+
+def write_manifest(backup_file: str, checksum: str, algorithm: str, **details: Any) -> str:
+    """
+    Write the sidecar manifest of a backup file.
+    
+    Args:
+        backup_file: Path to the backup file
+        checksum: Checksum of the backup file
+        algorithm: Name of the hash algorithm
+        **details: Additional fields (job name, database, content checksum, ...)
+    
+    Returns:
+        str: Path to the manifest
+    """
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'version': 1,
+        'file': os.path.basename(backup_file),
+        'size': os.path.getsize(backup_file),
+        'algorithm': algorithm,
+        'checksum': checksum,
+        **details,
+    }
+    
+    manifest_path = get_manifest_path(backup_file)
+    temp_path = f"{manifest_path}.part"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+
+def read_manifest(backup_file: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the sidecar manifest of a backup file.
+    
+    Args:
+        backup_file: Path to the backup file
+    
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if there is no valid manifest
+    """
+    try:
+        with open(get_manifest_path(backup_file)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    return manifest if manifest.get('format') == MANIFEST_FORMAT else None
+
+
+def get_required_files(backup_file: str) -> List[str]:
+    """
+    Get the earlier backups an incremental backup takes unchanged tables from.
+    
+    Args:
+        backup_file: Path to the backup file
+    
+    Returns:
+        List[str]: File names of the required backups (in the same directory),
+        empty for full backups and backups without a manifest
+    """
+    manifest = read_manifest(backup_file) or {}
+    return list((manifest.get('incremental') or {}).get('requires') or [])
+
+
+def remove_backup_file(backup_file: str) -> None:
+    """Remove a backup file together with its sidecar manifest."""
+    os.remove(backup_file)
+    
+    manifest_path = get_manifest_path(backup_file)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
@@ -0,0 +1,373 @@
+"""
+Streaming authenticated encryption of backup archives.
+
+Archives are encrypted with AES-256-GCM in independent chunks, so they are
+encrypted while they are written and decrypted while they are read, without
+another pass over the data. The file layout is::
+
+    header   magic 'DBBKENC', version, chunk size, key id, salt (36 bytes)
+    chunks   AES-256-GCM(chunk) + 16-byte tag, ``chunk size`` bytes each,
+             the last one shorter (possibly empty)
+
+Every file is encrypted with its own key, derived from the master key and
+the random salt with HKDF-SHA256. The nonce of a chunk is its number plus a
+flag marking the last chunk, and the header is authenticated with every
+chunk, so reordered, dropped, truncated or appended chunks and a modified
+header all fail to decrypt.
+"""
+import io
+import os
+import hmac
+import base64
+import struct
+import hashlib
+from typing import Any, Dict, IO, Optional
+
+
+class EncryptionError(Exception):
+    """Custom exception for encryption errors."""
+    pass
+
+
+# Extension appended to the name of encrypted archives ('*.sql.zst.enc')
+ENCRYPTED_EXTENSION = 'enc'
+
+MAGIC = b'DBBKENC'
+VERSION = 1
+# Magic, version, chunk size, key id, salt
+HEADER = struct.Struct('>7sBI8s16s')
+KEY_SIZE = 32
+TAG_SIZE = 16
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _import_cryptography():
+    """Import AES-GCM lazily; the package is only needed when encryption is used."""
+    try:
+        from cryptography.exceptions import InvalidTag
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError:
+        raise EncryptionError("Backup encryption requires the cryptography package (pip install cryptography)")
+    return AESGCM, InvalidTag
+
+
+def load_key(key: Optional[str] = None, key_file: Optional[str] = None) -> bytes:
+    """
+    Load the 32-byte master key.
+    
+    Args:
+        key: Key as base64 or hex text
+        key_file: File holding the key as base64 or hex text, or as 32 raw bytes
+    
+    Returns:
+        bytes: The master key
+    
+    Raises:
+        EncryptionError: If no key is configured or it is not a valid 32-byte key
+    """
+    if key_file:
+        try:
+            with open(key_file, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise EncryptionError(f"Failed to read the encryption key file {key_file}: {e}")
+        if len(data) == KEY_SIZE:
+            return data
+        key = data.decode('ascii', errors='replace')
+    
+    if not key:
+        raise EncryptionError("No encryption key configured (BACKUP_ENCRYPTION_KEY or BACKUP_ENCRYPTION_KEY_FILE)")
+    
+    text = key.strip()
+    for decode in (bytes.fromhex, lambda value: base64.b64decode(value, validate=True)):
+        try:
+            decoded = decode(text)
+        except ValueError:
+            continue
+        if len(decoded) == KEY_SIZE:
+            return decoded
+    
+    raise EncryptionError("The encryption key must be 32 bytes, base64 or hex encoded "
+                          "(generate one with: openssl rand -base64 32)")
+
+
+def _derive_key(master_key: bytes, salt: bytes) -> bytes:
+    """Derive the key of one file with HKDF-SHA256 (RFC 5869, one output block)."""
+    pseudo_random_key = hmac.new(salt, master_key, hashlib.sha256).digest()
+    return hmac.new(pseudo_random_key, b'db-backup archive key\x01', hashlib.sha256).digest()
+
+
+def _nonce(counter: int, last: bool) -> bytes:
+    """Nonce of a chunk: 11-byte chunk number and a last-chunk flag."""
+    return counter.to_bytes(11, 'big') + (b'\x01' if last else b'\x00')
+
+
+def _read_exact(fileobj: IO[bytes], size: int) -> bytes:
+    """Read ``size`` bytes, fewer only at the end of the stream."""
+    data = fileobj.read(size)
+    if not data or len(data) == size:
+        return data or b''
+    
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        part = fileobj.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b''.join(parts)
+
+
+class Encryption:
+    """
+    Master key and settings used to encrypt and decrypt archives.
+    
+    The key id stored in the header of every file is a hash of the master
+    key, so a wrong key is reported as such rather than as corruption.
+    """
+    
+    algorithm = 'aes-256-gcm'
+    
+    def __init__(self, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if len(key) != KEY_SIZE:
+            raise EncryptionError(f"The encryption key must be {KEY_SIZE} bytes")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise EncryptionError(f"Invalid encryption chunk size: {chunk_size}")
+        
+        self._cipher_class, self._invalid_tag = _import_cryptography()
+        self._key = key
+        self.chunk_size = chunk_size
+        self.key_id = hashlib.sha256(b'db-backup key id' + key).digest()[:8]
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> Optional['Encryption']:
+        """
+        Create the encryption from the backup settings.
+        
+        Returns:
+            Optional[Encryption]: None if no key is configured
+        
+        Raises:
+            EncryptionError: If the key cannot be loaded
+        """
+        if not settings.get('encryption_key') and not settings.get('encryption_key_file'):
+            return None
+        key = load_key(settings.get('encryption_key'), settings.get('encryption_key_file'))
+        return cls(key, int(settings.get('encryption_chunk_size') or DEFAULT_CHUNK_SIZE))
+    
+    @staticmethod
+    def is_encrypted(path: str) -> bool:
+        """Whether a file name is the name of an encrypted archive."""
+        return path.endswith(f".{ENCRYPTED_EXTENSION}")
+    
+    @staticmethod
+    def get_encrypted_name(path: str) -> str:
+        """Get the name of the encrypted archive of a file."""
+        return f"{path}.{ENCRYPTED_EXTENSION}"
+    
+    @staticmethod
+    def strip_extension(path: str) -> str:
+        """Get the name of the archive inside an encrypted one ('*.sql.zst.enc' -> '*.sql.zst')."""
+        return path[:-len(ENCRYPTED_EXTENSION) - 1] if Encryption.is_encrypted(path) else path
+    
+    def describe(self) -> Dict[str, Any]:
+        """Describe the encryption for the backup manifest."""
+        return {
+            'algorithm': self.algorithm,
+            'key_id': self.key_id.hex(),
+            'chunk_size': self.chunk_size,
+        }
+    
+    def open_writer(self, fileobj: IO[bytes]) -> 'EncryptingWriter':
+        """Open a stream encrypting into ``fileobj``; closing it writes the last chunk."""
+        return EncryptingWriter(fileobj, self._cipher_class, self._key, self.key_id, self.chunk_size)
+    
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        """
+        Open a stream of the decrypted contents of ``fileobj``.
+        
+        Raises:
+            EncryptionError: If the file is not encrypted or was encrypted with another key
+        """
+        reader = DecryptingReader(fileobj, self._cipher_class, self._invalid_tag, self._key)
+        if reader.key_id != self.key_id:
+            raise EncryptionError(f"The archive was encrypted with another key (key id {reader.key_id.hex()}, "
+                                  f"configured key {self.key_id.hex()})")
+        return io.BufferedReader(reader, buffer_size=reader.chunk_size)
+
+
+class EncryptingWriter(io.RawIOBase):
+    """
+    Write-through stream encrypting the data in authenticated chunks.
+    
+    Full chunks are sealed as the data arrives; up to one chunk is held back
+    because only :meth:`close` knows which chunk is the last. The underlying
+    stream is not closed.
+    """
+    
+    def __init__(self, fileobj: IO[bytes], cipher_class, key: bytes, key_id: bytes, chunk_size: int):
+        super().__init__()
+        self._fileobj = fileobj
+        self.chunk_size = chunk_size
+        salt = os.urandom(16)
+        self._header = HEADER.pack(MAGIC, VERSION, chunk_size, key_id, salt)
+        self._cipher = cipher_class(_derive_key(key, salt))
+        self._buffer = bytearray()
+        self._counter = 0
+        # Plain bytes accepted, the position seen by the writer above
+        self.bytes_written = 0
+        
+        self._fileobj.write(self._header)
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        with memoryview(data) as view:
+            size = view.nbytes
+            offset = 0
+            if self._buffer:
+                offset = min(size, self.chunk_size - len(self._buffer))
+                self._buffer += view[:offset]
+                if offset < size:
+                    self._seal(self._buffer, last=False)
+                    self._buffer.clear()
+            # Full chunks are sealed straight from the caller's data
+            while size - offset > self.chunk_size:
+                self._seal(view[offset:offset + self.chunk_size], last=False)
+                offset += self.chunk_size
+            self._buffer += view[offset:]
+        
+        self.bytes_written += size
+        return size
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def flush(self) -> None:
+        self._fileobj.flush()
+    
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._seal(bytes(self._buffer), last=True)
+                self._buffer.clear()
+            finally:
+                super().close()
+    
+    def _seal(self, chunk, last: bool) -> None:
+        self._fileobj.write(self._cipher.encrypt(_nonce(self._counter, last), chunk, self._header))
+        self._counter += 1
+
+
+class DecryptingReader(io.RawIOBase):
+    """
+    Readable stream of the decrypted contents of an encrypted archive.
+    
+    Reads one sealed chunk ahead to tell whether the current chunk is the
+    last one. A chunk failing authentication raises EncryptionError, so no
+    unauthenticated data is ever returned. Over a seekable file the stream
+    is seekable too (only the chunk holding the new position is decrypted),
+    for formats needing random access such as zip and tar members.
+    """
+    
+    def __init__(self, fileobj: IO[bytes], cipher_class, invalid_tag, key: bytes):
+        super().__init__()
+        self._fileobj = fileobj
+        self._invalid_tag = invalid_tag
+        
+        self._header = _read_exact(fileobj, HEADER.size)
+        if len(self._header) < HEADER.size or not self._header.startswith(MAGIC):
+            raise EncryptionError("Not an encrypted backup archive")
+        _, version, self.chunk_size, self.key_id, salt = HEADER.unpack(self._header)
+        if version != VERSION:
+            raise EncryptionError(f"Unsupported encrypted archive version: {version}")
+        if not 0 < self.chunk_size <= MAX_CHUNK_SIZE:
+            raise EncryptionError(f"Invalid chunk size in the archive header: {self.chunk_size}")
+        
+        self._cipher = cipher_class(_derive_key(key, salt))
+        self._counter = 0
+        self._pending: Optional[bytes] = None
+        self._plaintext = b''
+        self._offset = 0
+        self._done = False
+        # Decrypted position, and bytes to skip in the next chunk after a seek
+        self._position = 0
+        self._skip = 0
+        
+        # Size of the decrypted data, known when the file is seekable
+        self._size: Optional[int] = None
+        if fileobj.seekable():
+            sealed_size = fileobj.seek(0, io.SEEK_END) - HEADER.size
+            chunks = -(-sealed_size // (self.chunk_size + TAG_SIZE))
+            self._size = max(0, sealed_size - chunks * TAG_SIZE)
+            fileobj.seek(HEADER.size)
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return self._size is not None
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if self._size is None:
+            raise io.UnsupportedOperation("seek")
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        
+        index, skip = divmod(offset, self.chunk_size)
+        if index == self._counter - 1 and self._plaintext and not self._skip:
+            # Within the chunk already decrypted
+            self._offset = skip
+        else:
+            self._fileobj.seek(HEADER.size + index * (self.chunk_size + TAG_SIZE))
+            self._counter = index
+            self._pending = None
+            self._plaintext = b''
+            self._offset = 0
+            self._skip = skip
+            self._done = offset >= self._size
+        
+        self._position = offset
+        return offset
+    
+    def readinto(self, buffer) -> int:
+        while self._offset >= len(self._plaintext):
+            if self._done:
+                return 0
+            self._plaintext = self._next_chunk()
+            self._offset, self._skip = self._skip, 0
+        
+        size = min(len(buffer), len(self._plaintext) - self._offset)
+        buffer[:size] = self._plaintext[self._offset:self._offset + size]
+        self._offset += size
+        self._position += size
+        return size
+    
+    def _next_chunk(self) -> bytes:
+        sealed_size = self.chunk_size + TAG_SIZE
+        current = self._pending if self._pending is not None else _read_exact(self._fileobj, sealed_size)
+        # A full chunk is the last one only if nothing follows it
+        following = _read_exact(self._fileobj, sealed_size) if len(current) == sealed_size else b''
+        last = not following
+        
+        try:
+            plaintext = self._cipher.decrypt(_nonce(self._counter, last), current, self._header)
+        except self._invalid_tag:
+            raise EncryptionError(f"Chunk {self._counter} of the archive failed authentication, "
+                                  f"the archive is corrupted or truncated")
+        
+        self._counter += 1
+        self._pending = following or None
+        self._done = last
+        return plaintext
@@ -1,22 +1,47 @@
 """
 Utility functions for the backup system.
 """
+import io
 import os
-import zipfile
 import logging
-from typing import Optional
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, IO, List, Optional
+from src.compression import CodecFactory
+from .checksum import HashingWriter, new_hasher
 
+if TYPE_CHECKING:
+    from .encryption import Encryption
 
-def compress_file(source_file: str, compression_type: str = 'zip') -> Optional[str]:
+
+def compress_file(source_file: str, compression_type: str = 'zip', level: Optional[int] = None,
+                  chunk_size: int = 1024 * 1024, threads: int = 1,
+                  block_size: int = 4 * 1024 * 1024, checksums: Optional[Dict[str, str]] = None,
+                  checksum_algorithm: str = 'sha256', throttle=None,
+                  encryption: Optional['Encryption'] = None) -> Optional[str]:
     """
     Compress a file using the specified compression type.
     
+    The source file is read and compressed in chunks, so memory use does not
+    depend on the size of the backup. When ``checksums`` is given, the
+    checksums of the source file and of the archive are computed in the same
+    pass and stored in it by path. With ``encryption`` the archive is
+    encrypted as it is written and named '*.enc'.
+    
     Args:
         source_file: Path to the source file
-        compression_type: Type of compression ('zip', 'gzip', etc.)
+        compression_type: Type of compression ('zip', 'gzip', 'zstd', 'xz', 'lz4')
+        level: Optional compression level, codec default if None
+        chunk_size: Number of bytes read per chunk
+        threads: Number of compression threads (0 = one per CPU)
+        block_size: Size of the blocks compressed in parallel
+        checksums: Optional dictionary receiving the checksums by file path
+        checksum_algorithm: Hash algorithm of the checksums
+        throttle: Optional Throttle whose write limit paces the archive writes
+        encryption: Optional Encryption the archive is encrypted with
         
     Returns:
         Optional[str]: Path to the compressed file, or None if compression failed
+            (a partially written archive is removed)
     """
     logger = logging.getLogger(__name__)
     
@@ -24,37 +49,276 @@ def compress_file(source_file: str, compression_type: str = 'zip') -> Optional[s
         logger.error(f"Source file does not exist: {source_file}")
         return None
     
+    archive_file = None
     try:
-        if compression_type.lower() == 'zip':
-            return _create_zip_file(source_file)
-        else:
-            logger.error(f"Unsupported compression type: {compression_type}")
-            return None
+        codec = CodecFactory.create_codec(compression_type, level)
+        archive_file = codec.get_archive_name(source_file)
+        if encryption is not None:
+            archive_file = encryption.get_encrypted_name(archive_file)
+        
+        source_hasher = new_hasher(checksum_algorithm) if checksums is not None else None
+        archive_hasher = new_hasher(checksum_algorithm) if checksums is not None else None
+        
+        with open(source_file, 'rb') as source:
+            with open_archive_writer(archive_file, os.path.basename(source_file), compression_type,
+                                     level, threads, block_size, hasher=archive_hasher,
+                                     throttle=throttle, encryption=encryption) as writer:
+                for chunk in iter(lambda: source.read(chunk_size), b''):
+                    if source_hasher:
+                        source_hasher.update(chunk)
+                    writer.write(chunk)
+        
+        if checksums is not None:
+            checksums[source_file] = source_hasher.hexdigest()
+            checksums[archive_file] = archive_hasher.hexdigest()
+        
+        return archive_file
             
     except Exception as e:
         logger.error(f"Failed to compress file {source_file}: {e}")
+        if archive_file and os.path.exists(archive_file):
+            os.remove(archive_file)
         return None
 
 
-def _create_zip_file(source_file: str) -> str:
+def get_archive_extension(compression_type: str = 'zip') -> str:
     """
-    Create a ZIP file from the source file.
+    Get the file extension used for archives of the given compression type.
     
     Args:
-        source_file: Path to the source file
+        compression_type: Type of compression ('zip', 'gzip', 'zstd', 'xz', 'lz4')
         
     Returns:
-        str: Path to the created ZIP file
+        str: File extension without the leading dot (replaces '.sql')
+        
+    Raises:
+        ValueError: If compression type is not supported
+    """
+    return CodecFactory.create_codec(compression_type).extension
+
+
+@contextmanager
+def open_archive_writer(archive_path: str, entry_name: str, compression_type: str = 'zip',
+                        level: Optional[int] = None, threads: int = 1,
+                        block_size: int = 4 * 1024 * 1024, hasher=None, throttle=None,
+                        mirrors: Optional[List[IO[bytes]]] = None,
+                        encryption: Optional['Encryption'] = None) -> Iterator[IO[bytes]]:
     """
-    # Create ZIP filename
-    base_name = os.path.splitext(source_file)[0]
-    zip_file = f"{base_name}.zip"
+    Open a writable stream that compresses into an archive file.
+    
+    With a ``hasher`` every compressed byte is hashed as it is written, so
+    the archive checksum is known without reading the file again. With
+    ``mirrors`` the compressed bytes are also written to other streams, such
+    as uploads to a storage target. With ``encryption`` the compressed bytes
+    are encrypted before they reach the file, so the checksum and the
+    uploads cover the encrypted archive.
+    
+    Args:
+        archive_path: Path to the archive to create
+        entry_name: Name of the uncompressed file inside the archive
+        compression_type: Type of compression ('zip', 'gzip', 'zstd', 'xz', 'lz4')
+        level: Optional compression level, codec default if None
+        threads: Number of compression threads (0 = one per CPU)
+        block_size: Size of the blocks compressed in parallel
+        hasher: Optional hash object (see ``new_hasher``) fed with the archive bytes
+        throttle: Optional Throttle whose write limit paces the archive writes
+        mirrors: Optional streams receiving a copy of the archive bytes
+        encryption: Optional Encryption the archive is encrypted with
+        
+    Yields:
+        IO[bytes]: Binary stream accepting uncompressed data
+        
+    Raises:
+        ValueError: If compression type is not supported
+        CompressionError: If the codec cannot be used
+    """
+    codec = CodecFactory.create_codec(compression_type, level)
+    threads = threads if threads > 0 else (os.cpu_count() or 1)
+    
+    with open(archive_path, 'wb') as fileobj:
+        target = throttle.wrap_writer(fileobj) if throttle is not None else fileobj
+        target = HashingWriter(target, hasher) if hasher is not None else target
+        target = _TeeWriter(target, mirrors) if mirrors else target
+        encryptor = encryption.open_writer(target) if encryption is not None else None
+        writer = codec.open_parallel_writer(encryptor or target, entry_name, threads, block_size)
+        try:
+            yield writer
+        finally:
+            try:
+                writer.close()
+            finally:
+                # Codecs leave the target open, closing the encryptor writes the last chunk
+                if encryptor is not None:
+                    encryptor.close()
+
+
+class _TeeWriter(io.RawIOBase):
+    """Write-through stream that copies every write to other streams."""
+    
+    def __init__(self, fileobj: IO[bytes], mirrors: List[IO[bytes]]):
+        super().__init__()
+        self._fileobj = fileobj
+        self._mirrors = mirrors
+        self.bytes_written = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._fileobj.write(data)
+        for mirror in self._mirrors:
+            mirror.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+
+class _ProgressReader(io.RawIOBase):
+    """Readable stream that reports the number of bytes read from a file."""
+    
+    def __init__(self, fileobj: IO[bytes], on_read: Callable[[int], None]):
+        super().__init__()
+        self._fileobj = fileobj
+        self._on_read = on_read
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        count = self._fileobj.readinto(buffer)
+        if count:
+            self._on_read(count)
+        return count
+    
+    def seekable(self) -> bool:
+        return self._fileobj.seekable()
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._fileobj.seek(offset, whence)
+    
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+
+@contextmanager
+def open_archive_reader(archive_path: str, on_read: Optional[Callable[[int], None]] = None,
+                        encryption: Optional['Encryption'] = None) -> Iterator[IO[bytes]]:
+    """
+    Open a readable stream of the uncompressed contents of an archive.
+    
+    The codec is detected from the file extension; files without a known
+    archive extension are read as-is. Encrypted archives ('*.enc') are
+    decrypted on the fly with ``encryption``.
+    
+    Args:
+        archive_path: Path to the archive
+        on_read: Optional callback receiving the number of (compressed) bytes
+            read from the archive file, for progress reporting
+        encryption: Encryption holding the key of encrypted archives
+        
+    Yields:
+        IO[bytes]: Binary stream of uncompressed data
+    
+    Raises:
+        EncryptionError: If the archive is encrypted and cannot be decrypted
+    """
+    from .encryption import Encryption, EncryptionError
+    
+    encrypted = Encryption.is_encrypted(archive_path)
+    if encrypted and encryption is None:
+        raise EncryptionError(f"{archive_path} is encrypted, configure its key with "
+                              f"BACKUP_ENCRYPTION_KEY or BACKUP_ENCRYPTION_KEY_FILE")
+    codec = CodecFactory.detect_codec(Encryption.strip_extension(archive_path))
+    
+    with open(archive_path, 'rb') as fileobj:
+        source = io.BufferedReader(_ProgressReader(fileobj, on_read)) if on_read else fileobj
+        if encrypted:
+            source = encryption.open_reader(source)
+        
+        if codec is None:
+            yield source
+            return
+        
+        reader = codec.open_reader(source)
+        try:
+            yield reader
+        finally:
+            reader.close()
+
+
+def package_directory(directory: str, archive_path: str, arcname: Optional[str] = None,
+                      hasher=None, throttle=None, encryption: Optional['Encryption'] = None) -> str:
+    """
+    Package a directory into a single uncompressed tar archive.
+    
+    The archive is written to a temporary ``.part`` file, moved into place
+    and the source directory is removed afterwards. No compression is applied
+    because the packaged files are expected to be compressed already. With
+    ``encryption`` the tar stream is encrypted as it is written.
+    
+    Args:
+        directory: Directory to package
+        archive_path: Path to the tar archive to create
+        arcname: Name of the top-level directory in the archive
+        hasher: Optional hash object fed with the archive bytes as they are written
+        throttle: Optional Throttle whose write limit paces the archive writes
+        encryption: Optional Encryption the archive is encrypted with
+        
+    Returns:
+        str: Path to the created archive
+    """
+    # Only directory-format dumps are packaged, tarfile stays off the startup path
+    import shutil
+    import tarfile
+    
+    temp_path = f"{archive_path}.part"
+    
+    with open(temp_path, 'wb') as fileobj:
+        target = throttle.wrap_writer(fileobj) if throttle is not None else fileobj
+        target = HashingWriter(target, hasher) if hasher is not None else target
+        encryptor = encryption.open_writer(target) if encryption is not None else None
+        with tarfile.open(fileobj=encryptor or target, mode='w') as tar:
+            tar.add(directory, arcname=arcname or os.path.basename(directory))
+        if encryptor is not None:
+            encryptor.close()
+    
+    os.replace(temp_path, archive_path)
+    shutil.rmtree(directory)
+    return archive_path
+
+
+def get_auto_worker_count(load_ceiling: Optional[float] = None, max_workers: Optional[int] = None) -> int:
+    """
+    Pick a worker count from the CPU count and the current load.
+    
+    Workers are added only while the 1-minute load average stays below the
+    ceiling, so a busy host gets fewer workers.
+    
+    Args:
+        load_ceiling: Highest load average to reach, defaults to the CPU count
+        max_workers: Optional upper bound for the worker count
+        
+    Returns:
+        int: Number of workers, at least 1
+    """
+    cpus = os.cpu_count() or 1
+    ceiling = cpus if load_ceiling is None else load_ceiling
+    
+    try:
+        load = os.getloadavg()[0]
+    except (OSError, AttributeError):
+        load = 0.0
     
-    # Create ZIP file
-    with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.write(source_file, os.path.basename(source_file))
+    workers = min(int(ceiling - load), cpus)
+    if max_workers:
+        workers = min(workers, max_workers)
     
-    return zip_file
+    return max(1, workers)
 
 
 def setup_logging(log_level: str = 'INFO', log_file: Optional[str] = None) -> None:
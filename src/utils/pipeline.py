@@ -0,0 +1,383 @@
+"""
+Streaming dump pipeline.
+"""
+import os
+import queue
+import logging
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+from src.compression import CodecFactory
+from .checksum import new_hasher
+from .encryption import Encryption
+from .helpers import open_archive_reader, open_archive_writer
+from .progress import ProgressReporter
+from .stderr import StderrBuffer
+
+
+class PipelineError(Exception):
+    """Custom exception for streaming pipeline errors."""
+    pass
+
+
+class DumpPipeline:
+    """
+    Stream the stdout of a dump command into a compressed archive.
+    
+    A reader thread pulls fixed-size chunks from the dump process into a
+    bounded queue while the calling thread compresses them, so the plain
+    dump never touches the disk and memory use is capped at
+    ``chunk_size * buffer_chunks``. With a checksum algorithm the dump
+    output and the archive are hashed on the way through. With a throttle
+    the reads from the dump command are paced by its dump limit (the dump
+    tool blocks on the full pipe) and the archive writes by its write limit.
+    
+    With a ``selector`` (see ``CodecSelector``) the codec is picked from the
+    first ``selector.sample_size`` bytes of the dump before the archive is
+    opened. ``archive_path`` is then the path of the dump ('*.sql') and gets
+    the extension of the selected codec.
+    
+    With ``storages`` (see ``BaseStorage``) the archive is uploaded to every
+    target while it is written. An upload that fails does not fail the dump;
+    the targets whose upload completed are listed in ``uploads``.
+    
+    With ``encryption`` (see ``Encryption``) the archive is encrypted as it
+    is written and ``archive_path`` should end in '.enc'; with a selector
+    the extension is added after the codec's.
+    
+    The error output of the dump command is kept in a bounded buffer (see
+    ``StderrBuffer``); ``on_stderr_line`` receives every line as it is
+    written and ``progress`` counts the bytes read from the command.
+    """
+    
+    def __init__(self, command: List[str], archive_path: str, entry_name: str,
+                 compression_type: str = 'zip', level: Optional[int] = None,
+                 chunk_size: int = 1024 * 1024, buffer_chunks: int = 8,
+                 threads: int = 1, block_size: int = 4 * 1024 * 1024,
+                 env: Optional[Dict[str, str]] = None, checksum_algorithm: Optional[str] = None,
+                 throttle=None, selector=None, expected_size: Optional[int] = None,
+                 storages: Optional[List[Any]] = None, encryption: Optional[Encryption] = None,
+                 progress: Optional[ProgressReporter] = None,
+                 on_stderr_line: Optional[Callable[[str], None]] = None):
+        self.command = command
+        self.archive_path = archive_path
+        self.entry_name = entry_name
+        self.compression_type = compression_type
+        self.level = level
+        self.chunk_size = max(1, chunk_size)
+        self.buffer_chunks = max(1, buffer_chunks)
+        self.threads = threads
+        self.block_size = block_size
+        self.env = env
+        self.throttle = throttle
+        self.selector = selector
+        # Expected dump size, for the time budget of the selector
+        self.expected_size = expected_size
+        # CodecChoice made by the selector
+        self.selection = None
+        self.storages = storages or []
+        self.encryption = encryption
+        self.progress = progress
+        # URIs of the completed uploads by storage type
+        self.uploads: Dict[str, str] = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+        
+        self.bytes_in = 0
+        # Checksums of the archive and of the uncompressed dump output
+        self.checksum: Optional[str] = None
+        self.content_checksum: Optional[str] = None
+        self._archive_hasher = new_hasher(checksum_algorithm) if checksum_algorithm else None
+        self._content_hasher = new_hasher(checksum_algorithm) if checksum_algorithm else None
+        self._buffer: queue.Queue = queue.Queue(maxsize=self.buffer_chunks)
+        self._stop = threading.Event()
+        self._stderr = StderrBuffer(on_line=on_stderr_line)
+    
+    def run(self) -> int:
+        """
+        Run the dump command and write its output to the archive.
+        
+        The archive is written to a temporary ``.part`` file and only moved
+        into place once the dump command has exited successfully.
+        
+        Returns:
+            int: Number of uncompressed bytes read from the dump command
+        
+        Raises:
+            PipelineError: If the command or the compressor fails
+        """
+        temp_path = None
+        uploads = []
+        
+        process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+        )
+        
+        reader = threading.Thread(target=self._read_stdout, args=(process.stdout,), daemon=True)
+        reader.start()
+        self._stderr.start(process.stderr)
+        
+        try:
+            pending = self._select_codec() if self.selector else []
+            temp_path = f"{self.archive_path}.part"
+            uploads = self._open_uploads()
+            
+            with open_archive_writer(temp_path, self.entry_name, self.compression_type, self.level,
+                                     self.threads, self.block_size, hasher=self._archive_hasher,
+                                     throttle=self.throttle,
+                                     mirrors=[upload for _, upload in uploads],
+                                     encryption=self.encryption) as writer:
+                for chunk in self._iter_chunks(pending):
+                    if self._content_hasher:
+                        self._content_hasher.update(chunk)
+                    writer.write(chunk)
+                    self.bytes_in += len(chunk)
+                    if self.progress:
+                        self.progress.update(len(chunk))
+        except Exception as e:
+            self._stop.set()
+            process.kill()
+            process.wait()
+            self._remove(temp_path)
+            self._abort_uploads(uploads)
+            raise PipelineError(f"Streaming pipeline failed: {e}")
+        
+        returncode = process.wait()
+        reader.join()
+        self._stderr.join()
+        
+        if returncode != 0 or self.bytes_in == 0:
+            self._abort_uploads(uploads)
+        
+        if returncode != 0:
+            self._remove(temp_path)
+            self.logger.error(f"Command failed with exit code {returncode}")
+            self.logger.error(f"Error output: {self.stderr}")
+            raise PipelineError(f"Command failed with exit code {returncode}")
+        
+        if self._archive_hasher:
+            self.checksum = self._archive_hasher.hexdigest()
+            self.content_checksum = self._content_hasher.hexdigest()
+        
+        os.replace(temp_path, self.archive_path)
+        
+        if self.bytes_in:
+            self._complete_uploads(uploads)
+        return self.bytes_in
+    
+    def _open_uploads(self) -> List[Any]:
+        """Start an upload of the archive to every storage target."""
+        uploads = []
+        filename = os.path.basename(self.archive_path)
+        for storage in self.storages:
+            try:
+                uploads.append((storage, storage.open_upload(filename)))
+            except Exception as e:
+                self.logger.warning(f"Cannot stream the archive to {storage.name}, "
+                                    f"it is uploaded after the backup: {e}")
+        return uploads
+    
+    def _complete_uploads(self, uploads: List[Any]) -> None:
+        """Finish the uploads, keeping the URIs of those that succeeded."""
+        for storage, upload in uploads:
+            try:
+                self.uploads[storage.name] = upload.complete()
+            except Exception as e:
+                self.logger.warning(f"Streaming the archive to {storage.name} failed, "
+                                    f"it is uploaded after the backup: {e}")
+    
+    @staticmethod
+    def _abort_uploads(uploads: List[Any]) -> None:
+        for _, upload in uploads:
+            upload.abort()
+    
+    def _select_codec(self) -> List[Any]:
+        """
+        Pick the codec from the first chunks of the dump.
+        
+        Returns:
+            List[Any]: The chunks read for the sample (including the end
+            marker if the dump was shorter), to be written first
+        """
+        pending = []
+        size = 0
+        while size < self.selector.sample_size:
+            item = self._buffer.get()
+            pending.append(item)
+            if item is None or isinstance(item, Exception):
+                break
+            size += len(item)
+        
+        sample = b''.join(item for item in pending if isinstance(item, bytes))
+        self.selection = self.selector.select(sample, self.expected_size)
+        self.compression_type = self.selection.codec
+        self.level = self.selection.level
+        self.archive_path = CodecFactory.create_codec(self.compression_type).get_archive_name(self.archive_path)
+        if self.encryption is not None:
+            self.archive_path = self.encryption.get_encrypted_name(self.archive_path)
+        return pending
+    
+    def _iter_chunks(self, pending: List[Any]):
+        """Yield the sampled chunks, then the chunks of the buffer until the end of the dump."""
+        while True:
+            chunk = pending.pop(0) if pending else self._buffer.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    
+    @property
+    def stderr(self) -> str:
+        """Last lines of the stderr output of the dump command."""
+        return self._stderr.text()
+    
+    def _read_stdout(self, stream) -> None:
+        """Read chunks from the dump process into the bounded buffer."""
+        try:
+            while not self._stop.is_set():
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                if self.throttle:
+                    self.throttle.dump.consume(len(chunk))
+                self._put(chunk)
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+        finally:
+            stream.close()
+    
+    def _put(self, item) -> None:
+        """Put an item in the buffer, giving up once the pipeline is stopped."""
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    @staticmethod
+    def _remove(path: Optional[str]) -> None:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+class RestorePipeline:
+    """
+    Stream the uncompressed contents of an archive into a restore command.
+    
+    A reader thread decompresses the archive into a bounded queue while the
+    calling thread feeds the command's stdin, so decompression overlaps with
+    the database applying the data and nothing is written to disk.
+    Encrypted archives are decrypted on the way with ``encryption``.
+    """
+    
+    def __init__(self, command: List[str], archive_path: str,
+                 chunk_size: int = 1024 * 1024, buffer_chunks: int = 8,
+                 env: Optional[Dict[str, str]] = None,
+                 progress: Optional[ProgressReporter] = None,
+                 encryption: Optional[Encryption] = None):
+        self.command = command
+        self.archive_path = archive_path
+        self.chunk_size = max(1, chunk_size)
+        self.buffer_chunks = max(1, buffer_chunks)
+        self.env = env
+        self.progress = progress
+        self.encryption = encryption
+        self.logger = logging.getLogger(self.__class__.__name__)
+        
+        self.bytes_out = 0
+        self._buffer: queue.Queue = queue.Queue(maxsize=self.buffer_chunks)
+        self._stop = threading.Event()
+        self._stderr = StderrBuffer()
+    
+    def run(self) -> int:
+        """
+        Run the restore command and feed it the archive contents.
+        
+        Returns:
+            int: Number of uncompressed bytes written to the command
+        
+        Raises:
+            PipelineError: If the archive cannot be read or the command fails
+        """
+        process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=self.env,
+        )
+        
+        reader = threading.Thread(target=self._read_archive, daemon=True)
+        reader.start()
+        self._stderr.start(process.stderr)
+        
+        error = None
+        try:
+            while True:
+                chunk = self._buffer.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                process.stdin.write(chunk)
+                self.bytes_out += len(chunk)
+        except BrokenPipeError:
+            # The command exited early; its exit code and stderr tell why
+            pass
+        except Exception as e:
+            error = e
+            process.kill()
+        finally:
+            self._stop.set()
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        
+        returncode = process.wait()
+        reader.join()
+        self._stderr.join()
+        
+        if error is not None:
+            raise PipelineError(f"Reading {self.archive_path} failed: {error}")
+        
+        if returncode != 0:
+            self.logger.error(f"Command failed with exit code {returncode}")
+            self.logger.error(f"Error output: {self.stderr}")
+            raise PipelineError(f"Command failed with exit code {returncode}")
+        
+        return self.bytes_out
+    
+    @property
+    def stderr(self) -> str:
+        """Last lines of the stderr output of the restore command."""
+        return self._stderr.text()
+    
+    def _read_archive(self) -> None:
+        """Decompress the archive into the bounded buffer."""
+        on_read = self.progress.update if self.progress else None
+        try:
+            with open_archive_reader(self.archive_path, on_read=on_read, encryption=self.encryption) as reader:
+                while not self._stop.is_set():
+                    chunk = reader.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    self._put(chunk)
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+    
+    def _put(self, item) -> None:
+        """Put an item in the buffer, giving up once the pipeline is stopped."""
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
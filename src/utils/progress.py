@@ -0,0 +1,127 @@
+"""
+Progress reporting for long running transfers.
+"""
+import time
+import logging
+import threading
+from typing import Callable, Optional
+from .helpers import format_duration
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count in a human-readable unit."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+class ProgressReporter:
+    """
+    Thread-safe byte counter that logs throughput at a fixed interval.
+    
+    With a known total the log line also shows the percentage done and the
+    estimated time left. Transfers made of items (e.g. the tables of a
+    dump) can count them with :meth:`step`, and a ``listener`` receives
+    every progress line logged (e.g. to notify about a long backup).
+    """
+    
+    def __init__(self, label: str, total: Optional[int] = None, interval: float = 5.0,
+                 logger: Optional[logging.Logger] = None, items_total: Optional[int] = None,
+                 item_label: str = 'item', listener: Optional[Callable[[str], None]] = None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.done = 0
+        self.items_total = items_total
+        self.item_label = item_label
+        self.items_done = 0
+        # Item being processed
+        self.item: Optional[str] = None
+        self.listener = listener
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+    
+    def update(self, count: int) -> None:
+        """Add ``count`` processed bytes, logging if the interval has passed."""
+        with self._lock:
+            self.done += count
+            if not self._is_due():
+                return
+        
+        self._report()
+    
+    def update_to(self, done: int, total: Optional[int] = None) -> None:
+        """Set the processed bytes (and the total) reported by the transfer itself."""
+        with self._lock:
+            self.done = done
+            if total:
+                self.total = total
+            if not self._is_due():
+                return
+        
+        self._report()
+    
+    def step(self, item: str) -> None:
+        """Start processing the next item."""
+        with self._lock:
+            self.items_done += 1
+            self.item = item
+            if not self._is_due():
+                return
+        
+        self._report()
+    
+    def _is_due(self) -> bool:
+        """Check whether the interval has passed, called with the lock held."""
+        now = time.monotonic()
+        if now - self._last_report < self.interval:
+            return False
+        self._last_report = now
+        return True
+    
+    def _report(self) -> None:
+        line = self.describe()
+        self.logger.info(line)
+        if self.listener is not None:
+            self.listener(line)
+    
+    @property
+    def rate(self) -> float:
+        """Average throughput in bytes per second."""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+    
+    def describe(self) -> str:
+        """Describe the current progress in one line."""
+        rate = self.rate
+        
+        # A total that was only an estimate may be exceeded
+        if not self.total or self.done > self.total:
+            line = f"{self.label}: {format_bytes(self.done)} ({format_bytes(rate)}/s)"
+        else:
+            percent = min(100.0, self.done * 100.0 / self.total)
+            line = (f"{self.label}: {percent:.0f}% ({format_bytes(self.done)} of {format_bytes(self.total)}, "
+                    f"{format_bytes(rate)}/s")
+            if rate > 0 and self.done < self.total:
+                line += f", ETA {format_duration((self.total - self.done) / rate)}"
+            line += ")"
+        
+        if self.items_done:
+            line += f", {self.item_label} {self.items_done}"
+            if self.items_total:
+                line += f"/{self.items_total}"
+            if self.item:
+                line += f" {self.item}"
+        return line
+    
+    def finish(self) -> None:
+        """Log the final throughput."""
+        elapsed = time.monotonic() - self.started
+        line = f"{self.label}: {format_bytes(self.done)} in {format_duration(elapsed)} ({format_bytes(self.rate)}/s)"
+        if self.items_done:
+            line += f", {self.items_done} {self.item_label}s"
+        self.logger.info(line)
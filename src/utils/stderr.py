@@ -0,0 +1,78 @@
+"""
+Bounded capture of the error output of child processes.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+class StderrBuffer:
+    """
+    Keep the last lines of a process's error output in a ring buffer.
+    
+    The stream is consumed line by line while the process runs, so a
+    verbose tool never blocks on a full pipe and memory stays bounded by
+    ``max_lines * max_line_length`` however much it prints. Lines longer
+    than ``max_line_length`` are cut. Every line is passed to ``on_line``
+    as it arrives, e.g. to follow the progress of a dump.
+    """
+    
+    def __init__(self, max_lines: int = 200, max_line_length: int = 4096,
+                 on_line: Optional[Callable[[str], None]] = None):
+        self.max_line_length = max(1, max_line_length)
+        self.on_line = on_line
+        self.lines: deque = deque(maxlen=max(1, max_lines))
+        # Lines read, including the ones that left the buffer
+        self.total_lines = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self, stream) -> 'StderrBuffer':
+        """Consume a binary stream in a daemon thread."""
+        self._thread = threading.Thread(target=self.read, args=(stream,), daemon=True)
+        self._thread.start()
+        return self
+    
+    def join(self) -> None:
+        """Wait until the stream is closed."""
+        if self._thread is not None:
+            self._thread.join()
+    
+    def read(self, stream) -> None:
+        """Consume a binary stream until it is closed."""
+        truncated = False
+        try:
+            for line in iter(lambda: stream.readline(self.max_line_length), b''):
+                continued = truncated
+                truncated = len(line) == self.max_line_length and not line.endswith(b'\n')
+                if continued:
+                    # Rest of a line that was cut
+                    continue
+                text = line.decode('utf-8', errors='replace').rstrip()
+                if text:
+                    self.append(text + (' [...]' if truncated else ''))
+        finally:
+            stream.close()
+    
+    def append(self, text: str) -> None:
+        """Add a line, passing it to ``on_line``."""
+        self.lines.append(text)
+        self.total_lines += 1
+        if self.on_line is not None:
+            try:
+                self.on_line(text)
+            except Exception as e:
+                # Following the output must never stop draining it
+                self.logger.debug(f"Failed to handle output line {text!r}: {e}")
+    
+    def text(self) -> str:
+        """Get the kept lines, noting how many earlier lines were dropped."""
+        lines = list(self.lines)
+        omitted = self.total_lines - len(lines)
+        if omitted > 0:
+            lines.insert(0, f"[{omitted} earlier lines omitted]")
+        return '\n'.join(lines)
+    
+    def __str__(self) -> str:
+        return self.text()
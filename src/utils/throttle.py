@@ -0,0 +1,339 @@
+"""
+I/O and CPU throttling of the backup processes.
+"""
+import io
+import re
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from typing import Any, Dict, IO, List, Optional
+
+from .progress import format_bytes
+
+
+# ionice scheduling classes by name
+IONICE_CLASSES = {
+    'realtime': 1,
+    'best-effort': 2,
+    'idle': 3,
+}
+
+
+class RateLimiter:
+    """
+    Token bucket limiting a byte rate, shared by any number of threads.
+    
+    :meth:`consume` blocks until the bytes fit in the rate. Large chunks
+    are allowed to overdraw the bucket and the caller waits off the debt,
+    so the average rate holds whatever the chunk size. A rate of 0 means
+    unlimited; the bytes are still counted.
+    """
+    
+    def __init__(self, rate: float = 0, burst: float = 1.0, name: str = 'rate'):
+        self.name = name
+        # Configured rate, restored when the adaptive throttle recovers
+        self.ceiling = max(0.0, float(rate))
+        # Seconds of traffic the bucket can hold
+        self.burst = burst
+        # Set by the adaptive throttle, which may limit an unlimited rate
+        self.adaptive = False
+        self.total = 0
+        self.waited = 0.0
+        self._rate = self.ceiling
+        self._tokens = self.ceiling * burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def rate(self) -> float:
+        """Current rate in bytes per second, 0 if unlimited."""
+        return self._rate
+    
+    @property
+    def limited(self) -> bool:
+        """Whether the rate is or may become limited during the run."""
+        return self.ceiling > 0 or self.adaptive
+    
+    def set_rate(self, rate: float) -> None:
+        """Change the rate, 0 for unlimited."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = max(0.0, float(rate))
+            self._tokens = min(self._tokens, self._rate * self.burst)
+    
+    def consume(self, count: int) -> None:
+        """Account for ``count`` bytes, sleeping as long as the rate requires."""
+        with self._lock:
+            self.total += count
+            if self._rate <= 0:
+                return
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= count
+            delay = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            self.waited += delay
+        
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _refill(self, now: float) -> None:
+        if self._rate > 0:
+            self._tokens = min(self._rate * self.burst, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+
+class ThrottledWriter(io.RawIOBase):
+    """Write-through stream whose writes are paced by a rate limiter."""
+    
+    def __init__(self, fileobj: IO[bytes], limiter: RateLimiter):
+        super().__init__()
+        self._fileobj = fileobj
+        self._limiter = limiter
+        self.bytes_written = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._limiter.consume(len(data))
+        self._fileobj.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+
+def get_priority_prefix(nice: Optional[int] = None, ionice_class: Optional[str] = None,
+                        ionice_level: Optional[int] = None) -> List[str]:
+    """
+    Get the ``nice``/``ionice`` command prefix that runs a command at a lower priority.
+    
+    Args:
+        nice: Niceness of the command (-20 to 19), unchanged if None
+        ionice_class: I/O scheduling class ('idle', 'best-effort', 'realtime' or 1-3)
+        ionice_level: Priority within the best-effort and realtime classes (0-7)
+    
+    Returns:
+        List[str]: Command prefix, empty when no priority is configured
+    
+    Raises:
+        ValueError: If the I/O scheduling class is unknown
+    """
+    logger = logging.getLogger(__name__)
+    prefix = []
+    
+    if nice is not None:
+        if shutil.which('nice'):
+            prefix.extend(['nice', '-n', str(nice)])
+        else:
+            logger.warning("BACKUP_NICE is set but the nice command is not available")
+    
+    if ionice_class or ionice_level is not None:
+        io_class = str(ionice_class or 'best-effort').lower()
+        io_class = str(IONICE_CLASSES.get(io_class, io_class))
+        if io_class not in ('1', '2', '3'):
+            raise ValueError(f"Unknown ionice class: {ionice_class}. "
+                             f"Supported classes: {', '.join(IONICE_CLASSES)}")
+        
+        if shutil.which('ionice'):
+            prefix.extend(['ionice', '-c', io_class])
+            # The idle class has no levels
+            if ionice_level is not None and io_class != '3':
+                prefix.extend(['-n', str(ionice_level)])
+        else:
+            logger.warning("BACKUP_IONICE_CLASS is set but the ionice command is not available")
+    
+    return prefix
+
+
+class AdaptiveThrottle:
+    """
+    Lower the rate limits while a load probe reports high load.
+    
+    The probe is a shell command printing a number, for example the active
+    connections or the replication lag of the production database. It runs
+    every ``interval`` seconds in a daemon thread: while its value exceeds
+    the threshold the limiters are halved (down to ``min_rate``), and once
+    it falls back they are doubled until they reach their configured rate.
+    An unlimited limiter starts from the throughput it had when the load
+    rose and becomes unlimited again after recovering past it.
+    """
+    
+    def __init__(self, limiters: List[RateLimiter], probe: str, threshold: float,
+                 interval: float = 15.0, min_rate: float = 1024 * 1024,
+                 env: Optional[Dict[str, str]] = None):
+        self.limiters = limiters
+        self.probe = probe
+        self.threshold = threshold
+        self.interval = max(1.0, interval)
+        self.min_rate = max(1.0, min_rate)
+        self.env = env
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # Throughput of the unlimited limiters before the first back off
+        self._baseline: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        for limiter in limiters:
+            limiter.adaptive = True
+    
+    def start(self) -> None:
+        """Start probing in the background."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='throttle-probe', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop probing and restore the configured rates."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval)
+            self._thread = None
+        for limiter in self.limiters:
+            limiter.set_rate(limiter.ceiling)
+        self._baseline.clear()
+    
+    def read_probe(self) -> Optional[float]:
+        """Run the probe and return its value, None if it failed."""
+        try:
+            result = subprocess.run(self.probe, shell=True, capture_output=True, text=True,
+                                    timeout=self.interval, env=self.env)
+        except subprocess.TimeoutExpired:
+            self.logger.warning(f"Load probe timed out after {self.interval:.0f}s")
+            return None
+        
+        match = re.search(r'-?\d+(?:\.\d+)?', result.stdout)
+        if result.returncode != 0 or not match:
+            self.logger.warning(f"Load probe failed (exit code {result.returncode}): "
+                                f"{(result.stderr or result.stdout).strip()}")
+            return None
+        return float(match.group())
+    
+    def _run(self) -> None:
+        totals = {id(limiter): limiter.total for limiter in self.limiters}
+        last = time.monotonic()
+        
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            elapsed = max(now - last, 1e-6)
+            last = now
+            # Throughput of every limiter since the previous probe
+            throughput = {}
+            for limiter in self.limiters:
+                throughput[id(limiter)] = (limiter.total - totals[id(limiter)]) / elapsed
+                totals[id(limiter)] = limiter.total
+            
+            value = self.read_probe()
+            if value is None:
+                continue
+            
+            for limiter in self.limiters:
+                if value > self.threshold:
+                    self._back_off(limiter, throughput[id(limiter)], value)
+                else:
+                    self._recover(limiter, value)
+    
+    def _back_off(self, limiter: RateLimiter, throughput: float, value: float) -> None:
+        current = limiter.rate
+        if current <= 0:
+            if throughput <= 0:
+                return
+            self._baseline[id(limiter)] = throughput
+            current = throughput
+        
+        rate = max(self.min_rate, current / 2)
+        if rate != limiter.rate:
+            limiter.set_rate(rate)
+            self.logger.info(f"Load probe reported {value:g} (threshold {self.threshold:g}), "
+                             f"limiting the {limiter.name} to {format_bytes(rate)}/s")
+    
+    def _recover(self, limiter: RateLimiter, value: float) -> None:
+        if limiter.rate == limiter.ceiling:
+            return
+        
+        rate = limiter.rate * 2
+        target = limiter.ceiling or self._baseline.get(id(limiter), 0)
+        if rate >= target:
+            rate = limiter.ceiling
+            self._baseline.pop(id(limiter), None)
+        
+        limiter.set_rate(rate)
+        limit = f"{format_bytes(rate)}/s" if rate else "unlimited"
+        self.logger.info(f"Load probe reported {value:g} (threshold {self.threshold:g}), "
+                         f"raising the {limiter.name} limit to {limit}")
+
+
+class Throttle:
+    """
+    Rate limits and process priority applied to the backups of one run.
+    
+    One instance is shared by all jobs, so the limits are a budget for the
+    whole host rather than per database:
+    
+    - ``dump`` limits the output read from the dump tools (which then block
+      on the pipe, slowing down their reads from the database)
+    - ``write`` limits the archives written to the backup directory
+    - :meth:`wrap_command` runs the dump tools under ``nice``/``ionice``
+    """
+    
+    def __init__(self, dump_rate: float = 0, write_rate: float = 0, nice: Optional[int] = None,
+                 ionice_class: Optional[str] = None, ionice_level: Optional[int] = None,
+                 probe: Optional[str] = None, probe_threshold: float = 0, probe_interval: float = 15.0,
+                 min_rate: float = 1024 * 1024):
+        self.dump = RateLimiter(dump_rate, name='dump output')
+        self.write = RateLimiter(write_rate, name='archive writes')
+        self.prefix = get_priority_prefix(nice, ionice_class, ionice_level)
+        self.adaptive = None
+        if probe:
+            self.adaptive = AdaptiveThrottle([self.dump, self.write], probe, probe_threshold,
+                                             probe_interval, min_rate)
+    
+    @classmethod
+    def from_config(cls, settings: Optional[Dict[str, Any]] = None) -> 'Throttle':
+        """Create a throttle from the ``throttle`` configuration section."""
+        settings = settings or {}
+        return cls(
+            dump_rate=settings.get('dump_rate') or 0,
+            write_rate=settings.get('write_rate') or 0,
+            nice=settings.get('nice'),
+            ionice_class=settings.get('ionice_class'),
+            ionice_level=settings.get('ionice_level'),
+            probe=settings.get('probe'),
+            probe_threshold=settings.get('probe_threshold') or 0,
+            probe_interval=settings.get('probe_interval') or 15.0,
+            min_rate=settings.get('min_rate') or 1024 * 1024,
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether any throttling is configured."""
+        return self.dump.limited or self.write.limited or bool(self.prefix)
+    
+    @property
+    def waited(self) -> float:
+        """Seconds the rate limits delayed the backups so far."""
+        return self.dump.waited + self.write.waited
+    
+    def wrap_command(self, command: List[str]) -> List[str]:
+        """Prefix a command with the configured ``nice``/``ionice`` priority."""
+        return [*self.prefix, *command]
+    
+    def wrap_writer(self, fileobj: IO[bytes]) -> IO[bytes]:
+        """Pace the writes to an archive file by the write limit, if any."""
+        return ThrottledWriter(fileobj, self.write) if self.write.limited else fileobj
+    
+    def start(self) -> None:
+        """Start the adaptive throttle, if a probe is configured."""
+        if self.adaptive:
+            self.adaptive.start()
+    
+    def stop(self) -> None:
+        """Stop the adaptive throttle and restore the configured rates."""
+        if self.adaptive:
+            self.adaptive.stop()
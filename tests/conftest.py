@@ -0,0 +1,13 @@
+"""
+Shared test setup.
+"""
+import os
+import sys
+
+# The modules are imported from the repository root, like main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.config validates the database settings when it is imported
+for name, value in (('DB_TYPE', 'postgresql'), ('DB_HOST', 'localhost'), ('DB_USER', 'test'),
+                    ('DB_PASSWORD', 'test'), ('DB_DATABASE', 'test')):
+    os.environ.setdefault(name, value)
@@ -0,0 +1,324 @@
+"""
+Tests of the backup job flow with a stub database and storage target.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from config.config import config
+from src.backup_manager import BackupManager, BackupResult
+from src.database import DatabaseBackupError, DatabaseFactory
+from src.database.base import BaseDatabase
+from src.metrics import JobMetrics
+from src.notification.base import BaseNotifier
+from src.storage.base import BaseStorage, StorageError
+from src.utils import compute_checksum, read_manifest
+
+
+class DumpStub(BaseDatabase):
+    """Database writing a small plain dump."""
+    
+    backup_extensions = ['sql']
+    
+    def backup(self):
+        path = os.path.join(self.backup_dir, f"backup_{self.name}_20260101_030000.sql")
+        with open(path, 'w') as f:
+            f.write("SELECT 1;\n")
+        return path
+    
+    def get_backup_command(self):
+        return []
+    
+    def get_restore_command(self):
+        return []
+
+
+class FailingStorage(BaseStorage):
+    """Storage target rejecting every upload."""
+    
+    name = 'failing'
+    
+    def get_uri(self, filename):
+        return f"failing://{filename}"
+    
+    def open_upload(self, filename, size=None):
+        raise StorageError("bucket unreachable")
+    
+    def upload_file(self, path, filename=None):
+        raise StorageError("bucket unreachable")
+    
+    def list_files(self, prefix=''):
+        return []
+    
+    def delete_file(self, filename):
+        pass
+
+
+class RecordingNotifier(BaseNotifier):
+    """Notifier keeping the messages it was asked to send."""
+    
+    def __init__(self):
+        super().__init__({'enabled': True})
+        self.sent = []
+    
+    def send_backup_success(self, backup_file, message=None):
+        self.sent.append(('success', message))
+        return True
+    
+    def send_backup_failure(self, error_message):
+        self.sent.append(('failure', error_message))
+        return True
+
+
+class HangingNotifier(RecordingNotifier):
+    """Notifier whose provider never answers until released."""
+    
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+        self.release = threading.Event()
+    
+    def send_backup_failure(self, error_message):
+        self.release.wait()
+        return super().send_backup_failure(error_message)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(DatabaseFactory, 'create_database',
+                        lambda db_type, config: DumpStub(config))
+    manager = BackupManager()
+    manager.notifiers = [RecordingNotifier()]
+    manager.storages = [FailingStorage({})]
+    return manager
+
+
+def test_failed_upload_keeps_the_local_retention(manager, tmp_path):
+    old_backups = [tmp_path / f"backup_testdb_2025010{day}_030000.sql" for day in (1, 2, 3)]
+    for day, path in enumerate(old_backups, 1):
+        path.write_text("SELECT 0;\n")
+        os.utime(path, (day, day))
+    
+    result = manager.run_job({
+        'type': 'postgresql', 'host': 'localhost', 'database': 'testdb',
+        'backup_dir': str(tmp_path), 'compression': 'none', 'retention_count': 2, 'catalog': False,
+        # Uploaded after the dump, through upload_file
+        'storage_streaming': False,
+    })
+    
+    assert not result.success
+    assert result.degraded
+    assert result.backup_file == str(tmp_path / 'backup_testdb_20260101_030000.sql')
+    assert 'bucket unreachable' in result.error
+    # The new backup and the newest old one are kept
+    assert sorted(path.name for path in tmp_path.glob('*.sql')) == [
+        'backup_testdb_20250103_030000.sql',
+        'backup_testdb_20260101_030000.sql',
+    ]
+    (kind, message), = manager.notifiers[0].sent
+    assert kind == 'failure'
+    assert 'bucket unreachable' in message
+
+
+def test_failed_dump_is_notified_and_recorded_once(manager, tmp_path, monkeypatch):
+    def fail():
+        raise DatabaseBackupError("pg_dump: connection refused")
+    
+    monkeypatch.setattr(DumpStub, 'backup', lambda self: fail())
+    
+    result = manager.run_job({
+        'type': 'postgresql', 'host': 'localhost', 'database': 'testdb',
+        'backup_dir': str(tmp_path), 'compression': 'none', 'catalog': False,
+    })
+    
+    assert not result.success
+    assert result.error == "pg_dump: connection refused"
+    (kind, message), = manager.notifiers[0].sent
+    assert kind == 'failure'
+    assert 'connection refused' in message
+    metrics = manager.metrics.get('testdb')
+    assert metrics.success is False
+    assert list(metrics.phases) == ['dump']
+    assert 'db_backup_runs_total{job="testdb",status="failure"} 1' in manager.metrics.render()
+
+
+def test_failed_encryption_keeps_the_unencrypted_dump(manager, tmp_path, monkeypatch):
+    class EncryptedDumpStub(DumpStub):
+        def __init__(self, config):
+            super().__init__(config)
+            # Only checked for None before the (stubbed) compression
+            self.encryption = object()
+    
+    monkeypatch.setattr(DatabaseFactory, 'create_database',
+                        lambda db_type, config: EncryptedDumpStub(config))
+    # compress_file reports every failure, such as a full disk, with None
+    monkeypatch.setattr('src.backup_manager.compress_file', lambda *args, **kwargs: None)
+    manager.storages = []
+    
+    result = manager.run_job({
+        'type': 'postgresql', 'host': 'localhost', 'database': 'testdb',
+        'backup_dir': str(tmp_path), 'compression': 'gzip', 'catalog': False,
+    })
+    
+    assert not result.success
+    assert 'unencrypted dump was kept' in result.error
+    assert [path.name for path in tmp_path.iterdir()] == ['backup_testdb_20260101_030000.sql']
+
+
+def test_notifications_return_within_the_budget(manager, monkeypatch):
+    monkeypatch.setitem(config._config['notification'], 'timeout', 0.2)
+    hanging = HangingNotifier(timeout=30)
+    manager.notifiers = [hanging, RecordingNotifier()]
+    
+    start = time.monotonic()
+    manager._send_notifications('failure', None, 'Backup failed')
+    elapsed = time.monotonic() - start
+    hanging.release.set()
+    
+    assert 0.2 <= elapsed < 1
+    assert manager.notifiers[1].sent == [('failure', 'Backup failed')]
+
+
+def test_hung_provider_is_abandoned_at_its_own_deadline(manager, monkeypatch):
+    monkeypatch.setitem(config._config['notification'], 'timeout', 30)
+    hanging = HangingNotifier(timeout=0.2)
+    manager.notifiers = [hanging, RecordingNotifier()]
+    metrics = JobMetrics('testdb')
+    
+    start = time.monotonic()
+    manager._send_notifications('failure', None, 'Backup failed', metrics)
+    elapsed = time.monotonic() - start
+    hanging.release.set()
+    
+    assert 0.2 <= elapsed < 1
+    assert metrics.notifications['HangingNotifier']['success'] is False
+    assert metrics.notifications['HangingNotifier']['duration'] >= 0.2
+    assert metrics.notifications['RecordingNotifier']['success'] is True
+
+
+def test_jobs_are_interleaved_by_host():
+    jobs = [{'name': name, 'host': host} for name, host in
+            [('a1', 'a'), ('a2', 'a'), ('a3', 'a'), ('b1', 'b'), ('c1', 'c'), ('c2', 'c')]]
+    
+    ordered = BackupManager._interleave_by_host(jobs)
+    
+    assert [job['name'] for job in ordered] == ['a1', 'b1', 'c1', 'a2', 'c2', 'a3']
+
+
+def test_concurrent_jobs_respect_the_per_host_limit(manager, monkeypatch):
+    monkeypatch.setitem(config._config['backup'], 'max_workers', 4)
+    monkeypatch.setitem(config._config['backup'], 'max_per_host', 1)
+    lock = threading.Lock()
+    running = {}
+    peaks = {}
+    
+    def run_job(job):
+        host = job['host']
+        with lock:
+            running[host] = running.get(host, 0) + 1
+            peaks[host] = max(peaks.get(host, 0), running[host])
+            total = sum(running.values())
+            peaks['total'] = max(peaks.get('total', 0), total)
+        time.sleep(0.05)
+        with lock:
+            running[host] -= 1
+        return BackupResult(job['name'], job['name'] != 'b2', error=None if job['name'] != 'b2' else 'failed')
+    
+    monkeypatch.setattr(manager, 'run_job', run_job)
+    jobs = [{'name': f"{host}{n}", 'host': host} for host in 'ab' for n in (1, 2, 3)]
+    
+    results = manager._run_jobs_concurrently(jobs)
+    
+    # Every job ran and reported, in job order, despite the failing one
+    assert [result.name for result in results] == ['a1', 'a2', 'a3', 'b1', 'b2', 'b3']
+    assert [result.success for result in results] == [True, True, True, True, False, True]
+    assert peaks['a'] == peaks['b'] == 1
+    assert peaks['total'] == 2
+
+
+def test_backup_manifests_record_the_inline_checksums(manager, tmp_path):
+    manager.storages = []
+    
+    result = manager.run_job({
+        'type': 'postgresql', 'host': 'localhost', 'database': 'testdb',
+        'backup_dir': str(tmp_path), 'compression': 'gzip', 'catalog': False,
+    })
+    
+    assert result.success
+    dump = str(tmp_path / 'backup_testdb_20260101_030000.sql')
+    archive = read_manifest(result.backup_file)
+    assert archive['checksum'] == compute_checksum(result.backup_file, 'sha256')
+    assert archive['codec'] == 'gzip'
+    # The archive manifest also describes the dump it was compressed from
+    assert archive['content_checksum'] == read_manifest(dump)['checksum'] == compute_checksum(dump, 'sha256')
+    assert archive['content_size'] == os.path.getsize(dump)
+
+
+class CountingDumpStub(DumpStub):
+    """Dump stub with a change counter, numbering its backups."""
+    
+    counter = 'inserted=1'
+    dumps = 0
+    
+    def _read_fingerprint(self):
+        return CountingDumpStub.counter
+    
+    def backup(self):
+        CountingDumpStub.dumps += 1
+        path = os.path.join(self.backup_dir, f"backup_{self.name}_2026010{CountingDumpStub.dumps}_030000.sql")
+        with open(path, 'w') as f:
+            f.write("SELECT 1;\n")
+        return path
+
+
+@pytest.fixture
+def skip_unchanged_job(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(DatabaseFactory, 'create_database',
+                        lambda db_type, config: CountingDumpStub(config))
+    monkeypatch.setattr(CountingDumpStub, 'counter', 'inserted=1')
+    monkeypatch.setattr(CountingDumpStub, 'dumps', 0)
+    manager.storages = []
+    return {
+        'type': 'postgresql', 'host': 'localhost', 'database': 'testdb', 'backup_dir': str(tmp_path),
+        'compression': 'none', 'retention_count': 5, 'skip_unchanged': True,
+    }
+
+
+def test_unchanged_database_keeps_the_previous_backup(manager, skip_unchanged_job):
+    first = manager.run_job(skip_unchanged_job)
+    second = manager.run_job(skip_unchanged_job)
+    
+    assert first.success and not first.unchanged
+    assert second.success and second.unchanged
+    assert second.backup_file == first.backup_file
+    assert CountingDumpStub.dumps == 1
+    entry = manager.get_catalog(skip_unchanged_job).find_backup('testdb')
+    assert entry['unchanged_runs'] == 1
+    # Unchanged runs are not notified
+    assert [kind for kind, _ in manager.notifiers[0].sent] == ['success']
+
+
+def test_changed_database_or_settings_take_a_new_backup(manager, skip_unchanged_job, monkeypatch):
+    manager.run_job(skip_unchanged_job)
+    
+    monkeypatch.setattr(CountingDumpStub, 'counter', 'inserted=2')
+    changed = manager.run_job(skip_unchanged_job)
+    # The fingerprint covers the settings shaping the backup file too
+    recompressed = manager.run_job({**skip_unchanged_job, 'compression': 'gzip'})
+    
+    assert not changed.unchanged and not recompressed.unchanged
+    assert CountingDumpStub.dumps == 3
+
+
+def test_unchanged_backup_older_than_the_maximum_age_is_replaced(manager, skip_unchanged_job):
+    manager.run_job(skip_unchanged_job)
+    catalog = manager.get_catalog(skip_unchanged_job)
+    with catalog._connect() as connection:
+        connection.execute("UPDATE backups SET created_at = created_at - 7200")
+    
+    result = manager.run_job({**skip_unchanged_job, 'skip_unchanged_max_age': 1})
+    
+    assert not result.unchanged
+    assert CountingDumpStub.dumps == 2
@@ -0,0 +1,193 @@
+"""
+Tests of the binlog archive with fixture file names and fake MySQL clients.
+"""
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+from config.config import config
+from src.archive import ArchiveError
+from src.archive.binlog import BinlogArchiver
+from src.restore_manager import RestoreManager
+from src.utils import package_directory, write_manifest
+
+# Answers SHOW MASTER STATUS, records every other run with what it got on stdin
+FAKE_MYSQL = """#!{python}
+import os, sys
+if '-e' in sys.argv:
+    print('binlog.000007\\t154\\t\\t\\t')
+    sys.exit(0)
+data = sys.stdin.buffer.read()
+with open(os.path.join(os.environ['MYSQL_LOADS'], 'loads'), 'ab') as f:
+    f.write(data + b'-- end of load\\n')
+"""
+
+# Prints its options and the contents of the binlog files it was given
+FAKE_MYSQLBINLOG = """#!{python}
+import os, sys
+print('-- mysqlbinlog ' + ' '.join(arg for arg in sys.argv[1:] if arg.startswith('--')))
+for arg in sys.argv[1:]:
+    if os.path.isfile(arg):
+        sys.stdout.write(open(arg).read())
+"""
+
+
+def binlog(number):
+    return f"binlog.{number:06d}"
+
+
+@pytest.fixture
+def archiver(tmp_path):
+    return BinlogArchiver({
+        'name': 'shop',
+        'archive_dir': str(tmp_path / 'archive'),
+        'archive_compression': 'gzip',
+        'host': 'db',
+        'user': 'backup',
+    })
+
+
+def receive(archiver, *names):
+    """Write binlog files into the incoming directory like mysqlbinlog --raw, with their events as content."""
+    os.makedirs(archiver.incoming_dir, exist_ok=True)
+    for name in names:
+        with open(os.path.join(archiver.incoming_dir, name), 'w') as f:
+            f.write(f"INSERT INTO orders VALUES ('{name}');\n")
+
+
+@pytest.fixture
+def fake_clients(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name, source in (('mysql', FAKE_MYSQL), ('mysqlbinlog', FAKE_MYSQLBINLOG)):
+        path = bin_dir / name
+        path.write_text(source.format(python=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    loads = tmp_path / 'loads'
+    loads.mkdir()
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('MYSQL_LOADS', str(loads))
+    return loads / 'loads'
+
+
+def test_command_resumes_from_the_file_being_written(archiver):
+    receive(archiver, binlog(3), binlog(4))
+    os.makedirs(archiver.archive_dir, exist_ok=True)
+    
+    command = archiver.get_command()
+    
+    assert command[-1] == binlog(4)
+    assert '--stop-never' in command and '--raw' in command
+    assert f"--result-file={archiver.incoming_dir}{os.sep}" in command
+
+
+def test_command_resumes_from_the_newest_archived_file(archiver):
+    receive(archiver, binlog(9), binlog(10), binlog(11))
+    archiver.archive_completed()
+    os.remove(os.path.join(archiver.incoming_dir, binlog(11)))
+    
+    # Sorted by sequence number, not by name
+    assert archiver.get_command()[-1] == binlog(10)
+
+
+def test_new_archive_starts_with_the_current_file_of_the_server(archiver, fake_clients):
+    os.makedirs(archiver.incoming_dir)
+    
+    assert archiver.get_command()[-1] == binlog(7)
+
+
+def test_file_being_written_is_held_back(archiver):
+    receive(archiver, binlog(2), binlog(1), binlog(3), 'binlog.index')
+    
+    assert archiver.list_completed() == [binlog(1), binlog(2)]
+    assert archiver.archive_completed() == 2
+    # Every completed file leaves the incoming directory
+    assert sorted(os.listdir(archiver.incoming_dir)) == [binlog(3), 'binlog.index']
+    assert sorted(archiver.list_archived()) == [binlog(1), binlog(2)]
+    assert all(path.endswith('.gz') for path in archiver.list_archived().values())
+
+
+def test_prune_keeps_everything_from_the_oldest_kept_position(archiver):
+    receive(archiver, *(binlog(number) for number in range(1, 7)))
+    archiver.archive_completed()
+    
+    removed = archiver.prune([
+        {'method': 'binlog', 'file': binlog(4), 'position': 154},
+        {'method': 'binlog', 'file': binlog(3), 'position': 4},
+        # Starts of other archivers are ignored
+        {'method': 'wal', 'start_segment': '000000010000000000000001'},
+    ])
+    
+    assert removed == [binlog(1), binlog(2)]
+    assert sorted(archiver.list_archived()) == [binlog(3), binlog(4), binlog(5)]
+
+
+def test_prune_keeps_everything_without_a_binlog_position(archiver):
+    receive(archiver, binlog(1), binlog(2))
+    archiver.archive_completed()
+    
+    assert archiver.prune([{'method': 'wal', 'start_segment': '000000010000000000000001'}]) == []
+    assert sorted(archiver.list_archived()) == [binlog(1)]
+
+
+def test_stage_restores_the_files_from_the_position_on(archiver, tmp_path):
+    receive(archiver, binlog(1), binlog(2), binlog(3))
+    archiver.archive_completed()
+    output_dir = str(tmp_path / 'binlog')
+    
+    paths = archiver.stage(binlog(2), output_dir)
+    
+    # The file still being written is copied from the incoming directory
+    assert paths == [os.path.join(output_dir, name) for name in (binlog(2), binlog(3))]
+    for path in paths:
+        with open(path) as f:
+            assert f.read() == f"INSERT INTO orders VALUES ('{os.path.basename(path)}');\n"
+
+
+def test_stage_fails_when_the_position_is_not_archived(archiver, tmp_path):
+    receive(archiver, binlog(5), binlog(6))
+    archiver.archive_completed()
+    
+    with pytest.raises(ArchiveError, match=binlog(4)):
+        archiver.stage(binlog(4), str(tmp_path / 'binlog'))
+
+
+def test_restore_replays_the_binlog_after_the_backup(archiver, fake_clients, tmp_path, monkeypatch):
+    monkeypatch.setitem(config._config, 'jobs', [{
+        'type': 'mysql', 'name': 'shop', 'host': 'db', 'port': 3306, 'user': 'backup', 'password': 'secret',
+        'database': 'shop', 'backup_dir': str(tmp_path), 'archive_dir': str(tmp_path / 'archive'),
+        'archive_compression': 'gzip', 'catalog': False,
+    }])
+    receive(archiver, binlog(1), binlog(2), binlog(3))
+    archiver.archive_completed()
+    
+    dump_dir = tmp_path / 'backup_shop_20260101_030000.mysql.part'
+    dump_dir.mkdir()
+    (dump_dir / 'schema.sql').write_text("CREATE TABLE orders (note text);\n")
+    (dump_dir / 'triggers.sql').write_text("")
+    (dump_dir / 'orders.sql').write_text("INSERT INTO orders VALUES ('dump');\n")
+    (dump_dir / 'manifest.json').write_text(json.dumps({
+        'format': 'mysql-parallel', 'version': 1, 'database': 'shop', 'codec': None,
+        'binlog': {'file': binlog(2), 'position': 154, 'gtid': ''},
+        'schema': 'schema.sql', 'triggers': 'triggers.sql',
+        'tables': [{'name': 'orders', 'file': 'orders.sql', 'rows': 1, 'bytes': 36}],
+    }))
+    backup_file = package_directory(str(dump_dir), str(tmp_path / 'backup_shop_20260101_030000.mysql.tar'),
+                                    arcname='backup_shop_20260101_030000')
+    write_manifest(backup_file, 'unused', 'sha256',
+                   recovery={'method': 'binlog', 'file': binlog(2), 'position': 154, 'gtid': ''})
+    
+    assert RestoreManager().run_restore(backup_file=backup_file, replay_log=True)
+    
+    loads = fake_clients.read_text().split('-- end of load\n')
+    assert loads[:3] == ["CREATE TABLE orders (note text);\n", "INSERT INTO orders VALUES ('dump');\n", ""]
+    assert loads[3].splitlines() == [
+        '-- mysqlbinlog --start-position=154 --database=shop',
+        f"INSERT INTO orders VALUES ('{binlog(2)}');",
+        f"INSERT INTO orders VALUES ('{binlog(3)}');",
+    ]
+    # The staged binlog files are removed
+    assert not (tmp_path / 'backup_shop_20260101_030000.binlog.part').exists()
@@ -0,0 +1,94 @@
+"""
+Tests of the retention and rebuild of the backup catalog.
+"""
+import hashlib
+import os
+from datetime import datetime
+
+import pytest
+
+from src.catalog import BackupCatalog
+from src.utils import write_manifest
+
+
+def create_backup(backup_dir, name, day, content=b'-- dump\n', extension='sql.gz'):
+    path = backup_dir / f"backup_{name}_202601{day:02d}_030000.{extension}"
+    path.write_bytes(content)
+    return path
+
+
+def created_at(day):
+    return datetime(2026, 1, day, 3, 0).timestamp()
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return BackupCatalog(str(tmp_path))
+
+
+def test_prune_keeps_the_backups_a_kept_incremental_requires(catalog, tmp_path):
+    # Two jobs sharing the directory; shop takes an incremental chain on day 2
+    shop = [create_backup(tmp_path, 'shop', day) for day in range(1, 5)]
+    blog = [create_backup(tmp_path, 'blog', day) for day in range(1, 4)]
+    for day in (3, 4):
+        write_manifest(str(shop[day - 1]), 'checksum', 'sha256', name='shop',
+                       incremental={'base': shop[1].name, 'requires': [shop[1].name]})
+    for day, path in enumerate(shop, 1):
+        catalog.add(str(path), 'shop', checksum='checksum', created_at=created_at(day))
+    for day, path in enumerate(blog, 1):
+        catalog.add(str(path), 'blog', checksum='checksum', created_at=created_at(day))
+    
+    removed = catalog.prune('shop', 2)
+    
+    # Day 2 is the base of both kept backups, day 1 is not needed any more
+    assert removed == [str(shop[0])]
+    assert [entry['filename'] for entry in catalog.list_backups('shop')] == [path.name for path in shop[:0:-1]]
+    assert all(path.exists() for path in blog)
+    
+    removed = catalog.prune('blog', 1)
+    
+    # Retention counts the backups of each job separately
+    assert removed == [str(blog[1]), str(blog[0])]
+    assert all(path.exists() for path in shop[1:])
+
+
+def test_rebuild_drops_the_entries_of_missing_files(catalog, tmp_path):
+    kept = create_backup(tmp_path, 'shop', 1)
+    missing = create_backup(tmp_path, 'shop', 2)
+    for path in (kept, missing):
+        catalog.add(str(path), 'shop', database='shop', checksum='checksum')
+    missing.unlink()
+    
+    assert catalog.rebuild(['sql.gz']) == 1
+    
+    entry, = catalog.list_backups()
+    assert (entry['filename'], entry['database'], entry['checksum']) == (kept.name, 'shop', 'checksum')
+
+
+def test_rebuild_takes_the_metadata_of_a_matching_manifest(catalog, tmp_path):
+    described = create_backup(tmp_path, 'shop', 1)
+    write_manifest(str(described), 'recorded-checksum', 'sha512', name='shop', database='shop_db',
+                   db_type='mysql', host='db1', duration=12.5, fingerprint='fingerprint')
+    # Rewritten after its manifest, so the manifest describes another file
+    rewritten = create_backup(tmp_path, 'shop', 2)
+    write_manifest(str(rewritten), 'stale-checksum', 'sha256', name='shop', database='shop_db')
+    rewritten.write_bytes(b'-- a longer dump\n')
+    # Neither a backup extension nor a backup name
+    create_backup(tmp_path, 'shop', 3, extension='txt')
+    (tmp_path / 'notes.sql.gz').write_bytes(b'')
+    
+    assert catalog.rebuild(['sql.gz']) == 2
+    
+    entries = {entry['filename']: entry for entry in catalog.list_backups()}
+    assert sorted(entries) == [described.name, rewritten.name]
+    
+    entry = entries[described.name]
+    assert (entry['name'], entry['database'], entry['db_type'], entry['host']) == ('shop', 'shop_db', 'mysql', 'db1')
+    assert (entry['checksum'], entry['checksum_algorithm']) == ('recorded-checksum', 'sha512')
+    assert (entry['duration'], entry['fingerprint'], entry['codec']) == (12.5, 'fingerprint', 'gzip')
+    assert entry['created_at'] == created_at(1)
+    
+    entry = entries[rewritten.name]
+    assert (entry['name'], entry['database']) == ('shop', None)
+    assert entry['checksum'] == hashlib.sha256(rewritten.read_bytes()).hexdigest()
+    assert entry['size'] == os.path.getsize(rewritten)
@@ -0,0 +1,76 @@
+"""
+Tests of the inline checksums and the backup manifests.
+"""
+import hashlib
+import io
+
+import pytest
+
+from src.utils import (
+    HashingWriter,
+    compress_file,
+    compute_checksum,
+    get_manifest_path,
+    new_hasher,
+    read_manifest,
+    write_manifest,
+)
+
+
+def test_hashing_writer_hashes_what_it_writes():
+    target = io.BytesIO()
+    writer = HashingWriter(target, new_hasher('sha256'))
+    
+    for chunk in (b'SELECT ', b'1;', b'\n'):
+        writer.write(chunk)
+    
+    assert target.getvalue() == b'SELECT 1;\n'
+    assert writer.tell() == 10
+    assert writer.hexdigest() == hashlib.sha256(b'SELECT 1;\n').hexdigest()
+
+
+@pytest.mark.parametrize('algorithm', ['sha256', 'blake2b'])
+def test_inline_checksums_match_a_second_read(tmp_path, algorithm):
+    source = tmp_path / 'backup.sql'
+    source.write_bytes(b'INSERT INTO t VALUES (1);\n' * 50000)
+    checksums = {}
+    
+    archive = compress_file(str(source), 'gzip', chunk_size=4096, checksums=checksums,
+                            checksum_algorithm=algorithm)
+    
+    assert checksums == {
+        str(source): compute_checksum(str(source), algorithm, chunk_size=1000),
+        archive: compute_checksum(archive, algorithm),
+    }
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError, match='Unsupported checksum algorithm'):
+        new_hasher('md6')
+
+
+def test_manifest_round_trip(tmp_path):
+    backup = tmp_path / 'backup_shop_20260101_030000.sql.gz'
+    backup.write_bytes(b'archive')
+    
+    path = write_manifest(str(backup), 'abc123', 'sha256', name='shop', codec='gzip')
+    
+    assert path == get_manifest_path(str(backup))
+    manifest = read_manifest(str(backup))
+    assert manifest['file'] == backup.name
+    assert manifest['size'] == 7
+    assert (manifest['algorithm'], manifest['checksum']) == ('sha256', 'abc123')
+    assert (manifest['name'], manifest['codec']) == ('shop', 'gzip')
+
+
+def test_foreign_or_broken_manifests_are_ignored(tmp_path):
+    backup = tmp_path / 'backup.sql'
+    backup.write_bytes(b'dump')
+    
+    assert read_manifest(str(backup)) is None
+    with open(get_manifest_path(str(backup)), 'w') as f:
+        f.write('{"format": "other"}')
+    assert read_manifest(str(backup)) is None
+    with open(get_manifest_path(str(backup)), 'w') as f:
+        f.write('{not json')
+    assert read_manifest(str(backup)) is None
@@ -0,0 +1,94 @@
+"""
+Tests of the compression of dump files.
+"""
+import errno
+import gzip
+import io
+import lzma
+import os
+
+import pytest
+
+from src.compression import CodecFactory, ParallelBlockWriter
+from src.utils import compress_file, open_archive_reader
+
+BLOCK_SIZE = 64 * 1024
+
+
+def create_dump(size):
+    """Compressible dump-like content with some random bytes."""
+    rows = b''.join(b"INSERT INTO t VALUES (%d, '%s');\n" % (n, os.urandom(4).hex().encode())
+                    for n in range(size // 40 + 1))
+    return rows[:size]
+
+
+class FullDiskThrottle:
+    """Throttle whose writer fails like a full disk after the first write."""
+    
+    def wrap_writer(self, fileobj):
+        return FullDiskWriter(fileobj)
+
+
+class FullDiskWriter:
+    
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.writes = 0
+    
+    def write(self, data):
+        self.writes += 1
+        if self.writes > 1:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return self.fileobj.write(data)
+    
+    def flush(self):
+        self.fileobj.flush()
+
+
+def test_failed_compression_removes_the_partial_archive(tmp_path):
+    source = tmp_path / 'backup.sql'
+    source.write_bytes(b'INSERT INTO t VALUES (1);\n' * 100000)
+    
+    archive = compress_file(str(source), 'gzip', chunk_size=4096, throttle=FullDiskThrottle())
+    
+    assert archive is None
+    assert [path.name for path in tmp_path.iterdir()] == ['backup.sql']
+
+
+@pytest.mark.parametrize('codec_name', ['gzip', 'xz', 'lz4'])
+@pytest.mark.parametrize('size', [0, BLOCK_SIZE - 1, BLOCK_SIZE * 3 + 17])
+def test_parallel_block_writer_round_trip(codec_name, size):
+    codec = CodecFactory.create_codec(codec_name)
+    data = create_dump(size)
+    target = io.BytesIO()
+    
+    writer = ParallelBlockWriter(target, codec.compress_block, threads=4, block_size=BLOCK_SIZE)
+    for start in range(0, len(data), 10_000):
+        writer.write(data[start:start + 10_000])
+    writer.close()
+    
+    assert codec.open_reader(io.BytesIO(target.getvalue())).read() == data
+
+
+@pytest.mark.parametrize('codec_name, decompress', [('gzip', gzip.decompress), ('xz', lzma.decompress)])
+def test_parallel_members_are_read_by_the_standard_decoders(codec_name, decompress):
+    codec = CodecFactory.create_codec(codec_name)
+    data = create_dump(BLOCK_SIZE * 4)
+    target = io.BytesIO()
+    
+    writer = ParallelBlockWriter(target, codec.compress_block, threads=3, block_size=BLOCK_SIZE)
+    writer.write(data)
+    writer.close()
+    
+    assert decompress(target.getvalue()) == data
+
+
+@pytest.mark.parametrize('codec_name', ['gzip', 'xz', 'lz4', 'zstd'])
+def test_threaded_compress_file_matches_the_source(tmp_path, codec_name):
+    source = tmp_path / 'backup.sql'
+    source.write_bytes(create_dump(BLOCK_SIZE * 5 + 123))
+    
+    archive = compress_file(str(source), codec_name, threads=4, block_size=BLOCK_SIZE)
+    
+    with open_archive_reader(archive) as reader:
+        assert reader.read() == source.read_bytes()
@@ -0,0 +1,133 @@
+"""
+Tests of the streamed email messages against a local SMTP stub.
+"""
+import os
+import smtplib
+import socketserver
+import threading
+from email import policy
+from email.parser import BytesParser
+
+import pytest
+
+from src.notification.email import EmailNotifier
+
+
+class SmtpStub:
+    """SMTP server keeping the DATA of every message as received on the wire."""
+    
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        stub = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b'\r\n')
+            
+            def handle(self):
+                stub.connections += 1
+                self.reply('220 stub ESMTP')
+                for line in iter(self.rfile.readline, b''):
+                    command = line.decode().strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250-stub')
+                        self.reply('250 AUTH PLAIN')
+                    elif command.startswith('AUTH'):
+                        self.reply('235 authenticated')
+                    elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                        self.reply('250 ok')
+                    elif command == 'DATA':
+                        self.reply('354 end with .')
+                        data = b''.join(iter(lambda: self.rfile.readline(), b'.\r\n'))
+                        stub.messages.append(data)
+                        self.reply('250 queued')
+                    elif command == 'QUIT':
+                        self.reply('221 bye')
+                        return
+                    else:
+                        self.reply('502 not implemented')
+        
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def decoded(self, index):
+        """Parse a received message, undoing the dot-stuffing."""
+        data = self.messages[index].replace(b'\r\n..', b'\r\n.')
+        if data.startswith(b'..'):
+            data = data[1:]
+        return BytesParser(policy=policy.default).parsebytes(data)
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = SmtpStub()
+    # The stub speaks plain text, the TLS handshake is not part of these tests
+    monkeypatch.setattr(smtplib.SMTP, 'starttls', lambda self, *args, **kwargs: (220, b'ready'))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def notifier(stub):
+    notifier = EmailNotifier({
+        'enabled': True,
+        'smtp_server': '127.0.0.1',
+        'smtp_port': stub.port,
+        'username': 'backup',
+        'password': 'secret',
+        'from_email': 'backup@example.com',
+        'to_email': 'ops@example.com, dba@example.com',
+        'timeout': 10,
+    })
+    yield notifier
+    notifier.close()
+
+
+def test_attachment_is_decoded_byte_for_byte(stub, notifier, tmp_path):
+    # Larger than one encoded chunk and not a multiple of 3 bytes
+    content = os.urandom(EmailNotifier.ATTACHMENT_CHUNK_SIZE * 2 + 1001)
+    backup_file = tmp_path / 'db_backup.sql.gz'
+    backup_file.write_bytes(content)
+    
+    assert notifier.send_backup_success(str(backup_file), message="Backup done\n")
+    
+    attachments = list(stub.decoded(0).iter_attachments())
+    assert len(attachments) == 1
+    assert attachments[0].get_filename() == 'db_backup.sql.gz'
+    assert attachments[0].get_content_type() == 'application/gzip'
+    assert attachments[0].get_payload(decode=True) == content
+
+
+def test_lines_starting_with_a_dot_are_stuffed(stub, notifier, tmp_path):
+    backup_file = tmp_path / 'db_backup.sql'
+    backup_file.write_bytes(b'SELECT 1;\n')
+    body = ".hidden file\n.\nlast line\n"
+    
+    assert notifier.send_backup_success(str(backup_file), message=body)
+    
+    assert b'\r\n..hidden file\r\n..\r\n' in stub.messages[0]
+    text = next(part for part in stub.decoded(0).walk() if part.get_content_type() == 'text/plain')
+    assert text.get_content().replace('\r\n', '\n') == body
+    assert next(stub.decoded(0).iter_attachments()).get_payload(decode=True) == b'SELECT 1;\n'
+
+
+def test_connection_is_reused_between_messages(stub, notifier, tmp_path):
+    first = tmp_path / 'first.sql'
+    first.write_bytes(b'-- first\n' * 1000)
+    second = tmp_path / 'second.sql'
+    second.write_bytes(b'-- second\n' * 1000)
+    
+    assert notifier.send_backup_success(str(first))
+    assert notifier.send_backup_success(str(second))
+    
+    assert stub.connections == 1
+    assert len(stub.messages) == 2
+    payloads = [next(stub.decoded(index).iter_attachments()).get_payload(decode=True) for index in range(2)]
+    assert payloads == [first.read_bytes(), second.read_bytes()]
@@ -0,0 +1,108 @@
+"""
+Tests of the chunked encryption of archives.
+"""
+import io
+import os
+
+import pytest
+
+from src.utils.encryption import HEADER, TAG_SIZE, Encryption, EncryptionError
+
+# Small chunks so the tests cross several chunk boundaries
+CHUNK_SIZE = 64
+SEALED_SIZE = CHUNK_SIZE + TAG_SIZE
+
+
+@pytest.fixture
+def encryption():
+    return Encryption(os.urandom(32), chunk_size=CHUNK_SIZE)
+
+
+def encrypt(encryption, data, write_size=37):
+    target = io.BytesIO()
+    writer = encryption.open_writer(target)
+    for start in range(0, len(data), write_size):
+        writer.write(data[start:start + write_size])
+    writer.close()
+    return target.getvalue()
+
+
+def decrypt(encryption, encrypted):
+    return encryption.open_reader(io.BytesIO(encrypted)).read()
+
+
+@pytest.mark.parametrize('size', [1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, CHUNK_SIZE * 3, CHUNK_SIZE * 3 + 17])
+def test_round_trip_across_chunks(encryption, size):
+    data = os.urandom(size)
+    
+    encrypted = encrypt(encryption, data)
+    
+    assert decrypt(encryption, encrypted) == data
+    # Writes larger than a chunk are split the same way
+    assert decrypt(encryption, encrypt(encryption, data, write_size=CHUNK_SIZE * 2 + 5)) == data
+
+
+def test_empty_input(encryption):
+    encrypted = encrypt(encryption, b'')
+    
+    # The header and one empty, authenticated last chunk
+    assert len(encrypted) == HEADER.size + TAG_SIZE
+    assert decrypt(encryption, encrypted) == b''
+
+
+def test_flipped_byte_fails_authentication(encryption):
+    encrypted = bytearray(encrypt(encryption, os.urandom(CHUNK_SIZE * 3)))
+    encrypted[HEADER.size + SEALED_SIZE + 10] ^= 0x01
+    
+    with pytest.raises(EncryptionError, match='Chunk 1 .* failed authentication'):
+        decrypt(encryption, bytes(encrypted))
+
+
+def test_flipped_header_byte_fails_authentication(encryption):
+    encrypted = bytearray(encrypt(encryption, os.urandom(CHUNK_SIZE)))
+    # Last byte of the salt
+    encrypted[HEADER.size - 1] ^= 0x01
+    
+    with pytest.raises(EncryptionError, match='failed authentication'):
+        decrypt(encryption, bytes(encrypted))
+
+
+def test_dropped_last_chunk_is_detected(encryption):
+    encrypted = encrypt(encryption, os.urandom(CHUNK_SIZE * 3))
+    
+    # Cut at a chunk boundary: the second chunk is read as the last one
+    truncated = encrypted[:HEADER.size + 2 * SEALED_SIZE]
+    
+    with pytest.raises(EncryptionError, match='Chunk 1 .* failed authentication'):
+        decrypt(encryption, truncated)
+
+
+def test_chunk_cut_in_the_middle_is_detected(encryption):
+    encrypted = encrypt(encryption, os.urandom(CHUNK_SIZE * 3))
+    
+    truncated = encrypted[:HEADER.size + 2 * SEALED_SIZE + SEALED_SIZE // 2]
+    
+    with pytest.raises(EncryptionError, match='Chunk 2 .* failed authentication'):
+        decrypt(encryption, truncated)
+
+
+def test_seek_then_read(encryption):
+    data = os.urandom(CHUNK_SIZE * 4 + 10)
+    reader = encryption.open_reader(io.BytesIO(encrypt(encryption, data)))
+    
+    assert reader.seekable()
+    for offset, size in [(100, 20), (CHUNK_SIZE, CHUNK_SIZE), (5, 3), (CHUNK_SIZE - 2, 4), (0, len(data))]:
+        assert reader.seek(offset) == offset
+        assert reader.read(size) == data[offset:offset + size]
+    
+    assert reader.seek(-7, io.SEEK_END) == len(data) - 7
+    assert reader.read() == data[-7:]
+    assert reader.seek(len(data) + 5) == len(data) + 5
+    assert reader.read() == b''
+
+
+def test_another_key_is_reported(encryption):
+    encrypted = encrypt(encryption, b'SELECT 1;\n')
+    
+    with pytest.raises(EncryptionError, match='another key'):
+        decrypt(Encryption(os.urandom(32), chunk_size=CHUNK_SIZE), encrypted)
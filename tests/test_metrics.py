@@ -0,0 +1,135 @@
+"""
+Tests of the Prometheus rendering and the textfile of the backup metrics.
+"""
+import os
+
+import pytest
+
+from src.metrics import JobMetrics, MetricsError, MetricsRegistry
+
+
+def finished_job(name, success, started=1767236400.0):
+    job = JobMetrics(name)
+    job.started = started
+    job.record('dump', 2.0, 4 * 1024 * 1024)
+    job.record('upload', 0.5)
+    job.sizes = {'dump': 4 * 1024 * 1024, 'archive': 1024 * 1024}
+    job.record_notification('TelegramNotifier', 1.25, True)
+    job.finish(success)
+    job.duration = 3.5
+    return job
+
+
+def samples(text, metric):
+    return [line for line in text.splitlines() if line.startswith(f"db_backup_{metric}{{")]
+
+
+def test_every_metric_has_help_and_type_lines():
+    registry = MetricsRegistry()
+    registry.add(finished_job('shop', True))
+    
+    lines = registry.render().splitlines()
+    
+    metrics = {line.split('{', 1)[0] for line in lines if not line.startswith('#')}
+    for metric in metrics:
+        help_line = lines.index(next(line for line in lines if line.startswith(f"# HELP {metric} ")))
+        assert lines[help_line + 1].startswith(f"# TYPE {metric} ")
+        assert lines[help_line + 2].startswith(metric + '{')
+    assert '# TYPE db_backup_runs_total counter' in lines
+    assert '# TYPE db_backup_duration_seconds gauge' in lines
+
+
+def test_per_phase_samples():
+    registry = MetricsRegistry()
+    registry.add(finished_job('shop', True))
+    
+    text = registry.render()
+    
+    assert samples(text, 'phase_duration_seconds') == [
+        'db_backup_phase_duration_seconds{job="shop",phase="dump"} 2',
+        'db_backup_phase_duration_seconds{job="shop",phase="upload"} 0.5',
+    ]
+    assert samples(text, 'phase_bytes') == [
+        'db_backup_phase_bytes{job="shop",phase="dump"} 4194304',
+        'db_backup_phase_bytes{job="shop",phase="upload"} 0',
+    ]
+    assert samples(text, 'phase_throughput_megabytes_per_second') == [
+        'db_backup_phase_throughput_megabytes_per_second{job="shop",phase="dump"} 2',
+        'db_backup_phase_throughput_megabytes_per_second{job="shop",phase="upload"} 0',
+    ]
+    assert samples(text, 'compression_ratio') == ['db_backup_compression_ratio{job="shop"} 4']
+    assert samples(text, 'notification_duration_seconds') == [
+        'db_backup_notification_duration_seconds{job="shop",provider="TelegramNotifier"} 1.25',
+    ]
+    assert samples(text, 'runs_total') == ['db_backup_runs_total{job="shop",status="success"} 1']
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.add(finished_job('a "b"\\c\nd', False))
+    
+    assert samples(registry.render(), 'last_success') == ['db_backup_last_success{job="a \\"b\\"\\\\c\\nd"} 0']
+
+
+@pytest.mark.parametrize('value, expected', [
+    (3, '3'),
+    (3.0, '3'),
+    (0, '0'),
+    (0.1, '0.1'),
+    (1767236400.123456, '1767236400.123456'),
+    (1 / 3, '0.3333333333333333'),
+])
+def test_format_value(value, expected):
+    assert MetricsRegistry._format_value(value) == expected
+
+
+def test_textfile_is_replaced_atomically(tmp_path):
+    path = tmp_path / 'textfile' / 'db_backup.prom'
+    registry = MetricsRegistry()
+    registry.add(finished_job('shop', True))
+    
+    registry.write_textfile(str(path))
+    
+    assert path.read_text() == registry.render()
+    assert os.listdir(path.parent) == ['db_backup.prom']
+
+
+def test_unwritable_textfile_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / 'db_backup.prom'
+    path.write_text('previous\n')
+    registry = MetricsRegistry()
+    
+    def fail(*args):
+        raise OSError('disk full')
+    
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(MetricsError, match='disk full'):
+        registry.write_textfile(str(path))
+    
+    assert path.read_text() == 'previous\n'
+    assert os.listdir(tmp_path) == ['db_backup.prom']
+
+
+def test_failed_run_keeps_the_last_success_time_of_the_textfile(tmp_path):
+    path = str(tmp_path / 'db_backup.prom')
+    first = MetricsRegistry()
+    first.add(finished_job('shop', True, started=1767236400.5))
+    first.add(finished_job('crm', True, started=1767236400.0))
+    first.write_textfile(path)
+    
+    # The next one-shot run starts with an empty registry
+    second = MetricsRegistry()
+    second.add(finished_job('shop', False, started=1767322800.0))
+    second.add(finished_job('crm', True, started=1767322800.0))
+    second.write_textfile(path)
+    
+    with open(path) as f:
+        text = f.read()
+    assert samples(text, 'last_success_timestamp_seconds') == [
+        'db_backup_last_success_timestamp_seconds{job="shop"} 1767236400.5',
+        'db_backup_last_success_timestamp_seconds{job="crm"} 1767322800',
+    ]
+    assert samples(text, 'last_success') == [
+        'db_backup_last_success{job="shop"} 0',
+        'db_backup_last_success{job="crm"} 1',
+    ]
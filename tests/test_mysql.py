@@ -0,0 +1,57 @@
+"""
+Tests of the mysqlbinlog command replaying the archived binlog.
+"""
+from datetime import datetime
+
+import pytest
+
+from src.database.mysql import MySQLDatabase
+
+
+PATHS = ['/restore/binlog.000007', '/restore/binlog.000008']
+
+
+@pytest.fixture
+def create_database(tmp_path):
+    def create(**config):
+        return MySQLDatabase({
+            'type': 'mysql', 'host': 'db', 'user': 'backup', 'password': 'secret', 'database': 'shop',
+            'backup_dir': str(tmp_path), **config,
+        })
+    return create
+
+
+def test_replay_of_the_backed_up_database(create_database):
+    command = create_database().get_binlog_replay_command(
+        {'method': 'binlog', 'file': 'binlog.000007', 'position': 1542}, 'shop', PATHS
+    )
+    
+    assert command == ['mysqlbinlog', '--start-position=1542', '--database=shop', *PATHS]
+
+
+def test_rewrite_db_comes_before_database_with_the_target_name(create_database):
+    command = create_database(database='shop_copy').get_binlog_replay_command(
+        {'method': 'binlog', 'file': 'binlog.000007', 'position': 4}, 'shop', PATHS
+    )
+    
+    # mysqlbinlog applies --rewrite-db first, --database filters on the rewritten name
+    assert command == ['mysqlbinlog', '--start-position=4', '--rewrite-db=shop->shop_copy',
+                       '--database=shop_copy', *PATHS]
+
+
+def test_gtid_positions_skip_the_gtids(create_database):
+    target = datetime(2026, 10, 17, 12, 30).timestamp()
+    command = create_database(recovery_target=target).get_binlog_replay_command(
+        {'method': 'binlog', 'file': 'binlog.000007', 'position': 4, 'gtid': '3e11fa47-71ca-11e1-9e33:1-57'},
+        'shop', PATHS,
+    )
+    
+    assert command == ['mysqlbinlog', '--start-position=4', '--skip-gtids',
+                       '--stop-datetime=2026-10-17 12:30:00', '--database=shop', *PATHS]
+
+
+def test_password_is_not_on_the_command_line(create_database):
+    database = create_database()
+    
+    assert 'secret' not in ' '.join(database.get_connection_args())
+    assert database.env['MYSQL_PWD'] == 'secret'
@@ -0,0 +1,212 @@
+"""
+Tests of the parallel MySQL dump and load with stub connections and fake clients.
+"""
+import hashlib
+import json
+import os
+import stat
+import sys
+import tarfile
+from decimal import Decimal
+
+import pytest
+
+from src.compression import CodecFactory
+from src.database.mysql_parallel import ParallelMySQLDumper, ParallelMySQLLoader
+from src.utils import package_directory
+
+
+COLUMNS = [('id', 'int(11)'), ('note', 'varchar(20)')]
+
+
+class CursorStub:
+    """Cursor answering the column query and the checksum query, keeping the SQL it ran."""
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def execute(self, sql, args=None):
+        self.connection.queries.append(sql)
+    
+    def fetchall(self):
+        return self.connection.columns
+    
+    def fetchone(self):
+        return self.connection.checksum
+
+
+class ConnectionStub:
+    """Connection handing out cursor stubs with fixed results."""
+    
+    def __init__(self, columns, checksum=None):
+        self.columns = columns
+        self.checksum = checksum
+        self.queries = []
+    
+    def cursor(self):
+        return CursorStub(self)
+
+
+@pytest.fixture
+def dumper(tmp_path):
+    return ParallelMySQLDumper({'database': 'shop'}, str(tmp_path / 'dump'), None, 1, [], incremental=True)
+
+
+def test_checksum_sums_the_row_hashes(dumper):
+    connection = ConnectionStub(COLUMNS, (3, Decimal('40634872186592934717')))
+    
+    checksum = dumper._checksum_table(connection, 'orders')
+    
+    sql = connection.queries[-1]
+    assert 'SUM(CAST(CONV(SUBSTRING(MD5(CONCAT_WS(' in sql
+    assert 'BIT_XOR' not in sql
+    assert 'FROM `orders`' in sql
+    definition = hashlib.md5(b'id int(11),note varchar(20)').hexdigest()
+    assert checksum == f"3:{40634872186592934717:x}:{definition}"
+
+
+def test_checksum_hashes_every_column_and_its_null_flag(dumper):
+    connection = ConnectionStub(COLUMNS, (1, Decimal(1)))
+    
+    dumper._checksum_table(connection, 'orders')
+    
+    sql = connection.queries[-1]
+    # Fixed-width column hashes, so 'a#', 'b' and 'a', '#b' are different rows
+    assert "CONCAT_WS('#', MD5(CAST(`id` AS BINARY)), MD5(CAST(`note` AS BINARY)), " in sql
+    assert 'CONCAT(ISNULL(`id`), ISNULL(`note`))' in sql
+
+
+def test_checksum_of_an_empty_table(dumper):
+    connection = ConnectionStub(COLUMNS, (0, 0))
+    
+    checksum = dumper._checksum_table(connection, 'orders')
+    
+    assert checksum.startswith('0:0:')
+
+
+def test_table_without_columns_has_no_checksum(dumper):
+    assert dumper._checksum_table(ConnectionStub([]), 'orders') == ''
+
+
+TABLES = {
+    'orders': [(1, 'first'), (2, "it's")],
+    'customers': [(7, None)],
+}
+
+FAKE_MYSQLDUMP = """#!{python}
+import sys
+if '--triggers' in sys.argv:
+    print('CREATE TRIGGER audit AFTER INSERT ON orders FOR EACH ROW SET @n = 1;')
+else:
+    print('CREATE TABLE orders (id int, note varchar(20));')
+    print('CREATE TABLE customers (id int, note varchar(20));')
+"""
+
+# Keeps every load in its own file and the order in which the loads finished
+FAKE_MYSQL = """#!{python}
+import os, sys
+data = sys.stdin.buffer.read()
+path = os.path.join(os.environ['MYSQL_LOADS'], str(os.getpid()))
+with open(path, 'wb') as f:
+    f.write(data)
+with open(os.path.join(os.environ['MYSQL_LOADS'], 'order'), 'a') as f:
+    f.write(str(os.getpid()) + '\\n')
+"""
+
+
+class SnapshotCursorStub:
+    """Cursor of a stub server holding TABLES."""
+    
+    def __init__(self):
+        self.rows = []
+    
+    def execute(self, sql, args=None):
+        if 'information_schema.TABLES' in sql:
+            self.rows = [(name, 1000 * len(rows)) for name, rows in TABLES.items()]
+        elif 'information_schema.COLUMNS' in sql:
+            self.rows = COLUMNS
+        elif sql.startswith('SELECT `id`, `note` FROM'):
+            self.rows = TABLES[sql.rsplit('`', 2)[1]]
+        elif 'MASTER STATUS' in sql:
+            self.rows = [{'File': 'binlog.000003', 'Position': 154, 'Executed_Gtid_Set': ''}]
+        else:
+            self.rows = []
+    
+    def fetchall(self):
+        return self.rows
+    
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def close(self):
+        pass
+
+
+class SnapshotConnectionStub:
+    """Connection of the stub server."""
+    
+    def cursor(self, cursor_class=None):
+        return SnapshotCursorStub()
+    
+    @staticmethod
+    def escape(row):
+        return '(' + ','.join('NULL' if value is None else repr(value) for value in row) + ')'
+    
+    def close(self):
+        pass
+
+
+def write_script(path, source):
+    path.write_text(source.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+
+@pytest.fixture
+def fake_clients(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    write_script(bin_dir / 'mysqldump', FAKE_MYSQLDUMP)
+    write_script(bin_dir / 'mysql', FAKE_MYSQL)
+    loads = tmp_path / 'loads'
+    loads.mkdir()
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('MYSQL_LOADS', str(loads))
+    return loads
+
+
+def test_dump_and_load_round_trip(tmp_path, fake_clients, monkeypatch):
+    output_dir = str(tmp_path / 'backup_shop.mysql.part')
+    dumper = ParallelMySQLDumper({'database': 'shop'}, output_dir, CodecFactory.create_codec('gzip'), 2, [])
+    monkeypatch.setattr(dumper, '_connect', SnapshotConnectionStub)
+    
+    manifest = dumper.run()
+    archive = package_directory(output_dir, str(tmp_path / 'backup_shop.mysql.tar'), arcname='backup_shop')
+    
+    with tarfile.open(archive) as tar:
+        names = sorted(member.name for member in tar.getmembers() if member.isfile())
+        packaged = json.load(tar.extractfile('backup_shop/manifest.json'))
+    assert names == ['backup_shop/customers.sql.gz', 'backup_shop/manifest.json', 'backup_shop/orders.sql.gz',
+                     'backup_shop/schema.sql', 'backup_shop/triggers.sql']
+    assert packaged == manifest
+    assert manifest['binlog'] == {'file': 'binlog.000003', 'position': 154, 'gtid': ''}
+    assert sorted((table['name'], table['file'], table['rows']) for table in manifest['tables']) == [
+        ('customers', 'customers.sql.gz', 1), ('orders', 'orders.sql.gz', 2),
+    ]
+    
+    loader = ParallelMySQLLoader(archive, ['mysql'], 2)
+    assert loader.run() == manifest
+    
+    order = (fake_clients / 'order').read_text().split()
+    loads = [(fake_clients / pid).read_bytes().decode() for pid in order]
+    assert len(loads) == 4
+    assert loads[0].startswith('CREATE TABLE orders')
+    assert loads[-1].startswith('CREATE TRIGGER audit')
+    assert sorted(load.splitlines()[-1] for load in loads[1:3]) == [
+        "INSERT INTO `customers` (`id`, `note`) VALUES (7,NULL);",
+        "INSERT INTO `orders` (`id`, `note`) VALUES (1,'first'),(2,\"it's\");",
+    ]
+    assert all(load.startswith('/*!40101 SET NAMES utf8mb4 */;') for load in loads[1:3])
+    assert loader.bytes_loaded == sum(len(load) for load in loads)
@@ -0,0 +1,94 @@
+"""
+Tests of the streaming dump pipeline with a fake dump command.
+"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+from src.database.base import BaseDatabase, DatabaseBackupError
+from src.utils import open_archive_reader
+from src.utils.pipeline import DumpPipeline, PipelineError
+
+
+# Larger than several chunks of the pipeline below, ending in a partial chunk
+DUMP_OUTPUT = b''.join(f"INSERT INTO t VALUES ({number}, 'row {number}');\n".encode() for number in range(20000))
+
+
+def fake_dump(code):
+    return [sys.executable, '-c', code]
+
+
+@pytest.fixture
+def dump_command(tmp_path):
+    """Command writing DUMP_OUTPUT to its stdout, then running ``then``."""
+    source = tmp_path / 'dump.sql'
+    source.write_bytes(DUMP_OUTPUT)
+    
+    def command(then=''):
+        code = f"import shutil, sys; shutil.copyfileobj(open({str(source)!r}, 'rb'), sys.stdout.buffer)"
+        return fake_dump(code + then)
+    return command
+
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    path = tmp_path / 'backups'
+    path.mkdir()
+    return path
+
+
+class StreamingStub(BaseDatabase):
+    """Database streaming a dump command that writes nothing."""
+    
+    backup_extensions = ['sql.gz']
+    
+    def backup(self):
+        return self._stream_backup(self.get_backup_command())
+    
+    def get_backup_command(self):
+        return fake_dump('pass')
+    
+    def get_restore_command(self):
+        return []
+
+
+@pytest.mark.parametrize('compression_type, extension', [('gzip', 'gz'), ('zip', 'zip')])
+def test_archive_holds_the_exact_dump_output(dump_command, backup_dir, compression_type, extension):
+    archive_path = str(backup_dir / f"backup.sql.{extension}")
+    pipeline = DumpPipeline(dump_command(), archive_path, 'backup.sql',
+                            compression_type=compression_type, chunk_size=64 * 1024, buffer_chunks=2,
+                            checksum_algorithm='sha256')
+    
+    assert pipeline.run() == len(DUMP_OUTPUT)
+    
+    with open_archive_reader(archive_path) as reader:
+        assert reader.read() == DUMP_OUTPUT
+    assert pipeline.content_checksum == hashlib.sha256(DUMP_OUTPUT).hexdigest()
+    with open(archive_path, 'rb') as f:
+        assert pipeline.checksum == hashlib.sha256(f.read()).hexdigest()
+    assert os.listdir(backup_dir) == [f"backup.sql.{extension}"]
+
+
+def test_failed_command_leaves_no_archive(dump_command, backup_dir):
+    command = dump_command("; sys.stderr.write('access denied'); sys.exit(3)")
+    pipeline = DumpPipeline(command, str(backup_dir / 'backup.sql.gz'), 'backup.sql', compression_type='gzip',
+                            chunk_size=64 * 1024)
+    
+    with pytest.raises(PipelineError, match='exit code 3'):
+        pipeline.run()
+    
+    # Neither the archive nor its .part file
+    assert os.listdir(backup_dir) == []
+    assert 'access denied' in pipeline.stderr
+
+
+def test_empty_output_fails_the_backup(backup_dir):
+    database = StreamingStub({'database': 'shop', 'backup_dir': str(backup_dir), 'compression': 'gzip',
+                              'streaming': True})
+    
+    with pytest.raises(DatabaseBackupError, match='^Backup output is empty$'):
+        database.backup()
+    
+    assert os.listdir(backup_dir) == []
@@ -0,0 +1,287 @@
+"""
+Tests of the pg_dump and pg_restore commands, the packaged directory dumps
+and the table statistics driving the incremental PostgreSQL backups.
+"""
+import json
+import os
+import stat
+import sys
+import tarfile
+
+import pytest
+
+from src.database import DatabaseBackupError
+from src.database.postgresql import PostgreSQLDatabase
+
+# Writes a custom format file or a directory of table files to the -f path
+FAKE_PG_DUMP = """#!{python}
+import os, sys
+args = sys.argv[1:]
+output = args[args.index('-f') + 1]
+if '-Fd' in args:
+    os.makedirs(output)
+    with open(os.path.join(output, 'toc.dat'), 'w') as f:
+        f.write(' '.join(args))
+    for number in (3001, 3002):
+        with open(os.path.join(output, f'{{number}}.dat.gz'), 'wb') as f:
+            f.write(b'rows of %d' % number)
+else:
+    with open(output, 'w') as f:
+        f.write('custom ' + ' '.join(args))
+"""
+
+# Records its arguments and the dump (file contents or directory files) it was given
+FAKE_PG_RESTORE = """#!{python}
+import json, os, sys
+archive = sys.argv[-1]
+if os.path.isdir(archive):
+    dump = {{name: open(os.path.join(archive, name)).read() for name in sorted(os.listdir(archive))}}
+else:
+    dump = open(archive).read()
+with open(os.environ['PG_RESTORE_LOG'], 'w') as f:
+    json.dump({{'args': sys.argv[1:], 'dump': dump}}, f)
+"""
+
+# The table sizes of the dump progress are not needed
+FAKE_PSQL = """#!{python}
+"""
+
+
+SERVER_START = '2026-01-01 00:00:00+00'
+
+OIDS = {'orders': 16385, 'users': 16390}
+
+
+class StatsStub(PostgreSQLDatabase):
+    """Database answering the statistics queries with fixed results."""
+    
+    def __init__(self, config, stats_reset, tables, parent):
+        super().__init__(config)
+        self.stats_reset = stats_reset
+        self.tables = tables
+        self.parent = parent
+    
+    def _query(self, command):
+        if command[-1] == self.SERVER_STATS_QUERY:
+            return f"{SERVER_START}\t{self.stats_reset}\t2000\n"
+        return ''.join(f"public\t{name}\t{OIDS[name]}\t{signature}\n" for name, signature in self.tables.items())
+    
+    def _load_parent_backup(self, chain_format):
+        return self.parent
+
+
+def create_database(tmp_path, stats_reset=0, tables=None, parent=None):
+    config = {'host': 'localhost', 'user': 'test', 'database': 'shop', 'backup_dir': str(tmp_path),
+              'pg_dump_format': 'custom', 'incremental': True}
+    return StatsStub(config, stats_reset, tables or {}, parent)
+
+
+def create_parent(tables, stats_read_at=1000, oids=OIDS):
+    return {'type': 'full', 'format': 'postgresql-custom', 'base': 'full.dump', 'chain': 0,
+            'server': SERVER_START, 'stats_reset': 0, 'stats_read_at': stats_read_at,
+            'tables': {f"public.{name}": {'signature': signature, 'archive': 'full.dump', 'oid': oids[name]}
+                       for name, signature in tables.items()}}
+
+
+def test_unchanged_tables_are_taken_from_the_parent(tmp_path):
+    parent = create_parent({'orders': '5,0,0,8192', 'users': '2,0,0,8192'})
+    database = create_database(tmp_path, tables={'orders': '5,0,0,8192', 'users': '3,0,0,16384'}, parent=parent)
+    database.previous_backup = str(tmp_path / 'full.dump')
+    
+    unchanged = database._plan_incremental(str(tmp_path / 'next.dump'))
+    
+    assert unchanged == [('public', 'orders')]
+    assert database.incremental['type'] == 'incremental'
+    assert database.incremental['requires'] == ['full.dump']
+    assert database.incremental['stats_read_at'] == 2000
+    assert database.incremental['tables']['public.users'] == {
+        'signature': '3,0,0,16384', 'archive': 'next.dump', 'oid': 16390,
+    }
+
+
+def test_table_recreated_under_the_same_name_is_dumped(tmp_path):
+    tables = {'orders': '5,0,0,8192'}
+    parent = create_parent(tables, oids={'orders': 16000})
+    database = create_database(tmp_path, tables=tables, parent=parent)
+    database.previous_backup = str(tmp_path / 'full.dump')
+    
+    assert database._plan_incremental(str(tmp_path / 'next.dump')) == []
+    assert database.incremental['tables']['public.orders']['oid'] == 16385
+
+
+@pytest.mark.parametrize('stats_read_at', [1000, None])
+def test_statistics_reset_after_the_parent_forces_a_full_backup(tmp_path, stats_read_at):
+    tables = {'orders': '5,0,0,8192'}
+    database = create_database(tmp_path, stats_reset=1500, tables=tables,
+                               parent=create_parent(tables, stats_read_at))
+    database.previous_backup = str(tmp_path / 'full.dump')
+    
+    unchanged = database._plan_incremental(str(tmp_path / 'next.dump'))
+    
+    assert unchanged == []
+    assert database.incremental['type'] == 'full'
+    assert database.incremental['stats_reset'] == 1500
+
+
+class TocStub(PostgreSQLDatabase):
+    """Database listing a fixed TOC and keeping the pg_restore runs with their TOC lists."""
+    
+    def __init__(self, config, toc):
+        super().__init__(config)
+        self.toc = toc
+        self.restores = []
+    
+    def _query(self, command):
+        return self.toc
+    
+    def _pg_restore(self, archive_path, jobs, options=None):
+        with open(options[options.index('-L') + 1]) as f:
+            self.restores.append((archive_path, options, f.read().splitlines()))
+
+
+TOC = """;
+; Archive created at 2026-01-01 03:00:00 UTC
+;
+3400; 0 16385 TABLE DATA public orders postgres
+3401; 0 16390 TABLE DATA my schema line items app owner
+3402; 0 16395 TABLE DATA my schema line items2 app owner
+3410; 0 0 SEQUENCE SET public orders_id_seq postgres
+"""
+
+
+def test_table_rows_are_selected_by_their_oid(tmp_path):
+    database = TocStub({'database': 'shop'}, TOC)
+    archive = str(tmp_path / 'full.dump')
+    
+    database._restore_table_data(archive, {
+        'public.orders': {'signature': 's', 'archive': 'full.dump', 'oid': 16385},
+        # Unquoted names with spaces cannot be told apart by name
+        'my schema.line items': {'signature': 's', 'archive': 'full.dump', 'oid': 16390},
+    }, 2)
+    
+    (path, options, entries), = database.restores
+    assert path == archive
+    assert options[:1] == ['--section=data']
+    assert entries == ['3400; 0 16385 TABLE DATA public orders postgres',
+                       '3401; 0 16390 TABLE DATA my schema line items app owner']
+    assert not os.path.exists(f"{archive}.list")
+
+
+def test_tables_of_chains_without_oids_are_selected_by_name(tmp_path):
+    database = TocStub({'database': 'shop'}, TOC)
+    
+    database._restore_table_data(str(tmp_path / 'full.dump'),
+                                 {'public.orders': {'signature': 's', 'archive': 'full.dump'}}, 2)
+    
+    assert database.restores[0][2] == ['3400; 0 16385 TABLE DATA public orders postgres']
+
+
+def test_missing_table_rows_fail_the_restore(tmp_path):
+    database = TocStub({'database': 'shop'}, TOC)
+    
+    with pytest.raises(DatabaseBackupError, match='holds no rows of public.users'):
+        database._restore_table_data(str(tmp_path / 'full.dump'),
+                                     {'public.users': {'signature': 's', 'archive': 'full.dump', 'oid': 16500}}, 2)
+    assert database.restores == []
+
+
+def create_dump_database(tmp_path, **settings):
+    config = {'host': 'db', 'port': 5432, 'user': 'backup', 'database': 'shop', 'backup_dir': str(tmp_path),
+              'catalog': False, **settings}
+    return PostgreSQLDatabase(config)
+
+
+@pytest.fixture
+def load(monkeypatch):
+    """Run on a host with 8 CPUs and a load average of 3."""
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(os, 'getloadavg', lambda: (3.0, 3.0, 3.0))
+
+
+@pytest.fixture
+def fake_tools(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name, source in (('pg_dump', FAKE_PG_DUMP), ('pg_restore', FAKE_PG_RESTORE), ('psql', FAKE_PSQL)):
+        path = bin_dir / name
+        path.write_text(source.format(python=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / 'pg_restore.json'
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('PG_RESTORE_LOG', str(log))
+    return log
+
+
+def test_custom_format_command(tmp_path, load):
+    database = create_dump_database(tmp_path, pg_dump_format='custom', pg_dump_compress_level=6)
+    
+    command = database.get_backup_command('/backups/shop.dump.part')
+    
+    assert command == ['pg_dump', '-h', 'db', '-p', '5432', '-U', 'backup', '-d', 'shop', '-w', '--verbose',
+                       '-Fc', '-Z', '6', '-f', '/backups/shop.dump.part']
+
+
+@pytest.mark.parametrize('settings, jobs', [
+    # The CPUs left below the load ceiling, the CPU count by default
+    ({}, 5),
+    ({'load_ceiling': 6}, 3),
+    # A busy host still gets one job
+    ({'load_ceiling': 2}, 1),
+    ({'pg_dump_jobs': 12}, 12),
+])
+def test_directory_format_jobs_follow_the_cpus_and_the_load(tmp_path, load, settings, jobs):
+    database = create_dump_database(tmp_path, pg_dump_format='directory', **settings)
+    
+    command = database.get_backup_command('/backups/shop.dir.part')
+    
+    assert command[command.index('-Fd'):] == ['-Fd', '-j', str(jobs), '-f', '/backups/shop.dir.part']
+
+
+def test_pg_restore_command(tmp_path, load):
+    database = create_dump_database(tmp_path, restore_jobs=4)
+    
+    assert database.get_pg_restore_command('/backups/shop.dump', database.get_restore_jobs(), ['--section=data']) == [
+        'pg_restore', '-h', 'db', '-p', '5432', '-U', 'backup', '-d', 'shop', '-w', '--exit-on-error', '-j', '4',
+        '--section=data', '/backups/shop.dump',
+    ]
+    assert create_dump_database(tmp_path).get_restore_jobs() == 5
+
+
+def test_directory_dump_is_packaged_and_restored_in_parallel(tmp_path, fake_tools, load):
+    database = create_dump_database(tmp_path, pg_dump_format='directory', restore_jobs=3)
+    
+    backup_file = database.backup()
+    
+    assert backup_file.endswith('.dir.tar')
+    base_name = os.path.basename(backup_file)[:-len('.dir.tar')]
+    # One artifact holding the dump directory; the dump directory itself is removed
+    assert sorted(os.listdir(tmp_path)) == sorted(['bin', os.path.basename(backup_file)])
+    with tarfile.open(backup_file) as tar:
+        assert sorted(tar.getnames()) == [base_name] + [f"{base_name}/{name}"
+                                                        for name in ('3001.dat.gz', '3002.dat.gz', 'toc.dat')]
+    assert database.output_compressed
+    assert database.checksums[backup_file]
+    
+    database.restore(backup_file)
+    
+    with open(fake_tools) as f:
+        restored = json.load(f)
+    assert restored['args'][restored['args'].index('-j') + 1] == '3'
+    assert restored['dump']['3001.dat.gz'] == 'rows of 3001'
+    assert '-Fd -j 5' in restored['dump']['toc.dat']
+    # The unpacked copy is removed after the restore
+    assert sorted(os.listdir(tmp_path)) == sorted(['bin', os.path.basename(backup_file), 'pg_restore.json'])
+
+
+def test_custom_dump_is_restored_with_pg_restore(tmp_path, fake_tools, load):
+    database = create_dump_database(tmp_path, pg_dump_format='custom')
+    
+    backup_file = database.backup()
+    database.restore(backup_file, jobs=2)
+    
+    assert backup_file.endswith('.dump')
+    with open(fake_tools) as f:
+        restored = json.load(f)
+    assert restored['args'][-3:] == ['-j', '2', backup_file]
+    assert restored['dump'].startswith('custom ')
+    assert '-Fc' in restored['dump']
@@ -0,0 +1,86 @@
+"""
+Tests of the bounded error output capture and the progress reports.
+"""
+import io
+
+import pytest
+
+from src.utils import progress
+from src.utils.progress import ProgressReporter
+from src.utils.stderr import StderrBuffer
+
+MB = 1024 * 1024
+
+
+def test_stderr_buffer_keeps_the_last_lines():
+    buffer = StderrBuffer(max_lines=3)
+    
+    buffer.read(io.BytesIO(b''.join(b"line %d\n" % n for n in range(1, 11))))
+    
+    assert list(buffer.lines) == ['line 8', 'line 9', 'line 10']
+    assert buffer.total_lines == 10
+    assert buffer.text() == "[7 earlier lines omitted]\nline 8\nline 9\nline 10"
+
+
+def test_stderr_buffer_cuts_long_lines():
+    buffer = StderrBuffer(max_line_length=8)
+    
+    buffer.read(io.BytesIO(b"short\n" + b"x" * 30 + b"\n\nafter\n"))
+    
+    # The rest of a cut line is dropped instead of becoming lines of its own
+    assert list(buffer.lines) == ['short', 'xxxxxxxx [...]', 'after']
+    assert buffer.total_lines == 3
+
+
+def test_stderr_buffer_survives_a_failing_listener():
+    seen = []
+    
+    def on_line(line):
+        seen.append(line)
+        raise RuntimeError("listener bug")
+    
+    buffer = StderrBuffer(on_line=on_line)
+    buffer.start(io.BytesIO(b"one\ntwo\n")).join()
+    
+    assert seen == ['one', 'two']
+    assert list(buffer.lines) == ['one', 'two']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_describe_shows_the_percentage_rate_and_eta(clock):
+    reporter = ProgressReporter('Dumping shop', total=100 * MB, items_total=4, item_label='table')
+    clock[0] += 10
+    reporter.update(25 * MB)
+    reporter.step('public.orders')
+    
+    # 25 MB in 10 s leaves 75 MB for 30 s
+    assert reporter.describe() == ("Dumping shop: 25% (25.0 MB of 100.0 MB, 2.5 MB/s, ETA 30.0s), "
+                                   "table 1/4 public.orders")
+
+
+def test_describe_without_a_reliable_total(clock):
+    reporter = ProgressReporter('Dumping shop', total=10 * MB)
+    clock[0] += 4
+    reporter.update_to(12 * MB)
+    
+    # An estimated total that was exceeded is no longer shown
+    assert reporter.describe() == "Dumping shop: 12.0 MB (3.0 MB/s)"
+
+
+def test_progress_lines_are_reported_once_per_interval(clock):
+    lines = []
+    reporter = ProgressReporter('Uploading', total=10 * MB, interval=5, listener=lines.append)
+    
+    reporter.update(MB)
+    clock[0] += 5
+    reporter.update(MB)
+    clock[0] += 1
+    reporter.update(MB)
+    
+    assert lines == ["Uploading: 20% (2.0 MB of 10.0 MB, 409.6 KB/s, ETA 20.0s)"]
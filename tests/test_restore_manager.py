@@ -0,0 +1,136 @@
+"""
+Tests of finding, verifying and streaming backups into fake database clients.
+"""
+import gzip
+import os
+import stat
+import sys
+from datetime import datetime
+
+import pytest
+
+from config.config import config
+from src.database import DatabaseBackupError
+from src.restore_manager import RestoreManager
+from src.utils import Encryption, compute_checksum, write_manifest
+
+DUMP = b"CREATE TABLE orders (id int);\nINSERT INTO orders VALUES (1);\n" * 1000
+
+# Keeps what the client was given on stdin and its arguments
+FAKE_CLIENT = """#!{python}
+import os, sys
+output = os.environ['RESTORE_OUTPUT']
+with open(output, 'wb') as f:
+    f.write(sys.stdin.buffer.read())
+with open(output + '.args', 'w') as f:
+    f.write(' '.join(sys.argv[1:]))
+"""
+
+
+def create_backup(path, content, requires=()):
+    path.write_bytes(content)
+    incremental = {'type': 'incremental', 'requires': list(requires)} if requires else None
+    write_manifest(str(path), compute_checksum(str(path), 'sha256'), 'sha256', incremental=incremental)
+    return str(path)
+
+
+@pytest.fixture
+def chain(tmp_path):
+    create_backup(tmp_path / 'backup_shop_20260101_030000.dump', b'full')
+    return create_backup(tmp_path / 'backup_shop_20260102_030000.dump', b'incremental',
+                         requires=['backup_shop_20260101_030000.dump'])
+
+
+def test_verify_accepts_an_intact_chain(chain):
+    RestoreManager().verify_backup(chain)
+
+
+def test_verify_checks_the_backups_an_incremental_backup_requires(chain, tmp_path):
+    (tmp_path / 'backup_shop_20260101_030000.dump').write_bytes(b'fuLL')
+    
+    with pytest.raises(DatabaseBackupError, match='Checksum mismatch for .*20260101_030000.dump'):
+        RestoreManager().verify_backup(chain)
+
+
+def test_verify_fails_when_a_required_backup_is_missing(chain, tmp_path):
+    (tmp_path / 'backup_shop_20260101_030000.dump').unlink()
+    
+    with pytest.raises(DatabaseBackupError, match='not found: .*20260101_030000.dump'):
+        RestoreManager().verify_backup(chain)
+
+
+@pytest.fixture
+def fake_clients(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name in ('psql', 'mysql'):
+        path = bin_dir / name
+        path.write_text(FAKE_CLIENT.format(python=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    output = tmp_path / 'received.sql'
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('RESTORE_OUTPUT', str(output))
+    return output
+
+
+def use_job(monkeypatch, tmp_path, **settings):
+    job = {'type': 'postgresql', 'host': 'localhost', 'port': 5432, 'user': 'test', 'password': 'test',
+           'database': 'shop', 'backup_dir': str(tmp_path), 'catalog': False, **settings}
+    monkeypatch.setitem(config._config, 'jobs', [job])
+    return job
+
+
+def test_restore_streams_a_compressed_backup_into_psql(fake_clients, tmp_path, monkeypatch):
+    use_job(monkeypatch, tmp_path)
+    (tmp_path / 'backup_shop_20260101_030000.sql.gz').write_bytes(gzip.compress(DUMP))
+    
+    assert RestoreManager().run_restore()
+    
+    assert fake_clients.read_bytes() == DUMP
+    assert 'ON_ERROR_STOP=1' in (tmp_path / 'received.sql.args').read_text()
+
+
+def test_restore_decrypts_a_backup_into_mysql(fake_clients, tmp_path, monkeypatch):
+    key = os.urandom(32)
+    use_job(monkeypatch, tmp_path, type='mysql', port=3306, encryption_key=key.hex(), encryption_chunk_size=4096)
+    path = tmp_path / 'backup_shop_20260101_030000.sql.gz.enc'
+    with open(path, 'wb') as f:
+        writer = Encryption(key, 4096).open_writer(f)
+        writer.write(gzip.compress(DUMP))
+        writer.close()
+    
+    assert RestoreManager().run_restore(backup_file=str(path))
+    
+    assert fake_clients.read_bytes() == DUMP
+    assert (tmp_path / 'received.sql.args').read_text().endswith('shop')
+
+
+def test_restore_of_a_backup_encrypted_with_another_key_fails(fake_clients, tmp_path, monkeypatch):
+    use_job(monkeypatch, tmp_path, encryption_key=os.urandom(32).hex())
+    path = tmp_path / 'backup_shop_20260101_030000.sql.gz.enc'
+    with open(path, 'wb') as f:
+        writer = Encryption(os.urandom(32)).open_writer(f)
+        writer.write(gzip.compress(DUMP))
+        writer.close()
+    
+    assert not RestoreManager().run_restore(backup_file=str(path))
+
+
+@pytest.mark.parametrize('catalog', [True, False])
+def test_find_backup_picks_the_newest_backup_at_or_before_the_time(tmp_path, catalog):
+    for stamp in ('20260101_030000', '20260102_030000', '20260103_030000'):
+        (tmp_path / f"backup_shop_{stamp}.sql.gz").write_bytes(b'dump')
+    (tmp_path / 'backup_other_20260102_120000.sql.gz').write_bytes(b'dump')
+    settings = {'backup_dir': str(tmp_path), 'catalog': catalog}
+    manager = RestoreManager()
+    
+    def find(before=None):
+        return os.path.basename(manager.find_backup(settings, 'shop', before))
+    
+    assert find() == 'backup_shop_20260103_030000.sql.gz'
+    assert find(datetime(2026, 1, 2, 3, 0).timestamp()) == 'backup_shop_20260102_030000.sql.gz'
+    assert find(datetime(2026, 1, 2, 23, 0).timestamp()) == 'backup_shop_20260102_030000.sql.gz'
+    with pytest.raises(DatabaseBackupError):
+        find(datetime(2025, 12, 31).timestamp())
+    # Without the catalog the directory is scanned and no catalog is created
+    assert (tmp_path / '.backup_catalog.db').exists() == catalog
@@ -0,0 +1,169 @@
+"""
+Tests of the cron schedule and the run lock.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import scheduler as scheduler_module
+from src.scheduler import BackupScheduler, CronSchedule, RunLock, SchedulerError
+
+
+def next_runs(expression, start, count=3):
+    schedule = CronSchedule(expression)
+    runs = []
+    for _ in range(count):
+        start = schedule.next_after(start)
+        runs.append(start)
+    return runs
+
+
+def test_impossible_date_never_matches():
+    schedule = CronSchedule('0 0 30 2 *')
+    
+    with pytest.raises(SchedulerError, match='never matches'):
+        schedule.next_after(datetime(2026, 1, 1))
+
+
+@pytest.mark.parametrize('expression', ['0 0 * *', '61 * * * *', '0 0 5-1 * *', '0 0 * foo *'])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(SchedulerError):
+        CronSchedule(expression)
+
+
+def test_day_of_month_or_day_of_week():
+    # Both restricted: the 13th (a Tuesday here) or any Friday
+    assert next_runs('0 0 13 * fri', datetime(2026, 10, 10)) == [
+        datetime(2026, 10, 13),
+        datetime(2026, 10, 16),
+        datetime(2026, 10, 23),
+    ]
+
+
+def test_single_restricted_day_field():
+    assert next_runs('0 0 13 * *', datetime(2026, 10, 10), 2) == [datetime(2026, 10, 13), datetime(2026, 11, 13)]
+    assert next_runs('0 0 * * 5', datetime(2026, 10, 10), 2) == [datetime(2026, 10, 16), datetime(2026, 10, 23)]
+
+
+def test_weekly_macro():
+    # Wednesday to the next Sunday midnight, strictly after a matching time
+    assert next_runs('@weekly', datetime(2026, 10, 14, 12, 30), 2) == [
+        datetime(2026, 10, 18),
+        datetime(2026, 10, 25),
+    ]
+    # 7 is Sunday too
+    assert next_runs('0 0 * * 7', datetime(2026, 10, 14), 1) == [datetime(2026, 10, 18)]
+
+
+def test_month_rollover():
+    assert next_runs('0 3 1 * *', datetime(2026, 1, 31, 10, 0), 2) == [datetime(2026, 2, 1, 3), datetime(2026, 3, 1, 3)]
+    # Months without a 31st are skipped
+    assert next_runs('0 0 31 * *', datetime(2026, 4, 30), 2) == [datetime(2026, 5, 31), datetime(2026, 7, 31)]
+    assert next_runs('* * * * *', datetime(2026, 12, 31, 23, 59), 1) == [datetime(2027, 1, 1)]
+    assert next_runs('30 4 29 feb *', datetime(2026, 3, 1), 1) == [datetime(2028, 2, 29, 4, 30)]
+
+
+def test_steps_and_lists():
+    assert next_runs('*/20 9-10 * * *', datetime(2026, 10, 14, 10, 45), 3) == [
+        datetime(2026, 10, 15, 9, 0),
+        datetime(2026, 10, 15, 9, 20),
+        datetime(2026, 10, 15, 9, 40),
+    ]
+
+
+def test_run_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / 'locks' / 'backup.lock')
+    first, second = RunLock(path), RunLock(path)
+    
+    assert first.acquire()
+    assert not second.acquire()
+    
+    first.release()
+    assert second.acquire()
+    assert not first.acquire()
+    second.release()
+
+
+def test_run_is_skipped_while_the_lock_is_held(tmp_path):
+    runs = []
+    scheduler = BackupScheduler(lambda: runs.append(True) or True, {'lock_file': str(tmp_path / 'backup.lock')})
+    
+    with RunLock(scheduler.lock.path) as acquired:
+        assert acquired
+        scheduler._run_once()
+    assert runs == []
+    
+    scheduler._run_once()
+    assert runs == [True]
+
+
+class FakeClock:
+    """Clock of the scheduler, moved forward by the runs and the waits."""
+    
+    def __init__(self, now):
+        self.now = now
+    
+    def advance(self, **delta):
+        self.now += timedelta(**delta)
+
+
+def run_with_clock(monkeypatch, tmp_path, clock, until, run_minutes, on_wait=None, **settings):
+    """Run the scheduler until the clock reaches ``until``, returning the start times of the runs."""
+    runs = []
+    
+    class ClockDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+    
+    monkeypatch.setattr(scheduler_module, 'datetime', ClockDatetime)
+    
+    def run():
+        runs.append(clock.now)
+        clock.advance(minutes=run_minutes)
+        return True
+    
+    scheduler = BackupScheduler(run, {'schedule': '0 3 * * *', 'lock_file': str(tmp_path / 'backup.lock'),
+                                      'poll_interval': 60, **settings})
+    
+    def wait(timeout):
+        if on_wait:
+            on_wait(scheduler)
+        clock.advance(seconds=timeout)
+        if clock.now >= until:
+            scheduler.stop()
+        return False
+    
+    monkeypatch.setattr(scheduler._wakeup, 'wait', wait)
+    scheduler.run_forever()
+    return runs
+
+
+def test_slot_passed_during_a_start_up_run_is_skipped(monkeypatch, tmp_path):
+    clock = FakeClock(datetime(2026, 10, 17, 2, 59))
+    
+    runs = run_with_clock(monkeypatch, tmp_path, clock, datetime(2026, 10, 18, 3, 30), 10, run_on_start=True)
+    
+    assert runs == [datetime(2026, 10, 17, 2, 59), datetime(2026, 10, 18, 3, 0)]
+
+
+def test_slot_passed_during_a_triggered_run_is_skipped(monkeypatch, tmp_path):
+    clock = FakeClock(datetime(2026, 10, 17, 2, 50))
+    triggered = []
+    
+    def trigger_once(scheduler):
+        if clock.now >= datetime(2026, 10, 17, 2, 55) and not triggered:
+            triggered.append(clock.now)
+            scheduler.trigger()
+    
+    runs = run_with_clock(monkeypatch, tmp_path, clock, datetime(2026, 10, 18, 3, 30), 10, trigger_once)
+    
+    assert runs == [triggered[0] + timedelta(seconds=60), datetime(2026, 10, 18, 3, 0)]
+
+
+def test_triggered_run_before_a_slot_keeps_the_slot(monkeypatch, tmp_path):
+    clock = FakeClock(datetime(2026, 10, 17, 2, 0))
+    
+    runs = run_with_clock(monkeypatch, tmp_path, clock, datetime(2026, 10, 17, 4, 0), 10, run_on_start=True)
+    
+    assert runs == [datetime(2026, 10, 17, 2, 0), datetime(2026, 10, 17, 3, 0)]
@@ -0,0 +1,90 @@
+"""
+Tests of the automatic codec and level selection.
+"""
+import pytest
+
+from src.compression import CodecSelector
+
+# Measurements by candidate: (compressed bytes of a 1000 byte sample, MB/s)
+MEASUREMENTS = {
+    ('zstd', 3): (200, 300.0),
+    ('zstd', 9): (149, 40.0),
+    ('xz', 1): (147, 20.0),
+    ('lz4', None): (400, 900.0),
+}
+
+
+@pytest.fixture
+def create_selector(monkeypatch):
+    def create(measurements=MEASUREMENTS, **options):
+        selector = CodecSelector(','.join(f"{name}:{level}" if level else name for name, level in measurements),
+                                 **options)
+        
+        def measure(name, level, sample):
+            size, speed = measurements[(name, level)]
+            return {'codec': name, 'level': level, 'bytes': size, 'ratio': round(len(sample) / size, 3),
+                    'mb_per_second': speed}
+        
+        monkeypatch.setattr(selector, '_measure', measure)
+        return selector
+    return create
+
+
+def test_best_ratio_prefers_the_fastest_within_two_percent(create_selector):
+    choice = create_selector().select(b'x' * 1000)
+    
+    # xz:1 is smallest, zstd:9 is within 2% of it and faster
+    assert (choice.codec, choice.level) == ('zstd', 9)
+    assert choice.reason == 'best ratio within the budget'
+
+
+def test_minimum_speed_excludes_slow_candidates(create_selector):
+    choice = create_selector(min_speed=100).select(b'x' * 1000)
+    
+    assert (choice.codec, choice.level) == ('zstd', 3)
+    assert choice.required_speed == 100
+
+
+def test_time_budget_sets_the_required_speed(create_selector):
+    # 2000 MB within 4 s needs 500 MB/s
+    choice = create_selector(time_budget=4).select(b'x' * 1000, total_size=2000 * 1024 * 1024)
+    
+    assert (choice.codec, choice.level) == ('lz4', None)
+    assert choice.required_speed == 500
+
+
+def test_fastest_candidate_when_none_fits(create_selector):
+    choice = create_selector(min_speed=5000).select(b'x' * 1000)
+    
+    assert (choice.codec, choice.level) == ('lz4', None)
+    assert choice.reason == 'no candidate fits the budget, using the fastest'
+
+
+def test_fastest_candidate_for_incompressible_data(create_selector):
+    measurements = {('zstd', 3): (980, 300.0), ('lz4', None): (1000, 900.0)}
+    
+    choice = create_selector(measurements).select(b'x' * 1000)
+    
+    assert (choice.codec, choice.level) == ('lz4', None)
+    assert choice.reason == 'data hardly compresses, using the fastest'
+
+
+def test_empty_sample_uses_the_first_candidate(create_selector):
+    choice = create_selector().select(b'')
+    
+    assert (choice.codec, choice.level) == ('zstd', 3)
+    assert choice.reason == 'empty sample'
+
+
+def test_real_measurement_of_a_sample():
+    choice = CodecSelector('gzip:1,gzip:9').select(b'INSERT INTO t VALUES (1);\n' * 10000)
+    
+    assert choice.codec == 'gzip'
+    assert choice.ratio > 10
+    assert [candidate['level'] for candidate in choice.candidates] == [1, 9]
+
+
+@pytest.mark.parametrize('text', ['zip', 'brotli:5', ' , '])
+def test_invalid_candidates_are_rejected(text):
+    with pytest.raises(ValueError):
+        CodecSelector.parse_candidates(text)
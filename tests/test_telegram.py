@@ -0,0 +1,200 @@
+"""
+Tests of the Telegram uploads against a local Bot API stub.
+"""
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config.config import config
+from src.backup_manager import BackupManager
+from src.notification import telegram
+from src.notification.telegram import MultipartUpload, TelegramNotifier
+
+
+class BotApiStub:
+    """Bot API answering every request with ok, or with the queued responses first."""
+    
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        # Seconds every document upload takes
+        self.upload_delay = 0.0
+        self._lock = threading.Lock()
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if self.path.endswith('/sendDocument') and stub.upload_delay:
+                    # Not time.sleep, which the sleeps fixture replaces
+                    threading.Event().wait(stub.upload_delay)
+                with stub._lock:
+                    stub.requests.append((self.path, self.headers.get('Content-Type'), body))
+                    status, payload = stub.responses.pop(0) if stub.responses else (200, {'ok': True, 'result': {}})
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def documents(self):
+        """Decode the uploaded documents as (field values, file name, content)."""
+        documents = []
+        for path, content_type, body in self.requests:
+            if not path.endswith('/sendDocument'):
+                continue
+            message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+            fields, document = {}, None
+            for part in message.get_payload():
+                name = part.get_param('name', header='content-disposition')
+                if name == 'document':
+                    document = (part.get_filename(), part.get_payload(decode=True))
+                else:
+                    fields[name] = part.get_payload(decode=True).decode()
+            documents.append((fields, *document))
+        return documents
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = BotApiStub()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(telegram.time, 'sleep', delays.append)
+    return delays
+
+
+def create_notifier(stub, **config):
+    return TelegramNotifier({'enabled': True, 'bot_token': 'token', 'chat_id': '42', 'api_url': stub.url,
+                             'min_interval': 0, 'upload_workers': 2, **config})
+
+
+def test_multipart_upload_streams_the_slice_and_rewinds(tmp_path):
+    path = tmp_path / 'backup.sql.gz'
+    path.write_bytes(bytes(range(256)) * 40)
+    
+    body = MultipartUpload({'chat_id': '42'}, 'document', str(path), 'part', 'application/octet-stream',
+                           offset=1000, length=5000)
+    first = b''.join(iter(lambda: body.read(777), b''))
+    assert len(first) == len(body)
+    assert (bytes(range(256)) * 40)[1000:6000] in first
+    
+    body.seek(0)
+    assert body.read() == first
+    body.close()
+
+
+def test_large_backup_is_split_into_parts(stub, sleeps, tmp_path):
+    content = bytes(range(256)) * 1000
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(content)
+    notifier = create_notifier(stub, max_file_size_mb=100_000 / (1024 * 1024))
+    
+    assert notifier.send_backup_success(str(path))
+    
+    documents = sorted(stub.documents(), key=lambda document: document[1])
+    assert [name for _, name, _ in documents] == [f"backup_db.sql.gz.part00{n}" for n in (1, 2, 3)]
+    assert [len(data) for _, _, data in documents] == [100_000, 100_000, 56_000]
+    assert b''.join(data for _, _, data in documents) == content
+    assert documents[2][0] == {'chat_id': '42', 'caption': 'Backup file: backup_db.sql.gz (part 3/3)'}
+    assert sleeps == []
+
+
+def test_small_backup_is_sent_whole(stub, sleeps, tmp_path):
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(b'dump' * 100)
+    notifier = create_notifier(stub)
+    
+    assert notifier.send_backup_success(str(path))
+    
+    [(fields, name, data)] = stub.documents()
+    assert (fields['caption'], name, data) == ('Backup file: backup_db.sql.gz', 'backup_db.sql.gz', b'dump' * 100)
+
+
+def test_rate_limited_upload_is_retried_after_retry_after(stub, sleeps, tmp_path):
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(b'x' * 5000)
+    notifier = create_notifier(stub)
+    stub.responses = [
+        (429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 7}}),
+        (429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 3}}),
+    ]
+    
+    notifier._send_document(str(path))
+    
+    assert sleeps == [7.0, 3.0]
+    # Every attempt sent the whole document again
+    assert [data for _, _, data in stub.documents()] == [b'x' * 5000] * 3
+
+
+def test_server_errors_back_off_exponentially_until_the_retries_are_spent(stub, sleeps, tmp_path):
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(b'x' * 10)
+    notifier = create_notifier(stub, max_retries=2)
+    stub.responses = [(503, {'ok': False})] * 3
+    
+    with pytest.raises(Exception):
+        notifier._send_document(str(path))
+    
+    assert sleeps == [1, 2]
+    assert len(stub.requests) == 3
+
+
+def test_upload_in_parts_is_given_its_sized_deadline_within_the_budget(stub, tmp_path, monkeypatch):
+    content = bytes(range(256)) * 1000
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(content)
+    # Three parts in two rounds, each taking longer than the provider timeout
+    stub.upload_delay = 0.5
+    notifier = create_notifier(stub, max_file_size_mb=100_000 / (1024 * 1024), timeout=0.2, request_timeout=5)
+    monkeypatch.setitem(config._config['notification'], 'timeout', 30)
+    manager = BackupManager()
+    manager.notifiers = [notifier]
+    
+    assert notifier.get_timeout(str(path)) == pytest.approx(10.2)
+    manager._send_notifications('success', str(path), 'Backup completed')
+    
+    documents = sorted(stub.documents(), key=lambda document: document[1])
+    assert [name for _, name, _ in documents] == [f"backup_db.sql.gz.part00{n}" for n in (1, 2, 3)]
+    assert b''.join(data for _, _, data in documents) == content
+
+
+def test_upload_in_parts_is_cut_short_by_the_budget(stub, tmp_path, monkeypatch, caplog):
+    path = tmp_path / 'backup_db.sql.gz'
+    path.write_bytes(bytes(range(256)) * 1000)
+    stub.upload_delay = 0.5
+    notifier = create_notifier(stub, max_file_size_mb=100_000 / (1024 * 1024), timeout=0.2, request_timeout=5)
+    monkeypatch.setitem(config._config['notification'], 'timeout', 0.1)
+    manager = BackupManager()
+    manager.notifiers = [notifier]
+    
+    start = time.monotonic()
+    manager._send_notifications('success', str(path), 'Backup completed')
+    
+    assert time.monotonic() - start < 0.4
+    assert 'NOTIFICATION_TIMEOUT' in caplog.text
+    # Let the abandoned upload finish before other tests patch time.sleep
+    for thread in threading.enumerate():
+        if thread.name.startswith('notify-'):
+            thread.join()
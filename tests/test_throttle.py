@@ -0,0 +1,107 @@
+"""
+Tests of the rate limits and process priority of the backups.
+"""
+import io
+
+import pytest
+
+from src.utils import throttle
+from src.utils.throttle import AdaptiveThrottle, RateLimiter, ThrottledWriter, get_priority_prefix
+
+
+class FakeClock:
+    """Monotonic clock advanced by the sleeps of the code under test."""
+    
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(throttle.time, 'monotonic', fake.monotonic)
+    monkeypatch.setattr(throttle.time, 'sleep', fake.sleep)
+    return fake
+
+
+def test_rate_limiter_holds_the_average_rate(clock):
+    limiter = RateLimiter(1000, burst=1.0)
+    
+    # The first second of traffic fits in the full bucket
+    limiter.consume(1000)
+    assert clock.sleeps == []
+    for _ in range(4):
+        limiter.consume(500)
+    
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+    assert limiter.total == 3000
+    assert limiter.waited == pytest.approx(2.0)
+
+
+def test_large_chunks_overdraw_the_bucket(clock):
+    limiter = RateLimiter(1000, burst=1.0)
+    
+    limiter.consume(5000)
+    
+    assert clock.sleeps == [pytest.approx(4.0)]
+
+
+def test_unlimited_rate_only_counts(clock):
+    limiter = RateLimiter(0)
+    
+    limiter.consume(10 ** 9)
+    
+    assert clock.sleeps == []
+    assert limiter.total == 10 ** 9
+    assert not limiter.limited
+
+
+def test_throttled_writer_paces_the_writes(clock):
+    target = io.BytesIO()
+    writer = ThrottledWriter(target, RateLimiter(100, burst=1.0))
+    
+    for _ in range(3):
+        writer.write(b'x' * 100)
+    
+    assert target.getvalue() == b'x' * 300
+    assert writer.tell() == 300
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+
+
+def test_adaptive_throttle_halves_and_restores_the_rates():
+    limited = RateLimiter(8 * 1024 * 1024, name='limited')
+    unlimited = RateLimiter(0, name='unlimited')
+    adaptive = AdaptiveThrottle([limited, unlimited], 'true', threshold=10, min_rate=3 * 1024 * 1024)
+    
+    adaptive._back_off(limited, 0, 20)
+    adaptive._back_off(unlimited, 6 * 1024 * 1024, 20)
+    assert (limited.rate, unlimited.rate) == (4 * 1024 * 1024, 3 * 1024 * 1024)
+    
+    # Never below the minimum rate
+    adaptive._back_off(limited, 0, 20)
+    assert limited.rate == 3 * 1024 * 1024
+    
+    adaptive._recover(limited, 5)
+    adaptive._recover(unlimited, 5)
+    assert (limited.rate, unlimited.rate) == (6 * 1024 * 1024, 0)
+    adaptive._recover(limited, 5)
+    assert limited.rate == 8 * 1024 * 1024
+
+
+def test_priority_prefix(monkeypatch):
+    monkeypatch.setattr(throttle.shutil, 'which', lambda name: f"/usr/bin/{name}")
+    
+    assert get_priority_prefix() == []
+    assert get_priority_prefix(10, 'best-effort', 7) == ['nice', '-n', '10', 'ionice', '-c', '2', '-n', '7']
+    # The idle class has no levels
+    assert get_priority_prefix(ionice_class='idle', ionice_level=7) == ['ionice', '-c', '3']
+    with pytest.raises(ValueError, match='Unknown ionice class'):
+        get_priority_prefix(ionice_class='background')
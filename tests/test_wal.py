@@ -0,0 +1,90 @@
+"""
+Tests of the WAL archive retention and staging with fixture segment names.
+"""
+import os
+
+import pytest
+
+from src.archive.wal import WalArchiver
+
+
+def segment(timeline, number):
+    return f"{timeline:08X}{0:08X}{number:08X}"
+
+
+@pytest.fixture
+def archiver(tmp_path):
+    return WalArchiver({
+        'name': 'main',
+        'archive_dir': str(tmp_path / 'archive'),
+        'archive_compression': 'gzip',
+    })
+
+
+def receive(archiver, *names):
+    """Write segments into the incoming directory like pg_receivewal, with their name as content."""
+    os.makedirs(archiver.incoming_dir, exist_ok=True)
+    for name in names:
+        with open(os.path.join(archiver.incoming_dir, name), 'wb') as f:
+            f.write(name.encode() * 64)
+
+
+def test_prune_keeps_everything_from_the_oldest_kept_start(archiver):
+    receive(archiver, *(segment(1, number) for number in range(1, 6)), '00000002.history',
+            *(segment(2, number) for number in range(5, 8)))
+    assert archiver.archive_completed() == 9
+    
+    removed = archiver.prune([
+        {'method': 'wal', 'start_segment': segment(2, 6)},
+        {'method': 'wal', 'start_segment': segment(1, 4)},
+        # Starts of other archivers are ignored
+        {'method': 'binlog', 'start_file': 'binlog.000001'},
+    ])
+    
+    assert removed == [segment(1, 1), segment(1, 2), segment(1, 3)]
+    assert sorted(archiver.list_archived()) == sorted([
+        '00000002.history', segment(1, 4), segment(1, 5), segment(2, 5), segment(2, 6), segment(2, 7),
+    ])
+    assert all(path.endswith('.gz') for path in archiver.list_archived().values())
+
+
+def test_prune_keeps_everything_without_a_base_backup(archiver):
+    receive(archiver, segment(1, 1), segment(1, 2))
+    archiver.archive_completed()
+    
+    assert archiver.prune([{'method': 'binlog', 'start_file': 'binlog.000001'}]) == []
+    assert sorted(archiver.list_archived()) == [segment(1, 1), segment(1, 2)]
+
+
+def test_stage_restores_the_segments_and_promotes_the_partial_one(archiver, tmp_path):
+    receive(archiver, '00000002.history', *(segment(2, number) for number in range(3, 6)))
+    archiver.archive_completed()
+    # The newest completed segment stays in the incoming directory next to the one being written
+    assert sorted(os.listdir(archiver.incoming_dir)) == [segment(2, 5)]
+    with open(os.path.join(archiver.incoming_dir, segment(2, 6) + '.partial'), 'wb') as f:
+        f.write(b'partial')
+    output_dir = str(tmp_path / 'wal')
+    
+    assert archiver.stage(segment(2, 4), output_dir) == 3
+    
+    assert sorted(os.listdir(output_dir)) == sorted(['00000002.history', segment(2, 4), segment(2, 5), segment(2, 6)])
+    for name in (segment(2, 4), segment(2, 5)):
+        with open(os.path.join(output_dir, name), 'rb') as f:
+            assert f.read() == name.encode() * 64
+    with open(os.path.join(output_dir, segment(2, 6)), 'rb') as f:
+        assert f.read() == b'partial'
+
+
+def test_stage_prefers_the_archived_copy_of_a_segment(archiver, tmp_path):
+    receive(archiver, segment(1, 1))
+    archiver.archive_completed()
+    receive(archiver, segment(1, 2))
+    # A partial segment left over from before the segment was completed
+    with open(os.path.join(archiver.incoming_dir, segment(1, 1) + '.partial'), 'wb') as f:
+        f.write(b'stale')
+    output_dir = str(tmp_path / 'wal')
+    
+    assert archiver.stage(segment(1, 1), output_dir) == 2
+    
+    with open(os.path.join(output_dir, segment(1, 1)), 'rb') as f:
+        assert f.read() == segment(1, 1).encode() * 64